@@ -32,6 +32,8 @@ class EconomicsEntry:
     cost_per_success_usd: float | None
     avg_tokens_per_run: float
     tokens_per_success: float | None
+    # Where ``estimated_tokens`` came from: "provider_usage" or a local tokenizer name.
+    token_sources: tuple[str, ...] = ()
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -49,6 +51,7 @@ class EconomicsEntry:
             "cost_per_success_usd": self.cost_per_success_usd,
             "avg_tokens_per_run": self.avg_tokens_per_run,
             "tokens_per_success": self.tokens_per_success,
+            "token_sources": list(self.token_sources),
         }
 
 
@@ -88,6 +91,7 @@ def summarize_report(
         cost_per_success_usd=cost_per_success,
         avg_tokens_per_run=(total_tokens / total_runs) if total_runs else 0.0,
         tokens_per_success=tokens_per_success,
+        token_sources=_token_sources(results),
     )
 
 
@@ -154,15 +158,15 @@ def render_markdown(report: dict[str, Any]) -> str:
         )
     lines.extend(
         [
-            "| Label | Suite | Provider | Model | Pass rate (95% CI) | Runs | Avg tokens | Tokens/success | Estimated cost | Cost/success |",
-            "| --- | --- | --- | --- | ---: | ---: | ---: | ---: | ---: | ---: |",
+            "| Label | Suite | Provider | Model | Pass rate (95% CI) | Runs | Avg tokens | Tokens/success | Token source | Estimated cost | Cost/success |",
+            "| --- | --- | --- | --- | ---: | ---: | ---: | ---: | --- | ---: | ---: |",
         ]
     )
     for entry in report.get("entries", []):
         lines.append(
             "| {label} | {suite} | {provider} | {model} | {pass_rate} | {total_runs} | "
-            "{avg_tokens_per_run:.0f} | {tokens_per_success} | {estimated_cost} | "
-            "{cost_per_success} |".format(
+            "{avg_tokens_per_run:.0f} | {tokens_per_success} | {token_sources} | "
+            "{estimated_cost} | {cost_per_success} |".format(
                 label=entry.get("label", ""),
                 suite=entry.get("suite", ""),
                 provider=entry.get("provider", ""),
@@ -174,6 +178,7 @@ def render_markdown(report: dict[str, Any]) -> str:
                 total_runs=int(entry.get("total_runs", 0)),
                 avg_tokens_per_run=float(entry.get("avg_tokens_per_run", 0.0)),
                 tokens_per_success=_format_number(entry.get("tokens_per_success"), decimals=0),
+                token_sources=", ".join(entry.get("token_sources") or []) or "-",
                 estimated_cost=_format_usd(entry.get("estimated_cost_usd")),
                 cost_per_success=_format_usd(entry.get("cost_per_success_usd")),
             )
@@ -242,6 +247,12 @@ def _total_tokens(results: Sequence[dict[str, Any]], summary: dict[str, Any]) ->
     return sum(int(result.get("estimated_tokens") or 0) for result in results)
 
 
+def _token_sources(results: Sequence[dict[str, Any]]) -> tuple[str, ...]:
+    sources = {str((result.get("metadata") or {}).get("token_source") or "") for result in results}
+    sources.discard("")
+    return tuple(sorted(sources))
+
+
 def _resolve_cost_per_1k(report: dict[str, Any], override: float | None) -> float | None:
     if override is not None:
         return override
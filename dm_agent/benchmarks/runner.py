@@ -11,7 +11,7 @@ import sys
 import tempfile
 import time
 from collections.abc import Iterable, Sequence
-from contextlib import contextmanager, redirect_stdout
+from contextlib import redirect_stdout
 from io import StringIO
 from pathlib import Path
 from typing import Any, cast
@@ -19,6 +19,7 @@ from typing import Any, cast
 from dm_agent.clients.llm_factory import PROVIDER_DEFAULTS, create_llm_client
 from dm_agent.core import ReactAgent
 from dm_agent.evals.real_runner import PROVIDER_API_KEY_ENV, UsageTrackingClient
+from dm_agent.memory.context_budget import tokenizer_for
 from dm_agent.skills import SkillManager
 from dm_agent.tools import default_tools
 from dm_agent.tracing import TraceWriter, analyze_events, load_trace_events
@@ -42,16 +43,6 @@ BENCH_VARIANTS: list[BenchmarkVariant] = [
 DEFAULT_BENCH_VARIANTS: list[BenchmarkVariant] = [BENCH_VARIANTS[0]]
 
 
-@contextmanager
-def chdir(path: Path):
-    previous = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(previous)
-
-
 def run_benchmark_suite(
     *,
     suite: str = "coding",
@@ -117,6 +108,8 @@ def run_benchmark_suite(
         },
         "token_economics": {
             "cost_per_1k_tokens": config.cost_per_1k_tokens,
+            # 供应商不回传用量的那些 run，estimated_tokens 用这个 tokenizer 数。
+            "tokenizer": tokenizer_for(provider, config.model or defaults.get("model", "")).name,
         },
         "summary": summarize_benchmark_results(results, tasks=selected_tasks),
         "manifest": build_benchmark_manifest(
@@ -662,34 +655,35 @@ def _run_benchmark_task_in_workspace(
         trace_writer=trace_writer,
         enable_adaptive_replanning=config.enable_adaptive_replanning,
         max_replans=config.max_replans,
+        workspace=workspace,
+        tokenizer=client.tokenizer,
     )
 
-    with chdir(workspace):
-        prompt = task.scoped_prompt() if config.declare_allowed_files else task.prompt
-        try:
-            if config.quiet:
-                with redirect_stdout(StringIO()):
-                    raw_result = agent.run(prompt)
-            else:
+    prompt = task.scoped_prompt() if config.declare_allowed_files else task.prompt
+    try:
+        if config.quiet:
+            with redirect_stdout(StringIO()):
                 raw_result = agent.run(prompt)
-        except Exception as exc:
-            if trace_writer:
-                trace_writer.record(
-                    "run_error",
-                    {"error_type": type(exc).__name__, "message": str(exc)},
-                )
-            raw_result = {
-                "final_answer": "",
-                "steps": [],
-                "metadata": {
-                    "status": "exception",
-                    "failure_reason": str(exc),
-                    "duration_seconds": 0.0,
-                },
-            }
-        finally:
-            if trace_writer:
-                trace_writer.close()
+        else:
+            raw_result = agent.run(prompt)
+    except Exception as exc:
+        if trace_writer:
+            trace_writer.record(
+                "run_error",
+                {"error_type": type(exc).__name__, "message": str(exc)},
+            )
+        raw_result = {
+            "final_answer": "",
+            "steps": [],
+            "metadata": {
+                "status": "exception",
+                "failure_reason": str(exc),
+                "duration_seconds": 0.0,
+            },
+        }
+    finally:
+        if trace_writer:
+            trace_writer.close()
 
     after_snapshot = _snapshot_workspace(workspace)
     changed_files = _diff_workspace(before_snapshot, after_snapshot)
@@ -713,6 +707,9 @@ def _run_benchmark_task_in_workspace(
             "prompt_tokens": client.usage.prompt_tokens,
             "completion_tokens": client.usage.completion_tokens,
             "total_tokens": client.usage.total_tokens,
+            "cached_tokens": client.usage.cached_tokens,
+            "cache_write_tokens": client.usage.cache_write_tokens,
+            "token_source": client.usage.token_source,
             "repeat_index": repeat_index,
             "changed_files": changed_files,
             "patch_fingerprint": patch_fingerprint,
@@ -802,7 +799,7 @@ def _build_tracking_client(config: BenchmarkRunConfig) -> UsageTrackingClient:
         base_url=config.base_url or defaults.get("base_url"),
         timeout=config.timeout,
     )
-    return UsageTrackingClient(client)
+    return UsageTrackingClient(client, tokenizer=tokenizer_for(provider, client.model))
 
 
 def _validate_benchmark_config(config: BenchmarkRunConfig) -> None:
@@ -202,9 +202,22 @@ def main(argv: Any = None) -> int:
         show_steps=args.show_steps,
         max_observation_chars=args.max_observation_chars,
         context_token_budget=args.context_token_budget,
+        tokenizer=args.tokenizer,
         enable_edit_guard=args.enable_edit_guard,
+        enable_tool_cache=args.enable_tool_cache,
+        tool_cache_path=str(args.tool_cache_path) if args.tool_cache_path else None,
+        memory_db_path=str(args.memory_db_path) if args.memory_db_path else None,
+        dense_memory=args.dense_memory,
+        trace_flush_every=args.trace_flush_every,
+        trace_flush_ms=args.trace_flush_ms,
+        trace_fsync=args.trace_fsync,
+        trace_background=args.trace_background,
+        trace_blob_threshold=args.trace_blob_threshold,
+        enable_streaming=args.enable_streaming,
+        cache_friendly_context=args.cache_friendly_context,
         llm_max_retries=args.llm_max_retries,
         enable_adaptive_replanning=args.enable_adaptive_replanning,
+        speculative_planning=args.speculative_planning,
         max_replans=args.max_replans,
     )
 
@@ -6,6 +6,8 @@ import argparse
 from pathlib import Path
 from typing import Any
 
+from dm_agent.memory.dense_index import NUMPY_AVAILABLE
+
 from .config import load_config_from_file
 
 
@@ -19,6 +21,8 @@ def validate_feature_args(args: argparse.Namespace) -> str:
         return "--context-token-budget must be 0 (disabled) or greater."
     if args.llm_max_retries < 0:
         return "--llm-max-retries must be 0 or greater."
+    if getattr(args, "dense_memory", False) and not NUMPY_AVAILABLE:
+        return "--dense-memory 需要 numpy：pip install 'dm-code-agent[dense]'。"
     if getattr(args, "resume_at", "") and not getattr(args, "resume", None):
         return "--resume-at 需要与 --resume 一起使用。"
     conversation_error = _validate_conversation_args(args)
@@ -111,6 +115,16 @@ def parse_args(argv: Any) -> argparse.Namespace:
         default=saved_config.get("context_token_budget", 24000),
         help="对话历史的估算 token 预算，超限提前触发本地压缩；0 表示只按消息节奏压缩（默认：24000）。",
     )
+    parser.add_argument(
+        "--tokenizer",
+        choices=("auto", "heuristic"),
+        default=saved_config.get("tokenizer", "heuristic"),
+        help=(
+            "token 预算的计数方式：heuristic 固定用 chars/4（默认）；auto 按提供商选择"
+            "（openai 装了 tiktoken 时精确计数，其余按提供商的中英文字符比例估算），"
+            "中文多的会话会更早触发压缩。"
+        ),
+    )
     parser.add_argument(
         "--disable-edit-guard",
         dest="enable_edit_guard",
@@ -121,12 +135,69 @@ def parse_args(argv: Any) -> argparse.Namespace:
             "依赖行号的连续编辑在写后需重读）。"
         ),
     )
+    parser.add_argument(
+        "--disable-tool-cache",
+        dest="enable_tool_cache",
+        action="store_false",
+        default=saved_config.get("enable_tool_cache", True),
+        help=(
+            "关闭只读分析工具的结果缓存（默认开启：parse_ast、search_in_file 等在目标文件"
+            "未变时复用本次 run 内上一次的结果，写入或执行命令后自动失效）。"
+        ),
+    )
+    parser.add_argument(
+        "--tool-cache",
+        dest="tool_cache_path",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="把只读工具结果缓存持久化到该 JSON 文件，跨 run 复用（条目仍按文件指纹校验）。",
+    )
+    parser.add_argument(
+        "--memory-db",
+        dest="memory_db_path",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="把上下文压缩的记忆持久化到该 SQLite 库，按仓库分区，同一仓库的后续 run 从已有记忆起步。",
+    )
+    parser.add_argument(
+        "--dense-memory",
+        action="store_true",
+        default=saved_config.get("dense_memory", False),
+        help=(
+            "记忆检索在 BM25 之外混入哈希向量相似度，措辞不同的记忆也能召回"
+            "（需要 numpy；默认关闭）。"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        dest="enable_streaming",
+        action="store_true",
+        default=saved_config.get("enable_streaming", False),
+        help="流式接收 LLM 响应，动作 JSON 一完整就执行并断开流（默认关闭）。",
+    )
+    parser.add_argument(
+        "--cache-friendly-context",
+        action="store_true",
+        default=saved_config.get("cache_friendly_context", False),
+        help=(
+            "缓存友好的上下文布局：只在当前窗口超出 token 预算时才折叠，"
+            "折叠之间只在末尾追加，让供应商前缀缓存持续命中（默认关闭）。"
+        ),
+    )
     parser.add_argument(
         "--llm-max-retries",
         type=int,
         default=saved_config.get("llm_max_retries", 2),
         help="LLM 瞬时故障（超时/断连/429/5xx）的统一重试次数；0 表示不重试（默认：2）。",
     )
+    parser.add_argument(
+        "--speculative-planning",
+        action="store_true",
+        default=saved_config.get("speculative_planning", False),
+        help="规划调用与第一个 agent 请求并发，计划到达后再拼回任务提示词。默认关闭。",
+    )
     parser.add_argument(
         "--enable-adaptive-replanning",
         action="store_true",
@@ -178,7 +249,7 @@ def parse_args(argv: Any) -> argparse.Namespace:
         type=Path,
         help=(
             "每步结束后落一份 run 状态，用于崩溃后 --resume 续跑。"
-            "*.jsonl 写成 append-only 会话日志（保留每一步的历史快照，可配合 "
+            "*.jsonl（或块压缩的 *.jsonl.gz）写成 append-only 会话日志（保留每一步的历史快照，可配合 "
             "--resume-at 与 dm-agent-trace fork）；其他后缀写成单文件 JSON 快照。"
         ),
     )
@@ -198,6 +269,44 @@ def parse_args(argv: Any) -> argparse.Namespace:
         action="store_true",
         help="在 trace 中包含完整 LLM 输入/输出。仅建议在私有调试时启用。",
     )
+    parser.add_argument(
+        "--trace-flush-every",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "会话日志组提交：攒够 N 条再一次性写出（默认：明文日志 1，即每条立刻 flush；"
+            ".jsonl.gz 日志 64）。"
+        ),
+    )
+    parser.add_argument(
+        "--trace-flush-ms",
+        type=int,
+        default=0,
+        metavar="MS",
+        help="会话日志组提交：最早一条缓冲条目等待超过 MS 毫秒即写出（默认 0，不按时间）。",
+    )
+    parser.add_argument(
+        "--trace-fsync",
+        choices=["off", "checkpoint", "always"],
+        default="off",
+        help="会话日志 fsync 策略：checkpoint 在 run_end/checkpoint 条目处落盘，always 每次提交都落盘。",
+    )
+    parser.add_argument(
+        "--trace-background",
+        action="store_true",
+        help="会话日志的脱敏、序列化与写盘交给后台线程（有界队列，run 结束时按序写完）。",
+    )
+    parser.add_argument(
+        "--trace-blob-threshold",
+        type=int,
+        default=0,
+        metavar="CHARS",
+        help=(
+            "会话日志里长于 CHARS 个字符的字符串存进 <日志>.blobs/（按内容去重），"
+            "条目只留引用（默认 0，不外置）。"
+        ),
+    )
     parser.add_argument(
         "--report",
         type=Path,
@@ -40,9 +40,24 @@ class Config:
     show_steps: bool = False
     max_observation_chars: int = 8000
     context_token_budget: int = 24000
+    tokenizer: str = "heuristic"
     enable_edit_guard: bool = True
+    enable_tool_cache: bool = True
+    # 只对本次调用生效，不写回配置文件（同 --trace）。
+    tool_cache_path: str | None = None
+    memory_db_path: str | None = None
+    dense_memory: bool = False
+    # 会话日志的组提交与 fsync 策略，同样只对本次调用生效。
+    trace_flush_every: int | None = None
+    trace_flush_ms: int = 0
+    trace_fsync: str = "off"
+    trace_background: bool = False
+    trace_blob_threshold: int = 0
+    enable_streaming: bool = False
+    cache_friendly_context: bool = False
     llm_max_retries: int = 2
     enable_adaptive_replanning: bool = False
+    speculative_planning: bool = False
     max_replans: int = -1
 
 
@@ -81,9 +96,15 @@ def save_config_to_file(config: Config) -> None:
             "show_steps": config.show_steps,
             "max_observation_chars": config.max_observation_chars,
             "context_token_budget": config.context_token_budget,
+            "tokenizer": config.tokenizer,
             "enable_edit_guard": config.enable_edit_guard,
+            "enable_tool_cache": config.enable_tool_cache,
+            "dense_memory": config.dense_memory,
+            "enable_streaming": config.enable_streaming,
+            "cache_friendly_context": config.cache_friendly_context,
             "llm_max_retries": config.llm_max_retries,
             "enable_adaptive_replanning": config.enable_adaptive_replanning,
+            "speculative_planning": config.speculative_planning,
             "max_replans": config.max_replans,
         }
         atomic_write_json(path, config_data)
@@ -130,6 +151,7 @@ def resolve_advanced_features(config: Config) -> dict[str, bool]:
     """Return effective advanced feature switches for one agent run."""
     return {
         "adaptive_replanning": config.enable_adaptive_replanning,
+        "speculative_planning": config.speculative_planning,
     }
 
 
@@ -140,6 +162,7 @@ def format_advanced_feature_status(config: Config) -> str:
         label
         for key, label in [
             ("adaptive_replanning", "adaptive-replan"),
+            ("speculative_planning", "speculative-plan"),
         ]
         if advanced[key]
     ]
@@ -17,8 +17,10 @@ from dm_agent import (
 )
 from dm_agent.core.checkpoint import RunCheckpoint
 from dm_agent.mcp import MCPManager, load_mcp_config
+from dm_agent.memory import tokenizer_for
 from dm_agent.skills import SkillManager
 from dm_agent.tracing import SessionWriter, TraceWriter
+from dm_agent.tracing.compression import is_session_log_path
 
 if TYPE_CHECKING:
     from dm_agent.extensions import ExtensionRegistry
@@ -107,7 +109,17 @@ def create_agent(
         max_observation_chars=config.max_observation_chars,
         context_token_budget=config.context_token_budget,
         enable_edit_guard=config.enable_edit_guard,
+        enable_tool_cache=config.enable_tool_cache,
+        tool_cache_path=config.tool_cache_path,
+        memory_db=config.memory_db_path,
+        dense_memory=config.dense_memory,
+        tokenizer=(
+            tokenizer_for(config.provider, config.model) if config.tokenizer == "auto" else None
+        ),
+        enable_streaming=config.enable_streaming,
+        cache_friendly_context=config.cache_friendly_context,
         enable_adaptive_replanning=advanced["adaptive_replanning"],
+        speculative_planning=advanced["speculative_planning"],
         max_replans=config.max_replans,
         event_bus=(
             extension_registry.create_event_bus() if extension_registry is not None else None
@@ -164,9 +176,20 @@ def _assemble_agent(
     advanced = resolve_advanced_features(config)
 
     trace_writer: SessionWriter | None = None
-    if trace_path or (checkpoint_path and checkpoint_path.suffix.lower() == ".jsonl"):
-        trace_sink = TraceWriter(trace_path, capture_llm_io=trace_llm_io) if trace_path else None
-        trace_writer = SessionWriter(trace_sink)
+    if trace_path or (checkpoint_path and is_session_log_path(checkpoint_path)):
+        sink_options: dict[str, Any] = {
+            "flush_every": config.trace_flush_every,
+            "flush_interval_ms": config.trace_flush_ms,
+            "fsync": config.trace_fsync,
+            "background": config.trace_background,
+            "blob_threshold": config.trace_blob_threshold,
+        }
+        trace_sink = (
+            TraceWriter(trace_path, capture_llm_io=trace_llm_io, **sink_options)
+            if trace_path
+            else None
+        )
+        trace_writer = SessionWriter(trace_sink, **sink_options)
         if checkpoint_path:
             trace_writer.ensure_checkpoint_sink(checkpoint_path)
         trace_writer.record(
@@ -180,12 +203,24 @@ def _assemble_agent(
                 "show_steps": config.show_steps,
                 "max_observation_chars": config.max_observation_chars,
                 "context_token_budget": config.context_token_budget,
+                "tokenizer": config.tokenizer,
                 "edit_guard_enabled": config.enable_edit_guard,
+                "tool_cache_enabled": config.enable_tool_cache,
+                "memory_db_enabled": bool(config.memory_db_path),
+                "dense_memory": config.dense_memory,
+                "streaming_enabled": config.enable_streaming,
+                "cache_friendly_context": config.cache_friendly_context,
                 "mcp_started_count": started_count,
                 "mcp_tool_count": len(mcp_tools),
                 "skill_count": skill_count,
                 "trace_llm_io": trace_llm_io,
+                "trace_flush_every": config.trace_flush_every,
+                "trace_flush_ms": config.trace_flush_ms,
+                "trace_fsync": config.trace_fsync,
+                "trace_background": config.trace_background,
+                "trace_blob_threshold": config.trace_blob_threshold,
                 "adaptive_replanning_enabled": advanced["adaptive_replanning"],
+                "speculative_planning_enabled": advanced["speculative_planning"],
                 "max_replans": config.max_replans,
             },
         )
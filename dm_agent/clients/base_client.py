@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
+import inspect
 import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Mapping
+from contextvars import ContextVar
 from typing import Any
 
 # Provider-agnostic transient-failure status codes (429/5xx plus common
@@ -32,6 +36,71 @@ _RETRYABLE_TEXT_TOKENS = (
 )
 
 
+# 归一化后的用量字段。``cached_tokens`` 是命中供应商前缀缓存的输入 token，
+# ``cache_write_tokens`` 是本次写入缓存的输入 token（目前只有 Anthropic 单独计费）。
+USAGE_FIELDS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "cached_tokens",
+    "cache_write_tokens",
+)
+
+# 最近一次 ``respond`` 的归一化用量。用 ContextVar 而不是实例属性：同一个客户端
+# 会被多个线程 / 协程并发使用（并行工具批、arun），各自只该看到自己那次请求的用量。
+_LAST_USAGE: ContextVar[dict[str, int] | None] = ContextVar("dm_agent_last_usage", default=None)
+
+
+def publish_usage(usage: dict[str, int] | None) -> None:
+    """记录当前上下文里最近一次请求的用量（``respond`` / 包装客户端调用）。"""
+    _LAST_USAGE.set(dict(usage) if usage else None)
+
+
+def consume_last_usage() -> dict[str, int] | None:
+    """取出并清空当前上下文里最近一次请求的用量。"""
+    usage = _LAST_USAGE.get()
+    _LAST_USAGE.set(None)
+    return usage
+
+
+def normalize_usage(
+    *,
+    prompt_tokens: Any = 0,
+    completion_tokens: Any = 0,
+    total_tokens: Any = 0,
+    cached_tokens: Any = 0,
+    cache_write_tokens: Any = 0,
+) -> dict[str, int]:
+    """把各家 SDK 的用量字段收敛成 ``USAGE_FIELDS``；缺失或非数字一律按 0。"""
+    values = {
+        "prompt_tokens": _usage_int(prompt_tokens),
+        "completion_tokens": _usage_int(completion_tokens),
+        "total_tokens": _usage_int(total_tokens),
+        "cached_tokens": _usage_int(cached_tokens),
+        "cache_write_tokens": _usage_int(cache_write_tokens),
+    }
+    if not values["total_tokens"]:
+        values["total_tokens"] = values["prompt_tokens"] + values["completion_tokens"]
+    return values
+
+
+def usage_value(container: Any, name: str) -> Any:
+    """从 dict 或 SDK 对象上取一个用量字段。"""
+    if container is None:
+        return None
+    if isinstance(container, Mapping):
+        return container.get(name)
+    return getattr(container, name, None)
+
+
+def _usage_int(value: Any) -> int:
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    return 0
+
+
 class LLMError(RuntimeError):
     """当 LLM API 请求失败时抛出。
 
@@ -86,6 +155,9 @@ class BaseLLMClient(ABC):
         self.respond_retries = respond_retries
         self.respond_retry_backoff = respond_retry_backoff
         self.total_respond_retries = 0
+        # 原生异步路径的连接池，按事件循环懒建（见 ``_async_session_for_loop``）。
+        self._async_session: Any = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
 
     @abstractmethod
     def complete(
@@ -146,4 +218,138 @@ class BaseLLMClient(ABC):
             提取的文本响应
         """
         data = self.complete_with_retry(messages, **extra)
+        publish_usage(self.extract_usage(data))
+        return self.extract_text(data)
+
+    def extract_usage(self, data: dict[str, Any]) -> dict[str, int] | None:
+        """从 API 响应中提取归一化用量（见 ``USAGE_FIELDS``）；响应里没有用量时返回 ``None``。
+
+        默认读 OpenAI Chat Completions 形状的 ``data["usage"]``，兼容 DeepSeek 的
+        ``prompt_cache_hit_tokens`` 与 OpenAI 的 ``prompt_tokens_details.cached_tokens``。
+        """
+        usage = data.get("usage") if isinstance(data, dict) else None
+        if usage is None:
+            return None
+        cached = usage_value(usage, "prompt_cache_hit_tokens")
+        if cached is None:
+            cached = usage_value(usage_value(usage, "prompt_tokens_details"), "cached_tokens")
+        return normalize_usage(
+            prompt_tokens=usage_value(usage, "prompt_tokens"),
+            completion_tokens=usage_value(usage, "completion_tokens"),
+            total_tokens=usage_value(usage, "total_tokens"),
+            cached_tokens=cached,
+        )
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> Iterator[str]:
+        """原生流式补全，逐段产出文本增量。
+
+        默认退化为一次非流式请求、整段产出；支持流式的子类应覆盖它，并在生成器被
+        提前 ``close()`` 时断开连接，让服务端停止生成调用方已经不要的部分。
+
+        与 ``respond`` 一样用 ``publish_usage`` 发布用量：供应商通常在流的末尾才回报，
+        被提前关闭的流拿不到，调用方据此把这次请求记为估算用量。
+        """
+        data = self.complete(messages, **extra)
+        publish_usage(self.extract_usage(data))
+        yield self.extract_text(data)
+
+    def stream_text(self, messages: list[dict[str, str]], **extra: Any) -> Iterator[str]:
+        """``respond`` 的流式版本。
+
+        只在首个增量到达之前按统一口径重试瞬时故障；一旦开始产出，中途失败直接
+        抛出——已经交给调用方的增量无法收回，重放会产生重复文本。
+        """
+        attempts = self.respond_retries + 1
+        for attempt in range(attempts):
+            started = False
+            try:
+                for chunk in self.stream_complete(messages, **extra):
+                    started = True
+                    yield chunk
+                return
+            except LLMError as exc:
+                is_last = attempt == attempts - 1
+                if started or not getattr(exc, "retryable", False) or is_last:
+                    raise
+                self.total_respond_retries += 1
+                if self.respond_retry_backoff > 0:
+                    time.sleep(self.respond_retry_backoff * (2**attempt))
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete`` 的协程版本。
+
+        默认在工作线程里调同步的 ``complete``；有原生异步 SDK 的子类应覆盖它，
+        复用自己的异步连接池。
+        """
+        return await asyncio.to_thread(self.complete, messages, **extra)
+
+    async def acomplete_with_retry(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete_with_retry`` 的协程版本：重试口径一致，退避改用 ``asyncio.sleep``。"""
+        attempts = self.respond_retries + 1
+        for attempt in range(attempts):
+            try:
+                return await self.acomplete(messages, **extra)
+            except LLMError as exc:
+                is_last = attempt == attempts - 1
+                if not getattr(exc, "retryable", False) or is_last:
+                    raise
+                self.total_respond_retries += 1
+                if self.respond_retry_backoff > 0:
+                    await asyncio.sleep(self.respond_retry_backoff * (2**attempt))
+        raise LLMError("LLM request failed after exhausting retry budget.")
+
+    async def arespond(self, messages: list[dict[str, str]], **extra: Any) -> str:
+        """``respond`` 的协程版本。"""
+        data = await self.acomplete_with_retry(messages, **extra)
+        publish_usage(self.extract_usage(data))
         return self.extract_text(data)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的异步连接池；由客户端的持有者在所有请求结束后调用，可重复调用。
+
+        之后再发异步请求会重新建池。池属于另一个（已结束的）循环时只丢弃引用：
+        它的连接已随那个循环失效，在当前循环里关不掉。
+        """
+        session, loop = self._async_session, self._async_loop
+        self._async_session = None
+        self._async_loop = None
+        if session is None or loop not in (None, asyncio.get_running_loop()):
+            return
+        close = getattr(session, "aclose", None) or getattr(session, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self) -> BaseLLMClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    def _async_session_for_loop(self, factory: Callable[[], Any]) -> Any:
+        """返回绑定当前事件循环的异步客户端，必要时用 ``factory`` 新建。
+
+        httpx 与官方 SDK 的异步客户端把连接绑在第一次使用它们的循环上，而每次
+        ``asyncio.run`` 都是新循环；沿用旧池会抛 ``Event loop is closed``。同一循环里
+        的协程仍共享一个池。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_session is not None and self._async_loop not in (None, loop):
+            self._async_session = None
+        if self._async_session is None:
+            self._async_session = factory()
+        self._async_loop = loop
+        return self._async_session
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from typing import Any
 
 try:
@@ -11,7 +12,17 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
-from .base_client import BaseLLMClient, LLMError, classify_retryable_exception
+from .base_client import (
+    BaseLLMClient,
+    LLMError,
+    classify_retryable_exception,
+    normalize_usage,
+    publish_usage,
+    usage_value,
+)
+
+# 显式缓存断点（Anthropic prompt caching）。ephemeral 缓存约 5 分钟，ReAct 步间隔远小于此。
+CACHE_CONTROL = {"type": "ephemeral"}
 
 
 class ClaudeClient(BaseLLMClient):
@@ -26,6 +37,7 @@ class ClaudeClient(BaseLLMClient):
         timeout: int = 600,
         anthropic_version: str = "2023-06-01",
         respond_retries: int = 2,
+        prompt_cache: bool = True,
     ) -> None:
         if not ANTHROPIC_AVAILABLE:
             raise ImportError("anthropic 未安装。请运行: pip install anthropic")
@@ -38,6 +50,8 @@ class ClaudeClient(BaseLLMClient):
             respond_retries=respond_retries,
         )
         self.anthropic_version = anthropic_version
+        # 在 system 与最后一条消息上打 cache_control 断点；下一步请求的前缀命中缓存。
+        self.prompt_cache = prompt_cache
 
         # 创建 Anthropic 客户端实例
         # 官方 SDK 不需要手动设置 base_url
@@ -51,31 +65,53 @@ class ClaudeClient(BaseLLMClient):
         """向 Claude API 发送消息请求。"""
 
         try:
-            # Claude API 要求分离系统消息
-            system_message = None
-            claude_messages = []
-
-            for msg in messages:
-                if msg.get("role") == "system":
-                    system_message = msg.get("content", "")
-                else:
-                    claude_messages.append(msg)
-
-            # 调用 Claude API
-            kwargs = {
-                "model": self.model,
-                "messages": claude_messages,
-                "max_tokens": extra.pop("max_tokens", 4096),
-            }
-
-            if system_message:
-                kwargs["system"] = system_message
+            response = self.client.messages.create(**self._build_request(messages, extra))
 
-            kwargs.update(extra)
+            # 转换为字典格式
+            return {"response": response}
 
-            response = self.client.messages.create(**kwargs)
+        except Exception as e:
+            raise LLMError(
+                f"Claude API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
 
-            # 转换为字典格式
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> Iterator[str]:
+        """流式生成：逐段产出 ``text_stream`` 的文本。
+
+        流完整结束时发布最终消息的用量；被提前关闭的流没有用量。
+
+        生成器被提前关闭时，``with`` 会断开连接。中途失败同样包装成 ``LLMError``；
+        是否重试由基类 ``stream_text`` 按「是否已经产出过增量」决定。
+        """
+
+        try:
+            with self.client.messages.stream(**self._build_request(messages, extra)) as stream:
+                yield from stream.text_stream
+                # 输入与缓存用量在 message_start，输出用量在收尾的 message_delta；
+                # 最终消息快照已把两者合并。
+                publish_usage(self.extract_usage({"response": stream.get_final_message()}))
+        except Exception as e:
+            raise LLMError(
+                f"Claude API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete`` 的原生异步版本。"""
+
+        try:
+            # 异步路径（arespond）专用的客户端按事件循环懒建，同一循环里的并发请求共享连接池。
+            async_client = self._async_session_for_loop(
+                lambda: anthropic.AsyncAnthropic(api_key=self.api_key)
+            )
+            response = await async_client.messages.create(**self._build_request(messages, extra))
             return {"response": response}
 
         except Exception as e:
@@ -83,6 +119,56 @@ class ClaudeClient(BaseLLMClient):
                 f"Claude API 调用失败: {e}", retryable=classify_retryable_exception(e)
             ) from e
 
+    def _build_request(
+        self, messages: list[dict[str, str]], extra: dict[str, Any]
+    ) -> dict[str, Any]:
+        """把标准消息列表转换成 ``messages.create`` 的参数。"""
+        # Claude API 要求分离系统消息
+        system_message = None
+        claude_messages = []
+
+        for msg in messages:
+            if msg.get("role") == "system":
+                system_message = msg.get("content", "")
+            else:
+                claude_messages.append(msg)
+
+        extra = dict(extra)
+        if self.prompt_cache:
+            claude_messages = _with_cache_breakpoint(claude_messages)
+        kwargs: dict[str, Any] = {
+            "model": self.model,
+            "messages": claude_messages,
+            "max_tokens": extra.pop("max_tokens", 4096),
+        }
+
+        if system_message:
+            if self.prompt_cache:
+                kwargs["system"] = [
+                    {"type": "text", "text": system_message, "cache_control": CACHE_CONTROL}
+                ]
+            else:
+                kwargs["system"] = system_message
+
+        kwargs.update(extra)
+        return kwargs
+
+    def extract_usage(self, data: dict[str, Any]) -> dict[str, int] | None:
+        """读取 ``response.usage``；Anthropic 的 ``input_tokens`` 不含缓存读写，这里加回去。"""
+        response = data.get("response") if isinstance(data, dict) else None
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        input_tokens = usage_value(usage, "input_tokens") or 0
+        cache_read = usage_value(usage, "cache_read_input_tokens") or 0
+        cache_write = usage_value(usage, "cache_creation_input_tokens") or 0
+        return normalize_usage(
+            prompt_tokens=input_tokens + cache_read + cache_write,
+            completion_tokens=usage_value(usage, "output_tokens"),
+            cached_tokens=cache_read,
+            cache_write_tokens=cache_write,
+        )
+
     def extract_text(self, data: dict[str, Any]) -> str:
         """从 Claude 响应中提取文本内容。"""
 
@@ -106,3 +192,22 @@ class ClaudeClient(BaseLLMClient):
                 raise LLMError(f"无法从 Claude 响应中提取文本: {e}") from e
 
         raise LLMError("无法从 Claude 响应中提取文本。")
+
+
+def _with_cache_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """复制消息列表，把最后一条消息的正文改成带 ``cache_control`` 的 text block。
+
+    断点放在最后一条：本次请求写入整段前缀，下一步请求（只在末尾追加）读回它。
+    原列表不改动——调用方随后还要用它写 trace。
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last.get("content")
+    if not isinstance(content, str) or not content:
+        return messages
+    marked = {
+        **last,
+        "content": [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}],
+    }
+    return [*messages[:-1], marked]
@@ -2,13 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import time
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from typing import Any
 
 import requests
 
-from .base_client import BaseLLMClient, LLMError
+try:
+    import httpx
+
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from .base_client import BaseLLMClient, LLMError, publish_usage
 
 DEFAULT_RETRY_STATUS_CODES = frozenset({400, 408, 409, 429, 500, 502, 503, 504})
 
@@ -72,17 +81,10 @@ class DeepSeekClient(BaseLLMClient):
         """向 DeepSeek API 发送聊天式补全请求。"""
 
         if stream:
-            raise NotImplementedError("此客户端未实现流式传输。")
+            raise NotImplementedError("complete 只返回完整响应；流式输出请用 stream_text。")
 
-        payload: dict[str, Any] = {
-            "model": self.model,
-            "messages": messages,
-        }
-        if response_format is not None:
-            payload["response_format"] = response_format
-        payload.update(extra)
-
-        url = f"{self.base_url}/{self.endpoint.lstrip('/')}"
+        payload = self._build_payload(messages, response_format, extra)
+        url = self._url()
         for retry_index in range(self.max_retries + 1):
             attempt = retry_index + 1
             has_retry_budget = retry_index < self.max_retries
@@ -118,6 +120,173 @@ class DeepSeekClient(BaseLLMClient):
 
         raise DeepSeekError("DeepSeek API request failed after exhausting retry budget.")
 
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        response_format: dict[str, Any] | None = None,
+        stream: bool = False,
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete`` 的异步版本：重试与报错口径一致，HTTP 走 ``httpx.AsyncClient``。
+
+        ``httpx`` 是 openai SDK 的传递依赖，通常总在；万一缺失则退回基类的线程实现。
+        """
+
+        if stream:
+            raise NotImplementedError("acomplete 只返回完整响应；流式输出请用 stream_text。")
+        if not HTTPX_AVAILABLE:
+            return await super().acomplete(
+                messages, response_format=response_format, stream=stream, **extra
+            )
+
+        payload = self._build_payload(messages, response_format, extra)
+        url = self._url()
+        session = self._get_async_session()
+        for retry_index in range(self.max_retries + 1):
+            attempt = retry_index + 1
+            has_retry_budget = retry_index < self.max_retries
+            try:
+                response = await session.post(url, json=payload)
+            except httpx.TransportError as exc:
+                # 超时与断连都是 TransportError，对应同步路径里可重试的那一类异常。
+                if has_retry_budget:
+                    await self._async_sleep_before_retry(retry_index)
+                    continue
+                message = "DeepSeek API request failed"
+                if attempt > 1:
+                    message = f"{message} after {attempt} attempts"
+                raise DeepSeekError(f"{message}: {exc}") from exc
+
+            if response.is_success:
+                try:
+                    data: dict[str, Any] = response.json()
+                    return data
+                except ValueError as exc:
+                    if has_retry_budget:
+                        await self._async_sleep_before_retry(retry_index)
+                        continue
+                    raise DeepSeekError(
+                        f"DeepSeek API returned invalid JSON after {attempt} attempts: {exc}"
+                    ) from exc
+
+            message = self._format_error(response)
+            if self._is_retryable_response(response) and has_retry_budget:
+                await self._async_sleep_before_retry(retry_index)
+                continue
+            if self._is_retryable_response(response) and attempt > 1:
+                message = f"{message} after {attempt} attempts"
+            raise DeepSeekError(message)
+
+        raise DeepSeekError("DeepSeek API request failed after exhausting retry budget.")
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        response_format: dict[str, Any] | None = None,
+        **extra: Any,
+    ) -> Iterator[str]:
+        """流式补全（SSE），逐段产出 ``choices[0].delta.content``。
+
+        建立连接前的失败沿用 ``complete`` 的按状态码内部重试；开始产出后中途断开
+        直接抛 ``DeepSeekError``。生成器被提前关闭时连接随 ``with`` 一并关闭。
+
+        请求带 ``stream_options.include_usage``：用量在 ``[DONE]`` 之前的最后一个事件里，
+        流完整结束时发布；被提前关闭的流没有用量。
+        """
+        payload = self._build_payload(messages, response_format, extra)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        response = self._open_stream(self._url(), payload)
+        usage: dict[str, int] | None = None
+        with response:
+            # SSE 的 Content-Type 不带 charset 时 requests 会按 ISO-8859-1 解码，中文会乱码。
+            response.encoding = "utf-8"
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    event = self._stream_event(data)
+                    if event.get("usage"):
+                        usage = self.extract_usage(event)
+                    content = self._delta_content(event)
+                    if content:
+                        yield content
+            except requests.RequestException as exc:
+                raise DeepSeekError(f"DeepSeek 流式响应中断: {exc}") from exc
+        publish_usage(usage)
+
+    def _open_stream(self, url: str, payload: dict[str, Any]) -> requests.Response:
+        for retry_index in range(self.max_retries + 1):
+            attempt = retry_index + 1
+            has_retry_budget = retry_index < self.max_retries
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=True)
+            except requests.RequestException as exc:
+                if self._is_retryable_exception(exc) and has_retry_budget:
+                    self._sleep_before_retry(retry_index)
+                    continue
+                raise DeepSeekError(f"DeepSeek API request failed: {exc}") from exc
+            if response.ok:
+                return response
+            message = self._format_error(response)
+            response.close()
+            if self._is_retryable_response(response) and has_retry_budget:
+                self._sleep_before_retry(retry_index)
+                continue
+            if self._is_retryable_response(response) and attempt > 1:
+                message = f"{message} after {attempt} attempts"
+            raise DeepSeekError(message)
+        raise DeepSeekError("DeepSeek API request failed after exhausting retry budget.")
+
+    @staticmethod
+    def _stream_event(data: str) -> dict[str, Any]:
+        try:
+            event = json.loads(data)
+        except ValueError as exc:
+            raise DeepSeekError(f"DeepSeek 流式响应不是合法 JSON: {exc}") from exc
+        return event if isinstance(event, dict) else {}
+
+    @staticmethod
+    def _delta_content(event: dict[str, Any]) -> str:
+        choices = event.get("choices")
+        if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+            return ""
+        delta = choices[0].get("delta")
+        content = delta.get("content") if isinstance(delta, dict) else None
+        return content if isinstance(content, str) else ""
+
+    def _build_payload(
+        self,
+        messages: list[dict[str, str]],
+        response_format: dict[str, Any] | None,
+        extra: dict[str, Any],
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        payload.update(extra)
+        return payload
+
+    def _url(self) -> str:
+        return f"{self.base_url}/{self.endpoint.lstrip('/')}"
+
+    def _get_async_session(self) -> Any:
+        """当前事件循环上的异步会话：同一循环里的协程共享这一个连接池。"""
+        return self._async_session_for_loop(
+            lambda: httpx.AsyncClient(
+                headers={str(key): str(value) for key, value in self.session.headers.items()},
+                timeout=self.timeout,
+            )
+        )
+
     def extract_text(self, data: dict[str, Any]) -> str:
         """从各种响应格式中提取助手文本内容。"""
 
@@ -151,12 +320,14 @@ class DeepSeekClient(BaseLLMClient):
         raise DeepSeekError("无法从 DeepSeek 响应中提取文本。")
 
     @staticmethod
-    def _format_error(response: requests.Response) -> str:
+    def _format_error(response: Any) -> str:
+        """同时接受 ``requests`` 与 ``httpx`` 的响应对象（后者把原因短语叫 ``reason_phrase``）。"""
         try:
             body = response.json()
         except ValueError:
             body = response.text
-        message = f"DeepSeek API error: {response.status_code} {response.reason}"
+        reason = getattr(response, "reason", None) or getattr(response, "reason_phrase", "")
+        message = f"DeepSeek API error: {response.status_code} {reason}"
         if isinstance(body, dict):
             detail = body.get("error", {}).get("message") or body.get("error_msg")
             if not detail:
@@ -172,7 +343,12 @@ class DeepSeekClient(BaseLLMClient):
             return
         time.sleep(self.retry_backoff * (2**retry_index))
 
-    def _is_retryable_response(self, response: requests.Response) -> bool:
+    async def _async_sleep_before_retry(self, retry_index: int) -> None:
+        if self.retry_backoff <= 0:
+            return
+        await asyncio.sleep(self.retry_backoff * (2**retry_index))
+
+    def _is_retryable_response(self, response: Any) -> bool:
         return response.status_code in self.retry_status_codes
 
     @staticmethod
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from typing import Any
 
 try:
@@ -11,7 +12,14 @@ try:
 except ImportError:
     GENAI_AVAILABLE = False
 
-from .base_client import BaseLLMClient, LLMError, classify_retryable_exception
+from .base_client import (
+    BaseLLMClient,
+    LLMError,
+    classify_retryable_exception,
+    normalize_usage,
+    publish_usage,
+    usage_value,
+)
 
 
 class GeminiClient(BaseLLMClient):
@@ -62,6 +70,72 @@ class GeminiClient(BaseLLMClient):
                 f"Gemini API 调用失败: {e}", retryable=classify_retryable_exception(e)
             ) from e
 
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> Iterator[str]:
+        """流式生成：逐块产出 ``generate_content_stream`` 的文本。
+
+        每块都带截至当前的 ``usage_metadata``，流完整结束时发布最后一块的用量。
+        生成器被提前关闭时（``GeneratorExit`` 不经过 ``except Exception``），
+        ``finally`` 关闭 SDK 的迭代器，连接随之断开，服务端不再生成尾随部分。
+        """
+
+        try:
+            chunks = self.client.models.generate_content_stream(
+                model=self.model, contents=self._convert_messages_to_contents(messages)
+            )
+            try:
+                last_chunk = None
+                for chunk in chunks:
+                    last_chunk = chunk
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        yield str(text)
+                if last_chunk is not None:
+                    publish_usage(self.extract_usage({"response": last_chunk}))
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            raise LLMError(
+                f"Gemini API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete`` 的原生异步版本（``client.aio``）。"""
+
+        try:
+            contents = self._convert_messages_to_contents(messages)
+            response = await self.client.aio.models.generate_content(
+                model=self.model, contents=contents
+            )
+            return {"response": response}
+
+        except Exception as e:
+            raise LLMError(
+                f"Gemini API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
+
+    def extract_usage(self, data: dict[str, Any]) -> dict[str, int] | None:
+        """读取 ``usage_metadata``；隐式缓存命中数是 ``cached_content_token_count``。"""
+        response = data.get("response") if isinstance(data, dict) else None
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return None
+        return normalize_usage(
+            prompt_tokens=usage_value(usage, "prompt_token_count"),
+            completion_tokens=usage_value(usage, "candidates_token_count"),
+            total_tokens=usage_value(usage, "total_token_count"),
+            cached_tokens=usage_value(usage, "cached_content_token_count"),
+        )
+
     def extract_text(self, data: dict[str, Any]) -> str:
         """从 Gemini 响应中提取文本内容。"""
 
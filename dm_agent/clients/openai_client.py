@@ -2,16 +2,24 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from typing import Any
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
-from .base_client import BaseLLMClient, LLMError, classify_retryable_exception
+from .base_client import (
+    BaseLLMClient,
+    LLMError,
+    classify_retryable_exception,
+    normalize_usage,
+    publish_usage,
+    usage_value,
+)
 
 
 class OpenAIClient(BaseLLMClient):
@@ -69,6 +77,76 @@ class OpenAIClient(BaseLLMClient):
                 f"OpenAI API 调用失败: {e}", retryable=classify_retryable_exception(e)
             ) from e
 
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> Iterator[str]:
+        """流式生成：逐个产出 ``response.output_text.delta`` 事件的文本。
+
+        流完整结束时发布 ``response.completed`` 里的用量；被提前关闭的流没有用量。
+
+        生成器被提前关闭时，``with`` 会断开连接。中途失败同样包装成 ``LLMError``；
+        是否重试由基类 ``stream_text`` 按「是否已经产出过增量」决定。
+        """
+
+        try:
+            stream = self.client.responses.create(
+                model=self.model,
+                input=self._convert_messages_to_input(messages),
+                stream=True,
+            )
+            with stream:
+                for event in stream:
+                    event_type = getattr(event, "type", "")
+                    if event_type == "response.output_text.delta":
+                        yield str(getattr(event, "delta", ""))
+                    elif event_type == "response.completed":
+                        # 用量只在收尾的 response.completed 里回报。
+                        publish_usage(
+                            self.extract_usage({"response": getattr(event, "response", None)})
+                        )
+        except Exception as e:
+            raise LLMError(
+                f"OpenAI API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """``complete`` 的原生异步版本。"""
+
+        try:
+            # 异步路径（arespond）专用的客户端按事件循环懒建，同一循环里的并发请求共享连接池。
+            async_client = self._async_session_for_loop(
+                lambda: AsyncOpenAI(api_key=self.api_key, timeout=self.timeout)
+            )
+            response = await async_client.responses.create(
+                model=self.model,
+                input=self._convert_messages_to_input(messages),
+            )
+            return {"response": response}
+
+        except Exception as e:
+            raise LLMError(
+                f"OpenAI API 调用失败: {e}", retryable=classify_retryable_exception(e)
+            ) from e
+
+    def extract_usage(self, data: dict[str, Any]) -> dict[str, int] | None:
+        """读取 Responses API 的 ``usage``；自动前缀缓存命中数在 ``input_tokens_details``。"""
+        response = data.get("response") if isinstance(data, dict) else None
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        return normalize_usage(
+            prompt_tokens=usage_value(usage, "input_tokens"),
+            completion_tokens=usage_value(usage, "output_tokens"),
+            total_tokens=usage_value(usage, "total_tokens"),
+            cached_tokens=usage_value(usage_value(usage, "input_tokens_details"), "cached_tokens"),
+        )
+
     def extract_text(self, data: dict[str, Any]) -> str:
         """从 OpenAI 响应中提取文本内容。"""
 
@@ -14,6 +14,7 @@ from .events import (
 )
 from .observation import is_failure_observation
 from .planner import AdaptiveReplanPolicy, ReplanDecision, ReplanSignal
+from .tool_cache import ToolResultCache
 
 __all__ = [
     "AdaptiveReplanPolicy",
@@ -31,5 +32,6 @@ __all__ = [
     "RunEndEvent",
     "RunStartEvent",
     "Step",
+    "ToolResultCache",
     "is_failure_observation",
 ]
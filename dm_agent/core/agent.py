@@ -10,7 +10,9 @@ from pathlib import Path
 from typing import Any, cast
 
 from dm_agent.clients.base_client import BaseLLMClient
-from dm_agent.memory.context_compressor import ContextCompressor
+from dm_agent.memory.context_budget import Tokenizer
+from dm_agent.memory.context_compressor import ContextCompressor, Mem0StyleMemory
+from dm_agent.memory.sqlite_memory import SQLiteMemory, memory_namespace
 from dm_agent.prompts import build_code_agent_prompt
 from dm_agent.tools.base import Tool
 from dm_agent.tracing.session import parse_failed_response_placeholder
@@ -20,6 +22,7 @@ from .capabilities import AgentCapability, CapabilityContext
 from .checkpoint import RunCheckpoint
 from .completion import CompletionGate, build_run_result, format_final_answer
 from .context_window import ContextWindow
+from .driver import AgentLoop, LLMTurn, drive_async, drive_sync
 from .events import (
     EventBus,
     HookFailure,
@@ -27,7 +30,7 @@ from .events import (
     RunEndEvent,
     RunStartEvent,
 )
-from .guards import ReadBeforeEditGuard
+from .guards import PARALLEL_SAFE_ACTIONS, ReadBeforeEditGuard
 from .observation import ObservationBounder, is_failure_observation
 from .persistence import (
     RunPersistence,
@@ -39,12 +42,13 @@ from .persistence import (
     steps_from_checkpoint,
     warn_on_config_mismatch,
 )
-from .planner import AdaptiveReplanPolicy, PlanStep, TaskPlanner
+from .planner import AdaptiveReplanPolicy, PendingPlan, PlanStep, TaskPlanner
 from .prompting import activate_skills, build_user_prompt
 from .replan import FailureContext, ReplanCoordinator
-from .response_parser import normalize_action, parse_agent_response
+from .response_parser import batch_actions, normalize_action, parse_agent_response
 from .run_state import RunContext, Step, initial_run_metadata
-from .tool_invoker import ToolInvoker
+from .tool_cache import ToolResultCache
+from .tool_invoker import ToolInvocation, ToolInvoker
 
 __all__ = ["ReactAgent", "Step"]
 
@@ -90,6 +94,15 @@ class ReactAgent:
         context_token_budget: int = 24000,
         enable_edit_guard: bool = True,
         event_bus: EventBus | None = None,
+        enable_streaming: bool = False,
+        speculative_planning: bool = False,
+        cache_friendly_context: bool = False,
+        workspace: str | Path | None = None,
+        enable_tool_cache: bool = True,
+        tool_cache_path: str | Path | None = None,
+        memory_db: str | Path | None = None,
+        dense_memory: bool = False,
+        tokenizer: Tokenizer | None = None,
     ) -> None:
         """初始化 ReactAgent。
 
@@ -97,8 +110,28 @@ class ReactAgent:
         关闭，基础设施护栏（观察截断、token 预算、read-before-edit 守卫）默认开启；
         取值口径与 ``dm-agent`` CLI 的同名参数一致。
 
+        ``workspace`` 是工具调用的根目录：相对路径与子进程 ``cwd`` 都落在这里，
+        进程 CWD 不受影响，因此同一进程可以并发托管多个工作区不同的智能体。
+        为 None 时沿用进程 CWD。
+
+        ``enable_tool_cache`` 让只读分析工具在目标文件未变时复用上一次的结果（见
+        ``core.tool_cache``），缓存默认只在一次 run 内有效；给了 ``tool_cache_path``
+        则跨 run 落盘复用。
+
+        ``memory_db`` 把压缩器的记忆落到该 SQLite 库（见 ``memory.sqlite_memory``），
+        按「agent id + 仓库根」分区，同一仓库上的后续 run 从已积累的记忆起步；
+        关闭压缩时不生效。
+
+        ``dense_memory`` 让记忆检索在 BM25 之外混入哈希向量的余弦相似度（见
+        ``memory.dense_index``），措辞不同的记忆也能召回；需要 NumPy。有 ``memory_db``
+        时作用于 SQLite 记忆，否则作用于进程内记忆；关闭压缩时同样不生效。
+
+        ``tokenizer`` 决定 ``context_token_budget`` 怎么数 token（通常取
+        ``tokenizer_for(provider, model)``）；为 None 时沿用 chars/4 启发式。
+
         Raises:
             ValueError: 工具列表为空
+            ImportError: ``dense_memory`` 为真但没有安装 NumPy
         """
         if not tools:
             raise ValueError("必须为 ReactAgent 提供至少一个工具。")
@@ -127,23 +160,40 @@ class ReactAgent:
         self.temperature = temperature
         self.system_prompt = system_prompt or build_code_agent_prompt(tools)
         self.step_callback = step_callback
+        self.workspace = Path(workspace) if workspace is not None else None
+        # 流式响应：动作在语法上完整即执行，不等尾随输出（见 core.driver）。
+        self.enable_streaming = enable_streaming
         # 多轮对话历史记录
         self.conversation_history: list[dict[str, str]] = []
 
         # 规划器
         self.enable_planning = enable_planning
         self.planner = TaskPlanner(client_for("planner"), tools) if enable_planning else None
+        # speculative planning：规划调用与第一个 agent 请求并发，计划到达后再拼回任务消息。
+        self.speculative_planning = speculative_planning
 
         # 上下文压缩器：默认先充分利用现代 LLM 上下文，长会话再分批压缩。
         # token 预算超限时也会提前触发压缩（0 表示只按消息节奏压缩）。
         self.enable_compression = enable_compression
+        self.tokenizer = tokenizer
         self.context_token_budget = max(0, int(context_token_budget))
+        self.dense_memory = dense_memory
+        self.memory_store = (
+            SQLiteMemory(memory_db, namespace=memory_namespace(self.workspace), dense=dense_memory)
+            if enable_compression and memory_db is not None
+            else None
+        )
+        memory: Mem0StyleMemory | None = self.memory_store
+        if memory is None and enable_compression and dense_memory:
+            memory = Mem0StyleMemory(dense=True)
         self.compressor = (
             ContextCompressor(
                 client_for("compression"),
                 compress_every=20,
                 keep_recent=8,
+                memory=memory,
                 token_budget=self.context_token_budget,
+                tokenizer=tokenizer,
             )
             if enable_compression
             else None
@@ -152,6 +202,7 @@ class ReactAgent:
             compressor=self.compressor,
             enabled=enable_compression,
             trace_writer=self.trace_writer,
+            cache_friendly=cache_friendly_context,
         )
         # 单条工具观察的字符上限；0 表示不截断。
         self.max_observation_chars = max(0, int(max_observation_chars))
@@ -159,11 +210,15 @@ class ReactAgent:
             max_chars=self.max_observation_chars, trace_writer=self.trace_writer
         )
         self._persistence = RunPersistence(trace_writer=self.trace_writer)
+        self.enable_tool_cache = enable_tool_cache
+        self.tool_cache = ToolResultCache(tool_cache_path) if enable_tool_cache else None
         self._tool_invoker = ToolInvoker(
             event_bus=self.event_bus,
             bounder=self._observation_bounder,
             persistence=self._persistence,
             on_error=self._record_hook_error,
+            workspace=self.workspace,
+            cache=self.tool_cache,
         )
         # read-before-edit 守卫：首次编辑前必须读过目标文件；依赖行号的连续编辑
         # 在写后需重读，内容锚定编辑由唯一精确匹配保证当前性。
@@ -220,6 +275,48 @@ class ReactAgent:
         重试时对话历史恢复到调用前的快照，因此每次尝试都是干净的一轮；
         ``on_run_start`` 处理器可以借 ``prompt_suffix`` 把上一轮的经验带进来。
         """
+        self._validate_run_request(task, checkpoint_path, resume_state)
+        loop = self._run_attempts(
+            task, max_steps=max_steps, checkpoint_path=checkpoint_path, resume_state=resume_state
+        )
+        return cast(
+            dict[str, Any],
+            drive_sync(loop, self._request_client, stream=self.enable_streaming),
+        )
+
+    async def arun(
+        self,
+        task: str,
+        *,
+        max_steps: int | None = None,
+        checkpoint_path: Path | None = None,
+        resume_state: RunCheckpoint | None = None,
+    ) -> dict[str, Any]:
+        """``run`` 的协程版本，语义与产出完全一致。
+
+        agent 阶段的 LLM 调用走客户端的 ``arespond``（没有时退回在线程里调
+        ``respond``），两次调用之间的工具执行与钩子链在工作线程里推进，不阻塞事件
+        循环。同一个 ``ReactAgent`` 实例同一时刻只能跑一个任务；并发请用多个实例，
+        它们可以共用一个客户端，同一事件循环上的请求共享它的连接池。
+
+        ``arun`` 不关闭客户端：连接池归客户端的持有者管理，所有 run 结束后由它
+        ``await client.aclose()``（或 ``async with client:``）释放。
+        """
+        self._validate_run_request(task, checkpoint_path, resume_state)
+        loop = self._run_attempts(
+            task, max_steps=max_steps, checkpoint_path=checkpoint_path, resume_state=resume_state
+        )
+        return cast(
+            dict[str, Any],
+            await drive_async(loop, self._request_client, stream=self.enable_streaming),
+        )
+
+    def _validate_run_request(
+        self,
+        task: str,
+        checkpoint_path: Path | None,
+        resume_state: RunCheckpoint | None,
+    ) -> None:
         if not isinstance(task, str) or not task.strip():
             raise ValueError("任务必须是非空字符串。")
         if (
@@ -227,9 +324,19 @@ class ReactAgent:
         ) and self.event_bus.has_handlers("on_run_end"):
             raise ValueError("checkpoint/resume 暂不支持与 on_run_end 重试同时使用。")
 
+    def _run_attempts(
+        self,
+        task: str,
+        *,
+        max_steps: int | None,
+        checkpoint_path: Path | None,
+        resume_state: RunCheckpoint | None,
+    ) -> AgentLoop:
+        """多次尝试之间的编排；每次尝试委托给 ``_run_once`` 这个生成器。"""
         initial_history = [dict(message) for message in self.conversation_history]
+        # 重试基线会被持有整个 run：取 to_dict 副本，撤销日志 mark 只留给短命的候选回滚。
         initial_compressor_state = (
-            self.compressor.snapshot_runtime_state() if self.compressor else None
+            self.compressor.snapshot_runtime_state(durable=True) if self.compressor else None
         )
         attempt = 1
         while True:
@@ -237,7 +344,7 @@ class ReactAgent:
                 self.conversation_history = [dict(message) for message in initial_history]
                 if self.compressor and initial_compressor_state is not None:
                     self.compressor.restore_runtime_state(initial_compressor_state)
-            result = self._run_once(
+            result = yield from self._run_once(
                 task,
                 max_steps=max_steps,
                 attempt=attempt,
@@ -329,13 +436,15 @@ class ReactAgent:
         attempt: int = 1,
         checkpoint_path: Path | None = None,
         resume_state: RunCheckpoint | None = None,
-    ) -> dict[str, Any]:
+    ) -> AgentLoop:
         """跑完整的一轮 ReAct 循环：规划 → 推理 → 行动 → 观察，直到完成或步数耗尽。
 
-        ``run`` 负责多次尝试之间的编排，本方法只管一次尝试。
+        ``_run_attempts`` 负责多次尝试之间的编排，本方法只管一次尝试。它是一个
+        生成器：每步 ``yield`` 一个 ``LLMTurn``，由 ``core.driver`` 同步或异步地
+        发出请求后把响应文本送回来。
 
         Returns:
-            含 ``final_answer`` / ``steps`` / ``metadata`` 三个键的结果字典
+            （生成器返回值）含 ``final_answer`` / ``steps`` / ``metadata`` 三个键的结果字典
 
         Raises:
             ValueError: 任务不是非空字符串
@@ -353,6 +462,8 @@ class ReactAgent:
         if checkpoint_path is not None:
             self._persistence.prepare_session_checkpoint(checkpoint_path)
         self._edit_guard.reset()
+        if self.tool_cache is not None and not self.tool_cache.persistent:
+            self.tool_cache.clear()
         run_token = getattr(self.trace_writer, "run_id", "") or uuid.uuid4().hex[:12]
         retry_baseline = getattr(self.client, "total_respond_retries", 0)
         self._context_window.reset()
@@ -376,6 +487,8 @@ class ReactAgent:
 
         # resume 必须先恢复持久化状态，再落 trace 的 run_start。
         plan: list[PlanStep] = []
+        pending_plan: PendingPlan | None = None
+        task_message_index = -1
         resume_from = 0
         if resume_state is not None:
             plan, resume_from = self._restore_from_checkpoint(resume_state, steps, metadata)
@@ -387,10 +500,16 @@ class ReactAgent:
                     "max_steps": limit,
                     "temperature": self.temperature,
                     "planning_enabled": self.enable_planning,
+                    "speculative_planning_enabled": self.speculative_planning,
+                    "cache_friendly_context": self._context_window.cache_friendly,
                     "compression_enabled": self.enable_compression,
                     "max_observation_chars": self.max_observation_chars,
                     "context_token_budget": self.context_token_budget,
+                    "tokenizer": self.tokenizer.name if self.tokenizer is not None else "heuristic",
+                    "dense_memory": self.dense_memory,
                     "edit_guard_enabled": self.enable_edit_guard,
+                    "tool_cache_enabled": self.enable_tool_cache,
+                    "streaming_enabled": self.enable_streaming,
                     "skills_enabled": bool(self.skill_manager),
                     "adaptive_replanning_enabled": self.enable_adaptive_replanning,
                     "max_replans": self.max_replans,
@@ -400,6 +519,7 @@ class ReactAgent:
                         for tool in self.tools_list
                     ],
                 },
+                workspace=self.workspace,
             )
 
         def finish_result(final_answer: str) -> dict[str, Any]:
@@ -408,6 +528,11 @@ class ReactAgent:
             )
             if metadata.get("backup_count"):
                 print(f"[backup] 修改前的原文件备份目录：{metadata['backup_dir']}")
+            self._flush_step_timing()
+            if self.tool_cache is not None:
+                self.tool_cache.save()
+            if self.memory_store is not None:
+                self.memory_store.flush()
             result = build_run_result(final_answer, steps, metadata)
             if self.trace_writer:
                 self.trace_writer.finish_run(result)
@@ -432,7 +557,9 @@ class ReactAgent:
             print(f"[resume] 已恢复 checkpoint，从第 {resume_from + 1} 步继续执行")
         else:
             self._adopt_existing_history(kind="carried")
-            if self.enable_planning and self.planner:
+            if self.enable_planning and self.planner and self.speculative_planning:
+                pending_plan = PendingPlan(self.planner, task)
+            elif self.enable_planning and self.planner:
                 try:
                     plan = self.planner.plan(task)
                     metadata["initial_plan_steps"] = len(plan)
@@ -447,32 +574,44 @@ class ReactAgent:
                     print(f"[warn] 计划生成失败：{e}，将使用常规模式执行")
 
             # 添加新任务到对话历史
-            task_prompt: str = build_user_prompt(task, plan)
+            task_prompt: str = build_user_prompt(task, plan, plan_pending=pending_plan is not None)
             self._append_history("user", task_prompt, kind="task")
+            task_message_index = len(self.conversation_history) - 1
 
+        timer = self._run_context.step_timer
         for step_num in range(resume_from + 1, limit + 1):
             self._run_context.step_number = step_num
+            # 上一步的分阶段耗时在这里落盘：步骤有多个 continue 出口，统一收口。
+            self._flush_step_timing()
+            timer.restart(step_num, io_clock=self._trace_io_seconds)
             # 每步开始前落盘上一步完成后的快照（若启用 checkpoint）。
             if checkpoint_path is not None:
-                self._save_checkpoint_snapshot(
-                    checkpoint_path,
-                    task=task,
-                    step_count=step_num - 1,
-                    steps=steps,
-                    metadata=metadata,
-                    plan=plan,
-                    limit=limit,
-                )
+                with timer.phase("checkpoint"):
+                    self._save_checkpoint_snapshot(
+                        checkpoint_path,
+                        task=task,
+                        step_count=step_num - 1,
+                        steps=steps,
+                        metadata=metadata,
+                        plan=plan,
+                        limit=limit,
+                    )
             # 第二步：整理旧上下文为本地记忆（如果需要）
-            messages_to_send = self._context_window.build_messages(
-                self.system_prompt,
-                self.conversation_history,
-                context=self._run_context,
-            )
+            with timer.phase("context_build"):
+                messages_to_send = self._context_window.build_messages(
+                    self.system_prompt,
+                    self.conversation_history,
+                    context=self._run_context,
+                )
 
-            # 获取 AI 响应
+            # 获取 AI 响应：由驱动方发出请求，失败时异常会被 throw 回这里。
+            turn = LLMTurn(messages=messages_to_send, temperature=self.temperature)
+            if self.trace_writer:
+                # 组提交模式下缓冲的条目在等模型前写出，跟读会话日志的一方不会落后一整步。
+                self.trace_writer.flush()
             try:
-                raw = self._request_client.respond(messages_to_send, temperature=self.temperature)
+                with timer.phase("llm_wait"):
+                    raw = yield turn
             except Exception as exc:
                 if self.trace_writer:
                     self.trace_writer.record(
@@ -486,10 +625,20 @@ class ReactAgent:
                     messages=messages_to_send,
                     temperature=self.temperature,
                     raw_response=raw,
+                    timing=turn.timing or None,
+                    usage=turn.usage,
+                    usage_source=turn.usage_source,
                 )
+            if pending_plan is not None:
+                with timer.phase("plan_wait"):
+                    plan = self._splice_pending_plan(
+                        pending_plan, task, task_message_index, metadata
+                    )
+                pending_plan = None
 
             try:
-                parsed_response = parse_agent_response(raw)
+                with timer.phase("parse"):
+                    parsed_response = parse_agent_response(raw)
             except ValueError as exc:
                 context_replacement = parse_failed_response_placeholder(len(raw))
                 self._append_history(
@@ -544,8 +693,25 @@ class ReactAgent:
             if parsed_response.repaired:
                 metadata["parse_repair_count"] += 1
 
-            # 获取动作、thought 和输入
-            raw_action_value = parsed.get("action", "")
+            thought = parsed.get("thought", "").strip()
+            batch = batch_actions(parsed)
+            if batch is not None and len(batch) > 1:
+                plan = self._run_action_batch(
+                    task,
+                    batch,
+                    thought=thought,
+                    raw=raw,
+                    steps=steps,
+                    plan=plan,
+                    metadata=metadata,
+                    step_num=step_num,
+                )
+                continue
+
+            # 获取动作、thought 和输入；只有一个元素的 ``actions`` 等同于单动作格式。
+            raw_action_value, action_input = (
+                batch[0] if batch else (parsed.get("action", ""), parsed.get("action_input"))
+            )
             raw_action = "" if raw_action_value is None else str(raw_action_value).strip()
             action = normalize_action(raw_action)
             if action != raw_action:
@@ -557,19 +723,18 @@ class ReactAgent:
                         "normalized": action,
                     }
                 )
-            thought = parsed.get("thought", "").strip()
-            action_input = parsed.get("action_input")
 
             # 检查是否完成
             if action == "finish":
                 final = format_final_answer(action_input)
-                accepted, observation = self._completion_gate.review(
-                    task=task,
-                    action=action,
-                    completion_text=final,
-                    steps=steps,
-                    context=self._run_context,
-                )
+                with timer.phase("hooks"):
+                    accepted, observation = self._completion_gate.review(
+                        task=task,
+                        action=action,
+                        completion_text=final,
+                        steps=steps,
+                        context=self._run_context,
+                    )
                 step = Step(
                     thought=thought,
                     action=action,
@@ -661,13 +826,14 @@ class ReactAgent:
             no_progress = invocation.blocked or invocation.no_change
             accepted = False
             if action == "task_complete" and invocation.tool_succeeded:
-                accepted, observation = self._completion_gate.review(
-                    task=task,
-                    action=action,
-                    completion_text=str(observation),
-                    steps=steps,
-                    context=self._run_context,
-                )
+                with timer.phase("hooks"):
+                    accepted, observation = self._completion_gate.review(
+                        task=task,
+                        action=action,
+                        completion_text=str(observation),
+                        steps=steps,
+                        context=self._run_context,
+                    )
                 if not accepted:
                     error_kind = "critic_rejected"
 
@@ -686,6 +852,7 @@ class ReactAgent:
                     action_input=action_input,
                     observation=observation,
                     failed=self._is_failure_observation(observation, action=action),
+                    cached=invocation.cached,
                 )
 
             # 更新计划进度（如果有计划；被拦下或明确无进展的调用不算完成）。
@@ -731,17 +898,176 @@ class ReactAgent:
         metadata["failure_reason"] = metadata["failure_reason"] or "Max steps exceeded"
         if checkpoint_path is not None:
             # 步数耗尽也落一份终态快照：换更大的 --max-steps 即可 resume 续跑。
-            self._save_checkpoint_snapshot(
-                checkpoint_path,
-                task=task,
-                step_count=limit,
-                steps=steps,
-                metadata=metadata,
-                plan=plan,
-                limit=limit,
-            )
+            with timer.phase("checkpoint"):
+                self._save_checkpoint_snapshot(
+                    checkpoint_path,
+                    task=task,
+                    step_count=limit,
+                    steps=steps,
+                    metadata=metadata,
+                    plan=plan,
+                    limit=limit,
+                )
         return finish_result("Reached step limit without completion.")
 
+    def _trace_io_seconds(self) -> float:
+        return float(getattr(self.trace_writer, "io_seconds", 0.0))
+
+    def _flush_step_timing(self) -> None:
+        """把当前步骤的分阶段耗时写成一条 ``step_timing`` 条目（每步只写一次）。"""
+        timer = self._run_context.step_timer
+        if timer.step_number <= 0:
+            return
+        payload = timer.snapshot()
+        timer.step_number = 0
+        if self.trace_writer:
+            self.trace_writer.record("step_timing", payload)
+
+    def _splice_pending_plan(
+        self,
+        pending: PendingPlan,
+        task: str,
+        message_index: int,
+        metadata: dict[str, Any],
+    ) -> list[PlanStep]:
+        """等后台计划就绪，把它拼回任务消息，返回计划（失败时为空计划）。
+
+        第一个 agent 响应已经拿到，计划从下一次请求起生效；``plan_spliced`` 条目
+        记下改写后的任务消息，``rebuild_context`` 据此复现之后的窗口。规划失败或
+        计划为空时同样改写：去掉 ``PLAN_PENDING_HINT``，否则「不要修改文件」会一直
+        留在任务消息里。
+        """
+        try:
+            plan = pending.wait()
+        except Exception as e:
+            if self.trace_writer:
+                self.trace_writer.record_plan_error(str(e))
+            print(f"[warn] 计划生成失败：{e}，将使用常规模式执行")
+            plan = []
+        else:
+            metadata["initial_plan_steps"] = len(plan)
+            metadata["speculative_plan_hidden_seconds"] = round(pending.hidden_seconds, 3)
+            if self.trace_writer:
+                self.trace_writer.record_plan(plan)
+
+        content = build_user_prompt(task, plan)
+        self.conversation_history[message_index]["content"] = content
+        self._context_window.note_message_replaced(
+            message_index, self.conversation_history[message_index]
+        )
+        if self.trace_writer:
+            self.trace_writer.record_plan_spliced(
+                {
+                    "plan_steps": len(plan),
+                    "plan_seconds": round(pending.plan_seconds, 3),
+                    "waited_seconds": round(pending.waited_seconds, 3),
+                    "hidden_latency_seconds": round(pending.hidden_seconds, 3),
+                    "content": content,
+                },
+                message_index=message_index,
+            )
+        if plan and self.planner:
+            print(f"\n[plan] 生成的执行计划：\n{self.planner.get_progress()}")
+        return plan
+
+    def _run_action_batch(
+        self,
+        task: str,
+        batch: list[tuple[str, Any]],
+        *,
+        thought: str,
+        raw: str,
+        steps: list[Step],
+        plan: list[PlanStep],
+        metadata: dict[str, Any],
+        step_num: int,
+    ) -> list[PlanStep]:
+        """执行一次响应里的 ``actions`` 批量动作，返回（可能重规划过的）计划。
+
+        只有 ``PARALLEL_SAFE_ACTIONS`` 里的工具会真正执行（并发）；其余动作原样
+        打回，提示模型改用单动作格式。不存在的工具（拼错、空名字）先按单动作路径
+        同样的口径记为未知工具，而不是被当成「不能批量」打回。每个动作各落一个 ``Step`` 与一条
+        ``tool_call``，次序与 ``actions`` 列表一致；多条结果合并成一条
+        ``tool_result`` 消息写回历史，对应这一次 LLM 往返。
+        """
+        metadata["parallel_batch_count"] += 1
+        calls: list[tuple[Tool, str, Any]] = []
+        slots: list[tuple[str, ToolInvocation | None]] = []
+        for raw_action, action_input in batch:
+            action = normalize_action(raw_action)
+            tool = self.tools.get(action)
+            if tool is None and action != "finish":
+                metadata["unknown_tool_count"] += 1
+                metadata["failure_reason"] = f"Unknown tool: {action}"
+                invocation = ToolInvocation(
+                    action_input, f"Unknown tool '{action}'.", error_kind="unknown_tool"
+                )
+                slots.append((action, invocation))
+            elif action not in PARALLEL_SAFE_ACTIONS:
+                # 打回不是失败：文案避开失败关键词，不触发重规划，也不推进计划。
+                metadata["parallel_action_rejected_count"] += 1
+                observation = (
+                    f"Action '{action}' cannot be batched: only read-only tools "
+                    f"({', '.join(sorted(PARALLEL_SAFE_ACTIONS))}) may appear in 'actions'. "
+                    "Send it again as a single action."
+                )
+                slots.append((action, ToolInvocation(action_input, observation, blocked=True)))
+            else:
+                calls.append((cast(Tool, tool), action, action_input))
+                slots.append((action, None))
+        metadata["parallel_action_count"] += len(calls)
+        executed = iter(self._tool_invoker.invoke_parallel(calls, context=self._run_context))
+
+        batch_steps: list[Step] = []
+        tool_infos: list[str] = []
+        first_failure: FailureContext | None = None
+        for action, rejected in slots:
+            invocation = rejected if rejected is not None else next(executed)
+            observation = invocation.observation
+            step = Step(
+                thought=thought,
+                action=action,
+                action_input=invocation.arguments,
+                observation=observation,
+                raw=raw,
+            )
+            steps.append(step)
+            batch_steps.append(step)
+            failed = invocation.error_kind == "unknown_tool" or self._is_failure_observation(
+                observation, action=action
+            )
+            if self.trace_writer:
+                self.trace_writer.record_tool_call(
+                    step_number=step_num,
+                    action=action,
+                    action_input=invocation.arguments,
+                    observation=observation,
+                    failed=failed,
+                    cached=invocation.cached,
+                )
+            if plan and self.planner and not (invocation.blocked or invocation.no_change):
+                next_step = self.planner.get_next_step()
+                if next_step and next_step.action == action:
+                    self.planner.mark_completed(next_step.step_number, observation)
+            if failed and first_failure is None:
+                first_failure = FailureContext(
+                    observation=observation,
+                    action=action,
+                    step_number=step_num,
+                    error_kind=invocation.error_kind or None,
+                )
+            tool_infos.append(
+                f"执行工具 {action}，输入：{json.dumps(invocation.arguments, ensure_ascii=False)}"
+                f"\n观察：{observation}"
+            )
+
+        self._append_history("user", "\n\n".join(tool_infos), kind="tool_result")
+        for step in batch_steps:
+            self._publish_step(step, step_num)
+        if first_failure is not None and plan and self.planner:
+            plan = self._replan_after_failure(task, plan, metadata, first_failure)
+        return plan
+
     def _apply_skills_for_task(self, task: str) -> list[str]:
         """根据任务自动选择技能，并把增量合并进本轮的 prompt 与工具表。"""
         # 调用点（_run_once）已用 `if self.skill_manager:` 守卫，此处的 None 分支不可达；
@@ -820,7 +1146,7 @@ class ReactAgent:
             plan=plan_to_checkpoint(plan),
             compressor_state=self.compressor.export_state() if self.compressor else None,
             agent_config=self._config_snapshot(max_steps=limit),
-            cwd=str(Path.cwd()),
+            cwd=str(self.workspace or Path.cwd()),
         )
         self._persistence.save(path, checkpoint)
 
@@ -837,13 +1163,14 @@ class ReactAgent:
         failure: FailureContext,
     ) -> list[PlanStep]:
         """失败后尝试重规划；新计划生效时把恢复提示追加进对话历史。"""
-        outcome = self._replan_coordinator.try_replan(
-            task,
-            plan,
-            failure,
-            metadata,
-            default_budget=self.DEFAULT_REPLAN_BUDGET,
-        )
+        with self._run_context.step_timer.phase("replan"):
+            outcome = self._replan_coordinator.try_replan(
+                task,
+                plan,
+                failure,
+                metadata,
+                default_budget=self.DEFAULT_REPLAN_BUDGET,
+            )
         if outcome.history_note:
             self._append_history("user", outcome.history_note, kind="replan_note")
         return outcome.plan
@@ -0,0 +1,235 @@
+"""会话日志 checkpoint 的增量编码：关键帧 + 逐步 delta。
+
+原来每一步都把完整的对话历史、全部 ``Step``、计划、metadata 与压缩器记忆整份
+追加进会话日志，长 run 的字节数与序列化 CPU 都是 O(n²)。现在：
+
+- 每 ``KEYFRAME_INTERVAL`` 条（以及每个 run、每次写失败后的第一条）写**关键帧**：
+  payload 仍是 ``{"state": 完整快照}``，与旧格式一致，自成一体；
+- 其余写 **delta**：``{"delta": ..., "base_id": 上一条 checkpoint 的 id}``，只记与
+  上一条相比变了什么。对话历史新增的消息若与本文件里已记下的 ``message`` 条目
+  完全一致，只存那条条目的 id。
+
+delta 的结构按值递归：dict 记改动与删除的键，list 记「保留前 k 项 + 新尾巴」
+（历史、步骤、记忆列表都是追加为主），其余类型整体替换。恢复时从目标条目沿
+``base_id`` 回溯到关键帧再依次折叠，回溯长度不超过关键帧间隔。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from dm_agent.tracing.blobs import is_blob_ref
+
+# 每隔多少条 checkpoint 写一次完整关键帧；也是 resume 时最多折叠的 delta 条数。
+KEYFRAME_INTERVAL = 16
+# delta 里引用 message 条目的那个列表字段。
+HISTORY_FIELD = "conversation_history"
+
+_MISSING = object()
+
+
+class CheckpointDeltaEncoder:
+    """记住上一条写出的 checkpoint，把下一条编码成关键帧或 delta。
+
+    用法：``encode`` 得到要写的 payload 字段，写成功后用返回的 entry id 调
+    ``commit``；写失败（id 为空）时 ``commit`` 会重置，下一条自动写关键帧。
+    """
+
+    def __init__(self, *, keyframe_interval: int | None = None) -> None:
+        interval = KEYFRAME_INTERVAL if keyframe_interval is None else keyframe_interval
+        self.keyframe_interval = max(1, int(interval))
+        self._previous: dict[str, Any] | None = None
+        self._previous_id = ""
+        self._since_keyframe = 0
+        self._pending: dict[str, Any] | None = None
+        self._pending_keyframe = False
+
+    def reset(self) -> None:
+        self._previous = None
+        self._previous_id = ""
+        self._since_keyframe = 0
+
+    def encode(
+        self,
+        state: dict[str, Any],
+        *,
+        message_ref: Callable[[dict[str, Any]], str] | None = None,
+    ) -> dict[str, Any]:
+        """返回 ``{"state": ...}``（关键帧）或 ``{"delta": ..., "base_id": ...}``。
+
+        ``message_ref`` 给出与某条历史消息内容完全一致的 ``message`` 条目 id，
+        没有时返回空串。
+        """
+        self._pending = state
+        keyframe = (
+            self._previous is None
+            or not self._previous_id
+            or self._since_keyframe + 1 >= self.keyframe_interval
+        )
+        self._pending_keyframe = keyframe
+        if keyframe or self._previous is None:
+            return {"state": state}
+        return {
+            "delta": diff_states(self._previous, state, message_ref=message_ref),
+            "base_id": self._previous_id,
+        }
+
+    def commit(self, entry_id: str) -> None:
+        if not entry_id or self._pending is None:
+            self.reset()
+            return
+        self._since_keyframe = 0 if self._pending_keyframe else self._since_keyframe + 1
+        self._previous = self._pending
+        self._previous_id = entry_id
+        self._pending = None
+
+
+def diff_states(
+    old: dict[str, Any],
+    new: dict[str, Any],
+    *,
+    message_ref: Callable[[dict[str, Any]], str] | None = None,
+) -> dict[str, Any]:
+    """顶层 dict 的 delta；对话历史的新尾巴可改写成 message 条目引用。"""
+    delta = _diff(old, new)
+    if delta is None:
+        return {"d": {}}
+    changed = delta.get("d", {}).get(HISTORY_FIELD)
+    if message_ref is not None and changed is not None and "t" in changed:
+        refs: dict[str, str] = {}
+        tail = list(changed["t"])
+        for position, message in enumerate(tail):
+            entry_id = message_ref(message) if isinstance(message, dict) else ""
+            if entry_id:
+                refs[str(position)] = entry_id
+                tail[position] = None
+        if refs:
+            changed["t"] = tail
+            changed["r"] = refs
+    return delta
+
+
+def apply_delta(
+    base: dict[str, Any],
+    delta: dict[str, Any],
+    *,
+    resolve_message: Callable[[str], dict[str, Any]],
+) -> dict[str, Any]:
+    """把一条 delta 折叠到 ``base`` 上，返回新快照（``base`` 不被修改）。
+
+    Raises:
+        ValueError: delta 结构损坏，或引用的 message 条目不存在
+    """
+    result = _apply(base, delta, resolve_message=resolve_message, field="")
+    if not isinstance(result, dict):
+        raise ValueError("Checkpoint delta does not produce a state object.")
+    return result
+
+
+def _diff(old: Any, new: Any) -> dict[str, Any] | None:
+    if old is new or (type(old) is type(new) and old == new):
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed: dict[str, Any] = {}
+        for key, value in new.items():
+            previous = old.get(key, _MISSING)
+            if previous is _MISSING:
+                changed[key] = {"v": value}
+                continue
+            op = _diff(previous, value)
+            if op is not None:
+                changed[key] = op
+        removed = [key for key in old if key not in new]
+        op = {"d": changed}
+        if removed:
+            op["u"] = removed
+        return op
+    if isinstance(old, list) and isinstance(new, list):
+        keep = 0
+        limit = min(len(old), len(new))
+        while keep < limit and old[keep] == new[keep]:
+            keep += 1
+        return {"k": keep, "t": new[keep:]}
+    return {"v": new}
+
+
+def _apply(
+    base: Any,
+    op: Any,
+    *,
+    resolve_message: Callable[[str], dict[str, Any]],
+    field: str,
+) -> Any:
+    if not isinstance(op, dict):
+        raise ValueError(f"Malformed checkpoint delta for {field or 'state'}.")
+    if "v" in op:
+        return op["v"]
+    if "d" in op:
+        result = dict(base) if isinstance(base, dict) else {}
+        for key in op.get("u") or []:
+            result.pop(key, None)
+        for key, child in (op["d"] or {}).items():
+            result[key] = _apply(
+                result.get(key), child, resolve_message=resolve_message, field=str(key)
+            )
+        return result
+    if "k" in op:
+        keep = int(op["k"])
+        previous = base if isinstance(base, list) else []
+        if keep > len(previous):
+            raise ValueError(f"Checkpoint delta keeps {keep} items of {field}, base has fewer.")
+        tail = list(op.get("t") or [])
+        for position, entry_id in (op.get("r") or {}).items():
+            index = int(position)
+            if not 0 <= index < len(tail):
+                raise ValueError(f"Checkpoint delta reference {position} is out of range.")
+            tail[index] = resolve_message(str(entry_id))
+        return previous[:keep] + tail
+    raise ValueError(f"Malformed checkpoint delta for {field or 'state'}.")
+
+
+def fold_checkpoint(
+    entry: dict[str, Any],
+    lookup: Callable[[str], dict[str, Any] | None],
+) -> dict[str, Any]:
+    """把一条 checkpoint 条目还原成完整快照：关键帧直接返回，delta 回溯后折叠。
+
+    ``lookup`` 按 entry id 精确取条目（取不到返回 None），用于沿 ``base_id`` 回溯与
+    解析 message 引用。
+
+    Raises:
+        ValueError: 链条断了（基准条目不存在）、成环，或 payload 没有可恢复状态
+    """
+    deltas: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    current = entry
+    while True:
+        payload = current.get("payload") or {}
+        state = payload.get("state")
+        if isinstance(state, dict):
+            break
+        delta = payload.get("delta")
+        base_id = str(payload.get("base_id") or "")
+        if not isinstance(delta, dict) or not base_id:
+            raise ValueError(f"Checkpoint entry {current.get('id')} carries no resumable state.")
+        if base_id in seen:
+            raise ValueError(f"Checkpoint chain loops back to {base_id}.")
+        seen.add(base_id)
+        deltas.append(delta)
+        base = lookup(base_id)
+        if base is None:
+            raise ValueError(f"Checkpoint entry {current.get('id')} refers to missing {base_id}.")
+        current = base
+
+    def resolve_message(entry_id: str) -> dict[str, Any]:
+        message = (lookup(entry_id) or {}).get("payload") or {}
+        content = message.get("content")
+        # 内容外置到 blob 时这里先留引用，由调用方统一解析。
+        if not isinstance(content, str) and not is_blob_ref(content):
+            raise ValueError(f"Checkpoint delta refers to missing message {entry_id}.")
+        return {"role": str(message.get("role", "")), "content": content}
+
+    for delta in reversed(deltas):
+        state = apply_delta(state, delta, resolve_message=resolve_message)
+    return dict(state)
@@ -8,14 +8,28 @@
 条目（记下折叠了哪些 entry、从哪条起保留、摘要是什么），构造消息时按这条条目
 跳过被折叠的区间。于是事后可以在同一份会话日志上开关压缩重算上下文
 （``tracing.session.rebuild_context``），精确量化折叠掉了什么。
+
+**缓存友好布局**（``cache_friendly=True``）：供应商的前缀缓存只在请求前缀逐字节
+不变时命中，而每次折叠都会重写 ``<agent_memory>`` 之后的一切。这个模式下预算按
+当前窗口（沿用的折叠 + 之后追加的消息）而不是全量历史判断，并且在有 token 预算时
+不再按消息节奏折叠——折叠之间窗口只在末尾追加，前缀一直可复用，直到窗口真的
+装不下才换一次边界。
+
+token 估算走 ``HistoryTokenLedger`` 的运行总量：每步只估算新追加的消息，折叠前后、
+预算事件里的 token 数都由总量与折叠区间的前缀和推出，不再反复扫描整份历史。
 """
 
 from __future__ import annotations
 
 from typing import Any
 
-from dm_agent.memory.context_budget import estimate_messages_tokens
-from dm_agent.memory.context_compressor import Compaction, ContextCompressor, apply_compaction
+from dm_agent.memory.context_budget import HistoryTokenLedger
+from dm_agent.memory.context_compressor import (
+    Compaction,
+    ContextCompressor,
+    apply_compaction,
+    estimate_compacted_tokens,
+)
 
 from .run_state import RunContext
 
@@ -54,13 +68,21 @@ class ContextWindow:
         compressor: ContextCompressor | None,
         enabled: bool,
         trace_writer: Any | None = None,
+        cache_friendly: bool = False,
     ) -> None:
         self.compressor = compressor
         self.enabled = enabled
+        self.cache_friendly = cache_friendly
         self.trace_writer = trace_writer
         self._last_logged_memory_items = 0
         self._last_logged_saved_messages = 0
         self._last_recorded_compaction: Compaction | None = None
+        # 跨 run 保留：交互式多轮的历史本来就是延续的，``sync`` 会自己识别换了历史。
+        self._ledger = HistoryTokenLedger(compressor.tokenizer if compressor is not None else None)
+
+    def note_message_replaced(self, index: int, message: dict[str, str]) -> None:
+        """历史里已计数的消息被原地改写后调用，让运行总量跟上。"""
+        self._ledger.replace(index, message)
 
     def reset(self) -> None:
         """每个 run 重新开始节流计数。"""
@@ -86,8 +108,11 @@ class ContextWindow:
         if not (self.enabled and compressor):
             return messages
         self._sync_current_memory_metadata(context)
+        ledger = self._ledger
+        ledger.sync(history)
+        history_tokens = ledger.total_tokens
 
-        if compressor.should_compress(history):
+        if compressor.should_compress(history, ledger=ledger, **self._trigger_options(ledger)):
             # ``plan_compaction`` 会写 memory、推进 cadence、更新 LLM 摘要计数；先快照，
             # 净收益不成立时恢复，保证“没折叠”也真的没有留下隐式状态变化。
             state_before_candidate = compressor.snapshot_candidate_state()
@@ -95,24 +120,25 @@ class ContextWindow:
             trigger_tokens = compressor.last_estimated_tokens
             try:
                 candidate = compressor.plan_compaction(history)
-                candidate_history = apply_compaction(history, candidate)
-                candidate_is_beneficial = estimate_messages_tokens(
-                    candidate_history
-                ) < estimate_messages_tokens(history)
+                candidate_tokens = estimate_compacted_tokens(candidate, ledger)
+                candidate_is_beneficial = candidate_tokens < history_tokens
             except Exception:
                 compressor.restore_candidate_state(state_before_candidate)
                 raise
             if candidate_is_beneficial:
                 compressor.accept_beneficial_compaction(candidate)
+                candidate_history = apply_compaction(history, candidate)
                 self._record_compaction_entry(
                     candidate,
                     history=history,
                     compressed_history=candidate_history,
+                    tokens_before=history_tokens,
+                    tokens_after=candidate_tokens,
                     context=context,
                     phase="accepted",
                 )
                 self._record_budget_events(
-                    candidate_history,
+                    candidate_tokens,
                     context=context,
                     trigger=trigger,
                     trigger_tokens=trigger_tokens,
@@ -126,7 +152,7 @@ class ContextWindow:
         if sticky is None:
             if compressor.last_trigger:
                 self._record_budget_events(
-                    history,
+                    history_tokens,
                     context=context,
                     trigger=compressor.last_trigger,
                     trigger_tokens=compressor.last_estimated_tokens,
@@ -134,17 +160,20 @@ class ContextWindow:
                 )
             return messages
         sticky_history = apply_compaction(history, sticky)
+        sticky_tokens = estimate_compacted_tokens(sticky, ledger)
         if sticky != self._last_recorded_compaction:
             self._record_compaction_entry(
                 sticky,
                 history=history,
                 compressed_history=sticky_history,
+                tokens_before=history_tokens,
+                tokens_after=sticky_tokens,
                 context=context,
                 phase="sticky_reuse",
             )
         if compressor.last_trigger:
             self._record_budget_events(
-                sticky_history,
+                sticky_tokens,
                 context=context,
                 trigger=compressor.last_trigger,
                 trigger_tokens=compressor.last_estimated_tokens,
@@ -152,12 +181,25 @@ class ContextWindow:
             )
         return [{"role": "system", "content": system_prompt}, *sticky_history]
 
+    def _trigger_options(self, ledger: HistoryTokenLedger) -> dict[str, Any]:
+        """缓存友好模式下的折叠触发口径；默认模式沿用全量历史 + 消息节奏。"""
+        compressor = self.compressor
+        if not self.cache_friendly or compressor is None:
+            return {}
+        sticky = compressor.last_beneficial_compaction
+        window_tokens = (
+            ledger.total_tokens if sticky is None else estimate_compacted_tokens(sticky, ledger)
+        )
+        return {"window_tokens": window_tokens, "use_cadence": compressor.token_budget <= 0}
+
     def _record_compaction_entry(
         self,
         compaction: Compaction,
         *,
         history: list[dict[str, str]],
         compressed_history: list[dict[str, str]],
+        tokens_before: int,
+        tokens_after: int,
         context: RunContext,
         phase: str,
     ) -> None:
@@ -181,8 +223,8 @@ class ContextWindow:
                 "original_message_count": len(history),
                 "summary": compaction.summary,
                 "memory_items": compressor.memory_count if compressor else compaction.memory_items,
-                "estimated_tokens_before": estimate_messages_tokens(history),
-                "estimated_tokens_after": estimate_messages_tokens(compressed_history),
+                "estimated_tokens_before": tokens_before,
+                "estimated_tokens_after": tokens_after,
             },
             first_kept_index=compaction.first_kept_index,
             folded_indexes=compaction.folded_indexes,
@@ -199,7 +241,7 @@ class ContextWindow:
 
     def _record_budget_events(
         self,
-        compressed_history: list[dict[str, str]],
+        window_tokens: int,
         *,
         context: RunContext,
         trigger: str,
@@ -224,15 +266,13 @@ class ContextWindow:
                         "budget": compressor.token_budget,
                     },
                 )
-        if self.trace_writer and 0 < compressor.token_budget < estimate_messages_tokens(
-            compressed_history
-        ):
+        if self.trace_writer and 0 < compressor.token_budget < window_tokens:
             self.trace_writer.record(
                 "context_budget",
                 {
                     "step_number": context.step_number,
                     "phase": "post_compress_still_over",
-                    "estimated_tokens": estimate_messages_tokens(compressed_history),
+                    "estimated_tokens": window_tokens,
                     "budget": compressor.token_budget,
                 },
             )
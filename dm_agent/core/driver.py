@@ -0,0 +1,151 @@
+"""主循环的同步 / 异步两种驱动方式。
+
+``ReactAgent`` 的主循环写成一个生成器：每当需要一次 agent 阶段的 LLM 调用，就
+``yield`` 一个 ``LLMTurn``，由驱动方真正发请求，再把响应文本 ``send`` 回来（请求
+失败则 ``throw`` 回去，让循环自己落 ``llm_error`` 后再抛出）。循环体本身不做 I/O
+等待，于是同一份代码同时支撑两条路径：
+
+- ``drive_sync``：``ReactAgent.run`` 用，逐步调 ``respond``，行为与改造前逐字一致；
+- ``drive_async``：``ReactAgent.arun`` 用，LLM 调用走客户端的 ``arespond``，两次
+  调用之间的循环体（工具执行、钩子、规划器与压缩器自己的 LLM 调用）放进
+  ``asyncio.to_thread``，不阻塞事件循环。一个进程里因此可以并发推进大量 run。
+
+两种驱动都支持流式（``stream=True``）：边收增量边交给 ``StreamingActionParser``，
+动作一完整就关闭流、把文本送回循环，并在 ``LLMTurn.timing`` 里记下首 token 与
+动作就绪的耗时，由循环写进 trace 的 ``llm_call`` 条目。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Generator, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from dm_agent.clients.base_client import consume_last_usage
+
+from .response_parser import StreamingActionParser
+
+
+@dataclass
+class LLMTurn:
+    """主循环请求的一次 agent 阶段 LLM 调用。
+
+    ``messages`` 是会被 ``before_llm_request`` 中间件原地替换的那份列表：驱动方
+    发送后，循环用同一个对象写 trace，保证 trace 与真实请求一致。
+    """
+
+    messages: list[dict[str, str]]
+    temperature: float
+    # 流式请求的耗时统计，由驱动方填写；非流式请求保持为空。
+    timing: dict[str, Any] = field(default_factory=dict)
+    # 供应商回报的归一化用量（含前缀缓存命中数）；客户端没有回报时为 None。
+    usage: dict[str, int] | None = None
+    # 流式请求的用量口径："provider" 为供应商回报；"estimated" 表示流被提前关闭或
+    # 没有回报，这次请求只有按字符数的估算。非流式请求保持为空。
+    usage_source: str | None = None
+
+
+AgentLoop = Generator[LLMTurn, str, Any]
+
+
+def drive_sync(loop: AgentLoop, client: Any, *, stream: bool = False) -> Any:
+    """在当前线程里把主循环跑完，返回生成器的返回值。"""
+    turn = next(loop)
+    while True:
+        try:
+            raw = request_turn(client, turn, stream=stream)
+        except Exception as exc:
+            turn = loop.throw(exc)
+            continue
+        try:
+            turn = loop.send(raw)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def drive_async(loop: AgentLoop, client: Any, *, stream: bool = False) -> Any:
+    """在事件循环里把主循环跑完；循环体在工作线程里推进，LLM 调用原生 await。
+
+    流式请求的增量消费是同步迭代，整段放进工作线程。
+    """
+    done, value = await asyncio.to_thread(_advance, loop, None, None)
+    while not done:
+        turn: LLMTurn = value
+        try:
+            if stream:
+                raw = await asyncio.to_thread(request_turn, client, turn, stream=True)
+            else:
+                consume_last_usage()
+                raw = await client.arespond(turn.messages, temperature=turn.temperature)
+                turn.usage = consume_last_usage()
+        except Exception as exc:
+            done, value = await asyncio.to_thread(_advance, loop, None, exc)
+            continue
+        done, value = await asyncio.to_thread(_advance, loop, raw, None)
+    return value
+
+
+def request_turn(client: Any, turn: LLMTurn, *, stream: bool) -> str:
+    """同步发出一次 agent 阶段请求，返回送回主循环的响应文本。"""
+    if not stream:
+        consume_last_usage()
+        raw = str(client.respond(turn.messages, temperature=turn.temperature))
+        turn.usage = consume_last_usage()
+        return raw
+    consume_last_usage()
+    chunks = client.stream_text(turn.messages, temperature=turn.temperature)
+    raw = consume_stream(chunks, turn)
+    # 用量在流的末尾才回报：动作就绪后提前关闭的流拿不到，单独标成估算，
+    # 免得报表把缺失的真实用量当成 0 与供应商口径混算。
+    turn.usage = consume_last_usage()
+    turn.usage_source = "provider" if turn.usage else "estimated"
+    return raw
+
+
+def consume_stream(chunks: Iterator[str], turn: LLMTurn) -> str:
+    """消费流式增量直到动作就绪或流结束，返回可解析的响应文本。
+
+    就绪后立即关闭生成器：客户端借此断开连接，服务端不再为尾随的闲聊计费。
+    """
+    started = time.perf_counter()
+    parser = StreamingActionParser()
+    chunk_count = 0
+    try:
+        for chunk in chunks:
+            if chunk_count == 0:
+                turn.timing["time_to_first_token_seconds"] = time.perf_counter() - started
+            chunk_count += 1
+            if parser.feed(chunk):
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    turn.timing.update(
+        {
+            "streamed": True,
+            "time_to_action_seconds": time.perf_counter() - started,
+            "early_dispatch": parser.ready,
+            "stream_chunks": chunk_count,
+            "streamed_chars": parser.received_chars,
+        }
+    )
+    return parser.text
+
+
+def _advance(loop: AgentLoop, raw: str | None, error: Exception | None) -> tuple[bool, Any]:
+    """推进生成器一步。
+
+    ``StopIteration`` 不能穿过 ``asyncio`` 的 Future 传播，所以在工作线程里就地
+    接住，换成 ``(done, value)`` 返回。
+    """
+    try:
+        if error is not None:
+            return False, loop.throw(error)
+        if raw is None:
+            return False, next(loop)
+        return False, loop.send(raw)
+    except StopIteration as stop:
+        return True, stop.value
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable, Mapping
+import asyncio
+from collections.abc import Callable, Iterator, Mapping
 from dataclasses import dataclass, field
-from typing import Any, Literal
+from typing import Any, Literal, cast
+
+from dm_agent.clients.base_client import consume_last_usage, publish_usage
 
 EventName = Literal[
     "before_tool_call",
@@ -421,6 +424,35 @@ class LLMRequestClient:
         )
 
     def respond(self, messages: list[dict[str, str]], **extra: Any) -> str:
+        self._apply_middleware(messages)
+        return str(self._client.respond(messages, **extra))
+
+    async def arespond(self, messages: list[dict[str, str]], **extra: Any) -> str:
+        """``respond`` 的协程版本；被代理的客户端没有 ``arespond`` 时在线程里调 ``respond``。"""
+        self._apply_middleware(messages)
+        arespond = getattr(self._client, "arespond", None)
+        if arespond is None:
+            # 工作线程跑在复制出来的 context 里，respond 发布的用量留在那边；带回来在
+            # 调用方的 context 里重新发布，drive_async 才取得到。
+            def respond_with_usage() -> tuple[str, dict[str, int] | None]:
+                consume_last_usage()
+                text = str(self._client.respond(messages, **extra))
+                return text, consume_last_usage()
+
+            text, usage = await asyncio.to_thread(respond_with_usage)
+            publish_usage(usage)
+            return text
+        return str(await arespond(messages, **extra))
+
+    def stream_text(self, messages: list[dict[str, str]], **extra: Any) -> Iterator[str]:
+        """``respond`` 的流式版本；被代理的客户端不支持流式时整段产出一次。"""
+        self._apply_middleware(messages)
+        stream_text = getattr(self._client, "stream_text", None)
+        if stream_text is None:
+            return iter([str(self._client.respond(messages, **extra))])
+        return cast(Iterator[str], stream_text(messages, **extra))
+
+    def _apply_middleware(self, messages: list[dict[str, str]]) -> None:
         run_id, step_number, metadata = self._context_provider()
         event = BeforeLLMRequestEvent(
             messages=[dict(message) for message in messages],
@@ -433,7 +465,6 @@ class LLMRequestClient:
         # 调用者随后会用同一列表写 trace；原地替换可确保 trace 与真实请求一致，
         # 同时浅复制消息字典，避免处理器意外污染 conversation_history。
         messages[:] = outgoing
-        return str(self._client.respond(messages, **extra))
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self._client, name)
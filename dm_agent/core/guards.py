@@ -10,6 +10,22 @@ from .events import AfterToolResultEvent, BeforeToolCallEvent
 
 READ_ACTIONS = frozenset({"read_file", "search_in_file"})
 WRITE_ACTIONS = frozenset({"edit_file", "create_file"})
+# 只读、无副作用、彼此之间没有先后依赖的内置工具：同一次响应里的 ``actions``
+# 批量动作只接受这些工具，并在线程池上并发执行。
+PARALLEL_SAFE_ACTIONS = frozenset(
+    {
+        "list_directory",
+        "read_file",
+        "search_in_file",
+        "parse_ast",
+        "get_function_signature",
+        "find_dependencies",
+        "get_code_metrics",
+        "build_code_index",
+        "search_symbol",
+        "dependency_graph",
+    }
+)
 
 
 class ReadBeforeEditGuard:
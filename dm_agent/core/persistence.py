@@ -9,7 +9,8 @@
 
 落盘有两种形态，按扩展名分流：
 
-- ``*.jsonl`` —— append-only 的**会话日志**，每步追加一条 ``checkpoint`` 条目。
+- ``*.jsonl`` / ``*.jsonl.gz`` —— append-only 的**会话日志**（后者是块压缩格式），
+  每步追加一条 ``checkpoint`` 条目。
   于是 checkpoint 退化成「记住某个 entry id」，``--resume-at`` 可以挑更早的条目，
   ``dm-agent-trace fork`` 可以从任意条目分叉。
 - 其余后缀 —— 原来的单文件 JSON 快照，原子覆盖写，语义完全不变。
@@ -18,14 +19,23 @@
 from __future__ import annotations
 
 import json
-from collections.abc import Iterable, Mapping
+from collections.abc import Callable, Iterable, Mapping
 from pathlib import Path
 from typing import Any
 
-from dm_agent.tracing.session import latest_checkpoint_entry, load_session_entries
+from dm_agent.tools.base import resolve_path
+from dm_agent.tracing.blobs import BlobStore
+from dm_agent.tracing.compression import is_session_log_path, read_log_text
+from dm_agent.tracing.index import SessionIndex
+from dm_agent.tracing.session import (
+    CHECKPOINT_EVENT,
+    latest_checkpoint_entry,
+    load_session_entries,
+)
 from dm_agent.tracing.writer import SessionWriter, TraceWriter
 
 from .checkpoint import RunCheckpoint, backup_file, save_checkpoint
+from .checkpoint_delta import CheckpointDeltaEncoder, fold_checkpoint
 from .planner import PlanStep
 from .run_state import RunContext, Step
 
@@ -40,13 +50,10 @@ COMPARED_CONFIG_KEYS = (
     "context_token_budget",
 )
 
-# 会话日志形态的 checkpoint 文件后缀。
-SESSION_SUFFIX = ".jsonl"
-
 
 def is_session_checkpoint(path: str | Path) -> bool:
-    """``*.jsonl`` 走会话日志形态，其余走单文件快照。"""
-    return Path(path).suffix.lower() == SESSION_SUFFIX
+    """``*.jsonl`` / ``*.jsonl.gz`` 走会话日志形态，其余走单文件快照。"""
+    return is_session_log_path(path)
 
 
 class RunPersistence:
@@ -60,11 +67,14 @@ class RunPersistence:
         # 旧的直接使用 RunPersistence 的调用方仍可走兼容 fallback；Agent 主路径
         # 使用共享 SessionWriter，因此 checkpoint 与普通会话条目共用同一条写入链。
         self._session_writer: TraceWriter | None = None
+        # 会话日志里的 checkpoint 按「关键帧 + delta」写；每个 run 从关键帧开始。
+        self._delta_encoder = CheckpointDeltaEncoder()
 
     def prepare_session_checkpoint(self, path: str | Path) -> None:
         """在 run_start 前准备 JSONL checkpoint sink，让首条消息也能被扇出。"""
         if not is_session_checkpoint(path):
             return
+        self._delta_encoder.reset()
         if isinstance(self.trace_writer, SessionWriter):
             self.trace_writer.ensure_checkpoint_sink(path)
 
@@ -75,7 +85,9 @@ class RunPersistence:
         path = action_input.get("path")
         if not isinstance(path, str) or not path:
             return
-        backup_path = backup_file(path, run_id=context.run_id, step=context.step_number)
+        backup_path = backup_file(
+            resolve_path(path), run_id=context.run_id, step=context.step_number
+        )
         if backup_path is None:
             return
         metadata = context.metadata
@@ -112,23 +124,36 @@ class RunPersistence:
             )
 
     def _append_session_checkpoint(self, path: Path, checkpoint: RunCheckpoint) -> None:
+        state = checkpoint.to_dict()
+        writer: SessionWriter | TraceWriter
         if isinstance(self.trace_writer, SessionWriter):
             self.trace_writer.ensure_checkpoint_sink(path)
-            self.trace_writer.record_checkpoint_state(
-                step_number=checkpoint.step_count,
-                state=checkpoint.to_dict(),
+            writer = self.trace_writer
+            encoded = self._delta_encoder.encode(
+                state, message_ref=self.trace_writer.checkpoint_message_id
             )
-            return
-        if self._session_writer is None:
-            self._session_writer = TraceWriter(path)
-        writer = self._session_writer
+        else:
+            if self._session_writer is None:
+                self._session_writer = TraceWriter(path)
+            writer = self._session_writer
+            encoded = self._delta_encoder.encode(state)
+        entry_id = ""
         try:
-            writer.record_checkpoint_state(
-                step_number=checkpoint.step_count,
-                state=checkpoint.to_dict(),
-            )
+            if "delta" in encoded:
+                entry_id = writer.record_checkpoint_delta(
+                    step_number=checkpoint.step_count,
+                    delta=encoded["delta"],
+                    base_id=encoded["base_id"],
+                )
+            else:
+                entry_id = writer.record_checkpoint_state(
+                    step_number=checkpoint.step_count, state=state
+                )
         finally:
-            writer.close()
+            # 没写成（sink 被停用或抛错）时下一条重新从关键帧开始。
+            self._delta_encoder.commit(entry_id)
+            if writer is self._session_writer:
+                writer.close()
 
 
 def load_resume_state(path: str | Path, *, at: str | None = None) -> RunCheckpoint:
@@ -144,9 +169,18 @@ def load_resume_state(path: str | Path, *, at: str | None = None) -> RunCheckpoi
     source = Path(path)
     if not source.is_file():
         raise ValueError(f"Checkpoint file not found: {source}")
+    index = _session_index(source)
+    if index is not None:
+        position = index.latest(CHECKPOINT_EVENT, until=index.find(at) if at else None)
+        return _checkpoint_from_entry(
+            index.entry(position, resolve_blobs=False) if position is not None else None,
+            at,
+            lookup=lambda entry_id: _index_lookup(index, entry_id),
+            blobs=BlobStore.for_log(source),
+        )
     try:
-        text = source.read_text(encoding="utf-8")
-    except OSError as exc:
+        text = read_log_text(source)
+    except (OSError, UnicodeDecodeError) as exc:
         raise ValueError(f"Checkpoint file is unreadable: {exc}") from exc
 
     snapshot = _as_json_object(text)
@@ -156,21 +190,72 @@ def load_resume_state(path: str | Path, *, at: str | None = None) -> RunCheckpoi
         return RunCheckpoint.from_dict(snapshot)
 
     try:
-        entries = load_session_entries(source)
+        entries = load_session_entries(source, resolve_blobs=False)
     except json.JSONDecodeError as exc:
         raise ValueError(
             f"Checkpoint file is neither a JSON snapshot nor session JSONL: {exc}"
         ) from exc
-    entry = latest_checkpoint_entry(entries, until_entry_id=at)
+    by_id = {str(entry.get("id")): entry for entry in entries}
+    return _checkpoint_from_entry(
+        latest_checkpoint_entry(entries, until_entry_id=at),
+        at,
+        lookup=by_id.get,
+        blobs=BlobStore.for_log(source),
+    )
+
+
+def _session_index(source: Path) -> SessionIndex | None:
+    """会话日志走字节偏移索引：只读目标 checkpoint 那一条，不解析整份日志。
+
+    单文件快照碰巧以 ``.jsonl`` 结尾、或内容不是逐行 JSON 时返回 None，交给原来的
+    整文件识别逻辑处理（保持它的报错文案）。
+    """
+    if not is_session_log_path(source):
+        return None
+    try:
+        index = SessionIndex.load(source)
+    except (OSError, ValueError):
+        return None
+    # 会话日志的每条都带 event；一行一个快照对象的文件没有。
+    if not index.records or not index.records[0].event:
+        return None
+    return index
+
+
+def _index_lookup(index: SessionIndex, entry_id: str) -> dict[str, Any] | None:
+    try:
+        position = index.find(entry_id)
+    except ValueError:
+        return None
+    entry = index.entry(position, resolve_blobs=False)
+    return entry if entry.get("id") == entry_id else None
+
+
+def _checkpoint_from_entry(
+    entry: dict[str, Any] | None,
+    at: str | None,
+    *,
+    lookup: Callable[[str], dict[str, Any] | None],
+    blobs: BlobStore,
+) -> RunCheckpoint:
+    """checkpoint 条目 -> 快照；增量条目沿 ``base_id`` 折叠回完整状态。
+
+    条目按原样（含 blob 引用）折叠，最后一次性解析引用；缺失的 blob 是硬错误——
+    带着占位串续跑会把损坏的上下文发给模型。
+    """
     if entry is None:
         scope = f"at or before {at}" if at else "in this session"
         raise ValueError(
             f"No resumable checkpoint entry {scope}. "
             "会话日志需要用 --checkpoint *.jsonl 跑过才会有 checkpoint 条目。"
         )
-    state = (entry.get("payload") or {}).get("state")
-    if not isinstance(state, dict):
-        raise ValueError(f"Checkpoint entry {entry.get('id')} carries no resumable state.")
+    state = fold_checkpoint(entry, lookup)
+    try:
+        state = blobs.resolve(state, strict=True)
+    except OSError as exc:
+        raise ValueError(
+            f"Checkpoint entry {entry.get('id')} refers to a missing blob: {exc}"
+        ) from exc
     return RunCheckpoint.from_dict(state)
 
 
@@ -277,6 +362,9 @@ def metadata_from_checkpoint(
         "edit_noop_count",
         "parse_error_context_omitted_count",
         "parse_error_context_omitted_chars",
+        "tool_cache_hits",
+        "tool_cache_misses",
+        "tool_cache_invalidations",
     ):
         restored.setdefault(key, 0)
     restored["status"] = "running"
@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import json
+import threading
+import time
 from dataclasses import dataclass
 from typing import Any, ClassVar
 
@@ -501,6 +503,48 @@ class TaskPlanner:
         self.current_plan = []
 
 
+class PendingPlan:
+    """在后台线程里生成的初始计划（speculative planning）。
+
+    ``ReactAgent`` 先发出第一个 agent 请求，规划器的 LLM 调用同时在这里进行；拿到
+    第一个响应后再 ``wait`` 计划，并把计划拼回任务提示词。两次调用重叠的部分就是
+    省下的延迟：``hidden_seconds = plan_seconds - waited_seconds``。
+    """
+
+    def __init__(self, planner: TaskPlanner, task: str):
+        self.plan_seconds = 0.0
+        self.waited_seconds = 0.0
+        self._steps: list[PlanStep] = []
+        self._error: Exception | None = None
+        self._started = time.perf_counter()
+        # daemon：第一个 agent 请求失败、run 直接抛出时，不让挂起的规划拖住进程退出。
+        self._thread = threading.Thread(
+            target=self._run, args=(planner, task), name="dm-agent-planner", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, planner: TaskPlanner, task: str) -> None:
+        try:
+            self._steps = planner.plan(task)
+        except Exception as exc:
+            self._error = exc
+        finally:
+            self.plan_seconds = time.perf_counter() - self._started
+
+    def wait(self) -> list[PlanStep]:
+        """阻塞到计划生成完毕；规划器抛出的异常在这里原样重新抛出。"""
+        started = time.perf_counter()
+        self._thread.join()
+        self.waited_seconds = time.perf_counter() - started
+        if self._error is not None:
+            raise self._error
+        return self._steps
+
+    @property
+    def hidden_seconds(self) -> float:
+        return max(0.0, self.plan_seconds - self.waited_seconds)
+
+
 def _strategy_guidance(signal: ReplanSignal) -> str:
     guidance = {
         "tool_error": (
@@ -28,12 +28,21 @@ class SkillActivation:
     tools: list[Tool] = field(default_factory=list)
 
 
-def build_user_prompt(task: str, plan: Sequence[PlanStep] | None = None) -> str:
+PLAN_PENDING_HINT = "\n执行计划生成中：这一步先做只读的探索（读文件、搜索、列目录），不要修改文件。"
+
+
+def build_user_prompt(
+    task: str,
+    plan: Sequence[PlanStep] | None = None,
+    *,
+    plan_pending: bool = False,
+) -> str:
     """构建用户提示词。
 
     Args:
         task: 当前任务描述
         plan: 执行计划
+        plan_pending: 计划仍在后台生成（speculative planning 的第一步）
 
     Returns:
         构建好的用户提示词字符串
@@ -48,6 +57,8 @@ def build_user_prompt(task: str, plan: Sequence[PlanStep] | None = None) -> str:
             lines.append(
                 f"{status} 步骤 {plan_step.step_number}: {plan_step.action} - {plan_step.reason}"
             )
+    elif plan_pending:
+        lines.append(PLAN_PENDING_HINT)
 
     lines.append(RESPONSE_FORMAT_HINT)
     return "\n".join(lines)
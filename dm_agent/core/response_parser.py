@@ -3,6 +3,12 @@
 模型经常把 JSON 包在解释文字或 ```` ```json ```` 围栏里，也会带上中文引号或
 尾随逗号。这里按「原文 → 围栏内容 → 首尾花括号之间 → 各自的修复版」的顺序
 逐个试，第一个能解析成 JSON 对象的胜出，并如实报告是否用上了修复。
+
+除了单动作的 ``action`` / ``action_input``，模型也可以用 ``actions`` 列表在一次
+响应里请求多个只读工具（见 ``batch_actions``），由内核并发执行。
+
+流式响应由 ``StreamingActionParser`` 边收边扫：动作一旦在语法上完整就可以提前
+交给内核执行，后面的闲聊不再等待。
 """
 
 from __future__ import annotations
@@ -27,6 +33,10 @@ TERMINAL_ACTION_ALIASES: dict[str, str] = {
     "task_complete": "task_complete",
 }
 
+# 一次响应里 ``actions`` 最多接受的动作数；超出的部分直接丢弃，防止模型一口气
+# 把整个仓库读进同一条观察。
+MAX_BATCH_ACTIONS = 8
+
 
 @dataclass(frozen=True)
 class ParsedResponse:
@@ -74,6 +84,115 @@ def normalize_action(action: str) -> str:
     return TERMINAL_ACTION_ALIASES.get(normalized, action)
 
 
+def batch_actions(data: dict[str, Any]) -> list[tuple[str, Any]] | None:
+    """取出 ``actions`` 批量格式里的动作列表；响应是单动作格式时返回 None。
+
+    单动作字段优先：同时给了非空 ``action`` 与 ``actions`` 时按单动作处理，老格式
+    的行为一字不变。列表里不是对象的元素归一成空动作名，由调用方按未知工具处理。
+    """
+    single = data.get("action")
+    if single is not None and str(single).strip():
+        return None
+    items = data.get("actions")
+    if not isinstance(items, list) or not items:
+        return None
+    actions: list[tuple[str, Any]] = []
+    for item in items[:MAX_BATCH_ACTIONS]:
+        if isinstance(item, dict):
+            name = item.get("action")
+            actions.append(("" if name is None else str(name).strip(), item.get("action_input")))
+        else:
+            actions.append(("", None))
+    return actions
+
+
+class StreamingActionParser:
+    """增量扫描流式响应，判断「动作是否已经可以执行」。
+
+    只跟踪第一个顶层 JSON 对象的括号深度与字符串状态，每个增量只扫新到的字符。
+    两种时机视为就绪：
+
+    - 顶层对象闭合且能解析成对象——对象之后的解释文字一概不等；
+    - 顶层出现逗号、而此前的成员已经包含动作（``action`` + ``action_input`` 或
+      ``actions``）——模型把 ``thought`` 写在动作之后时，不必等它写完。
+
+    就绪后 ``text`` 是可以直接交给 ``parse_agent_response`` 的对象文本（第二种
+    时机会补上闭合花括号）。没有就绪就结束的流，``text`` 是收到的全文，走普通的
+    容错解析。
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.ready = False
+        self._ready_text = ""
+
+    @property
+    def text(self) -> str:
+        return self._ready_text if self.ready else self._text
+
+    @property
+    def received_chars(self) -> int:
+        return len(self._text)
+
+    def feed(self, chunk: str) -> bool:
+        """喂入一段增量，返回是否已经就绪。"""
+        if self.ready:
+            return True
+        self._text += chunk
+        text = self._text
+        while self._pos < len(text) and not self.ready:
+            char = text[self._pos]
+            if self._start < 0:
+                if char == "{":
+                    self._start = self._pos
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._check(text[self._start : self._pos + 1], closed=True)
+            elif char == "," and self._depth == 1:
+                self._check(text[self._start : self._pos] + "}", closed=False)
+            self._pos += 1
+        return self.ready
+
+    def _check(self, candidate: str, *, closed: bool) -> None:
+        parsed = load_json_object(candidate)
+        if parsed is None:
+            if closed:
+                # 闭合了却解析不了（例如中文引号打乱了字符串状态）：放弃这个对象，
+                # 继续找下一个，最终交给容错解析处理全文。
+                self._start = -1
+                self._in_string = False
+                self._escape = False
+            return
+        if closed or _has_complete_action(parsed):
+            self.ready = True
+            self._ready_text = candidate
+
+
+def _has_complete_action(data: dict[str, Any]) -> bool:
+    action = data.get("action")
+    if action is not None and str(action).strip() and "action_input" in data:
+        return True
+    return isinstance(data.get("actions"), list)
+
+
 def json_candidates(candidate: str) -> list[str]:
     """按优先级列出所有值得一试的 JSON 片段。"""
     candidates = [candidate]
@@ -7,9 +7,33 @@
 
 from __future__ import annotations
 
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Any
 
+# ``step_timing`` 条目里的阶段名，顺序即输出顺序。``trace_io`` 是会话日志写盘耗时，
+# 已从其余阶段里扣除；``other`` 是总耗时减去全部已计阶段的余量（历史追加、回调等）。
+STEP_PHASES = (
+    "checkpoint",
+    "context_build",
+    "llm_wait",
+    "plan_wait",
+    "parse",
+    "hooks",
+    "backup",
+    "tool_execution",
+    "observation_bounding",
+    "replan",
+    "trace_io",
+    "other",
+)
+
+
+def _no_io() -> float:
+    return 0.0
+
 
 @dataclass
 class Step:
@@ -22,6 +46,63 @@ class Step:
     raw: str = ""  # 原始响应内容
 
 
+class StepTimer:
+    """一步之内各阶段的墙钟耗时（``perf_counter``）。
+
+    ``io_clock`` 返回会话日志累计写盘秒数；每个阶段都扣掉自己期间发生的写盘时间，
+    于是各阶段互不重叠，``trace_io`` 单列。阶段不要嵌套，否则外层会重复计入内层。
+    """
+
+    def __init__(self, io_clock: Callable[[], float] | None = None) -> None:
+        self.step_number = 0
+        self.phases: dict[str, float] = {}
+        self.tools: list[dict[str, Any]] = []
+        self._io_clock = io_clock or _no_io
+        self._started = time.perf_counter()
+        self._io_started = 0.0
+
+    def restart(self, step_number: int, *, io_clock: Callable[[], float] | None = None) -> None:
+        """开始计一个新步骤，清空上一步的累计。"""
+        if io_clock is not None:
+            self._io_clock = io_clock
+        self.step_number = step_number
+        self.phases = {}
+        self.tools = []
+        self._started = time.perf_counter()
+        self._io_started = self._io_clock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        io_before = self._io_clock()
+        try:
+            yield
+        finally:
+            io_spent = self._io_clock() - io_before
+            self.add(name, time.perf_counter() - started - io_spent)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + max(0.0, seconds)
+
+    def add_tool(self, action: str, seconds: float, *, cached: bool = False) -> None:
+        self.tools.append({"action": action, "seconds": round(seconds, 6), "cached": cached})
+
+    def snapshot(self) -> dict[str, Any]:
+        """``step_timing`` 条目的 payload。"""
+        total = time.perf_counter() - self._started
+        phases = dict(self.phases)
+        phases["trace_io"] = max(0.0, self._io_clock() - self._io_started)
+        phases["other"] = max(0.0, total - sum(phases.values()))
+        return {
+            "step_number": self.step_number,
+            "total_seconds": round(total, 6),
+            "phases": {
+                name: round(phases[name], 6) for name in STEP_PHASES if phases.get(name, 0.0) > 0
+            },
+            "tools": list(self.tools),
+        }
+
+
 @dataclass
 class RunContext:
     """一次 run 期间在内核与协作者之间共享的环境信息。
@@ -39,6 +120,8 @@ class RunContext:
     step_number: int = 0
     metadata: dict[str, Any] = field(default_factory=dict)
     history_entry_ids: list[str] = field(default_factory=list)
+    # 当前步骤的分阶段计时；协作者（工具调用链）往里记自己那一段。
+    step_timer: StepTimer = field(default_factory=StepTimer)
 
     def begin(self, *, run_id: str, metadata: dict[str, Any]) -> None:
         """进入新一轮 run，原地重置共享环境。"""
@@ -46,6 +129,7 @@ class RunContext:
         self.step_number = 0
         self.metadata = metadata
         self.history_entry_ids.clear()
+        self.step_timer.restart(0)
 
     def as_event_context(self) -> tuple[str, int, dict[str, Any]]:
         """``LLMRequestClient`` 需要的上下文取值回调。"""
@@ -113,6 +197,13 @@ def initial_run_metadata(
         "repeated_failures": [],
         "terminal_action_alias_count": 0,
         "terminal_action_aliases": [],
+        "parallel_batch_count": 0,
+        "parallel_action_count": 0,
+        "parallel_action_rejected_count": 0,
+        "speculative_plan_hidden_seconds": 0.0,
+        "tool_cache_hits": 0,
+        "tool_cache_misses": 0,
+        "tool_cache_invalidations": 0,
         # 本次尝试序号；``on_run_end`` 处理器请求重试时由 ``run()`` 递增。
         "trial": attempt,
     }
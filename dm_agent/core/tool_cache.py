@@ -0,0 +1,251 @@
+"""只读分析工具的结果缓存：同一文件没变就不再重复读盘、重复解析。
+
+模型经常对同一个没改过的文件反复调用 ``parse_ast`` / ``get_function_signature``
+/ ``get_code_metrics`` / ``search_in_file``，每次都要重读重解析。``ToolResultCache`` 以「工具名 + 规范化入参 + 目标文件指纹」为键记住原始
+观察（截断与 ``after_tool_result`` 钩子之前的那份），命中时直接复用。
+
+正确性靠两道闸：
+
+- **指纹**：``(mtime_ns, size, sha256)``。stat 没变直接命中；stat 变了再比内容
+  哈希，只是 touch 过的文件仍然命中，真的改过则作废。
+- **写感知失效**：``WRITE_ACTIONS`` 成功后作废该路径的全部条目；``run_shell`` 等
+  执行类工具以及任何不认识的工具可能改动工作区的任意文件，直接清空。
+
+只缓存内置 runner 的结果：扩展可以注册同名工具，那种实现的副作用内核无从保证。
+输出还取决于目标文件以外状态的工具也不缓存：``find_dependencies`` 按
+``target.parent/<顶层模块>`` 是否存在区分本地与第三方依赖，新建或删除同级模块不会
+改变目标文件的指纹。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from dm_agent.tools.base import Tool, resolve_path
+from dm_agent.tools.code_analysis_tools import (
+    get_code_metrics,
+    get_function_signature,
+    parse_ast,
+)
+from dm_agent.tools.file_tools import search_in_file
+
+from .guards import PARALLEL_SAFE_ACTIONS, WRITE_ACTIONS
+
+# 可缓存的工具 -> 对应的内置 runner（按身份比对，扩展同名覆盖的不缓存）。
+# 只收输出仅由目标文件内容决定的工具。
+CACHEABLE_RUNNERS = {
+    "parse_ast": parse_ast,
+    "get_function_signature": get_function_signature,
+    "get_code_metrics": get_code_metrics,
+    "search_in_file": search_in_file,
+}
+
+# 不改动工作区、执行后无需失效的动作。
+_NON_MUTATING_ACTIONS = PARALLEL_SAFE_ACTIONS | {"task_complete"}
+
+# 持久化文件的格式版本；不一致时整份丢弃重建。
+TOOL_CACHE_VERSION = 2
+
+
+@dataclass
+class _Fingerprint:
+    mtime_ns: int
+    size: int
+    sha256: str
+
+
+@dataclass
+class _Entry:
+    path: str
+    fingerprint: _Fingerprint
+    observation: str
+
+
+def _normalize_target(value: Any) -> str | None:
+    """把入参里的 ``path`` 解析成当前工作区下的绝对路径，作为键与失效的依据。"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return os.path.normcase(os.path.abspath(resolve_path(value.strip())))
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ToolResultCache:
+    """按文件指纹记忆只读分析工具的原始观察。
+
+    查找与写入都在调用线程里进行（``ToolInvoker`` 保证这一点），锁只是为了让多个
+    智能体共享同一个实例时也安全。``path`` 非空时在 ``save`` 时落盘，下次构造时
+    载回；持久化条目同样要过指纹校验，跨 run 复用不会读到过期结果。
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self._load(self.path)
+
+    @property
+    def persistent(self) -> bool:
+        return self.path is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key_for(self, tool: Tool, action: str, arguments: Any) -> tuple[str, str] | None:
+        """返回 ``(缓存键, 目标绝对路径)``；这次调用不可缓存时返回 None。"""
+        if CACHEABLE_RUNNERS.get(action) is not tool.runner or not isinstance(arguments, dict):
+            return None
+        target = _normalize_target(arguments.get("path"))
+        if target is None:
+            return None
+        # 原始 path 写法不同（./a.py 与 a.py）但指向同一文件时共享条目；观察里回显的
+        # 是原始写法，所以它仍要进键。
+        try:
+            normalized = json.dumps(
+                {"tool": action, "target": target, "arguments": arguments},
+                sort_keys=True,
+                ensure_ascii=False,
+            )
+        except (TypeError, ValueError):
+            return None
+        return normalized, target
+
+    def get(self, key: str) -> str | None:
+        """命中且指纹仍然有效时返回缓存的观察，并计入 hits/misses。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._still_valid(entry):
+                self.hits += 1
+                return entry.observation
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, target: str, observation: str) -> None:
+        """记住一次成功调用的原始观察；目标文件已不存在时不缓存。"""
+        fingerprint = self._fingerprint(target)
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._entries[key] = _Entry(target, fingerprint, observation)
+
+    def note_action(self, action: str, arguments: Any) -> int:
+        """一次动作执行完之后调用：按它可能造成的改动作废条目，返回作废条数。"""
+        if action in _NON_MUTATING_ACTIONS:
+            return 0
+        with self._lock:
+            if action in WRITE_ACTIONS and isinstance(arguments, dict):
+                target = _normalize_target(arguments.get("path"))
+                if target is not None:
+                    stale = [key for key, entry in self._entries.items() if entry.path == target]
+                    for key in stale:
+                        del self._entries[key]
+                    self.invalidations += len(stale)
+                    return len(stale)
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.invalidations += dropped
+            return dropped
+
+    def reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def save(self) -> None:
+        """持久化模式下原子写回磁盘；写失败只丢缓存，不影响任务。"""
+        if self.path is None:
+            return
+        with self._lock:
+            payload = {
+                "version": TOOL_CACHE_VERSION,
+                "entries": {
+                    key: {
+                        "path": entry.path,
+                        "mtime_ns": entry.fingerprint.mtime_ns,
+                        "size": entry.fingerprint.size,
+                        "sha256": entry.fingerprint.sha256,
+                        "observation": entry.observation,
+                    }
+                    for key, entry in self._entries.items()
+                },
+            }
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"[tool-cache] 写入 {self.path} 失败，本次结果不落盘：{exc}")
+
+    def _load(self, path: Path) -> None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != TOOL_CACHE_VERSION:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return
+        for key, raw in entries.items():
+            try:
+                self._entries[key] = _Entry(
+                    path=str(raw["path"]),
+                    fingerprint=_Fingerprint(
+                        int(raw["mtime_ns"]), int(raw["size"]), str(raw["sha256"])
+                    ),
+                    observation=str(raw["observation"]),
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    @staticmethod
+    def _fingerprint(target: str) -> _Fingerprint | None:
+        try:
+            stat = os.stat(target)
+            return _Fingerprint(stat.st_mtime_ns, stat.st_size, _hash_file(target))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _still_valid(entry: _Entry) -> bool:
+        """stat 一致直接放行；stat 变了再比内容哈希（只被 touch 过的文件仍命中）。"""
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        fingerprint = entry.fingerprint
+        if stat.st_mtime_ns == fingerprint.mtime_ns and stat.st_size == fingerprint.size:
+            return True
+        if stat.st_size != fingerprint.size:
+            return False
+        try:
+            digest = _hash_file(entry.path)
+        except OSError:
+            return False
+        if digest != fingerprint.sha256:
+            return False
+        fingerprint.mtime_ns = stat.st_mtime_ns
+        return True
@@ -6,14 +6,29 @@
 - 备份发生在 ``before_tool_call`` 放行之后、真正执行之前——被拦下的调用不备份；
 - 截断发生在 ``after_tool_result`` 链之前——处理器看到的就是最终写进 step、
   对话历史与 trace 的那份文本。
+
+同一次响应里的多个只读动作（``actions`` 批量）可以并发执行，但只有 runner 本身
+上线程池；校验、钩子、截断与计数仍按动作顺序串行，结果与逐个调用一致。
+
+配置了 ``ToolResultCache`` 时，可缓存的只读调用在放行之后、执行之前查缓存：命中就
+跳过 runner，缓存的是截断与后置钩子之前的原始观察，所以命中与否对下游完全透明。
+每次执行后按动作作废可能过期的条目（见 ``core.tool_cache``）。
+
+设置了 ``workspace`` 时，整条链路（含线程池里的 runner）都在
+:func:`~dm_agent.tools.base.use_workspace` 之内执行：相对路径与子进程 ``cwd`` 落在
+该智能体自己的工作区，不依赖、也不改动进程级 CWD。
 """
 
 from __future__ import annotations
 
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, cast
 
-from dm_agent.tools.base import Tool
+from dm_agent.tools.base import Tool, use_workspace
 from dm_agent.tools.file_tools import edit_file as builtin_edit_file
 
 from .events import AfterToolResultEvent, BeforeToolCallEvent, EventBus, HookErrorHandler
@@ -25,6 +40,11 @@ from .guards import (
 from .observation import ObservationBounder
 from .persistence import RunPersistence
 from .run_state import RunContext
+from .tool_cache import ToolResultCache
+
+# ``invoke_parallel`` 的线程池上限：只读工具主要耗在磁盘 I/O 与 AST 解析上，
+# 再多的线程只会争抢 GIL。
+DEFAULT_PARALLEL_WORKERS = 8
 
 
 @dataclass
@@ -44,6 +64,7 @@ class ToolInvocation:
     blocked: bool = False
     tool_succeeded: bool = False
     no_change: bool = False
+    cached: bool = False
 
 
 def coerce_task_complete_arguments(action_input: Any) -> dict[str, Any]:
@@ -66,8 +87,27 @@ def validate_tool_arguments(action_input: Any) -> tuple[str, str] | None:
     return None
 
 
+@dataclass
+class _PreparedCall:
+    """放行后、执行前的一次调用：``invoke`` 与 ``invoke_parallel`` 共用的中间态。"""
+
+    tool: Tool
+    action: str
+    arguments: Any
+    identity_edit_noop: bool
+    cache_key: tuple[str, str] | None = None
+    # runner 实际耗时；缓存命中时保持 0。
+    seconds: float = 0.0
+
+
 class ToolInvoker:
-    """按固定次序把一次工具调用跑完，并把过程记进 metadata。"""
+    """按固定次序把一次工具调用跑完，并把过程记进 metadata。
+
+    一次调用被拆成三段：``_prepare``（校验 → 前置钩子 → 备份）、``_execute``
+    （只跑 runner，不碰任何共享状态）与 ``_complete``（计数 → 截断 → 后置钩子）。
+    ``invoke_parallel`` 只把中间那段放上线程池，前后两段仍按动作顺序在调用线程里
+    跑，所以钩子、metadata 与 trace 的次序与逐个串行调用完全一致。
+    """
 
     def __init__(
         self,
@@ -76,11 +116,17 @@ class ToolInvoker:
         bounder: ObservationBounder,
         persistence: RunPersistence,
         on_error: HookErrorHandler | None = None,
+        max_workers: int = DEFAULT_PARALLEL_WORKERS,
+        workspace: str | Path | None = None,
+        cache: ToolResultCache | None = None,
     ) -> None:
         self.event_bus = event_bus
         self.bounder = bounder
         self.persistence = persistence
         self.on_error = on_error
+        self.max_workers = max(1, int(max_workers))
+        self.workspace = Path(workspace) if workspace is not None else None
+        self.cache = cache
 
     def invoke(
         self,
@@ -91,6 +137,99 @@ class ToolInvoker:
         context: RunContext,
     ) -> ToolInvocation:
         """执行一次工具调用；入参非法或被钩子拦下时不会真正调用 runner。"""
+        with use_workspace(self.workspace):
+            prepared = self._prepare(
+                tool, action=action, action_input=action_input, context=context
+            )
+            if isinstance(prepared, ToolInvocation):
+                return prepared
+            with context.step_timer.phase("tool_execution"):
+                cached = self._lookup_cache(prepared, context=context)
+                raw_observation, error = (
+                    (cached, None) if cached is not None else self._execute(prepared)
+                )
+                self._update_cache(prepared, raw_observation, error, hit=cached is not None)
+            self._note_executed(prepared, context=context)
+            return self._complete(
+                prepared, raw_observation, error, context=context, cached=cached is not None
+            )
+
+    def invoke_parallel(
+        self,
+        calls: Sequence[tuple[Tool, str, Any]],
+        *,
+        context: RunContext,
+    ) -> list[ToolInvocation]:
+        """并发执行一批互不依赖的只读调用，结果按 ``calls`` 的顺序返回。
+
+        调用方负责保证批内都是 ``PARALLEL_SAFE_ACTIONS``：这里不做写前备份之外的
+        任何串行化，两个会写同一文件的调用放进来会互相踩踏。
+        """
+        with use_workspace(self.workspace):
+            prepared_calls: list[_PreparedCall | ToolInvocation] = [
+                self._prepare(tool, action=action, action_input=action_input, context=context)
+                for tool, action, action_input in calls
+            ]
+            with context.step_timer.phase("tool_execution"):
+                outcomes, hits = self._run_batch(prepared_calls, context=context)
+
+            results: list[ToolInvocation] = []
+            for index, item in enumerate(prepared_calls):
+                if isinstance(item, ToolInvocation):
+                    results.append(item)
+                    continue
+                raw_observation, error = outcomes[index]
+                self._update_cache(item, raw_observation, error, hit=index in hits)
+                self._note_executed(item, context=context)
+                results.append(
+                    self._complete(
+                        item, raw_observation, error, context=context, cached=index in hits
+                    )
+                )
+            return results
+
+    def _run_batch(
+        self,
+        prepared_calls: Sequence[_PreparedCall | ToolInvocation],
+        *,
+        context: RunContext,
+    ) -> tuple[dict[int, tuple[str, Exception | None]], set[int]]:
+        """查缓存，把未命中的 runner 放上线程池；返回按下标的结果与命中下标。"""
+        outcomes: dict[int, tuple[str, Exception | None]] = {}
+        hits: set[int] = set()
+        runnable: list[tuple[int, _PreparedCall]] = []
+        for index, prepared in enumerate(prepared_calls):
+            if not isinstance(prepared, _PreparedCall):
+                continue
+            cached = self._lookup_cache(prepared, context=context)
+            if cached is None:
+                runnable.append((index, prepared))
+            else:
+                outcomes[index] = (cached, None)
+                hits.add(index)
+        if len(runnable) == 1:
+            index, prepared = runnable[0]
+            outcomes[index] = self._execute(prepared)
+        elif runnable:
+            workers = min(self.max_workers, len(runnable))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dm-tool") as pool:
+                # 工作线程不继承 ContextVar，工作区要在线程里重新绑定。
+                futures = {
+                    index: pool.submit(self._execute_in_workspace, prepared)
+                    for index, prepared in runnable
+                }
+                outcomes.update({index: future.result() for index, future in futures.items()})
+        return outcomes, hits
+
+    def _prepare(
+        self,
+        tool: Tool,
+        *,
+        action: str,
+        action_input: Any,
+        context: RunContext,
+    ) -> _PreparedCall | ToolInvocation:
+        """校验 → 前置钩子 → 写前备份；提前结束时直接返回 ``ToolInvocation``。"""
         metadata = context.metadata
         if action == "task_complete":
             action_input = coerce_task_complete_arguments(action_input)
@@ -114,7 +253,8 @@ class ToolInvoker:
             metadata=metadata,
             content_anchor_safe=(action == "edit_file" and tool.runner is builtin_edit_file),
         )
-        block = self.event_bus.emit_before_tool_call(before_event, on_error=self.on_error)
+        with context.step_timer.phase("hooks"):
+            block = self.event_bus.emit_before_tool_call(before_event, on_error=self.on_error)
         action_input = before_event.arguments
         if block is not None:
             # 被拦下的调用不计入计划完成，也不备份。
@@ -130,29 +270,99 @@ class ToolInvoker:
             and is_identity_content_edit(action_input)
         )
         if action in WRITE_ACTIONS and not identity_edit_noop:
-            self.persistence.backup_before_write(action_input, context)
+            with context.step_timer.phase("backup"):
+                self.persistence.backup_before_write(action_input, context)
+        return _PreparedCall(
+            tool=tool,
+            action=action,
+            arguments=action_input,
+            identity_edit_noop=identity_edit_noop,
+            cache_key=(
+                self.cache.key_for(tool, action, action_input) if self.cache is not None else None
+            ),
+        )
 
-        error_kind = ""
-        tool_succeeded = False
+    def _lookup_cache(self, prepared: _PreparedCall, *, context: RunContext) -> str | None:
+        """在调用线程里查缓存并计数；不可缓存的调用直接返回 None。"""
+        if self.cache is None or prepared.cache_key is None:
+            return None
+        cached = self.cache.get(prepared.cache_key[0])
+        counter = "tool_cache_hits" if cached is not None else "tool_cache_misses"
+        context.metadata[counter] += 1
+        return cached
+
+    def _update_cache(
+        self,
+        prepared: _PreparedCall,
+        raw_observation: str,
+        error: Exception | None,
+        *,
+        hit: bool,
+    ) -> None:
+        """未命中且执行成功的可缓存调用，把原始观察记进缓存。"""
+        if self.cache is None or prepared.cache_key is None or hit or error is not None:
+            return
+        key, target = prepared.cache_key
+        self.cache.put(key, target, raw_observation)
+
+    def _note_executed(self, prepared: _PreparedCall, *, context: RunContext) -> None:
+        """runner 跑过之后，按动作可能造成的改动作废缓存条目。"""
+        if self.cache is None:
+            return
+        dropped = self.cache.note_action(prepared.action, prepared.arguments)
+        context.metadata["tool_cache_invalidations"] += dropped
+
+    def _execute_in_workspace(self, prepared: _PreparedCall) -> tuple[str, Exception | None]:
+        """线程池入口：先绑定本智能体的工作区，再跑 runner。"""
+        with use_workspace(self.workspace):
+            return self._execute(prepared)
+
+    @staticmethod
+    def _execute(prepared: _PreparedCall) -> tuple[str, Exception | None]:
+        """只跑 runner。可能在工作线程里执行，因此不读写 metadata 与钩子。
+
+        runner 的墙钟耗时记在 ``prepared.seconds`` 上（每个调用只属于一个线程）。
+        """
+        started = time.perf_counter()
         try:
-            raw_observation = str(tool.execute(action_input))
+            return str(prepared.tool.execute(prepared.arguments)), None
         except Exception as exc:
+            return f"Tool execution failed: {exc}", exc
+        finally:
+            prepared.seconds = time.perf_counter() - started
+
+    def _complete(
+        self,
+        prepared: _PreparedCall,
+        raw_observation: str,
+        error: Exception | None,
+        *,
+        context: RunContext,
+        cached: bool = False,
+    ) -> ToolInvocation:
+        """计数 → 截断 → 后置钩子，产出最终写进 step、历史与 trace 的观察。"""
+        metadata = context.metadata
+        action = prepared.action
+        action_input = prepared.arguments
+        error_kind = ""
+        tool_succeeded = error is None
+        if error is not None:
             metadata["tool_error_count"] += 1
-            metadata["failure_reason"] = str(exc)
-            raw_observation = f"Tool execution failed: {exc}"
+            metadata["failure_reason"] = str(error)
             error_kind = "tool_error"
-        else:
-            tool_succeeded = True
 
-        bounded_observation = self.bounder.bound(
-            raw_observation,
-            action=action,
-            action_input=action_input,
-            context=context,
-        )
+        timer = context.step_timer
+        timer.add_tool(action, prepared.seconds, cached=cached)
+        with timer.phase("observation_bounding"):
+            bounded_observation = self.bounder.bound(
+                raw_observation,
+                action=action,
+                action_input=action_input,
+                context=context,
+            )
         confirmed_no_change = (
             tool_succeeded
-            and identity_edit_noop
+            and prepared.identity_edit_noop
             and not observation_reports_missing_path(bounded_observation)
         )
         after_event = AfterToolResultEvent(
@@ -166,11 +376,13 @@ class ToolInvoker:
             no_change_reason="identical_content" if confirmed_no_change else "",
             metadata=metadata,
         )
-        observation = self.event_bus.emit_after_tool_result(after_event, on_error=self.on_error)
+        with timer.phase("hooks"):
+            observation = self.event_bus.emit_after_tool_result(after_event, on_error=self.on_error)
         return ToolInvocation(
             arguments=action_input,
             observation=observation,
             error_kind=error_kind,
             tool_succeeded=tool_succeeded,
             no_change=after_event.no_change,
+            cached=cached,
         )
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import tempfile
 from collections.abc import Iterable, Sequence
@@ -11,9 +12,10 @@ from io import StringIO
 from pathlib import Path
 from typing import Any
 
+from dm_agent.clients.base_client import normalize_usage, publish_usage
 from dm_agent.clients.llm_factory import PROVIDER_DEFAULTS, create_llm_client
 from dm_agent.core import ReactAgent
-from dm_agent.memory.context_budget import estimate_tokens_from_chars
+from dm_agent.memory.context_budget import Tokenizer, estimate_tokens_from_chars, tokenizer_for
 from dm_agent.skills import SkillManager
 from dm_agent.tools import default_tools
 
@@ -22,7 +24,6 @@ from .runner import (
     EvalVariant,
     _validate,
     _write_setup_files,
-    chdir,
     summarize_results,
 )
 
@@ -63,16 +64,36 @@ class UsageTotals:
     prompt_tokens: int = 0
     completion_tokens: int = 0
     total_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    # 没有真实用量时 estimated_tokens 的来源：tokenizer 名字，默认 chars/4 启发式。
+    tokenizer: str = "heuristic"
+    tokenizer_tokens: int = 0
+
+    @property
+    def token_source(self) -> str:
+        """estimated_tokens 来自哪里：供应商返回的真实用量，或本地 tokenizer 的名字。"""
+        return "provider_usage" if self.total_tokens else self.tokenizer
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """前缀缓存命中的输入 token 占比；没有真实用量时为 0。"""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
 
 
 class UsageTrackingClient:
-    """Wrap a provider client and collect usage without changing agent code."""
+    """Wrap a provider client and collect usage without changing agent code.
+
+    ``tokenizer`` (usually ``tokenizer_for(provider, model)``) counts each message
+    when the provider reports no usage; without one the estimate stays chars / 4.
+    """
 
-    def __init__(self, client: Any) -> None:
+    def __init__(self, client: Any, *, tokenizer: Tokenizer | None = None) -> None:
         self.client = client
         self.model = client.model
         self.base_url = client.base_url
         self.timeout = client.timeout
+        self.tokenizer = tokenizer
         self.usage = UsageTotals()
 
     def complete(self, messages: list[dict[str, str]], **extra: Any) -> dict[str, Any]:
@@ -85,25 +106,75 @@ class UsageTrackingClient:
         return self.client.extract_text(data)
 
     def respond(self, messages: list[dict[str, str]], **extra: Any) -> str:
+        self._count_request(messages)
+        data = self.complete(messages, **extra)
+        return self._record_response(data)
+
+    async def arespond(self, messages: list[dict[str, str]], **extra: Any) -> str:
+        """Async twin of ``respond``; usage accounting is identical."""
+        self._count_request(messages)
+        acomplete = getattr(self.client, "acomplete_with_retry", None)
+        if acomplete is None:
+            data = await asyncio.to_thread(self.complete, messages, **extra)
+        else:
+            data = await acomplete(messages, **extra)
+        return self._record_response(data)
+
+    async def aclose(self) -> None:
+        aclose = getattr(self.client, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def _count_request(self, messages: list[dict[str, str]]) -> None:
         self.usage.request_count += 1
         self.usage.prompt_chars += sum(len(message.get("content", "")) for message in messages)
-
-        data = self.complete(messages, **extra)
+        if self.tokenizer is not None:
+            # 名字在首次计数时才取：LazyTokenizer 这时才加载编码，构造客户端不等下载。
+            self.usage.tokenizer = self.tokenizer.name
+            # 每步都重发整段历史；CachedTokenizer 按内容哈希记住计数，旧消息不重复分词。
+            count = self.tokenizer.count
+            self.usage.tokenizer_tokens += sum(
+                count(str(message.get("content", ""))) for message in messages
+            )
+
+    def _record_response(self, data: dict[str, Any]) -> str:
         text = self.extract_text(data)
 
         self.usage.completion_chars += len(text)
-        usage = data.get("usage") if isinstance(data, dict) else None
-        if isinstance(usage, dict):
-            self.usage.prompt_tokens += _int_value(usage.get("prompt_tokens"))
-            self.usage.completion_tokens += _int_value(usage.get("completion_tokens"))
-            self.usage.total_tokens += _int_value(usage.get("total_tokens"))
-
-        approx_tokens = estimate_tokens_from_chars(
-            self.usage.prompt_chars + self.usage.completion_chars
-        )
+        if self.tokenizer is not None:
+            self.usage.tokenizer_tokens += self.tokenizer.count(text)
+        usage = self._extract_usage(data)
+        # 包装层自己调的 complete，内层 respond 没机会发布用量，这里补上。
+        publish_usage(usage)
+        if usage:
+            self.usage.prompt_tokens += usage["prompt_tokens"]
+            self.usage.completion_tokens += usage["completion_tokens"]
+            self.usage.total_tokens += usage["total_tokens"]
+            self.usage.cached_tokens += usage["cached_tokens"]
+            self.usage.cache_write_tokens += usage["cache_write_tokens"]
+
+        if self.tokenizer is not None:
+            approx_tokens = self.usage.tokenizer_tokens
+        else:
+            approx_tokens = estimate_tokens_from_chars(
+                self.usage.prompt_chars + self.usage.completion_chars
+            )
         self.usage.estimated_tokens = self.usage.total_tokens or approx_tokens
         return text
 
+    def _extract_usage(self, data: dict[str, Any]) -> dict[str, int] | None:
+        extract_usage = getattr(self.client, "extract_usage", None)
+        if extract_usage is not None:
+            return extract_usage(data)
+        usage = data.get("usage") if isinstance(data, dict) else None
+        if not isinstance(usage, dict):
+            return None
+        return normalize_usage(
+            prompt_tokens=_int_value(usage.get("prompt_tokens")),
+            completion_tokens=_int_value(usage.get("completion_tokens")),
+            total_tokens=_int_value(usage.get("total_tokens")),
+        )
+
 
 def get_real_tasks() -> list[EvalTask]:
     """Return live-model tasks with explicit prompts and deterministic validators."""
@@ -307,25 +378,26 @@ def run_real_task(
             enable_planning=variant.enable_planning,
             enable_compression=variant.enable_compression,
             skill_manager=skill_manager,
+            workspace=workspace,
+            tokenizer=client.tokenizer,
         )
 
-        with chdir(workspace):
-            try:
-                if config.quiet:
-                    with redirect_stdout(StringIO()):
-                        raw_result = agent.run(task.prompt)
-                else:
+        try:
+            if config.quiet:
+                with redirect_stdout(StringIO()):
                     raw_result = agent.run(task.prompt)
-            except Exception as exc:
-                raw_result = {
-                    "final_answer": "",
-                    "steps": [],
-                    "metadata": {
-                        "status": "exception",
-                        "failure_reason": str(exc),
-                        "duration_seconds": 0.0,
-                    },
-                }
+            else:
+                raw_result = agent.run(task.prompt)
+        except Exception as exc:
+            raw_result = {
+                "final_answer": "",
+                "steps": [],
+                "metadata": {
+                    "status": "exception",
+                    "failure_reason": str(exc),
+                    "duration_seconds": 0.0,
+                },
+            }
 
         success, failure_reason = _validate(task, raw_result, workspace)
 
@@ -341,6 +413,9 @@ def run_real_task(
             "prompt_tokens": client.usage.prompt_tokens,
             "completion_tokens": client.usage.completion_tokens,
             "total_tokens": client.usage.total_tokens,
+            "cached_tokens": client.usage.cached_tokens,
+            "cache_write_tokens": client.usage.cache_write_tokens,
+            "token_source": client.usage.token_source,
             "repeat_index": repeat_index,
         }
     )
@@ -384,7 +459,7 @@ def _build_tracking_client(config: RealEvalConfig) -> UsageTrackingClient:
         base_url=config.base_url or defaults.get("base_url"),
         timeout=config.timeout,
     )
-    return UsageTrackingClient(client)
+    return UsageTrackingClient(client, tokenizer=tokenizer_for(provider, client.model))
 
 
 def _int_value(value: Any) -> int:
@@ -3,11 +3,10 @@
 from __future__ import annotations
 
 import json
-import os
 import statistics
 import tempfile
 from collections.abc import Iterable, Sequence
-from contextlib import contextmanager, redirect_stdout
+from contextlib import redirect_stdout
 from dataclasses import dataclass
 from io import StringIO
 from pathlib import Path
@@ -38,16 +37,6 @@ DEFAULT_VARIANTS: list[EvalVariant] = [
 ]
 
 
-@contextmanager
-def chdir(path: Path):
-    previous = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(previous)
-
-
 def run_suite(
     *,
     tasks: Sequence[EvalTask] | None = None,
@@ -107,23 +96,23 @@ def run_task(
             enable_planning=variant.enable_planning,
             enable_compression=variant.enable_compression,
             skill_manager=skill_manager,
+            workspace=workspace,
             **dict(task.agent_overrides),
         )
 
-        with chdir(workspace):
-            try:
-                with redirect_stdout(StringIO()):
-                    raw_result = agent.run(task.prompt)
-            except Exception as exc:
-                raw_result = {
-                    "final_answer": "",
-                    "steps": [],
-                    "metadata": {
-                        "status": "exception",
-                        "failure_reason": str(exc),
-                        "duration_seconds": 0.0,
-                    },
-                }
+        try:
+            with redirect_stdout(StringIO()):
+                raw_result = agent.run(task.prompt)
+        except Exception as exc:
+            raw_result = {
+                "final_answer": "",
+                "steps": [],
+                "metadata": {
+                    "status": "exception",
+                    "failure_reason": str(exc),
+                    "duration_seconds": 0.0,
+                },
+            }
 
         success, failure_reason = _validate(task, raw_result, workspace)
 
@@ -1,10 +1,16 @@
 """Memory and context management."""
 
+from .context_budget import Tokenizer, tokenizer_for
 from .context_compressor import ContextCompressor, Mem0StyleMemory, MemoryHit, MemoryItem
+from .sqlite_memory import SQLiteMemory, memory_namespace
 
 __all__ = [
     "ContextCompressor",
     "Mem0StyleMemory",
     "MemoryHit",
     "MemoryItem",
+    "SQLiteMemory",
+    "Tokenizer",
+    "memory_namespace",
+    "tokenizer_for",
 ]
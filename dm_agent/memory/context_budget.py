@@ -5,11 +5,18 @@ history. They are deliberately dependency-free and deterministic:
 
 - ``estimate_tokens`` uses the project-wide ``chars / 4`` heuristic (single
   source of truth; evals and benchmarks import it instead of re-deriving it).
+- ``Tokenizer`` implementations count more accurately where it matters:
+  ``tokenizer_for(provider, model)`` returns tiktoken for OpenAI when it is
+  installed, otherwise a script-aware ratio per provider (CJK text costs far more
+  tokens per character than ``chars / 4`` assumes), memoized per content hash by
+  ``CachedTokenizer``. Unknown providers keep the ``chars / 4`` heuristic.
 - ``truncate_observation`` bounds one tool observation while keeping the head
   (imports, signatures) and tail (tracebacks live at the end) and inserting an
   explicit marker that tells the model how to page through the omitted range.
 - ``FileLedger`` records which files were read/written at which step so the
   agent can require a fresh read before ``edit_file`` operates on line numbers.
+- ``HistoryTokenLedger`` keeps per-message token estimates and running totals
+  for an append-mostly history, so per-step budget checks cost O(new messages).
 
 Wording constraint: marker and guard texts produced here must never contain
 failure markers ("error", "failed", "失败", "错误", "不存在", ...) because
@@ -19,11 +26,25 @@ would otherwise misclassify a healthy observation as a failure.
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import json
+import math
 import os
-from collections.abc import Iterable
+import re
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Protocol
+
+from dm_agent.tools.base import resolve_path
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
 
 # Keep at least this many head characters when the cap allows it, so that
 # failure-signature prefixes (observation[:160]) and file headers stay intact.
@@ -35,6 +56,23 @@ _HEAD_SHARE = 0.6
 # Suggested page size (in lines) for read_file continuation hints.
 _PAGE_LINES = 200
 
+# Distinct texts whose token counts ``CachedTokenizer`` remembers.
+TOKEN_CACHE_SIZE = 4096
+
+# (characters per token for other text, tokens per CJK character) by provider.
+# DeepSeek documents 0.3 tokens per English and 0.6 per Chinese character; the
+# others are approximations of their published guidance, used only when the
+# exact tokenizer is not available offline.
+PROVIDER_TOKEN_RATIOS: dict[str, tuple[float, float]] = {
+    "deepseek": (1 / 0.3, 0.6),
+    "openai": (4.0, 1.0),
+    "claude": (3.5, 1.2),
+    "gemini": (4.0, 1.0),
+}
+
+# CJK punctuation, kana, ideographs (incl. extension A), Hangul and full-width forms.
+_CJK_PATTERN = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
 
 def estimate_tokens_from_chars(char_count: int) -> int:
     """Project-wide chars->tokens heuristic (~4 chars per token)."""
@@ -45,9 +83,251 @@ def estimate_tokens(text: str) -> int:
     return estimate_tokens_from_chars(len(str(text or "")))
 
 
-def estimate_messages_tokens(messages: Iterable[dict[str, Any]]) -> int:
+def estimate_messages_tokens(
+    messages: Iterable[dict[str, Any]], *, tokenizer: Tokenizer | None = None
+) -> int:
     """Estimate the token footprint of a message list (content only)."""
-    return sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+    count = tokenizer.count if tokenizer is not None else estimate_tokens
+    return sum(count(str(message.get("content", ""))) for message in messages)
+
+
+class Tokenizer(Protocol):
+    """Counts the tokens of one piece of text; ``name`` is recorded in traces and reports."""
+
+    @property
+    def name(self) -> str: ...
+
+    def count(self, text: str) -> int: ...
+
+
+class HeuristicTokenizer:
+    """The project-wide ``chars / 4`` heuristic."""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        return estimate_tokens(text)
+
+
+class ScriptAwareTokenizer:
+    """Offline estimate that prices CJK characters separately from other text."""
+
+    def __init__(self, name: str, *, chars_per_token: float, tokens_per_cjk_char: float) -> None:
+        self.name = name
+        self.chars_per_token = chars_per_token
+        self.tokens_per_cjk_char = tokens_per_cjk_char
+
+    def count(self, text: str) -> int:
+        text = str(text or "")
+        if not text:
+            return 0
+        cjk = len(_CJK_PATTERN.findall(text))
+        other = len(text) - cjk
+        return math.ceil(other / self.chars_per_token + cjk * self.tokens_per_cjk_char)
+
+
+class TiktokenTokenizer:
+    """Exact counts with a tiktoken encoding.
+
+    Raises:
+        ImportError: tiktoken is not installed
+    """
+
+    def __init__(self, encoding: Any) -> None:
+        if not TIKTOKEN_AVAILABLE:
+            raise ImportError("tiktoken is not installed: pip install 'dm-code-agent[tokenizers]'")
+        self.encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        # Special-token text in observations is content, not control tokens.
+        return len(self.encoding.encode(str(text or ""), disallowed_special=()))
+
+
+class CachedTokenizer:
+    """Memoizes another tokenizer by content hash, so recounting a message is free.
+
+    The key is a 128-bit BLAKE2 digest rather than the text itself, so the cache
+    does not keep large observations alive.
+    """
+
+    def __init__(self, inner: Tokenizer, *, max_entries: int | None = None) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.max_entries = TOKEN_CACHE_SIZE if max_entries is None else max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+
+    def count(self, text: str) -> int:
+        data = str(text or "").encode("utf-8")
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        cached = self._counts.get(key)
+        if cached is not None:
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        count = self.inner.count(text)
+        self._counts[key] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
+
+
+class LazyTokenizer:
+    """Builds the wrapped tokenizer on first use rather than at construction.
+
+    Loading can be slow (tiktoken downloads its encoding the first time), so agents
+    and eval clients built with ``tokenizer_for`` never wait on it until they count.
+    """
+
+    def __init__(self, factory: Callable[[], Tokenizer]) -> None:
+        self._factory = factory
+        self._inner: Tokenizer | None = None
+
+    @property
+    def inner(self) -> Tokenizer:
+        if self._inner is None:
+            self._inner = self._factory()
+        return self._inner
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    def count(self, text: str) -> int:
+        return self.inner.count(text)
+
+
+def tokenizer_for(provider: str, model: str = "") -> Tokenizer:
+    """The most accurate tokenizer available offline for ``provider`` / ``model``.
+
+    OpenAI uses tiktoken when it is installed and its encoding can be loaded
+    (tiktoken downloads encodings on first use, so the encoding is resolved lazily, on
+    the first count); every other case falls back to the provider's
+    ``PROVIDER_TOKEN_RATIOS`` entry, and unknown providers (scripted evals, fakes) to
+    the ``chars / 4`` heuristic.
+    """
+    provider = str(provider or "").casefold()
+    if provider == "openai" and TIKTOKEN_AVAILABLE:
+        return LazyTokenizer(functools.partial(_openai_tokenizer, str(model or "")))
+    return _ratio_tokenizer(provider)
+
+
+def _openai_tokenizer(model: str) -> Tokenizer:
+    encoding = _tiktoken_encoding(model)
+    if encoding is None:
+        return _ratio_tokenizer("openai")
+    return CachedTokenizer(TiktokenTokenizer(encoding))
+
+
+def _ratio_tokenizer(provider: str) -> Tokenizer:
+    ratios = PROVIDER_TOKEN_RATIOS.get(provider)
+    if ratios is None:
+        return HeuristicTokenizer()
+    chars_per_token, tokens_per_cjk_char = ratios
+    return CachedTokenizer(
+        ScriptAwareTokenizer(
+            f"{provider}-ratio",
+            chars_per_token=chars_per_token,
+            tokens_per_cjk_char=tokens_per_cjk_char,
+        )
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _tiktoken_encoding(model: str) -> Any:
+    # 失败也缓存：离线时每次都去下载编码文件，会让每个 benchmark 任务都卡在网络重试上。
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+class HistoryTokenLedger:
+    """Running token accounting for an append-mostly conversation history.
+
+    ``sync`` is called once per request: messages appended since the last call
+    are estimated and added to the running totals; anything else (a shorter
+    list, a different list object, a replaced tail message) triggers a full
+    rebuild. In-place edits of an already counted message are invisible to the
+    identity check, so callers that rewrite a message must call ``replace``.
+    Cumulative sums make the token count of any contiguous index range O(1).
+    Counts come from ``tokenizer`` (the ``chars / 4`` heuristic by default).
+    """
+
+    def __init__(self, tokenizer: Tokenizer | None = None) -> None:
+        self.tokenizer: Tokenizer = tokenizer if tokenizer is not None else HeuristicTokenizer()
+        self._tokens: list[int] = []
+        self._cumulative: list[int] = [0]
+        self._last_message: dict[str, Any] | None = None
+        self.user_messages = 0
+        self.system_messages = 0
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    @property
+    def total_tokens(self) -> int:
+        return self._cumulative[-1]
+
+    @property
+    def non_system_messages(self) -> int:
+        return len(self._tokens) - self.system_messages
+
+    def count_text(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def reset(self) -> None:
+        self._tokens.clear()
+        self._cumulative[:] = [0]
+        self._last_message = None
+        self.user_messages = 0
+        self.system_messages = 0
+
+    def sync(self, history: list[dict[str, Any]]) -> None:
+        """Account for messages appended since the last ``sync``."""
+        counted = len(self._tokens)
+        if len(history) < counted or (counted and history[counted - 1] is not self._last_message):
+            self.reset()
+            counted = 0
+        for message in history[counted:]:
+            self._append(message)
+        if history:
+            self._last_message = history[-1]
+
+    def replace(self, index: int, message: dict[str, Any]) -> None:
+        """Re-estimate one message that was rewritten in place."""
+        if not 0 <= index < len(self._tokens):
+            return
+        delta = self.tokenizer.count(str(message.get("content", ""))) - self._tokens[index]
+        self._tokens[index] += delta
+        for position in range(index + 1, len(self._cumulative)):
+            self._cumulative[position] += delta
+
+    def tokens_for(self, indexes: Iterable[int]) -> int:
+        """Token total of the given message indexes (O(1) for a contiguous range)."""
+        ordered = sorted(set(indexes))
+        if not ordered:
+            return 0
+        first, last = ordered[0], ordered[-1]
+        if last - first + 1 == len(ordered) and first >= 0 and last < len(self._tokens):
+            return self._cumulative[last + 1] - self._cumulative[first]
+        return sum(self._tokens[index] for index in ordered if 0 <= index < len(self._tokens))
+
+    def _append(self, message: dict[str, Any]) -> None:
+        tokens = self.tokenizer.count(str(message.get("content", "")))
+        self._tokens.append(tokens)
+        self._cumulative.append(self._cumulative[-1] + tokens)
+        role = message.get("role")
+        if role == "user":
+            self.user_messages += 1
+        elif role == "system":
+            self.system_messages += 1
 
 
 @dataclass(frozen=True)
@@ -138,7 +418,9 @@ def truncate_observation(
 
 
 def _normalize_path(path: str) -> str:
-    return os.path.normcase(os.path.abspath(str(path)))
+    # 相对路径按当前绑定的工作区解析（同 tool_cache._normalize_target）：runner 不再
+    # chdir，进程 CWD 不是工作区，``src/x.py`` 与 ``<workspace>/src/x.py`` 要落到同一个键。
+    return os.path.normcase(os.path.abspath(resolve_path(str(path))))
 
 
 class FileLedger:
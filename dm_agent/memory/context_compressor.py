@@ -9,14 +9,19 @@ keys or a hosted memory service.
 from __future__ import annotations
 
 import hashlib
+import heapq
 import re
-from collections.abc import Iterable, Mapping, Sequence
+import weakref
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Any
 
 from dm_agent.clients.base_client import BaseLLMClient
 
-from .context_budget import estimate_messages_tokens
+from .context_budget import HistoryTokenLedger, Tokenizer
+from .dense_index import DenseIndex
+from .inverted_index import InvertedIndex
 
 MEMORY_TYPES = {"episodic", "semantic", "procedural"}
 _TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[\u4e00-\u9fff]+")
@@ -36,6 +41,10 @@ _ERROR_MARKERS = (
     "异常",
 )
 _SUCCESS_MARKERS = ("success", "succeeded", "completed", "done", "完成", "成功")
+# 非词法项（文件重合 + importance + access_count + recency）加起来的上限，见 _blend_score。
+_NON_LEXICAL_CEILING = 0.3 + 0.15 + 5 * 0.02 + 0.05
+# 开启 dense 打分时，相关度 = (1 - w) * BM25 + w * 余弦；两者都在 [0, 1]，上面的上限照旧成立。
+DENSE_WEIGHT = 0.5
 
 
 @dataclass
@@ -58,6 +67,30 @@ class MemoryItem:
         self.access_count += 1
 
 
+class _JournalMark:
+    """``capture_rollback_state`` 的返回值：日志里的一个位置加上几个标量。"""
+
+    __slots__ = (
+        "__weakref__",
+        "max_items",
+        "next_order",
+        "position",
+        "serial",
+        "stale",
+        "superseded_count",
+    )
+
+    def __init__(
+        self, *, position: int, serial: int, max_items: int, superseded_count: int, next_order: int
+    ) -> None:
+        self.position = position
+        self.serial = serial
+        self.max_items = max_items
+        self.superseded_count = superseded_count
+        self.next_order = next_order
+        self.stale = False
+
+
 @dataclass(frozen=True)
 class MemoryHit:
     """A scored memory search result."""
@@ -73,14 +106,40 @@ class Mem0StyleMemory:
     Instead of summarizing all old messages into one fragile paragraph, the store
     turns old context into atomic memories, deduplicates them, reinforces repeated
     facts, and searches by query plus optional scope filters.
+
+    Search goes through an inverted index kept in step with ``_items`` (see
+    ``_index_item`` / ``_drop_item``), so a query costs the postings of its own
+    tokens rather than a pass over every stored memory.
+
+    With ``dense=True`` (requires NumPy) relevance also blends in the cosine
+    similarity of feature-hashed vectors (see ``dense_index``), so paraphrases and
+    differently spelled identifiers are recalled even without a shared token.
+
+    Rollback (``capture_rollback_state`` / ``restore_rollback_state``) is journaled:
+    while a mark is alive every mutation records how to undo itself, so taking a
+    mark is O(1) and rolling back costs the changes made since, not the store size.
     """
 
-    def __init__(self, *, max_items: int = 80) -> None:
+    def __init__(self, *, max_items: int = 80, dense: bool = False) -> None:
         if max_items < 1:
             raise ValueError("max_items must be at least 1")
         self.max_items = max_items
         self.superseded_count = 0
         self._items: dict[str, MemoryItem] = {}
+        self._index = InvertedIndex()
+        self._dense = DenseIndex() if dense else None
+        # 插入序号：同分时按先写入者优先，与按 dict 顺序稳定排序的旧行为一致。
+        self._order: dict[str, int] = {}
+        self._next_order = 0
+        # 撤销日志：只在还有活着的 mark 时记录；_journal_base 让 mark 的位置跨截断保持单调。
+        self._journal: list[tuple[Any, ...]] = []
+        self._journal_base = 0
+        self._marks: weakref.WeakSet[_JournalMark] = weakref.WeakSet()
+        self._mark_serial = 0
+        # 最近一个 mark 之后已记下原字段值的条目：同一条目只需记一次（写时复制）。
+        self._touched: set[str] = set()
+        # 为真时 capture_rollback_state 返回 to_dict 副本而不是 mark，见 durable_rollback。
+        self._durable_capture = False
 
     def __len__(self) -> int:
         return len(self._items)
@@ -89,25 +148,113 @@ class Mem0StyleMemory:
     def items(self) -> list[MemoryItem]:
         return list(self._items.values())
 
+    @property
+    def dense(self) -> bool:
+        return self._dense is not None
+
     def clear(self) -> None:
-        self._items.clear()
+        self._reset_containers()
         self.superseded_count = 0
 
     def capture_rollback_state(self) -> Any:
-        """捕获候选折叠回滚所需的纯内存状态。
+        """捕获候选折叠回滚所需的纯内存状态：O(1) 的撤销日志 mark。
+
+        mark 只覆盖本类自己的记忆内容，不复制子类 ``__dict__``，因此不会碰锁、网络
+        client、共享 backend 等不应复制的协作者。子类若在候选折叠期间还会改写自己的
+        可变字段，应覆盖本方法与 ``restore_rollback_state``，并把 ``super()`` 返回的
+        基础状态一并保存。条目字段只有经由本类方法修改时才会被记录。
 
-        默认实现只保存本类可序列化的记忆内容，不复制子类 ``__dict__``，因此不会碰
-        锁、网络 client、共享 backend 等不应复制的协作者。子类若在候选折叠期间还会
-        改写自己的可变字段，应覆盖本方法与 ``restore_rollback_state``，并把
-        ``super()`` 返回的基础状态一并保存。
+        处于 ``durable_rollback`` 内时改为返回 ``to_dict`` 副本：O(条目数)，但不会让撤销
+        日志在持有期间持续增长。
         """
-        return self.to_dict()
+        if self._durable_capture:
+            return self.to_dict()
+        if not self._marks:
+            # 写入若都发生在 mark 存活期间，_journaling 等不到截断的时机，在这里补上。
+            self._trim_journal()
+        self._mark_serial += 1
+        mark = _JournalMark(
+            position=self._journal_base + len(self._journal),
+            serial=self._mark_serial,
+            max_items=self.max_items,
+            superseded_count=self.superseded_count,
+            next_order=self._next_order,
+        )
+        self._marks.add(mark)
+        self._touched.clear()
+        return mark
+
+    @contextmanager
+    def durable_rollback(self) -> Iterator[None]:
+        """让其间的 ``capture_rollback_state`` 产出 ``to_dict`` 副本，供长期持有的快照使用。
+
+        mark 只适合短命的候选回滚：只要它还活着，之后每次写入都要进撤销日志。跨越整个
+        run 的快照若持有 mark，日志会随步数无界增长。子类覆盖的
+        ``capture_rollback_state`` 仍会被调用，只是 ``super()`` 返回的基础状态换成了副本。
+        """
+        previous = self._durable_capture
+        self._durable_capture = True
+        try:
+            yield
+        finally:
+            self._durable_capture = previous
 
     def restore_rollback_state(self, state: Any) -> None:
-        """在当前实例上恢复 ``capture_rollback_state`` 产出的状态。"""
-        if not isinstance(state, Mapping):
-            raise TypeError("memory rollback state must be a mapping")
-        self.restore_from_dict(dict(state))
+        """在当前实例上恢复 ``capture_rollback_state`` 产出的状态。
+
+        与数据库的 savepoint 一样，回滚到某个 mark 会作废它之后取的 mark；``to_dict``
+        产出的映射也照旧接受。
+
+        Raises:
+            ValueError: mark 已作废或不属于本实例
+        """
+        if isinstance(state, Mapping):
+            self.restore_from_dict(dict(state))
+            return
+        if not isinstance(state, _JournalMark):
+            raise TypeError("memory rollback state must come from capture_rollback_state")
+        start = state.position - self._journal_base
+        if state.stale or state not in self._marks or not 0 <= start <= len(self._journal):
+            raise ValueError("memory rollback state is stale or belongs to another store")
+        reorder = False
+        while len(self._journal) > start:
+            entry = self._journal.pop()
+            kind = entry[0]
+            if kind == "insert":
+                self._remove_entry(entry[1])
+            elif kind == "drop":
+                _, dropped, order_number = entry
+                self._items[dropped.id] = dropped
+                self._order[dropped.id] = order_number
+                self._reindex(dropped)
+                reorder = True
+            elif kind == "fields":
+                _, touched, importance, last_accessed_turn, access_count, metadata = entry
+                reindex = touched.metadata != metadata
+                touched.importance = importance
+                touched.last_accessed_turn = last_accessed_turn
+                touched.access_count = access_count
+                touched.metadata = metadata
+                # 条目之后被换下（swap）或淘汰过时，索引由对应的撤销记录负责。
+                if reindex and touched.id in self._items and self._items[touched.id] is touched:
+                    self._reindex(touched)
+            else:
+                _, self._items, self._index, self._dense, self._order = entry
+        if reorder:
+            # 被淘汰的条目放回原位：_items 的顺序始终与插入序号一致。
+            # 只有少数条目错位，timsort 在近乎有序的输入上接近线性。
+            items = self._items
+            self._items = {
+                memory_id: items[memory_id]
+                for memory_id in sorted(items, key=self._order.__getitem__)
+            }
+        self.max_items = state.max_items
+        self.superseded_count = state.superseded_count
+        self._next_order = state.next_order
+        for mark in list(self._marks):
+            if mark.serial > state.serial:
+                mark.stale = True
+        self._touched.clear()
 
     def add(
         self,
@@ -130,11 +277,14 @@ class Mem0StyleMemory:
 
         existing = self._items.get(memory_id)
         if existing:
+            self._touch(existing)
             existing.metadata = _merge_metadata(existing.metadata, metadata)
             existing.reinforce(turn=turn)
+            # 合并进来的 files / tool 也参与检索。
+            self._index_item(existing)
             return memory_id
 
-        self._items[memory_id] = MemoryItem(
+        item = MemoryItem(
             id=memory_id,
             text=text,
             type=type,
@@ -144,6 +294,7 @@ class Mem0StyleMemory:
             created_at_turn=turn,
             last_accessed_turn=turn,
         )
+        self._insert_item(item)
         self._enforce_limit()
         return memory_id
 
@@ -191,7 +342,8 @@ class Mem0StyleMemory:
                 continue
             item_files = set(item.metadata.get("files") or [])
             if item_files & files:
-                item.metadata["superseded_at_turn"] = turn
+                self._touch(item)
+                item.metadata = {**item.metadata, "superseded_at_turn": turn}
                 item.importance = max(0.0, item.importance * 0.3)
                 superseded += 1
         self.superseded_count += superseded
@@ -209,40 +361,55 @@ class Mem0StyleMemory:
             return []
         query_tokens = set(_tokenize(query))
         query_files = set(_FILE_PATTERN.findall(query))
-        scoped_items = [
-            item for item in self._items.values() if _scope_matches(item.scope, scope or {})
-        ]
-        current_turn = (
-            turn
-            if turn is not None
-            else max((item.last_accessed_turn for item in scoped_items), default=0)
-        )
-        scored: list[tuple[MemoryItem, float]] = []
-        for item in scoped_items:
-            item_tokens = set(_tokenize(_memory_search_text(item)))
-            lexical = len(query_tokens & item_tokens) / max(len(query_tokens), 1)
-            file_bonus = _file_overlap_bonus(query_files, item)
-            has_query_signal = bool(query_tokens or query_files)
-            relevance = lexical + file_bonus
-            if has_query_signal and relevance <= 0:
-                continue
-            recency = 1.0 / (1.0 + max(current_turn - item.last_accessed_turn, 0))
-            score = (
-                relevance
-                + item.importance * 0.15
-                + min(item.access_count, 5) * 0.02
-                + recency * 0.05
+        requested = scope or {}
+        has_query_signal = bool(query_tokens or query_files)
+        if turn is not None:
+            current_turn = turn
+        else:
+            current_turn = max(
+                (
+                    item.last_accessed_turn
+                    for item in self._items.values()
+                    if _scope_matches(item.scope, requested)
+                ),
+                default=0,
             )
-            if item.metadata.get("superseded_at_turn") is not None:
-                score *= 0.25
-            scored.append((item, score))
-
-        if not scored and not (query_tokens or query_files):
-            scored = [(item, item.importance) for item in scoped_items]
+        order = self._order
+        # 小顶堆，键 (score, -插入序号)：同分时先写入的排前面。
+        best: list[tuple[tuple[float, int], MemoryItem, float]] = []
+
+        def offer(item: MemoryItem, score: float) -> None:
+            key = (score, -order[item.id])
+            if len(best) < limit:
+                heapq.heappush(best, (key, item, score))
+            elif key > best[0][0]:
+                heapq.heapreplace(best, (key, item, score))
+
+        if has_query_signal:
+            # 查询里的文件名也会被切成 token，所以有文件重合的记忆一定在候选里。
+            relevance_scores = self._relevance_scores(query_tokens, limit=limit)
+            candidates = sorted(relevance_scores.items(), key=lambda pair: pair[1], reverse=True)
+            for memory_id, base_relevance in candidates:
+                # 相关度已经降序：剩下的候选加满非词法项也进不了前 limit 名。
+                if len(best) == limit and base_relevance + _NON_LEXICAL_CEILING < best[0][0][0]:
+                    break
+                item = self._items[memory_id]
+                if not _scope_matches(item.scope, requested):
+                    continue
+                relevance = base_relevance + _file_overlap_bonus(query_files, item)
+                offer(item, _blend_score(item, relevance, current_turn))
+        else:
+            for item in self._items.values():
+                if _scope_matches(item.scope, requested):
+                    offer(item, _blend_score(item, 0.0, current_turn))
 
-        ranked = sorted(scored, key=lambda pair: pair[1], reverse=True)[:limit]
+        ranked = [
+            (item, score)
+            for _, item, score in sorted(best, key=lambda entry: entry[0], reverse=True)
+        ]
         hits: list[MemoryHit] = []
         for rank, (item, score) in enumerate(ranked, start=1):
+            self._touch(item)
             item.reinforce(turn=current_turn)
             hits.append(MemoryHit(item=item, score=float(score), rank=rank))
         return hits
@@ -363,14 +530,104 @@ class Mem0StyleMemory:
         return memories
 
     def _enforce_limit(self) -> None:
-        if len(self._items) <= self.max_items:
+        excess = len(self._items) - self.max_items
+        if excess <= 0:
+            return
+        # 淘汰 (importance, access_count, last_accessed_turn) 最低的；同分时后写入的先走。
+        order = self._order
+
+        def keep_rank(item: MemoryItem) -> tuple[float, int, int, int]:
+            return (item.importance, item.access_count, item.last_accessed_turn, -order[item.id])
+
+        # 每次 add 最多超出一条：单次 min 比 nsmallest 便宜，淘汰仍是 O(n) 而不是排序。
+        evicted = (
+            [min(self._items.values(), key=keep_rank)]
+            if excess == 1
+            else heapq.nsmallest(excess, self._items.values(), key=keep_rank)
+        )
+        for item in evicted:
+            self._drop_item(item.id)
+
+    def _relevance_scores(self, query_tokens: set[str], *, limit: int) -> dict[str, float]:
+        lexical = self._index.scores(query_tokens, min_candidates=limit)
+        if self._dense is None:
+            return lexical
+        # 排序后再哈希累加：浮点和与 set 的迭代顺序（随 PYTHONHASHSEED 变）无关。
+        dense = self._dense.scores(sorted(query_tokens))
+        return {
+            memory_id: (1.0 - DENSE_WEIGHT) * lexical.get(memory_id, 0.0)
+            + DENSE_WEIGHT * dense.get(memory_id, 0.0)
+            for memory_id in lexical.keys() | dense.keys()
+        }
+
+    def _index_item(self, item: MemoryItem) -> None:
+        if item.id not in self._order:
+            self._order[item.id] = self._next_order
+            self._next_order += 1
+        self._reindex(item)
+
+    def _reindex(self, item: MemoryItem) -> None:
+        tokens = _tokenize(_memory_search_text(item))
+        self._index.add(item.id, tokens)
+        if self._dense is not None:
+            self._dense.add(item.id, tokens)
+
+    def _insert_item(self, item: MemoryItem) -> None:
+        if self._journaling():
+            self._journal.append(("insert", item.id))
+        self._items[item.id] = item
+        self._index_item(item)
+
+    def _drop_item(self, memory_id: str) -> None:
+        item = self._items.get(memory_id)
+        if item is not None and self._journaling():
+            self._journal.append(("drop", item, self._order[memory_id]))
+        self._remove_entry(memory_id)
+
+    def _remove_entry(self, memory_id: str) -> None:
+        self._items.pop(memory_id, None)
+        self._index.remove(memory_id)
+        if self._dense is not None:
+            self._dense.remove(memory_id)
+        self._order.pop(memory_id, None)
+
+    def _touch(self, item: MemoryItem) -> None:
+        """改条目字段前调用：记下它在最近一个 mark 时的取值。"""
+        if item.id in self._touched or not self._journaling():
             return
-        ranked = sorted(
-            self._items.values(),
-            key=lambda item: (item.importance, item.access_count, item.last_accessed_turn),
-            reverse=True,
+        self._touched.add(item.id)
+        self._journal.append(
+            (
+                "fields",
+                item,
+                item.importance,
+                item.last_accessed_turn,
+                item.access_count,
+                dict(item.metadata),
+            )
         )
-        self._items = {item.id: item for item in ranked[: self.max_items]}
+
+    def _reset_containers(self) -> None:
+        # 整体换新容器而不是原地清空：旧容器原样进日志，撤销时换回来，记录本身是 O(1)。
+        if self._journaling():
+            self._journal.append(("swap", self._items, self._index, self._dense, self._order))
+        self._items = {}
+        self._index = InvertedIndex()
+        self._dense = DenseIndex() if self._dense is not None else None
+        self._order = {}
+
+    def _journaling(self) -> bool:
+        if self._marks:
+            return True
+        # 没有人还拿着 mark：日志已经不可能被用到，顺手截掉。
+        self._trim_journal()
+        return False
+
+    def _trim_journal(self) -> None:
+        if self._journal:
+            self._journal_base += len(self._journal)
+            self._journal.clear()
+        self._touched.clear()
 
     @staticmethod
     def _fingerprint(*, text: str, type: str, scope: dict[str, str]) -> str:
@@ -408,7 +665,7 @@ class Mem0StyleMemory:
         """在当前实例上恢复内容，保留调用方注入的子类与对象身份。"""
         self.max_items = int(data.get("max_items", 80))
         self.superseded_count = int(data.get("superseded_count", 0))
-        self._items.clear()
+        self._reset_containers()
         for raw in data.get("items", []):
             item = MemoryItem(
                 id=str(raw.get("id", "")),
@@ -423,6 +680,7 @@ class Mem0StyleMemory:
             )
             if item.id:
                 self._items[item.id] = item
+                self._index_item(item)
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> Mem0StyleMemory:
@@ -514,6 +772,16 @@ def apply_compaction(history: list[dict[str, str]], compaction: Compaction) -> l
     return system_messages + memory_messages + kept
 
 
+def estimate_compacted_tokens(compaction: Compaction, ledger: HistoryTokenLedger) -> int:
+    """``estimate_messages_tokens(apply_compaction(history, compaction))`` 的增量算法。
+
+    ``ledger`` 必须已与 ``history`` 同步：折叠区间的 token 从运行总量里减掉，再加上
+    摘要消息，不必重新扫描整份历史。
+    """
+    summary_tokens = ledger.count_text(compaction.summary) if compaction.summary else 0
+    return ledger.total_tokens - ledger.tokens_for(compaction.folded_indexes) + summary_tokens
+
+
 class ContextCompressor:
     """Compress conversation history via scoped atomic memories.
 
@@ -532,6 +800,7 @@ class ContextCompressor:
         memory_limit: int = 5,
         scope: dict[str, str] | None = None,
         token_budget: int = 24000,
+        tokenizer: Tokenizer | None = None,
     ) -> None:
         if compress_every < 1:
             raise ValueError("compress_every must be at least 1")
@@ -548,6 +817,8 @@ class ContextCompressor:
         # Estimated-token ceiling for the pending history; 0 disables the
         # size-based trigger and falls back to pure message-count cadence.
         self.token_budget = max(0, int(token_budget))
+        # None keeps the ``chars / 4`` heuristic; see ``tokenizer_for``.
+        self.tokenizer = tokenizer
         self.last_trigger: str = ""
         self.last_estimated_tokens: int = 0
         self.turn_count = 0
@@ -574,10 +845,19 @@ class ContextCompressor:
         """记住一次已通过 token 净收益检查的折叠，供后续请求粘性复用。"""
         self.last_beneficial_compaction = compaction
 
-    def snapshot_runtime_state(self) -> _CompressorRuntimeState:
-        """保存全部运行时状态，同时保留调用方注入的 memory 实例身份。"""
+    def snapshot_runtime_state(self, *, durable: bool = False) -> _CompressorRuntimeState:
+        """保存全部运行时状态，同时保留调用方注入的 memory 实例身份。
+
+        ``durable=True`` 用于会被长期持有的快照（如整个 run 的重试基线）：memory 状态取
+        ``to_dict`` 副本而不是撤销日志 mark，避免日志在持有期间无界增长。
+        """
+        if durable:
+            with self.memory.durable_rollback():
+                memory_state = self.memory.capture_rollback_state()
+        else:
+            memory_state = self.memory.capture_rollback_state()
         return _CompressorRuntimeState(
-            memory_state=self.memory.capture_rollback_state(),
+            memory_state=memory_state,
             turn_count=self.turn_count,
             compression_count=self._compression_count,
             last_compressed_turn_count=self._last_compressed_turn_count,
@@ -604,14 +884,31 @@ class ContextCompressor:
         """兼容候选折叠调用点：回滚未通过净收益检查的状态。"""
         self.restore_runtime_state(state)
 
-    def should_compress(self, history: list[dict[str, str]]) -> bool:
-        user_messages = [msg for msg in history if msg.get("role") == "user"]
-        self.turn_count = len(user_messages)
-        non_system_messages = [msg for msg in history if msg.get("role") != "system"]
-        has_old_messages = len(non_system_messages) > self.keep_recent * 2
+    def should_compress(
+        self,
+        history: list[dict[str, str]],
+        *,
+        ledger: HistoryTokenLedger | None = None,
+        window_tokens: int | None = None,
+        use_cadence: bool = True,
+    ) -> bool:
+        """判断这一轮是否该折叠。
+
+        传入已与 ``history`` 同步的 ``ledger`` 时，计数与 token 估算直接取运行总量，
+        不再逐条扫描历史。``window_tokens`` 给出时按「当前真正发出去的窗口」而不是
+        全量历史判断是否超预算；``use_cadence=False`` 关掉按消息节奏的触发。两者
+        都是缓存友好布局用的：只在窗口确实装不下时才改写前缀。
+        """
+        if ledger is None:
+            ledger = HistoryTokenLedger(self.tokenizer)
+            ledger.sync(history)
+        self.turn_count = ledger.user_messages
+        has_old_messages = ledger.non_system_messages > self.keep_recent * 2
         new_turns_since_last = self.turn_count - self._last_compressed_turn_count
-        cadence_reached = new_turns_since_last >= self.compress_every
-        self.last_estimated_tokens = estimate_messages_tokens(history)
+        cadence_reached = use_cadence and new_turns_since_last >= self.compress_every
+        self.last_estimated_tokens = (
+            ledger.total_tokens if window_tokens is None else max(0, int(window_tokens))
+        )
         over_budget = 0 < self.token_budget < self.last_estimated_tokens
         self.last_trigger = ""
         if has_old_messages and (cadence_reached or over_budget):
@@ -753,6 +1050,14 @@ def _memory_search_text(item: MemoryItem) -> str:
     return "\n".join(fields)
 
 
+def _blend_score(item: MemoryItem, relevance: float, current_turn: int) -> float:
+    recency = 1.0 / (1.0 + max(current_turn - item.last_accessed_turn, 0))
+    score = relevance + item.importance * 0.15 + min(item.access_count, 5) * 0.02 + recency * 0.05
+    if item.metadata.get("superseded_at_turn") is not None:
+        score *= 0.25
+    return score
+
+
 def _file_overlap_bonus(query_files: set[str], item: MemoryItem) -> float:
     item_files = set(item.metadata.get("files") or [])
     if not query_files or not item_files:
@@ -0,0 +1,146 @@
+"""Feature-hashed dense vectors for paraphrase-tolerant memory recall.
+
+BM25 over ``_tokenize`` only matches memories that share a whole token with the
+query, so "timeout in the http client" misses "HttpClient timed out" and the
+agent re-reads files it already summarized. ``DenseIndex`` maps each memory to a
+fixed-width vector of hashed features - the tokens themselves (which already
+include ``_split_camel_case`` subwords) plus their character n-grams - and keeps
+all vectors as rows of one contiguous, L2-normalized float32 matrix. A query is
+a single matrix-vector product, cosine similarity for every memory at once.
+
+Hashing is ``zlib.crc32`` rather than ``hash()`` so vectors are identical across
+processes (``PYTHONHASHSEED``), and nothing is downloaded or trained. NumPy is
+optional: check ``NUMPY_AVAILABLE`` before constructing the index.
+"""
+
+from __future__ import annotations
+
+import functools
+import zlib
+from collections.abc import Iterable
+from typing import Any
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Vector width; a power of two so the bucket is a mask of the hash.
+HASH_DIMENSIONS = 1024
+# Character n-gram sizes taken from each token (with ``#`` boundary markers).
+NGRAM_SIZES = (3, 4)
+# Whole tokens carry more signal than any single n-gram of them.
+TOKEN_WEIGHT = 2.0
+NGRAM_WEIGHT = 1.0
+# Cosine below this is noise from shared n-grams of unrelated text ("ing", "ion").
+MIN_SIMILARITY = 0.2
+# Rows allocated up front; the matrix doubles when full.
+INITIAL_CAPACITY = 64
+
+
+def hashed_features(tokens: Iterable[str]) -> dict[int, float]:
+    """Signed bucket weights for ``tokens`` (already lower-cased, as ``_tokenize`` returns)."""
+    weights: dict[int, float] = {}
+    for token in tokens:
+        for bucket, weight in _token_features(token):
+            weights[bucket] = weights.get(bucket, 0.0) + weight
+    return weights
+
+
+@functools.lru_cache(maxsize=65536)
+def _token_features(token: str) -> tuple[tuple[int, float], ...]:
+    # 记忆文本的词表高度重复（文件名、工具名、固定前缀），按 token 缓存省掉大部分 crc32。
+    mask = HASH_DIMENSIONS - 1
+    features = [("w:" + token, TOKEN_WEIGHT)]
+    padded = f"#{token}#"
+    for size in NGRAM_SIZES:
+        features.extend(
+            (padded[start : start + size], NGRAM_WEIGHT) for start in range(len(padded) - size + 1)
+        )
+    result = []
+    for feature, weight in features:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        # 取哈希的最高位作符号：碰撞到同一桶的特征期望上相互抵消，而不是一起抬高点积。
+        result.append((digest & mask, -weight if digest & 0x80000000 else weight))
+    return tuple(result)
+
+
+class DenseIndex:
+    """Row-per-document matrix of hashed feature vectors with batched cosine search.
+
+    Raises:
+        ImportError: NumPy is not installed
+    """
+
+    def __init__(self) -> None:
+        if not NUMPY_AVAILABLE:
+            raise ImportError(
+                "dense memory scoring requires numpy: pip install 'dm-code-agent[dense]'"
+            )
+        self._matrix: Any = np.zeros((INITIAL_CAPACITY, HASH_DIMENSIONS), dtype=np.float32)
+        self._rows: dict[str, int] = {}
+        self._ids: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._rows
+
+    def clear(self) -> None:
+        self._matrix = np.zeros((INITIAL_CAPACITY, HASH_DIMENSIONS), dtype=np.float32)
+        self._rows.clear()
+        self._ids.clear()
+
+    def add(self, doc_id: str, tokens: Iterable[str]) -> None:
+        """Store ``doc_id``'s vector, overwriting its row if it is already indexed."""
+        row = self._rows.get(doc_id)
+        if row is None:
+            row = len(self._ids)
+            if row == self._matrix.shape[0]:
+                grown = np.zeros((row * 2, HASH_DIMENSIONS), dtype=np.float32)
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self._rows[doc_id] = row
+            self._ids.append(doc_id)
+        self._matrix[row] = _vector(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        # 用最后一行填洞，矩阵保持连续，打分时不必跳过空行。
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._matrix[last] = 0.0
+        self._ids.pop()
+
+    def scores(self, query_tokens: Iterable[str]) -> dict[str, float]:
+        """Cosine similarity in [``MIN_SIMILARITY``, 1] of every document close enough to the query."""
+        count = len(self._ids)
+        if not count:
+            return {}
+        query = _vector(query_tokens)
+        if not query.any():
+            return {}
+        similarities = self._matrix[:count] @ query
+        rows = np.flatnonzero(similarities >= MIN_SIMILARITY)
+        ids = self._ids
+        return {ids[row]: float(similarities[row]) for row in rows.tolist()}
+
+
+def _vector(tokens: Iterable[str]) -> Any:
+    vector = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+    weights = hashed_features(tokens)
+    if weights:
+        vector[list(weights)] = list(weights.values())
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+    return vector
@@ -0,0 +1,127 @@
+"""Posting-list index with BM25 scoring for ``Mem0StyleMemory``.
+
+Searching used to re-tokenize every stored memory for every query and score by
+plain set overlap, so the cost of one ``render`` grew with the whole store. The
+index keeps each memory's term frequencies and a ``token -> {memory id: tf}``
+posting list, updated when a memory is added, re-indexed or evicted. A query
+then only touches the postings of its own tokens, and ranks with BM25 so rare
+tokens (file names, identifiers) outweigh common ones.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from collections.abc import Iterable
+
+# Standard Okapi BM25 parameters: term-frequency saturation and length normalization.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Below this many indexed memories every query token walks its full posting list.
+COMMON_TERM_MIN_DOCS = 512
+# Share of documents above which a token only re-scores candidates (see ``scores``).
+COMMON_TERM_RATIO = 0.5
+
+
+class InvertedIndex:
+    """Term postings and document lengths for incremental BM25 search."""
+
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[str, int]] = {}
+        self._lengths: dict[str, int] = {}
+        # Distinct tokens per document, so removal touches only its own postings.
+        self._terms: dict[str, tuple[str, ...]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._lengths
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._lengths.clear()
+        self._terms.clear()
+        self._total_length = 0
+
+    def add(self, doc_id: str, tokens: Iterable[str]) -> None:
+        """Index ``doc_id`` under ``tokens``, replacing any earlier entry for it."""
+        self.remove(doc_id)
+        counts = Counter(tokens)
+        length = sum(counts.values())
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[doc_id] = count
+        self._lengths[doc_id] = length
+        self._terms[doc_id] = tuple(counts)
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for token in self._terms.pop(doc_id, ()):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[token]
+
+    def scores(self, query_tokens: Iterable[str], *, min_candidates: int = 0) -> dict[str, float]:
+        """BM25 of every document sharing a token with the query, scaled into (0, 1].
+
+        The scale is the score a document would reach if every query token present in
+        the index saturated it, so values are comparable across queries and can be
+        blended with the memory's importance and recency terms.
+
+        Once the index holds ``COMMON_TERM_MIN_DOCS`` documents, tokens found in more
+        than ``COMMON_TERM_RATIO`` of them (``py``, the memory type, ...) only add to
+        documents that a rarer query token already matched; walking their postings
+        would visit nearly every memory for a near-zero idf. When the rarer tokens
+        match fewer than ``min_candidates`` documents (or there are none), the common
+        postings are walked in full after all.
+        """
+        count = len(self._lengths)
+        if not count:
+            return {}
+        average_length = self._total_length / count or 1.0
+        terms: list[tuple[float, dict[str, int]]] = []
+        common: list[tuple[float, dict[str, int]]] = []
+        ceiling = 0.0
+        for token in set(query_tokens):
+            posting = self._postings.get(token)
+            if not posting:
+                continue
+            frequency = len(posting)
+            idf = math.log(1.0 + (count - frequency + 0.5) / (frequency + 0.5))
+            ceiling += idf * (BM25_K1 + 1.0)
+            if count >= COMMON_TERM_MIN_DOCS and frequency > count * COMMON_TERM_RATIO:
+                common.append((idf, posting))
+            else:
+                terms.append((idf, posting))
+        if ceiling <= 0:
+            return {}
+        lengths = self._lengths
+        scale = BM25_K1 + 1.0
+        base = BM25_K1 * (1.0 - BM25_B)
+        slope = BM25_K1 * BM25_B / average_length
+        scores: dict[str, float] = {}
+        for idf, posting in terms:
+            for doc_id, tf in posting.items():
+                gain = idf * tf * scale / (tf + base + slope * lengths[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + gain
+        if len(scores) < max(min_candidates, 1):
+            for idf, posting in common:
+                for doc_id, tf in posting.items():
+                    gain = idf * tf * scale / (tf + base + slope * lengths[doc_id])
+                    scores[doc_id] = scores.get(doc_id, 0.0) + gain
+            common = []
+        for idf, posting in common:
+            for doc_id in scores:
+                term_count = posting.get(doc_id, 0)
+                if term_count:
+                    norm = term_count + base + slope * lengths[doc_id]
+                    scores[doc_id] += idf * term_count * scale / norm
+        return {doc_id: score / ceiling for doc_id, score in scores.items()}
@@ -0,0 +1,412 @@
+"""Cross-run memory persisted to a local SQLite database.
+
+``Mem0StyleMemory`` lives only in the process (and in run checkpoints), so every
+new ``dm-agent`` invocation on the same repository starts cold. ``SQLiteMemory``
+keeps the same in-process store and search, and additionally:
+
+- writes new, merged, reinforced and superseded memories to a ``memories`` table
+  in batches of ``flush_every`` (and on ``flush``), so the hot path does not pay
+  one transaction per memory;
+- before each search, recalls the stored memories that match the query through
+  an FTS5 index (or, where SQLite lacks FTS5, the most important ones) into the
+  in-process store, so they compete with this run's memories as usual;
+- keeps at most ``max_stored`` rows per namespace, evicting the lowest
+  ``(importance, access_count, updated_at)`` first.
+
+Rows are partitioned by ``namespace`` (see ``memory_namespace``: agent id plus
+repository root), so unrelated projects sharing one database never see each
+other's memories.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from .context_compressor import (
+    Mem0StyleMemory,
+    MemoryHit,
+    MemoryItem,
+    _memory_search_text,
+    _tokenize,
+)
+
+# 库结构版本，存在 PRAGMA user_version；不一致时整库重建（记忆只是缓存，可以丢）。
+MEMORY_DB_SCHEMA_VERSION = 1
+# 累计多少条改动写一次库。
+DEFAULT_FLUSH_EVERY = 16
+# 每个 namespace 最多保留的行数。
+DEFAULT_MAX_STORED = 2000
+# 单次检索最多带多少个查询 token 进 FTS 的 MATCH 表达式。
+MAX_RECALL_TERMS = 64
+
+
+def _fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return True
+
+
+FTS5_AVAILABLE = _fts5_available()
+
+
+def memory_namespace(
+    workspace: str | Path | None = None, *, agent_id: str = "dm-code-agent"
+) -> str:
+    """``<agent_id>@<repository root>``：仓库根取最近的含 ``.git`` 的上级目录，没有则取工作区本身。"""
+    root = Path(workspace if workspace is not None else os.getcwd()).resolve()
+    for candidate in (root, *root.parents):
+        if (candidate / ".git").exists():
+            root = candidate
+            break
+    return f"{agent_id}@{os.path.normcase(str(root))}"
+
+
+class SQLiteMemory(Mem0StyleMemory):
+    """``Mem0StyleMemory`` backed by a SQLite database shared across runs.
+
+    Args:
+        path: database file; parent directories are created on demand
+        namespace: partition key for the rows (see ``memory_namespace``)
+        max_items: in-process capacity, as for ``Mem0StyleMemory``
+        flush_every: number of pending changes that triggers a write
+        max_stored: rows kept per namespace after each write
+        dense: blend in hashed-vector similarity, as for ``Mem0StyleMemory``
+
+    Database errors never fail a run: they are reported once per operation and the
+    store keeps working in-process.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        namespace: str = "default",
+        max_items: int = 80,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+        max_stored: int = DEFAULT_MAX_STORED,
+        dense: bool = False,
+    ) -> None:
+        super().__init__(max_items=max_items, dense=dense)
+        self.path = Path(path)
+        self.namespace = namespace
+        self.flush_every = max(1, int(flush_every))
+        self.max_stored = max(1, int(max_stored))
+        self.recalled_count = 0
+        # 待写的记忆 id；被挤出进程内存储的待写条目先搬到 _evicted 里，等下次 flush。
+        self._dirty: set[str] = set()
+        self._evicted: dict[str, MemoryItem] = {}
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        try:
+            self._conn = self._open()
+        except (OSError, sqlite3.Error) as exc:
+            print(f"[memory-db] 打开 {self.path} 失败，本次记忆不落盘：{exc}")
+
+    @property
+    def persistent(self) -> bool:
+        return self._conn is not None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._dirty) + len(self._evicted)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def clear(self) -> None:
+        # 清空的是本次对话的进程内记忆；已积累的跨 run 记忆先落盘，不跟着丢。
+        self.flush()
+        super().clear()
+        self._dirty.clear()
+
+    def capture_rollback_state(self) -> Any:
+        return {
+            "base": super().capture_rollback_state(),
+            "dirty": set(self._dirty),
+            "evicted": dict(self._evicted),
+        }
+
+    def restore_rollback_state(self, state: Any) -> None:
+        if not isinstance(state, dict) or "base" not in state:
+            raise TypeError("SQLiteMemory rollback state must come from capture_rollback_state")
+        super().restore_rollback_state(state["base"])
+        # 回滚期间若已经 flush 过，被撤销的记忆会留在库里：它们都抽取自真实发生过的
+        # 消息，下次检索照常参与排序，不影响本次 run 的上下文。
+        self._dirty = {memory_id for memory_id in state["dirty"] if memory_id in self._items}
+        self._evicted = dict(state["evicted"])
+
+    def add(
+        self,
+        text: str,
+        *,
+        type: str = "episodic",
+        scope: dict[str, str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        importance: float = 0.5,
+        turn: int = 0,
+    ) -> str:
+        memory_id = super().add(
+            text, type=type, scope=scope, metadata=metadata, importance=importance, turn=turn
+        )
+        if memory_id in self._items:
+            self._dirty.add(memory_id)
+        self._maybe_flush()
+        return memory_id
+
+    def supersede_failures(self, files: set[str], *, turn: int) -> int:
+        superseded = super().supersede_failures(files, turn=turn)
+        if superseded:
+            self._dirty.update(
+                item.id
+                for item in self._items.values()
+                if item.metadata.get("superseded_at_turn") == turn
+            )
+            self._maybe_flush()
+        return superseded
+
+    def search(
+        self,
+        query: str,
+        *,
+        scope: dict[str, str] | None = None,
+        limit: int = 5,
+        turn: int | None = None,
+    ) -> list[MemoryHit]:
+        if limit >= 1:
+            self._recall(query, limit=limit, turn=turn or 0)
+        hits = super().search(query, scope=scope, limit=limit, turn=turn)
+        self._dirty.update(hit.item.id for hit in hits)
+        self._maybe_flush()
+        return hits
+
+    def flush(self) -> int:
+        """Write pending changes and trim the namespace; returns the rows written."""
+        rows = [self._row(item) for item in self._evicted.values()]
+        rows.extend(
+            self._row(self._items[memory_id])
+            for memory_id in self._dirty
+            if memory_id in self._items
+        )
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return 0
+            try:
+                with conn:
+                    conn.executemany(
+                        """
+                        INSERT INTO memories (
+                            namespace, memory_id, text, type, scope, metadata, importance,
+                            access_count, search_text, updated_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(namespace, memory_id) DO UPDATE SET
+                            metadata = excluded.metadata,
+                            importance = excluded.importance,
+                            access_count = excluded.access_count,
+                            search_text = excluded.search_text,
+                            updated_at = excluded.updated_at
+                        """,
+                        rows,
+                    )
+                    self._trim(conn)
+            except sqlite3.Error as exc:
+                print(f"[memory-db] 写入 {self.path} 失败，{len(rows)} 条记忆暂留内存：{exc}")
+                return 0
+        self._dirty.clear()
+        self._evicted.clear()
+        return len(rows)
+
+    def stored_count(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return 0
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM memories WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return int(row[0])
+
+    def _drop_item(self, memory_id: str) -> None:
+        item = self._items.get(memory_id)
+        if item is not None and memory_id in self._dirty:
+            self._evicted[memory_id] = item
+        self._dirty.discard(memory_id)
+        super()._drop_item(memory_id)
+
+    def _maybe_flush(self) -> None:
+        if self.pending_count >= self.flush_every:
+            self.flush()
+
+    def _recall(self, query: str, *, limit: int, turn: int) -> None:
+        """把库里与查询相关、且不在进程内存储里的记忆读进来。"""
+        terms = list(dict.fromkeys(_tokenize(query)))[:MAX_RECALL_TERMS]
+        # 多取一些：命中的行可能已经在内存里，或被 scope 过滤掉。
+        fetch = limit * 4
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return
+            try:
+                if FTS5_AVAILABLE and terms:
+                    match = " OR ".join(f'"{term}"' for term in terms)
+                    rows = conn.execute(
+                        """
+                        SELECT m.memory_id, m.text, m.type, m.scope, m.metadata,
+                               m.importance, m.access_count
+                        FROM memories_fts
+                        JOIN memories AS m ON m.id = memories_fts.rowid
+                        WHERE memories_fts MATCH ? AND m.namespace = ?
+                        ORDER BY bm25(memories_fts)
+                        LIMIT ?
+                        """,
+                        (match, self.namespace, fetch),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        """
+                        SELECT memory_id, text, type, scope, metadata, importance, access_count
+                        FROM memories
+                        WHERE namespace = ?
+                        ORDER BY importance DESC, access_count DESC, updated_at DESC
+                        LIMIT ?
+                        """,
+                        (self.namespace, fetch),
+                    ).fetchall()
+            except sqlite3.Error as exc:
+                print(f"[memory-db] 读取 {self.path} 失败，跳过跨 run 记忆：{exc}")
+                return
+        self._admit(rows, turn=turn)
+
+    def _admit(self, rows: Iterable[tuple[Any, ...]], *, turn: int) -> None:
+        for memory_id, text, type, scope, metadata, importance, access_count in rows:
+            if memory_id in self._items or memory_id in self._evicted:
+                continue
+            # 上一个 run 的轮次与本 run 不可比：按「本轮刚被想起」计 recency。
+            item = MemoryItem(
+                id=str(memory_id),
+                text=str(text),
+                type=str(type),
+                scope={str(k): str(v) for k, v in json.loads(scope or "{}").items()},
+                metadata=dict(json.loads(metadata or "{}")),
+                importance=float(importance),
+                created_at_turn=turn,
+                last_accessed_turn=turn,
+                access_count=int(access_count),
+            )
+            self._insert_item(item)
+            self.recalled_count += 1
+        self._enforce_limit()
+
+    def _row(self, item: MemoryItem) -> tuple[Any, ...]:
+        return (
+            self.namespace,
+            item.id,
+            item.text,
+            item.type,
+            json.dumps(item.scope, ensure_ascii=False, sort_keys=True),
+            json.dumps(item.metadata, ensure_ascii=False, sort_keys=True),
+            item.importance,
+            item.access_count,
+            " ".join(_tokenize(_memory_search_text(item))),
+            time.time(),
+        )
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """
+            DELETE FROM memories WHERE id IN (
+                SELECT id FROM memories WHERE namespace = ?
+                ORDER BY importance DESC, access_count DESC, updated_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.namespace, self.max_stored),
+        )
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # CLI 在工作线程里跑 agent：连接跨线程使用，由 _lock 串行化。
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != MEMORY_DB_SCHEMA_VERSION:
+                with conn:
+                    for statement in (
+                        "DROP TRIGGER IF EXISTS memories_ai",
+                        "DROP TRIGGER IF EXISTS memories_ad",
+                        "DROP TRIGGER IF EXISTS memories_au",
+                        "DROP TABLE IF EXISTS memories_fts",
+                        "DROP TABLE IF EXISTS memories",
+                    ):
+                        conn.execute(statement)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS memories (
+                        id INTEGER PRIMARY KEY,
+                        namespace TEXT NOT NULL,
+                        memory_id TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        scope TEXT NOT NULL,
+                        metadata TEXT NOT NULL,
+                        importance REAL NOT NULL,
+                        access_count INTEGER NOT NULL,
+                        search_text TEXT NOT NULL,
+                        updated_at REAL NOT NULL,
+                        UNIQUE (namespace, memory_id)
+                    )
+                    """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS memories_rank "
+                    "ON memories (namespace, importance, access_count, updated_at)"
+                )
+                if FTS5_AVAILABLE:
+                    # 外部内容表：正文只存一份，触发器负责让全文索引跟上 memories。
+                    conn.execute(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5("
+                        "search_text, content='memories', content_rowid='id')"
+                    )
+                    conn.execute("""
+                        CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+                            INSERT INTO memories_fts(rowid, search_text)
+                            VALUES (new.id, new.search_text);
+                        END
+                        """)
+                    conn.execute("""
+                        CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+                            INSERT INTO memories_fts(memories_fts, rowid, search_text)
+                            VALUES ('delete', old.id, old.search_text);
+                        END
+                        """)
+                    conn.execute("""
+                        CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+                            INSERT INTO memories_fts(memories_fts, rowid, search_text)
+                            VALUES ('delete', old.id, old.search_text);
+                            INSERT INTO memories_fts(rowid, search_text)
+                            VALUES (new.id, new.search_text);
+                        END
+                        """)
+                conn.execute(f"PRAGMA user_version = {MEMORY_DB_SCHEMA_VERSION}")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
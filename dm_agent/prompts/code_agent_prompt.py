@@ -40,6 +40,12 @@ SYSTEM_PROMPT = """
 - 'action': 工具名称,或用于结束任务的 'finish' / 'task_complete'
 - 'action_input': 工具参数的 JSON 对象,或最终答案字符串(当 action 为 'finish' / 'task_complete' 时)
 
+需要同时查看多处互不依赖的内容时,可以省略 'action' / 'action_input',改用 'actions' 列表一次请求多个只读工具,
+它们会被并发执行,结果按列表顺序一并返回:
+- 'actions': [{"action": 工具名称, "action_input": 工具参数}, ...],最多 8 个
+- 只允许只读工具: list_directory、read_file、search_in_file、parse_ast、get_function_signature、find_dependencies、get_code_metrics、build_code_index、search_symbol、dependency_graph
+- 写文件、执行命令与终止动作必须单独作为 'action' 发出
+
 ## 停止规则
 
 当你已经完成用户任务、已经给出需要的文件/修改/解释、或验证已经通过时,不要继续调用工具。
@@ -53,6 +59,7 @@ SYSTEM_PROMPT = """
 ## 示例
 
 阅读文件: {"thought": "需要先查看 main.py 了解项目入口逻辑", "action": "read_file", "action_input": {"path": "main.py"}}
+并行阅读: {"thought": "同时查看入口与配置", "actions": [{"action": "read_file", "action_input": {"path": "main.py"}}, {"action": "read_file", "action_input": {"path": "config.py"}}]}
 创建文件: {"thought": "创建配置文件存储数据库连接信息", "action": "create_file", "action_input": {"path": "config.py", "content": "DB_HOST = 'localhost'"}}
 完成任务: {"thought": "所有功能已实现并测试通过", "action": "finish", "action_input": "已完成用户认证功能: 新增登录校验与会话处理,并运行测试确认通过。"}
 
@@ -46,6 +46,7 @@ class SpecError(ValueError):
 # 请求里多出来的字段一律忽略，不存在「传个奇怪的键就能注入参数」这条路。
 BOOL_FLAGS: dict[str, str] = {
     "enable_adaptive_replanning": "--enable-adaptive-replanning",
+    "speculative_planning": "--speculative-planning",
 }
 
 # 数值开关 → (CLI 开关, 最小值, 最大值)。超范围直接拒绝，不静默截断。
@@ -96,6 +96,15 @@ CAPABILITY_CATALOG: tuple[dict[str, Any], ...] = (
         "label": "Adaptive Replanning",
         "help": "扩展的重规划决策策略与限制。基础重规划本来就一直开着。",
     },
+    {
+        "flag": "--speculative-planning",
+        "key": "speculative_planning",
+        "kind": "bool",
+        "default": False,
+        "category": "behavior",
+        "label": "Speculative Planning",
+        "help": "规划调用与第一步并发，计划到达后再拼回任务提示词，省一次 LLM 往返。",
+    },
 )
 
 
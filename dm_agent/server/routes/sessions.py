@@ -13,6 +13,7 @@
 
 from __future__ import annotations
 
+import contextlib
 import json
 import shutil
 import time
@@ -30,10 +31,13 @@ from dm_agent.server.settings import (
     relative_session_name,
     resolve_session_path,
 )
-from dm_agent.tracing.analysis import analyze_events
-from dm_agent.tracing.fork import fork_session
+from dm_agent.tracing.analysis import TraceAnalysisReducer, reduce_trace_file
+from dm_agent.tracing.blobs import blob_dir_for
+from dm_agent.tracing.compression import is_session_log_path
+from dm_agent.tracing.fork import fork_session_at
+from dm_agent.tracing.index import SessionIndex, index_path_for
 from dm_agent.tracing.session import load_session_entries
-from dm_agent.tracing.summary import diff_events, summarize_events
+from dm_agent.tracing.summary import diff_events
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"], dependencies=[Depends(require_token)])
 
@@ -42,9 +46,12 @@ router = APIRouter(prefix="/api/sessions", tags=["sessions"], dependencies=[Depe
 DEFAULT_ENTRY_LIMIT = 1000
 MAX_ENTRY_LIMIT = 5000
 
-# 会话卡片缓存：路径 → (mtime_ns, size, card)。会话日志是 append-only 的，
-# mtime+size 一致就说明内容没变，可以直接复用上次的解析结果。
-_CARD_CACHE: dict[str, tuple[int, int, dict[str, Any]]] = {}
+# 会话卡片缓存：路径 → (mtime_ns, size, card, reducer 状态)。会话日志是 append-only
+# 的，mtime+size 一致就说明内容没变，直接复用上次的卡片；变了也只从上次读到的位置
+# 接着归约新追加的行，正在写的长会话不必每次从头解析。
+_CARD_CACHE: dict[str, tuple[int, int, dict[str, Any], dict[str, Any]]] = {}
+# 字节偏移索引缓存，口径同上：文件没变时翻页不必重读边车索引。
+_INDEX_CACHE: dict[str, tuple[int, int, SessionIndex]] = {}
 
 # 删除的会话搬到这里，而不是 unlink。
 #
@@ -90,6 +97,44 @@ def _load(settings: ServerSettings, name: str) -> list[dict[str, Any]]:
         ) from exc
 
 
+def _reduce(
+    settings: ServerSettings, name: str, *, keep_steps: bool = False
+) -> TraceAnalysisReducer:
+    """单遍流式归约会话：摘要与诊断不必把整份日志物化成条目列表。"""
+    try:
+        path = resolve_session_path(settings, name)
+    except SessionPathError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    try:
+        return reduce_trace_file(path, keep_steps=keep_steps)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"会话文件无法解析：{exc}",
+        ) from exc
+
+
+def _load_index(settings: ServerSettings, name: str) -> SessionIndex:
+    """按会话名取字节偏移索引：翻页与分叉只读需要的那几条。"""
+    try:
+        path = resolve_session_path(settings, name)
+    except SessionPathError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    try:
+        stat = path.stat()
+        cached = _INDEX_CACHE.get(str(path))
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        index = SessionIndex.load(path)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"会话文件无法解析：{exc}",
+        ) from exc
+    _INDEX_CACHE[str(path)] = (stat.st_mtime_ns, stat.st_size, index)
+    return index
+
+
 def _session_card(settings: ServerSettings, path: Path) -> dict[str, Any]:
     """会话列表里的一张卡片：摘要 + 健康度 + 文件元信息。"""
     stat = path.stat()
@@ -98,9 +143,9 @@ def _session_card(settings: ServerSettings, path: Path) -> dict[str, Any]:
     if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
         return cached[2]
 
-    entries = load_session_entries(path)
-    summary = summarize_events(entries)
-    analysis = analyze_events(entries)
+    reducer = reduce_trace_file(path, state=cached[3] if cached is not None else None)
+    summary = reducer.summary()
+    analysis = reducer.analysis()
     card = {
         "name": relative_session_name(settings, path),
         "run_id": summary.get("run_id", ""),
@@ -115,12 +160,12 @@ def _session_card(settings: ServerSettings, path: Path) -> dict[str, Any]:
         "duration_seconds": summary.get("duration_seconds"),
         # 一个 JSONL 可以连续记录多个 run；摘要口径与 dm-agent-trace 一致（取首个
         # run_start + 末个 run_end），但把 run 数量透出来，前端好提示「这里有多段」。
-        "run_count": sum(1 for entry in entries if entry.get("event") == "run_start"),
+        "run_count": reducer.count("run_start"),
         "health": analysis.get("trace_health", {}),
         "size_bytes": stat.st_size,
         "modified": stat.st_mtime,
     }
-    _CARD_CACHE[cache_key] = (stat.st_mtime_ns, stat.st_size, card)
+    _CARD_CACHE[cache_key] = (stat.st_mtime_ns, stat.st_size, card, reducer.to_state())
     return card
 
 
@@ -132,7 +177,11 @@ def list_sessions(
     cards: list[dict[str, Any]] = []
     errors: list[dict[str, str]] = []
     if settings.sessions_dir.is_dir():
-        for path in sorted(settings.sessions_dir.rglob("*.jsonl")):
+        paths = [
+            *settings.sessions_dir.rglob("*.jsonl"),
+            *settings.sessions_dir.rglob("*.jsonl.gz"),
+        ]
+        for path in sorted(paths):
             if not path.is_file() or _is_hidden(settings, path):
                 continue
             try:
@@ -175,12 +224,21 @@ def read_entries(
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=MAX_ENTRY_LIMIT)] = DEFAULT_ENTRY_LIMIT,
 ) -> dict[str, Any]:
-    """返回条目原文。id / parent_id 已由 tracing 读侧补齐（含 1.x 老 trace）。"""
-    entries = _load(settings, name)
-    window = entries[offset : offset + limit]
+    """返回条目原文。id / parent_id 已由 tracing 读侧补齐（含 1.x 老 trace）。
+
+    走字节偏移索引：只读这一页的字节，长会话翻到哪页都不必解析整份日志。
+    """
+    index = _load_index(settings, name)
+    try:
+        window = index.entries(offset, offset + limit)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"会话文件无法解析：{exc}",
+        ) from exc
     return {
         "name": name,
-        "total": len(entries),
+        "total": len(index),
         "offset": offset,
         "limit": limit,
         "entries": window,
@@ -193,7 +251,7 @@ def read_summary(
     name: Annotated[str, Query()],
 ) -> dict[str, Any]:
     """等价于 ``dm-agent-trace view --json``。"""
-    return {"name": name, "summary": summarize_events(_load(settings, name))}
+    return {"name": name, "summary": _reduce(settings, name, keep_steps=True).summary()}
 
 
 @router.get("/analysis", summary="会话诊断")
@@ -202,7 +260,7 @@ def read_analysis(
     name: Annotated[str, Query()],
 ) -> dict[str, Any]:
     """等价于 ``dm-agent-trace analyze --json``：失败阶段、恢复链路、验证缺口、幻觉信号。"""
-    return {"name": name, "analysis": analyze_events(_load(settings, name))}
+    return {"name": name, "analysis": _reduce(settings, name).analysis()}
 
 
 @router.get("/diff", summary="两次运行的行为 diff")
@@ -234,8 +292,8 @@ def create_fork(
     目标路径也要过 ``sessions_dir`` 的边界检查——``output`` 是外部输入，
     不能让它把文件写到目录外。
     """
-    entries = _load(settings, payload.name)
-    source = resolve_session_path(settings, payload.name)
+    index = _load_index(settings, payload.name)
+    source = index.path
 
     output: Path | None = None
     if payload.output:
@@ -245,7 +303,7 @@ def create_fork(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
     try:
-        result = fork_session(entries, source=source, at=payload.at, output=output)
+        result = fork_session_at(index, source=source, at=payload.at, output=output)
     except ValueError as exc:
         # at 未命中/歧义，或目标已存在——都是客户端可修正的输入问题。
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
@@ -317,6 +375,9 @@ def _trash_one(request: Request, settings: ServerSettings, name: str) -> dict[st
         trash_dir.mkdir(parents=True, exist_ok=True)
         target = _unique_trash_path(trash_dir, source.name)
         shutil.move(str(source), str(target))
+        if blob_dir_for(source).is_dir():
+            # blob 是原始数据的一部分，跟着日志进回收站，并随新文件名改名。
+            shutil.move(str(blob_dir_for(source)), str(blob_dir_for(target)))
     except OSError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -324,6 +385,10 @@ def _trash_one(request: Request, settings: ServerSettings, name: str) -> dict[st
         ) from exc
 
     _CARD_CACHE.pop(str(source), None)
+    _INDEX_CACHE.pop(str(source), None)
+    # 边车索引是派生数据，随时可以重建，不必跟进回收站。
+    with contextlib.suppress(OSError):
+        index_path_for(source).unlink()
     return {"name": name, "trashed_as": f"{TRASH_DIR_NAME}/{target.name}"}
 
 
@@ -366,8 +431,8 @@ def _resolve_new_session_path(settings: ServerSettings, name: str) -> Path:
     candidate = Path(name)
     if candidate.is_absolute() or candidate.drive or name.startswith(("/", "\\")):
         raise SessionPathError(f"目标会话名必须是相对路径：{name}")
-    if candidate.suffix.lower() != ".jsonl":
-        raise SessionPathError(f"目标会话名必须以 .jsonl 结尾：{name}")
+    if not is_session_log_path(candidate):
+        raise SessionPathError(f"目标会话名必须以 .jsonl 或 .jsonl.gz 结尾：{name}")
     target = (settings.sessions_dir / candidate).resolve()
     try:
         target.relative_to(settings.sessions_dir)
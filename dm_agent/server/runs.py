@@ -15,6 +15,8 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+from dm_agent.tracing.compression import GZIP_MAGIC, read_appended, read_log_bytes
+
 from .process import RunProcess
 
 __all__ = ["ConversationTurn", "RunRecord", "RunRegistry"]
@@ -296,16 +298,17 @@ def _count_run_ends(trace_path: Path) -> int:
     if size == offset:
         return count
     try:
-        with trace_path.open("rb") as handle:
-            handle.seek(offset)
-            data = handle.read()
+        data, next_offset = read_appended(trace_path, offset)
     except OSError:
         return count
 
     last_newline = data.rfind(b"\n")
     if last_newline < 0:
         return count  # 还没有完整的一行
-    complete, consumed = data[: last_newline + 1], last_newline + 1
+    complete = data[: last_newline + 1]
+    # 压缩日志按整个 gzip member 返回（member 边界就是行边界），偏移直接取 member
+    # 边界；明文日志把结尾的半行留到下次。
+    new_offset = next_offset if len(complete) == len(data) else offset + len(complete)
     for raw_line in complete.split(b"\n"):
         text = raw_line.strip()
         if not text.startswith(b"{"):
@@ -316,7 +319,7 @@ def _count_run_ends(trace_path: Path) -> int:
             continue
         if entry.get("event") == "run_end":
             count += 1
-    _RUN_END_SCAN[key] = (offset + consumed, count)
+    _RUN_END_SCAN[key] = (new_offset, count)
     return count
 
 
@@ -332,11 +335,16 @@ def _read_agent_status(trace_path: Path) -> str:
     """
     try:
         with trace_path.open("rb") as handle:
+            compressed = handle.read(len(GZIP_MAGIC)) == GZIP_MAGIC
             handle.seek(0, 2)
             size = handle.tell()
             window = min(size, 64 * 1024)
             handle.seek(size - window)
-            tail = handle.read().decode("utf-8", errors="replace")
+            raw_tail = handle.read()
+        if compressed:
+            # gzip member 无法从文件中部开始解，只能整份解出再取末尾。
+            raw_tail = read_log_bytes(trace_path)[-64 * 1024 :]
+        tail = raw_tail.decode("utf-8", errors="replace")
     except OSError:
         return ""
 
@@ -11,6 +11,8 @@ import secrets
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from dm_agent.tracing.compression import SESSION_LOG_SUFFIXES, is_session_log_path
+
 __all__ = [
     "DEFAULT_HOST",
     "DEFAULT_PORT",
@@ -24,9 +26,9 @@ __all__ = [
 DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = 8765
 
-# 会话文件的唯一合法后缀。限制后缀既是防呆，也让「把 sessions_dir 指到家目录」
-# 这类误操作不至于把任意文件读出去。
-SESSION_SUFFIX = ".jsonl"
+# 会话文件的合法后缀（明文与块压缩两种）。限制后缀既是防呆，也让「把 sessions_dir
+# 指到家目录」这类误操作不至于把任意文件读出去。
+SESSION_SUFFIXES = SESSION_LOG_SUFFIXES
 
 
 class SessionPathError(ValueError):
@@ -98,7 +100,7 @@ def resolve_session_path(settings: ServerSettings, name: str) -> Path:
     """把 API 传来的会话名解析成 ``sessions_dir`` 内的真实路径。
 
     这是整个 server 层唯一的「外部字符串 → 文件路径」入口，因此四道检查都放在这里：
-    后缀必须是 ``.jsonl``、不得是绝对路径、解析后必须仍在 ``sessions_dir`` 内
+    后缀必须是 ``.jsonl`` 或 ``.jsonl.gz``、不得是绝对路径、解析后必须仍在 ``sessions_dir`` 内
     （挡 ``../`` 穿越与符号链接逃逸）、且必须是已存在的普通文件。
 
     Raises:
@@ -109,8 +111,8 @@ def resolve_session_path(settings: ServerSettings, name: str) -> Path:
     candidate = Path(name)
     if candidate.is_absolute() or candidate.drive or name.startswith(("/", "\\")):
         raise SessionPathError(f"会话名必须是相对路径：{name}")
-    if candidate.suffix.lower() != SESSION_SUFFIX:
-        raise SessionPathError(f"只接受 {SESSION_SUFFIX} 会话文件：{name}")
+    if not is_session_log_path(candidate):
+        raise SessionPathError(f"只接受 {' / '.join(SESSION_SUFFIXES)} 会话文件：{name}")
 
     root = settings.sessions_dir
     # 先 resolve 再比较，符号链接指向目录外时会在这里暴露出来。
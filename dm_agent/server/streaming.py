@@ -12,6 +12,10 @@
 2. **半行**：写侧是「整行 + flush」，但读侧仍可能撞上写到一半的行。只有以 ``\\n``
    结尾的完整行才发出去，残段留在缓冲里等下一轮——否则会给前端一个解析不了的 JSON。
 3. **心跳**：长时间没有新条目时发 SSE 注释行，免得中间的代理把空闲连接掐掉。
+
+块压缩的 ``*.jsonl.gz`` 会话日志同样可以跟读：读侧只解完整的 gzip member，
+字节偏移停在 member 边界上（见 ``dm_agent.tracing.compression``）。条目里的 blob
+引用在发出前解析（见 ``dm_agent.tracing.blobs``）。
 """
 
 from __future__ import annotations
@@ -22,6 +26,9 @@ from collections.abc import AsyncIterator, Callable
 from pathlib import Path
 from typing import Any
 
+from dm_agent.tracing.blobs import BlobStore
+from dm_agent.tracing.compression import read_appended
+
 __all__ = ["parse_last_event_id", "sse_message", "stream_session_lines"]
 
 # 轮询间隔。会话日志是本地文件，0.25s 足够跟手，也不至于把 CPU 转满。
@@ -80,6 +87,8 @@ async def stream_session_lines(
     line_index = -1
     buffer = b""
     offset = 0
+    # 外置到 blob 的大字符串在发给浏览器前换回原文，前端看到的与 view 一致。
+    blobs = BlobStore.for_log(path)
     last_heartbeat = asyncio.get_running_loop().time()
     waited_for_file = 0.0
 
@@ -124,7 +133,7 @@ async def stream_session_lines(
                         event_id=line_index,
                     )
                     continue
-                yield sse_message(event="entry", data=entry, event_id=line_index)
+                yield sse_message(event="entry", data=blobs.resolve(entry), event_id=line_index)
                 last_heartbeat = loop_time
             continue  # 可能还有更多数据，先不睡
 
@@ -153,13 +162,11 @@ def _read_from(path: Path, offset: int) -> tuple[bytes, int]:
     """从 ``offset`` 起读出新增字节，返回 ``(数据, 新 offset)``。
 
     以二进制读并自己切行，而不是按文本行迭代：文本模式下的换行转换会让
-    offset 与真实字节数不一致，续传就会错位。
+    offset 与真实字节数不一致，续传就会错位。压缩日志返回的是解出的明文，
+    ``offset`` 仍是原始文件里的字节位置。
     """
     try:
-        with path.open("rb") as handle:
-            handle.seek(offset)
-            data = handle.read()
-            return data, offset + len(data)
+        return read_appended(path, offset)
     except OSError:
         # 文件可能正被替换或短暂锁住（Windows 上尤其常见）。下一轮再试。
         return b"", offset
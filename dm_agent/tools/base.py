@@ -2,10 +2,18 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
+# 当前工具调用所属智能体的工作区根目录；None 表示沿用进程 CWD（旧行为）。
+# 用 ContextVar 而不是 os.chdir：同一进程里并发的多个智能体各自看到自己的根目录，
+# 线程与 asyncio 任务之间互不串扰。
+_WORKSPACE: ContextVar[Path | None] = ContextVar("dm_agent_workspace", default=None)
+
 
 @dataclass
 class Tool:
@@ -22,6 +30,48 @@ class Tool:
         return self.runner(arguments)
 
 
+def current_workspace() -> Path | None:
+    """返回当前上下文绑定的工作区根目录，未绑定时为 None。"""
+    return _WORKSPACE.get()
+
+
+@contextmanager
+def use_workspace(root: str | Path | None) -> Iterator[None]:
+    """在 with 块内把工具的相对路径与子进程 cwd 锚定到 ``root``。
+
+    ``root`` 为 None 时什么都不做，方便调用方无条件包一层。ContextVar 不会自动
+    跟进 ``ThreadPoolExecutor`` 的工作线程，所以要在真正执行 runner 的那个线程里
+    进入这个上下文。
+    """
+    if root is None:
+        yield
+        return
+    token = _WORKSPACE.set(Path(root))
+    try:
+        yield
+    finally:
+        _WORKSPACE.reset(token)
+
+
+def resolve_path(value: str | Path) -> Path:
+    """把工具入参里的路径解析到当前工作区；绝对路径与未绑定工作区时原样返回。
+
+    只用于真正的文件 I/O。观察文本里仍应回显模型给出的原始路径，否则同一条
+    trace 换个工作区回放就会因为路径前缀不同而对不上。
+    """
+    path = Path(value)
+    workspace = _WORKSPACE.get()
+    if workspace is None or path.is_absolute():
+        return path
+    return workspace / path
+
+
+def subprocess_cwd() -> str | None:
+    """子进程的 ``cwd=`` 参数：绑定了工作区时指向它，否则继承进程 CWD。"""
+    workspace = _WORKSPACE.get()
+    return None if workspace is None else str(workspace)
+
+
 def _require_str(arguments: dict[str, Any], key: str) -> str:
     """
     从参数字典中提取必需的字符串参数
@@ -7,7 +7,7 @@ import json
 from pathlib import Path
 from typing import Any
 
-from .base import _require_str
+from .base import _require_str, resolve_path
 
 
 def parse_ast(arguments: dict[str, Any]) -> str:
@@ -22,16 +22,17 @@ def parse_ast(arguments: dict[str, Any]) -> str:
     """
     path_value = _require_str(arguments, "path")
     path = Path(path_value)
+    target = resolve_path(path)
 
-    if not path.exists():
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
     if path.suffix != ".py":
         return f"文件 {path} 不是 Python 文件。"
 
     try:
-        with open(path, encoding="utf-8") as f:
+        with open(target, encoding="utf-8") as f:
             source_code = f.read()
 
         tree = ast.parse(source_code, filename=str(path))
@@ -194,13 +195,14 @@ def get_function_signature(arguments: dict[str, Any]) -> str:
     function_name = _require_str(arguments, "function_name")
 
     path = Path(path_value)
-    if not path.exists():
+    target = resolve_path(path)
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
     try:
-        with open(path, encoding="utf-8") as f:
+        with open(target, encoding="utf-8") as f:
             source_code = f.read()
 
         tree = ast.parse(source_code, filename=str(path))
@@ -250,14 +252,15 @@ def find_dependencies(arguments: dict[str, Any]) -> str:
     """
     path_value = _require_str(arguments, "path")
     path = Path(path_value)
+    target = resolve_path(path)
 
-    if not path.exists():
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
     try:
-        with open(path, encoding="utf-8") as f:
+        with open(target, encoding="utf-8") as f:
             source_code = f.read()
 
         tree = ast.parse(source_code, filename=str(path))
@@ -288,7 +291,7 @@ def find_dependencies(arguments: dict[str, Any]) -> str:
                 local_modules.add(module)
             else:
                 # 简单判断：如果路径中存在对应文件夹，认为是本地模块
-                parent_path = path.parent / top_module
+                parent_path = target.parent / top_module
                 if parent_path.exists():
                     local_modules.add(module)
                 else:
@@ -320,14 +323,15 @@ def get_code_metrics(arguments: dict[str, Any]) -> str:
     """
     path_value = _require_str(arguments, "path")
     path = Path(path_value)
+    target = resolve_path(path)
 
-    if not path.exists():
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
     try:
-        with open(path, encoding="utf-8") as f:
+        with open(target, encoding="utf-8") as f:
             lines = f.readlines()
 
         # 统计行数
@@ -356,7 +360,7 @@ def get_code_metrics(arguments: dict[str, Any]) -> str:
 
         if path.suffix == ".py":
             try:
-                with open(path, encoding="utf-8") as f:
+                with open(target, encoding="utf-8") as f:
                     source = f.read()
                 tree = ast.parse(source)
 
@@ -8,7 +8,7 @@ from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
-from .base import _require_str
+from .base import _require_str, resolve_path
 
 DEFAULT_INDEX_EXCLUDES = {
     ".git",
@@ -28,7 +28,7 @@ DEFAULT_INDEX_EXCLUDES = {
 
 def build_code_index(arguments: dict[str, Any]) -> str:
     """Build a lightweight Python symbol index for a repository tree."""
-    root = Path(arguments.get("root", ".")).resolve()
+    root = resolve_path(arguments.get("root", ".")).resolve()
     max_files = int(arguments.get("max_files", 200))
     include_tests = bool(arguments.get("include_tests", True))
 
@@ -74,7 +74,7 @@ def build_code_index(arguments: dict[str, Any]) -> str:
 def search_symbol(arguments: dict[str, Any]) -> str:
     """Search Python symbols by exact name or substring in a repository tree."""
     name = _require_str(arguments, "name")
-    root = Path(arguments.get("root", ".")).resolve()
+    root = resolve_path(arguments.get("root", ".")).resolve()
     kind = arguments.get("kind")
     exact = bool(arguments.get("exact", False))
     max_files = int(arguments.get("max_files", 200))
@@ -119,7 +119,7 @@ def search_symbol(arguments: dict[str, Any]) -> str:
 
 def dependency_graph(arguments: dict[str, Any]) -> str:
     """Build a local Python import dependency graph for a repository tree."""
-    root = Path(arguments.get("root", ".")).resolve()
+    root = resolve_path(arguments.get("root", ".")).resolve()
     max_files = int(arguments.get("max_files", 200))
     include_external = bool(arguments.get("include_external", False))
 
@@ -9,7 +9,7 @@ from importlib.util import find_spec
 from pathlib import Path
 from typing import Any
 
-from .base import _require_str
+from .base import _require_str, resolve_path, subprocess_cwd
 
 # run_linter 支持的检查器，按推荐顺序（ruff 最快且覆盖面最广）。
 _LINTER_TOOLS = ("ruff", "flake8", "pylint", "mypy", "black")
@@ -47,7 +47,12 @@ def run_python(arguments: dict[str, Any]) -> str:
         raise ValueError("run_python 工具需要 'code' 或 'path' 参数。")
 
     result = subprocess.run(
-        command, capture_output=True, text=True, encoding="utf-8", errors="replace"
+        command,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        cwd=subprocess_cwd(),
     )
     segments: list[str] = []
     if result.stdout:
@@ -62,7 +67,13 @@ def run_shell(arguments: dict[str, Any]) -> str:
     """运行 Shell 命令"""
     command = _require_str(arguments, "command")
     result = subprocess.run(
-        command, shell=True, capture_output=True, text=True, encoding="utf-8", errors="replace"
+        command,
+        shell=True,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        cwd=subprocess_cwd(),
     )
     segments: list[str] = []
     if result.stdout:
@@ -85,8 +96,9 @@ def run_tests(arguments: dict[str, Any]) -> str:
     if framework not in ["pytest", "unittest"]:
         raise ValueError("framework 必须是 'pytest' 或 'unittest'。")
 
+    # 子进程在工作区里启动，命令行照旧用相对路径；只有存在性检查要显式解析。
     path = Path(test_path)
-    if not path.exists():
+    if not resolve_path(path).exists():
         return f"测试路径 {path} 不存在。"
 
     if framework == "pytest":
@@ -98,7 +110,7 @@ def run_tests(arguments: dict[str, Any]) -> str:
         command = [sys.executable, "-m", "unittest"]
         if verbose:
             command.append("-v")
-        if path.is_file():
+        if resolve_path(path).is_file():
             # 转换为模块路径
             module_path = str(path).replace("/", ".").replace("\\", ".").replace(".py", "")
             command.append(module_path)
@@ -106,7 +118,12 @@ def run_tests(arguments: dict[str, Any]) -> str:
             command.extend(["discover", "-s", str(path)])
 
     result = subprocess.run(
-        command, capture_output=True, text=True, encoding="utf-8", errors="replace"
+        command,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        cwd=subprocess_cwd(),
     )
     segments: list[str] = []
 
@@ -131,7 +148,7 @@ def run_linter(arguments: dict[str, Any]) -> str:
         )
 
     path = Path(path_value)
-    if not path.exists():
+    if not resolve_path(path).exists():
         return f"路径 {path} 不存在。"
 
     if tool == "black":
@@ -143,7 +160,12 @@ def run_linter(arguments: dict[str, Any]) -> str:
         command = [sys.executable, "-m", tool, str(path)]
 
     result = subprocess.run(
-        command, capture_output=True, text=True, encoding="utf-8", errors="replace"
+        command,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        cwd=subprocess_cwd(),
     )
 
     # 当前解释器没装这个检查器。直接把子进程的 "No module named X" 回给模型，会让它
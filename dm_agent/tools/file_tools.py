@@ -8,7 +8,7 @@ import time
 from pathlib import Path
 from typing import Any
 
-from .base import _require_str
+from .base import _require_str, resolve_path
 
 # 编辑后回显的上下文行数与总行数上限。上限存在的理由：观察会进对话历史，
 # 替换一大段代码时不设限会把窗口撑爆；`--max-observation-chars` 是全局兜底，
@@ -82,8 +82,9 @@ def create_file(arguments: dict[str, Any]) -> str:
         raise ValueError("工具参数 'content' 必须是字符串。")
 
     path = Path(path_value)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    note = _atomic_write_text(path, content)
+    target = resolve_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    note = _atomic_write_text(target, content)
     return f"已将 {len(content)} 个字符写入 {path}。{note}{_check_python_syntax(path, content)}".rstrip()
 
 
@@ -94,12 +95,13 @@ def read_file(arguments: dict[str, Any]) -> str:
     line_end = arguments.get("line_end")
 
     path = Path(path_value)
-    if not path.exists():
+    target = resolve_path(path)
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
-    content = path.read_text(encoding="utf-8")
+    content = target.read_text(encoding="utf-8")
 
     # 如果没有指定行号范围，返回全部内容
     if line_start is None and line_end is None:
@@ -144,9 +146,10 @@ def list_directory(arguments: dict[str, Any]) -> str:
         raise ValueError("工具参数 'recursive' 必须是布尔值。")
 
     path = Path(path_value or ".")
-    if not path.exists():
+    target = resolve_path(path)
+    if not target.exists():
         return f"目录 {path} 不存在。"
-    if not path.is_dir():
+    if not target.is_dir():
         return f"路径 {path} 不是目录。"
 
     entries = []
@@ -154,7 +157,7 @@ def list_directory(arguments: dict[str, Any]) -> str:
     if recursive:
         # 递归列出所有文件
         pattern = "**/*"
-        for item in sorted(path.glob(pattern)):
+        for item in sorted(target.glob(pattern)):
             if item.is_file():
                 # 过滤文件类型
                 if file_type:
@@ -163,14 +166,14 @@ def list_directory(arguments: dict[str, Any]) -> str:
                     if not item.name.endswith(file_type):
                         continue
                 # 使用相对路径
-                rel_path = item.relative_to(path)
+                rel_path = item.relative_to(target)
                 entries.append(str(rel_path))
             elif item.is_dir():
-                rel_path = item.relative_to(path)
+                rel_path = item.relative_to(target)
                 entries.append(str(rel_path) + "/")
     else:
         # 只列出当前目录
-        for item in sorted(path.iterdir()):
+        for item in sorted(target.iterdir()):
             if item.is_file():
                 # 过滤文件类型
                 if file_type:
@@ -239,9 +242,11 @@ def _render_edit_context(lines: list[str], start_line: int, end_line: int) -> st
     )
 
 
-def _edit_by_old_string(path: Path, arguments: dict[str, Any]) -> str:
+def _edit_by_old_string(path: Path, arguments: dict[str, Any], target: Path) -> str:
     """按内容精确定位替换：匹配不到或匹配多处一律不动文件。
 
+    ``path`` 是回显给模型的原始路径，``target`` 是按工作区解析后真正读写的文件。
+
     这是对行号模式的根治。行号会随每一次编辑漂移，而 ``replace`` 执行的是
     ``lines[start:end] = [content]``——区间给宽一行就会静默吞掉相邻代码。
     按内容定位从机制上排除了这种可能：要么命中唯一一处，要么什么都不做。
@@ -263,7 +268,7 @@ def _edit_by_old_string(path: Path, arguments: dict[str, Any]) -> str:
     if old_string == new_string:
         return "未改动：old_string 与 new_string 完全相同；请在 new_string 中提供实际修改后重试。"
 
-    content = path.read_text(encoding="utf-8")
+    content = target.read_text(encoding="utf-8")
     occurrences = content.count(old_string)
     # 下面两条提示同样避开 FAILURE_MARKERS：换一段 old_string 重试是局部纠正，
     # 不需要惊动 planner。
@@ -280,7 +285,7 @@ def _edit_by_old_string(path: Path, arguments: dict[str, Any]) -> str:
         )
 
     updated = content.replace(old_string, new_string, 1)
-    note = _atomic_write_text(path, updated)
+    note = _atomic_write_text(target, updated)
 
     prefix_lines = content[: content.index(old_string)].count("\n")
     start_line = prefix_lines + 1
@@ -303,22 +308,23 @@ def edit_file(arguments: dict[str, Any]) -> str:
     path_value = _require_str(arguments, "path")
 
     path = Path(path_value)
-    if not path.exists():
+    target = resolve_path(path)
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
     if arguments.get("old_string") is not None or arguments.get("new_string") is not None:
         if arguments.get("old_string") is None:
             raise ValueError("提供 new_string 时必须同时提供 old_string。")
-        return _edit_by_old_string(path, arguments)
+        return _edit_by_old_string(path, arguments, target)
 
     operation = _require_str(arguments, "operation")
 
     if operation not in ["insert", "replace", "delete"]:
         raise ValueError("operation 必须是 'insert'、'replace' 或 'delete' 之一。")
 
-    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    lines = target.read_text(encoding="utf-8").splitlines(keepends=True)
     line_start = arguments.get("line_start")
 
     if not isinstance(line_start, int) or line_start < 1:
@@ -341,7 +347,7 @@ def edit_file(arguments: dict[str, Any]) -> str:
 
         lines.insert(start_idx, content)
         updated = "".join(lines)
-        _atomic_write_text(path, updated)
+        _atomic_write_text(target, updated)
         inserted_lines = content.count("\n") if content else 0
         return (
             f"已在 {path} 的第 {line_start} 行插入 {len(content)} 个字符。"
@@ -369,7 +375,7 @@ def edit_file(arguments: dict[str, Any]) -> str:
 
             lines[start_idx:end_idx] = [content]
             updated = "".join(lines)
-            _atomic_write_text(path, updated)
+            _atomic_write_text(target, updated)
             replaced_lines = content.count("\n") if content else 0
             return (
                 f"已替换 {path} 的第 {line_start}-{line_end} 行。"
@@ -380,7 +386,7 @@ def edit_file(arguments: dict[str, Any]) -> str:
         else:  # delete
             del lines[start_idx:end_idx]
             updated = "".join(lines)
-            _atomic_write_text(path, updated)
+            _atomic_write_text(target, updated)
             anchor = max(1, min(line_start, len(lines)))
             return (
                 f"已删除 {path} 的第 {line_start}-{line_end} 行。"
@@ -405,12 +411,13 @@ def search_in_file(arguments: dict[str, Any]) -> str:
         raise ValueError("context_lines 必须是非负整数。")
 
     path = Path(path_value)
-    if not path.exists():
+    target = resolve_path(path)
+    if not target.exists():
         return f"文件 {path} 不存在。"
-    if not path.is_file():
+    if not target.is_file():
         return f"路径 {path} 不是文件。"
 
-    lines = path.read_text(encoding="utf-8").splitlines()
+    lines = target.read_text(encoding="utf-8").splitlines()
 
     try:
         regex = re.compile(pattern)
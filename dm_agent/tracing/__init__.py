@@ -1,9 +1,18 @@
 """Trace capture, analysis, diff, and replay helpers for DM-Code-Agent."""
 
-from .analysis import analyze_events, analyze_trace_directory
-from .fork import fork_session
+from .analysis import (
+    TraceAnalysisReducer,
+    analyze_events,
+    analyze_trace_directory,
+    reduce_trace_file,
+)
+from .blobs import BlobStore
+from .export import export_sessions
+from .fork import fork_session, fork_session_at
+from .index import SessionIndex
 from .render import render_trace_directory_markdown
 from .session import (
+    ContextIndex,
     conversation_from_entries,
     find_entry,
     find_entry_index,
@@ -14,19 +23,26 @@ from .session import (
     normalize_entries,
     rebuild_context,
 )
-from .summary import diff_events, summarize_events
+from .summary import TraceSummaryReducer, diff_events, summarize_events
 from .writer import SessionWriter, TraceWriter, load_trace_events
 
 __all__ = [
+    "BlobStore",
+    "ContextIndex",
+    "SessionIndex",
     "SessionWriter",
+    "TraceAnalysisReducer",
+    "TraceSummaryReducer",
     "TraceWriter",
     "analyze_events",
     "analyze_trace_directory",
     "conversation_from_entries",
     "diff_events",
+    "export_sessions",
     "find_entry",
     "find_entry_index",
     "fork_session",
+    "fork_session_at",
     "latest_checkpoint_entry",
     "load_session_entries",
     "load_trace_events",
@@ -34,6 +50,7 @@ __all__ = [
     "new_entry_id",
     "normalize_entries",
     "rebuild_context",
+    "reduce_trace_file",
     "render_trace_directory_markdown",
     "summarize_events",
 ]
@@ -3,40 +3,150 @@
 from __future__ import annotations
 
 import json
+import os
 from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
-from .summary import _first, _last, summarize_events
-from .writer import load_trace_events
+from .analysis_cache import AnalysisCache
+from .blobs import BlobStore
+from .compression import iter_log_entries, prefix_digest
+from .summary import TraceSummaryReducer
 
 VERIFICATION_TOOLS = {"run_python", "run_tests", "run_linter"}
+# Below this many traces to read, process start-up costs more than it saves.
+PARALLEL_MIN_TRACES = 16
 
+LatencySamples = dict[str, dict[str, list[float]]]
 
-def _hallucination_signals(events: list[dict[str, Any]]) -> dict[str, Any]:
-    """Deterministic hallucination proxies from one trace (advisory only).
 
-    These deliberately stay OUT of the trace-health score until calibrated
-    against outcomes; they are surfaced for audit and aggregation.
-    """
-    read_paths: set = set()
-    edit_without_read = 0
-    missing_path_references = 0
-    tool_call_count = 0
-    truncation_hits = 0
-    edit_guard_blocks = 0
+def _latency_samples(events: Iterable[dict[str, Any]]) -> LatencySamples:
+    """Collect per-step, per-phase and per-tool seconds from ``step_timing`` events."""
+    samples: LatencySamples = {"step": {}, "phases": {}, "tools": {}}
     for event in events:
-        name = event.get("event")
-        if name == "observation_truncated":
-            truncation_hits += 1
-            continue
-        if name == "edit_guard":
-            edit_guard_blocks += 1
-            continue
-        if name != "tool_call":
+        if event.get("event") == "step_timing":
+            _add_latency_sample(samples, event.get("payload", {}))
+    return samples
+
+
+def _add_latency_sample(samples: LatencySamples, payload: dict[str, Any]) -> None:
+    samples["step"].setdefault("total", []).append(float(payload.get("total_seconds", 0.0)))
+    for phase, seconds in (payload.get("phases") or {}).items():
+        samples["phases"].setdefault(str(phase), []).append(float(seconds))
+    for tool in payload.get("tools") or []:
+        if tool.get("cached"):
             continue
-        tool_call_count += 1
+        name = str(tool.get("action", ""))
+        samples["tools"].setdefault(name, []).append(float(tool.get("seconds", 0.0)))
+
+
+def _merge_latency_samples(target: LatencySamples, source: LatencySamples) -> None:
+    for group, series in source.items():
+        for name, values in series.items():
+            target.setdefault(group, {}).setdefault(name, []).extend(values)
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Linear-interpolated percentile of an already sorted, non-empty sequence."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def _latency_stats(values: Sequence[float]) -> dict[str, Any]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total_seconds": round(sum(ordered), 6),
+        "p50_seconds": round(percentile(ordered, 0.50), 6),
+        "p95_seconds": round(percentile(ordered, 0.95), 6),
+    }
+
+
+def _latency_summary(samples: LatencySamples) -> dict[str, Any]:
+    """p50/p95 per phase and per tool; phases are ordered by total time spent.
+
+    Phase percentiles are taken over the steps that spent time in that phase, so
+    ``count`` tells how many steps a phase actually showed up in. Cached tool calls
+    are excluded from the per-tool figures.
+    """
+    step_totals = samples.get("step", {}).get("total", [])
+
+    def by_total(series: dict[str, list[float]]) -> dict[str, dict[str, Any]]:
+        stats = {name: _latency_stats(values) for name, values in series.items() if values}
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["total_seconds"]))
+
+    return {
+        "step_count": len(step_totals),
+        "step_seconds": _latency_stats(step_totals) if step_totals else None,
+        "phases": by_total(samples.get("phases", {})),
+        "tools": by_total(samples.get("tools", {})),
+    }
+
+
+class TraceAnalysisReducer(TraceSummaryReducer):
+    """Single-pass accumulator behind :func:`analyze_events`.
+
+    Everything the analysis needs is folded in as events arrive: the first failure
+    and the failure count, whether a replan followed it, verification actions and
+    the first finish step, the hallucination proxies, and the ``step_timing``
+    samples. Step payloads are not kept by default, so memory grows only with the
+    distinct paths read, the verification actions and the latency samples (exact
+    percentiles need every sample).
+    """
+
+    def __init__(self, *, keep_steps: bool = False) -> None:
+        super().__init__(keep_steps=keep_steps)
+        self.failure_count = 0
+        self.first_failure: dict[str, Any] | None = None
+        self.replanned_after_failure = False
+        self.finish_step: int | None = None
+        self.verification_actions: list[dict[str, Any]] = []
+        self.read_paths: set[str] = set()
+        self.edit_without_read = 0
+        self.missing_path_references = 0
+        self.truncation_hits = 0
+        self.edit_guard_blocks = 0
+        self.latency: LatencySamples = {"step": {}, "phases": {}, "tools": {}}
+
+    def feed(self, event: dict[str, Any]) -> None:
+        index = self.event_count
+        super().feed(event)
+        name = event.get("event")
         payload = event.get("payload", {})
+        stage = _failure_stage(name, payload)
+        if stage is not None:
+            self.failure_count += 1
+            if self.first_failure is None:
+                self.first_failure = _failure_item(index, str(name), stage, payload)
+        if name == "replan" and self.first_failure is not None:
+            self.replanned_after_failure = True
+        elif name == "step":
+            self._note_step(payload)
+        elif name == "tool_call":
+            self._note_tool_call(payload)
+        elif name == "observation_truncated":
+            self.truncation_hits += 1
+        elif name == "edit_guard":
+            self.edit_guard_blocks += 1
+        elif name == "step_timing":
+            _add_latency_sample(self.latency, payload)
+
+    def _note_step(self, payload: dict[str, Any]) -> None:
+        step_number = int(payload.get("step_number") or self.step_count)
+        action = payload.get("action")
+        if action in {"finish", "task_complete"}:
+            self.finish_step = (
+                step_number if self.finish_step is None else min(self.finish_step, step_number)
+            )
+        if action in VERIFICATION_TOOLS:
+            self.verification_actions.append({"step_number": step_number, "action": action})
+
+    def _note_tool_call(self, payload: dict[str, Any]) -> None:
+        """Hallucination proxies; advisory only, kept out of the trace-health score."""
         action = str(payload.get("action", ""))
         action_input = payload.get("action_input")
         path = ""
@@ -48,142 +158,303 @@ def _hallucination_signals(events: list[dict[str, Any]]) -> dict[str, Any]:
         if observation.startswith(("文件 ", "路径 ")) and observation.endswith(
             ("不存在。", "不是文件。")
         ):
-            missing_path_references += 1
+            self.missing_path_references += 1
         if action in {"read_file", "search_in_file"} and path:
-            read_paths.add(path)
-        elif action == "edit_file" and path and path not in read_paths:
-            edit_without_read += 1
-    return {
-        "edit_without_read_count": edit_without_read,
-        "edit_guard_blocks": edit_guard_blocks,
-        "truncation_hits": truncation_hits,
-        "truncation_hit_rate": (truncation_hits / tool_call_count) if tool_call_count else 0.0,
-        "missing_path_reference_count": missing_path_references,
-    }
+            self.read_paths.add(path)
+        elif action == "edit_file" and path and path not in self.read_paths:
+            self.edit_without_read += 1
+
+    def hallucination_signals(self) -> dict[str, Any]:
+        tool_call_count = self.count("tool_call")
+        return {
+            "edit_without_read_count": self.edit_without_read,
+            "edit_guard_blocks": self.edit_guard_blocks,
+            "truncation_hits": self.truncation_hits,
+            "truncation_hit_rate": (
+                (self.truncation_hits / tool_call_count) if tool_call_count else 0.0
+            ),
+            "missing_path_reference_count": self.missing_path_references,
+        }
 
+    def analysis(self) -> dict[str, Any]:
+        summary = self.summary()
+        metadata = self.run_end.get("metadata", {}) if self.run_end is not None else {}
+        status = str(summary.get("status") or "")
+        failure_count = self.failure_count
+        primary_failure = self.first_failure or {}
+        replanned_after_failure = self.replanned_after_failure
+        if status == "max_steps_exceeded" and not failure_count:
+            # Running out of steps is a failure of its own; no replan can follow it.
+            failure_count = 1
+            primary_failure = {
+                "event_index": self.event_count,
+                "event": "run_end",
+                "stage": "max_steps",
+                "step_number": None,
+                "action": "",
+            }
+            replanned_after_failure = False
+        primary_stage = str(primary_failure.get("stage") or "none")
+        final_stage = _final_failure_stage(summary, primary_stage)
+        recovered = bool(failure_count and summary.get("status") == "success")
+        verification = _verification_analysis(
+            self.verification_actions, self.finish_step, summary.get("status")
+        )
+        signals = _analysis_signals(
+            primary_stage=primary_stage,
+            final_stage=final_stage,
+            verification_gap=verification["gap"],
+            replanned_after_failure=replanned_after_failure,
+            failure_count=failure_count,
+        )
+        health = _trace_health(
+            has_run_start=self.run_start is not None,
+            has_run_end=self.run_end is not None,
+            final_stage=final_stage,
+            verification_gap=verification["gap"],
+            failure_count=failure_count,
+            replanned_after_failure=replanned_after_failure,
+            metadata=metadata,
+        )
 
-def analyze_events(events: list[dict[str, Any]]) -> dict[str, Any]:
-    """Return a deterministic advisory analysis for one trace."""
+        analysis: dict[str, Any] = {
+            "run_id": summary.get("run_id", ""),
+            "task": summary.get("task", ""),
+            "status": summary.get("status", ""),
+            "primary_failure_stage": primary_stage,
+            "final_failure_stage": final_stage,
+            "signals": signals,
+            "recovery": {
+                "failure_event_count": failure_count,
+                "first_failure_step": primary_failure.get("step_number"),
+                "first_failure_event": primary_failure.get("event"),
+                "replan_count": summary.get("replan_count", 0),
+                "replanned_after_failure": replanned_after_failure,
+                "recovered": recovered,
+            },
+            "verification": verification,
+            "hallucination_signals": self.hallucination_signals(),
+            "metadata_counters": {
+                key: metadata.get(key, 0)
+                for key in (
+                    "parse_error_count",
+                    "parse_repair_count",
+                    "tool_error_count",
+                    "unknown_tool_count",
+                    "argument_error_count",
+                    "critic_reject_count",
+                    "replan_count",
+                )
+                if key in metadata
+            },
+            "trace_health": health,
+        }
+        # Traces recorded before step timing existed keep their exact report shape.
+        if self.latency["step"]:
+            analysis["latency"] = _latency_summary(self.latency)
+        return analysis
+
+    def to_state(self) -> dict[str, Any]:
+        state = super().to_state()
+        state.update(
+            {
+                "failure_count": self.failure_count,
+                "first_failure": self.first_failure,
+                "replanned_after_failure": self.replanned_after_failure,
+                "finish_step": self.finish_step,
+                "verification_actions": list(self.verification_actions),
+                "read_paths": sorted(self.read_paths),
+                "edit_without_read": self.edit_without_read,
+                "missing_path_references": self.missing_path_references,
+                "truncation_hits": self.truncation_hits,
+                "edit_guard_blocks": self.edit_guard_blocks,
+                "latency": self.latency,
+            }
+        )
+        return state
+
+    def _restore(self, state: dict[str, Any]) -> None:
+        super()._restore(state)
+        self.failure_count = int(state["failure_count"])
+        self.first_failure = state["first_failure"]
+        self.replanned_after_failure = bool(state["replanned_after_failure"])
+        finish_step = state["finish_step"]
+        self.finish_step = int(finish_step) if finish_step is not None else None
+        self.verification_actions = list(state["verification_actions"])
+        self.read_paths = set(state["read_paths"])
+        self.edit_without_read = int(state["edit_without_read"])
+        self.missing_path_references = int(state["missing_path_references"])
+        self.truncation_hits = int(state["truncation_hits"])
+        self.edit_guard_blocks = int(state["edit_guard_blocks"])
+        self.latency = {
+            group: {
+                str(name): [float(value) for value in values] for name, values in series.items()
+            }
+            for group, series in state["latency"].items()
+        }
 
-    summary = summarize_events(events)
-    run_start = _first(events, "run_start")
-    run_end = _last(events, "run_end")
-    metadata = run_end.get("payload", {}).get("metadata", {}) if run_end else {}
-    failures = _failure_events(events, summary)
-    primary_failure = failures[0] if failures else {}
-    primary_stage = str(primary_failure.get("stage") or "none")
-    final_stage = _final_failure_stage(summary, primary_stage)
-    replan_indices = [index for index, event in enumerate(events) if event.get("event") == "replan"]
-    first_failure_index = primary_failure.get("event_index")
-    replanned_after_failure = first_failure_index is not None and any(
-        index > first_failure_index for index in replan_indices
-    )
-    recovered = bool(failures and summary.get("status") == "success")
-    verification = _verification_analysis(summary)
-    signals = _analysis_signals(
-        primary_stage=primary_stage,
-        final_stage=final_stage,
-        verification_gap=verification["gap"],
-        replanned_after_failure=replanned_after_failure,
-        failure_count=len(failures),
-    )
-    health = _trace_health(
-        has_run_start=run_start is not None,
-        has_run_end=run_end is not None,
-        final_stage=final_stage,
-        verification_gap=verification["gap"],
-        failure_count=len(failures),
-        replanned_after_failure=replanned_after_failure,
-        metadata=metadata,
-    )
 
-    return {
-        "run_id": summary.get("run_id", ""),
-        "task": summary.get("task", ""),
-        "status": summary.get("status", ""),
-        "primary_failure_stage": primary_stage,
-        "final_failure_stage": final_stage,
-        "signals": signals,
-        "recovery": {
-            "failure_event_count": len(failures),
-            "first_failure_step": primary_failure.get("step_number"),
-            "first_failure_event": primary_failure.get("event"),
-            "replan_count": summary.get("replan_count", 0),
-            "replanned_after_failure": replanned_after_failure,
-            "recovered": recovered,
-        },
-        "verification": verification,
-        "hallucination_signals": _hallucination_signals(events),
-        "metadata_counters": {
-            key: metadata.get(key, 0)
-            for key in (
-                "parse_error_count",
-                "parse_repair_count",
-                "tool_error_count",
-                "unknown_tool_count",
-                "argument_error_count",
-                "critic_reject_count",
-                "replan_count",
-            )
-            if key in metadata
-        },
-        "trace_health": health,
-    }
+def analyze_events(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Return a deterministic advisory analysis for one trace."""
+    return TraceAnalysisReducer().feed_all(events).analysis()
 
 
-def analyze_trace_directory(directory: Path, *, pattern: str = "*.jsonl") -> dict[str, Any]:
-    """Analyze a directory of trace JSONL files without replaying tools."""
+def reduce_trace_file(
+    path: str | Path,
+    *,
+    state: dict[str, Any] | None = None,
+    keep_steps: bool = False,
+) -> TraceAnalysisReducer:
+    """Stream a trace file through a :class:`TraceAnalysisReducer` in one pass.
+
+    With ``state`` (from a previous call's ``to_state()``) only the bytes appended
+    since then are read. The state is ignored and the file re-read from the start
+    when it was saved by another version, or when the file has since been truncated
+    or replaced. Plain and block-compressed (``.jsonl.gz``) logs are both accepted; a
+    half-written last line is left for the next call.
+
+    Raises:
+        FileNotFoundError: the file does not exist
+        json.JSONDecodeError: a complete line is not valid JSON
+    """
+    source = Path(path)
+    reducer = _resumable_reducer(source, state)
+    if reducer is None:
+        reducer = TraceAnalysisReducer(keep_steps=keep_steps)
+    # Large strings may live in the session's blob store; resolve them per event.
+    blobs = BlobStore.for_log(source)
+    feed = (lambda event: reducer.feed(blobs.resolve(event))) if blobs.exists() else reducer.feed
+    for event, offset in iter_log_entries(source, reducer.offset):
+        feed(event)
+        reducer.offset = offset
+    reducer.prefix_sha256 = prefix_digest(source, reducer.offset)
+    return reducer
+
+
+def _resumable_reducer(source: Path, state: dict[str, Any] | None) -> TraceAnalysisReducer | None:
+    if not state:
+        return None
+    try:
+        reducer = TraceAnalysisReducer.from_state(state)
+    except ValueError:
+        return None
+    if source.stat().st_size < reducer.offset:
+        return None
+    if reducer.offset and prefix_digest(source, reducer.offset) != reducer.prefix_sha256:
+        return None
+    return reducer
+
+
+def analyze_trace_directory(
+    directory: Path,
+    *,
+    pattern: str = "*.jsonl",
+    workers: int | None = 1,
+    cache_path: str | Path | None = None,
+) -> dict[str, Any]:
+    """Analyze a directory of trace JSONL files without replaying tools.
+
+    ``workers`` > 1 (``None`` means one per CPU) reduces the traces in a process pool once
+    there are at least ``PARALLEL_MIN_TRACES`` of them to read. ``cache_path`` keeps each
+    trace's reducer state between runs (see :mod:`.analysis_cache`): unchanged traces are not
+    opened again and traces that only grew are read from where the last run stopped. The
+    report is identical either way and always ordered by path.
+    """
 
     paths = sorted(path for path in directory.glob(pattern) if path.is_file())
+    cache = AnalysisCache(cache_path) if cache_path is not None else None
+    reducers: dict[Path, TraceAnalysisReducer] = {}
+    failures: dict[Path, str] = {}
+    jobs: list[tuple[Path, os.stat_result, dict[str, Any] | None]] = []
+    for path in paths:
+        key = str(path.resolve())
+        try:
+            stat = path.stat()
+        except OSError as exc:
+            failures[path] = str(exc)
+            continue
+        state, fresh = cache.lookup(key, stat) if cache is not None else (None, False)
+        if fresh and state is not None:
+            try:
+                reducers[path] = TraceAnalysisReducer.from_state(state)
+                continue
+            except ValueError:
+                state = None
+        jobs.append((path, stat, state))
+
+    for (path, stat, _), (state, error) in zip(
+        jobs,
+        _run_reduce_jobs([(str(path), state) for path, _, state in jobs], workers),
+        strict=True,
+    ):
+        if state is None:
+            failures[path] = str(error)
+            if cache is not None:
+                cache.discard(str(path.resolve()))
+            continue
+        reducers[path] = TraceAnalysisReducer.from_state(state)
+        if cache is not None:
+            cache.store(str(path.resolve()), stat, state)
+    if cache is not None:
+        cache.prune()
+        cache.save()
+
     analyses = []
     errors = []
+    latency: LatencySamples = {}
     for path in paths:
-        try:
-            analysis = analyze_events(load_trace_events(path))
-        except (OSError, json.JSONDecodeError) as exc:
-            errors.append({"path": str(path), "error": str(exc)})
+        if path in failures:
+            errors.append({"path": str(path), "error": failures[path]})
             continue
-        analyses.append({"path": str(path), "analysis": analysis})
+        reducer = reducers[path]
+        analyses.append({"path": str(path), "analysis": reducer.analysis()})
+        _merge_latency_samples(latency, reducer.latency)
 
     return {
         "mode": "trace_directory_analysis",
         "directory": str(directory),
         "pattern": pattern,
-        "summary": _trace_directory_summary(paths, analyses, errors),
+        "summary": _trace_directory_summary(paths, analyses, errors, latency=latency),
         "analyses": analyses,
         "errors": errors,
     }
 
 
-def _failure_events(
-    events: Sequence[dict[str, Any]],
-    summary: dict[str, Any],
-) -> list[dict[str, Any]]:
-    failures: list[dict[str, Any]] = []
-    for index, event in enumerate(events):
-        name = event.get("event")
-        payload = event.get("payload", {})
-        if name == "parse_error":
-            failures.append(_failure_item(index, name, "parse", payload))
-        elif name == "llm_error":
-            failures.append(_failure_item(index, name, "llm", payload))
-        elif name == "critic_review" and not payload.get("passed", True):
-            failures.append(_failure_item(index, name, "critic", payload))
-        elif name == "tool_call" and payload.get("failed"):
-            failures.append(_failure_item(index, name, _classify_tool_failure(payload), payload))
-
-    status = str(summary.get("status") or "")
-    if status == "max_steps_exceeded" and not failures:
-        failures.append(
-            {
-                "event_index": len(events),
-                "event": "run_end",
-                "stage": "max_steps",
-                "step_number": None,
-                "action": "",
-            }
-        )
-    return failures
+def _run_reduce_jobs(
+    jobs: Sequence[tuple[str, dict[str, Any] | None]], workers: int | None
+) -> list[tuple[dict[str, Any] | None, str | None]]:
+    """Reduce each ``(path, cached state)`` job, in a process pool when it is worth it."""
+    count = workers if workers is not None else os.cpu_count() or 1
+    count = min(count, len(jobs))
+    if count <= 1 or len(jobs) < PARALLEL_MIN_TRACES:
+        return [_reduce_job(job) for job in jobs]
+    # Several traces per task so that IPC does not dominate on small files.
+    chunksize = max(1, len(jobs) // (count * 4))
+    with ProcessPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(_reduce_job, jobs, chunksize=chunksize))
+
+
+def _reduce_job(
+    job: tuple[str, dict[str, Any] | None],
+) -> tuple[dict[str, Any] | None, str | None]:
+    """Pool task: only plain JSON state crosses the process boundary."""
+    path, state = job
+    try:
+        return reduce_trace_file(path, state=state).to_state(), None
+    except (OSError, json.JSONDecodeError) as exc:
+        return None, str(exc)
+
+
+def _failure_stage(name: Any, payload: dict[str, Any]) -> str | None:
+    if name == "parse_error":
+        return "parse"
+    if name == "llm_error":
+        return "llm"
+    if name == "critic_review" and not payload.get("passed", True):
+        return "critic"
+    if name == "tool_call" and payload.get("failed"):
+        return _classify_tool_failure(payload)
+    return None
 
 
 def _failure_item(
@@ -231,22 +502,11 @@ def _final_failure_stage(summary: dict[str, Any], primary_stage: str) -> str:
     return status or "unknown"
 
 
-def _verification_analysis(summary: dict[str, Any]) -> dict[str, Any]:
-    steps = summary.get("steps", [])
-    finish_steps = [
-        int(step.get("step_number") or index + 1)
-        for index, step in enumerate(steps)
-        if step.get("action") in {"finish", "task_complete"}
-    ]
-    finish_step = min(finish_steps) if finish_steps else None
-    actions = [
-        {
-            "step_number": int(step.get("step_number") or index + 1),
-            "action": step.get("action"),
-        }
-        for index, step in enumerate(steps)
-        if step.get("action") in VERIFICATION_TOOLS
-    ]
+def _verification_analysis(
+    actions: list[dict[str, Any]],
+    finish_step: int | None,
+    status: Any,
+) -> dict[str, Any]:
     before_finish = bool(
         actions
         and (
@@ -254,9 +514,8 @@ def _verification_analysis(summary: dict[str, Any]) -> dict[str, Any]:
             or any(int(action["step_number"]) < finish_step for action in actions)
         )
     )
-    status = summary.get("status")
     return {
-        "actions": actions,
+        "actions": list(actions),
         "count": len(actions),
         "finish_step": finish_step,
         "before_finish": before_finish,
@@ -334,6 +593,8 @@ def _trace_directory_summary(
     paths: Sequence[Path],
     analyses: Sequence[dict[str, Any]],
     errors: Sequence[dict[str, Any]],
+    *,
+    latency: LatencySamples | None = None,
 ) -> dict[str, Any]:
     analysis_payloads = [item["analysis"] for item in analyses]
     runs_with_failures = [
@@ -344,7 +605,7 @@ def _trace_directory_summary(
     recovered_runs = [
         analysis for analysis in runs_with_failures if analysis.get("recovery", {}).get("recovered")
     ]
-    return {
+    summary: dict[str, Any] = {
         "total_files": len(paths),
         "analyzed_traces": len(analyses),
         "error_count": len(errors),
@@ -385,6 +646,10 @@ def _trace_directory_summary(
             analysis.get("final_failure_stage", "none") for analysis in analysis_payloads
         ),
     }
+    if latency and latency.get("step"):
+        # Percentiles must come from the pooled samples, not from per-trace percentiles.
+        summary["latency"] = _latency_summary(latency)
+    return summary
 
 
 def _count_values(values: Iterable[str]) -> dict[str, int]:
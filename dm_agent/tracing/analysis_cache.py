@@ -0,0 +1,106 @@
+"""On-disk cache of per-trace reducer states for ``analyze-dir``.
+
+Each entry is keyed by the trace's resolved path and stores the ``(size, mtime_ns)`` seen
+when it was reduced, together with the :class:`TraceAnalysisReducer` state. A later run
+reuses the entry without opening the trace when both still match. When the trace has only
+grown, the stored state lets ``reduce_trace_file`` read just the appended tail; it re-reads
+the whole file itself when the head no longer matches. Bumping ``ANALYSIS_CACHE_VERSION``
+(or the reducer's own state version) discards every entry.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Bump when the analysis output changes for the same reducer state.
+ANALYSIS_CACHE_VERSION = 1
+
+
+@dataclass
+class CachedTrace:
+    size: int
+    mtime_ns: int
+    state: dict[str, Any]
+
+
+class AnalysisCache:
+    """Per-trace reducer states persisted as one JSON file.
+
+    Loading never fails: a missing, unreadable or foreign-version file starts an empty
+    cache. ``save`` writes atomically and only reports an error; the analysis itself is
+    unaffected.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, CachedTrace] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str, stat: os.stat_result) -> tuple[dict[str, Any] | None, bool]:
+        """Return ``(state, fresh)``; ``fresh`` means size and mtime both still match."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            self.hits += 1
+            return entry.state, True
+        self.misses += 1
+        return entry.state, False
+
+    def store(self, key: str, stat: os.stat_result, state: dict[str, Any]) -> None:
+        self._entries[key] = CachedTrace(stat.st_size, stat.st_mtime_ns, state)
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def prune(self) -> int:
+        """Drop entries whose trace file no longer exists; return how many were dropped."""
+        stale = [key for key in self._entries if not os.path.exists(key)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def save(self) -> None:
+        payload = {
+            "version": ANALYSIS_CACHE_VERSION,
+            "entries": {
+                key: {"size": entry.size, "mtime_ns": entry.mtime_ns, "state": entry.state}
+                for key, entry in self._entries.items()
+            },
+        }
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"[warn] could not write analysis cache {self.path}: {exc}")
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != ANALYSIS_CACHE_VERSION:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return
+        for key, raw in entries.items():
+            try:
+                state = raw["state"]
+                if not isinstance(state, dict):
+                    continue
+                self._entries[str(key)] = CachedTrace(int(raw["size"]), int(raw["mtime_ns"]), state)
+            except (KeyError, TypeError, ValueError):
+                continue
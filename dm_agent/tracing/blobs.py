@@ -0,0 +1,170 @@
+"""会话日志的内容寻址 blob 仓库：大字符串只存一份。
+
+同一份文件内容每步会被记三遍（``tool_call`` 的观察、``step`` 的观察、包着它的
+``message`` 条目），模型每重读一次又是三遍。``TraceWriter(blob_threshold=N)``
+把 payload 里超过 N 个字符的字符串移进日志旁边的 ``<log>.blobs/`` 目录：
+
+- 文件名是内容的 sha256，内容是一个 gzip member（``zcat`` 可直接看）；同一内容
+  只写一次，天然去重；
+- 条目里原来的字符串换成 ``{"$blob": "<sha256>", "chars": N}`` 引用。
+
+读侧默认透明：``load_session_entries`` / ``load_trace_events`` /
+``SessionIndex.entries`` / ``reduce_trace_file`` / server 的 SSE 跟读按需把引用
+换回原文，只读被读到的条目所引用的 blob，并缓存最近用过的。需要原样引用的调用方
+传 ``resolve_blobs=False``，之后可用 ``rebuild_context(blobs=...)`` 只解析最终窗口
+里的消息。脱敏在外置之前完成，分享档的 blob 同样是脱敏后的内容。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, TypeGuard
+
+from .compression import compress_block, decompress_member
+
+BLOB_KEY = "$blob"
+BLOB_DIR_SUFFIX = ".blobs"
+# 文档推荐的阈值：比典型的短观察长、比一次 read_file 的结果短。
+DEFAULT_BLOB_THRESHOLD = 2048
+# 每个仓库缓存的已解压 blob 数；同一份文件内容常在相邻条目里反复出现。
+BLOB_CACHE_SIZE = 64
+
+
+def blob_dir_for(path: str | Path) -> Path:
+    """``run.jsonl`` -> ``run.jsonl.blobs``（压缩日志同理）。"""
+    log = Path(path)
+    return log.with_name(f"{log.name}{BLOB_DIR_SUFFIX}")
+
+
+def is_blob_ref(value: Any) -> TypeGuard[dict[str, Any]]:
+    return isinstance(value, dict) and isinstance(value.get(BLOB_KEY), str)
+
+
+def blob_placeholder(ref: dict[str, Any]) -> str:
+    """没有仓库可解析时的占位，与脱敏消息的 ``<redacted:...>`` 同一口径。"""
+    return f"<blob:{ref.get('chars', 0)}chars:{str(ref.get(BLOB_KEY, ''))[:16]}>"
+
+
+class BlobStore:
+    """一个会话日志旁的 blob 目录。
+
+    Args:
+        root: blob 目录（通常由 :meth:`for_log` 推出）
+        fsync: 写 blob 时是否 ``fsync``——引用它的条目按 fsync 策略落盘时，blob
+            必须先于条目持久化
+    """
+
+    def __init__(self, root: str | Path, *, fsync: bool = False) -> None:
+        self.root = Path(root)
+        self.fsync = fsync
+        self.written = 0
+        self.reused = 0
+        self._known: set[str] = set()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+    @classmethod
+    def for_log(cls, path: str | Path, *, fsync: bool = False) -> BlobStore:
+        return cls(blob_dir_for(path), fsync=fsync)
+
+    def exists(self) -> bool:
+        return self.root.is_dir()
+
+    def put(self, text: str) -> dict[str, Any]:
+        """存入一段文本（已存在则不重写），返回引用。"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._known or (self.root / digest).exists():
+            self._known.add(digest)
+            self.reused += 1
+            return {BLOB_KEY: digest, "chars": len(text)}
+        self.root.mkdir(parents=True, exist_ok=True)
+        target = self.root / digest
+        tmp_path = target.with_name(f"{digest}.tmp-{os.getpid()}")
+        try:
+            with tmp_path.open("wb") as handle:
+                handle.write(compress_block(data))
+                if self.fsync:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            os.replace(tmp_path, target)
+        except OSError:
+            with contextlib.suppress(OSError):
+                tmp_path.unlink()
+            raise
+        self._known.add(digest)
+        self.written += 1
+        return {BLOB_KEY: digest, "chars": len(text)}
+
+    def get(self, digest: str) -> str:
+        """读出一个 blob 的原文。
+
+        Raises:
+            FileNotFoundError: blob 不存在
+            gzip.BadGzipFile: blob 已损坏
+        """
+        cached = self._cache.get(digest)
+        if cached is not None:
+            self._cache.move_to_end(digest)
+            return cached
+        if not digest or any(char not in "0123456789abcdef" for char in digest):
+            raise FileNotFoundError(f"Invalid blob reference: {digest!r}")
+        text = decompress_member((self.root / digest).read_bytes()).decode("utf-8")
+        self._cache[digest] = text
+        if len(self._cache) > BLOB_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return text
+
+    def externalize(self, value: Any, threshold: int) -> Any:
+        """把 ``value`` 里长于 ``threshold`` 的字符串换成引用；容器只在有改动时复制。"""
+        if isinstance(value, str):
+            return self.put(value) if len(value) > threshold else value
+        if isinstance(value, dict):
+            changed = {key: self.externalize(item, threshold) for key, item in value.items()}
+            return changed if any(changed[key] is not value[key] for key in value) else value
+        if isinstance(value, list):
+            items = [self.externalize(item, threshold) for item in value]
+            return (
+                items
+                if any(new is not old for new, old in zip(items, value, strict=True))
+                else value
+            )
+        return value
+
+    def resolve(self, value: Any, *, strict: bool = False) -> Any:
+        """把引用换回原文。
+
+        ``strict=False`` 时缺失或损坏的 blob 换成占位串（查看类工具照常可用）；
+        ``strict=True`` 时抛 ``OSError``——续跑不能带着占位继续。
+        """
+        if isinstance(value, dict):
+            if is_blob_ref(value):
+                try:
+                    return self.get(value[BLOB_KEY])
+                except OSError:
+                    if strict:
+                        raise
+                    return blob_placeholder(value)
+            resolved = {key: self.resolve(item, strict=strict) for key, item in value.items()}
+            return resolved if any(resolved[key] is not value[key] for key in value) else value
+        if isinstance(value, list):
+            items = [self.resolve(item, strict=strict) for item in value]
+            return (
+                items
+                if any(new is not old for new, old in zip(items, value, strict=True))
+                else value
+            )
+        return value
+
+
+def resolve_entries(
+    entries: list[dict[str, Any]], path: str | Path, *, strict: bool = False
+) -> list[dict[str, Any]]:
+    """按 ``path`` 旁的 blob 目录解析一批条目；目录不存在时原样返回（零开销）。"""
+    store = BlobStore.for_log(path)
+    if not store.exists():
+        return entries
+    return [store.resolve(entry, strict=strict) for entry in entries]
@@ -8,8 +8,15 @@ import sys
 from pathlib import Path
 from typing import Any
 
-from .analysis import analyze_events, analyze_trace_directory
+from .analysis import (
+    TraceAnalysisReducer,
+    analyze_events,
+    analyze_trace_directory,
+    reduce_trace_file,
+)
+from .export import DEFAULT_QUERY_LIMIT, REPORTS, _export, _query
 from .fork import _fork, fork_session
+from .index import SessionIndex
 from .render import _analyze, _analyze_dir, _diff, _view, render_trace_directory_markdown
 from .replay import _replay, replay_tools
 from .summary import diff_events, summarize_events
@@ -62,6 +69,14 @@ def parse_args(argv: Any = None) -> argparse.Namespace:
     )
     analyze_parser.add_argument("trace", type=Path, help="Path to a JSONL trace file.")
     analyze_parser.add_argument("--json", action="store_true", help="Print analysis as JSON.")
+    analyze_parser.add_argument(
+        "--state",
+        type=Path,
+        help=(
+            "Reducer state file. When it exists, only lines appended since the saved "
+            "state are read; the updated state is written back after the analysis."
+        ),
+    )
 
     analyze_dir_parser = subparsers.add_parser(
         "analyze-dir",
@@ -74,6 +89,20 @@ def parse_args(argv: Any = None) -> argparse.Namespace:
         help="Glob pattern relative to the directory. Default: *.jsonl.",
     )
     analyze_dir_parser.add_argument("--json", action="store_true", help="Print analysis as JSON.")
+    analyze_dir_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to read traces. Default: one per CPU; 1 reads serially.",
+    )
+    analyze_dir_parser.add_argument(
+        "--cache",
+        type=Path,
+        help=(
+            "Keep per-trace analysis state in this JSON file; reruns skip unchanged traces "
+            "and read only the appended tail of grown ones."
+        ),
+    )
     analyze_dir_parser.add_argument(
         "--markdown",
         type=Path,
@@ -102,6 +131,56 @@ def parse_args(argv: Any = None) -> argparse.Namespace:
         help="Destination file. Defaults to <session>.fork-<entry-id>.jsonl next to the source.",
     )
     fork_parser.add_argument("--json", action="store_true", help="Print fork result as JSON.")
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Ingest session logs into a SQLite database for cross-run queries.",
+    )
+    export_parser.add_argument(
+        "sources",
+        type=Path,
+        nargs="+",
+        help="Session files or directories of session files.",
+    )
+    export_parser.add_argument(
+        "--sqlite",
+        type=Path,
+        required=True,
+        metavar="DB",
+        help=(
+            "Database to create or update. Unchanged files are skipped and grown files are "
+            "read from where the previous export stopped."
+        ),
+    )
+    export_parser.add_argument(
+        "--pattern",
+        default="*.jsonl",
+        help="Glob pattern for files inside directory sources. Default: *.jsonl.",
+    )
+    export_parser.add_argument("--json", action="store_true", help="Print export result as JSON.")
+
+    query_parser = subparsers.add_parser(
+        "query",
+        help="Run a canned performance report against an exported database.",
+    )
+    query_parser.add_argument("database", type=Path, help="Database written by export --sqlite.")
+    query_parser.add_argument(
+        "report",
+        nargs="?",
+        choices=sorted(REPORTS),
+        help="Report to run. Omit to list the reports.",
+    )
+    query_parser.add_argument(
+        "--sql",
+        help="Run this read-only SQL instead of a canned report (percentile(x, 0.95) available).",
+    )
+    query_parser.add_argument(
+        "--limit",
+        type=int,
+        default=DEFAULT_QUERY_LIMIT,
+        help=f"Maximum rows per report. Default: {DEFAULT_QUERY_LIMIT}.",
+    )
+    query_parser.add_argument("--json", action="store_true", help="Print rows as JSON.")
     return parser.parse_args(argv)
 
 
@@ -125,16 +204,18 @@ def main(argv: Any = None) -> int:
             as_json=args.json,
         )
     if args.command == "analyze":
-        events = _load_trace_for_cli(args.trace)
-        if events is None:
+        reducer = _reduce_trace_for_cli(args.trace, state_path=args.state)
+        if reducer is None:
             return 2
-        return _analyze(events, as_json=args.json)
+        return _analyze(reducer.analysis(), as_json=args.json)
     if args.command == "analyze-dir":
         return _analyze_dir(
             args.directory,
             pattern=args.pattern,
             as_json=args.json,
             markdown_path=args.markdown,
+            workers=args.workers,
+            cache_path=args.cache,
         )
     if args.command == "diff":
         base_events = _load_trace_for_cli(args.base_trace)
@@ -143,16 +224,26 @@ def main(argv: Any = None) -> int:
             return 2
         return _diff(base_events, candidate_events, as_json=args.json)
     if args.command == "fork":
-        events = _load_trace_for_cli(args.session)
-        if events is None:
+        index = _load_index_for_cli(args.session)
+        if index is None:
             return 2
         return _fork(
-            events,
+            index,
             source=args.session,
             at=args.at,
             output=args.output,
             as_json=args.json,
         )
+    if args.command == "export":
+        return _export(args.sources, database=args.sqlite, pattern=args.pattern, as_json=args.json)
+    if args.command == "query":
+        return _query(
+            args.database,
+            report=args.report,
+            sql=args.sql,
+            limit=args.limit,
+            as_json=args.json,
+        )
     return 2
 
 
@@ -167,5 +258,45 @@ def _load_trace_for_cli(path: Path) -> list[dict[str, Any]] | None:
         return None
 
 
+def _reduce_trace_for_cli(path: Path, *, state_path: Path | None) -> TraceAnalysisReducer | None:
+    """``analyze`` streams the trace in one pass instead of materializing every event."""
+    state = _read_state(state_path) if state_path is not None else None
+    try:
+        reducer = reduce_trace_file(path, state=state)
+    except FileNotFoundError:
+        print(f"Trace not found: {path}", file=sys.stderr)
+        return None
+    except json.JSONDecodeError as exc:
+        print(f"Invalid trace JSONL: {exc}", file=sys.stderr)
+        return None
+    if state_path is not None:
+        try:
+            state_path.parent.mkdir(parents=True, exist_ok=True)
+            state_path.write_text(json.dumps(reducer.to_state(), ensure_ascii=False), "utf-8")
+        except OSError as exc:
+            print(f"Could not save reducer state: {exc}", file=sys.stderr)
+    return reducer
+
+
+def _read_state(path: Path) -> dict[str, Any] | None:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def _load_index_for_cli(path: Path) -> SessionIndex | None:
+    """``fork`` 只需定位分叉点并读出它之前的条目，走字节偏移索引。"""
+    try:
+        return SessionIndex.load(path)
+    except FileNotFoundError:
+        print(f"Trace not found: {path}", file=sys.stderr)
+        return None
+    except json.JSONDecodeError as exc:
+        print(f"Invalid trace JSONL: {exc}", file=sys.stderr)
+        return None
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,215 @@
+"""Block-compressed session logs (``*.jsonl.gz``).
+
+``TraceWriter`` 写 ``.gz`` 路径时，每次组提交都追加一个**独立的 gzip member**：
+多 member 的 gzip 文件是标准格式（``zcat`` / ``gzip.open`` 直接可读），而且每个
+member 都能单独解压，所以仍在写的文件也能边写边读——读侧只解完整的 member，
+结尾写到一半的那个留到下一轮。一个 member 总是以整行结尾，块边界就是行边界。
+
+读侧一律按魔数识别，不看后缀：``load_session_entries`` / ``load_trace_events`` /
+server 的 SSE 跟读与 ``run_end`` 计数对两种格式透明。
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+GZIP_MAGIC = b"\x1f\x8b"
+COMPRESSED_SUFFIX = ".gz"
+# 会话日志认可的文件名后缀（明文与块压缩两种）。
+SESSION_LOG_SUFFIXES = (".jsonl", ".jsonl.gz")
+# 组提交一般只有几 KB 到几百 KB，6 级在体积与 CPU 之间够均衡。
+COMPRESS_LEVEL = 6
+# 流式读取时每次从磁盘读入的原始字节数。
+READ_CHUNK_BYTES = 1 << 20
+# 解一个 member 时第一次喂给解码器的最少字节数，没解完就翻倍再喂。
+MIN_FEED_BYTES = 1024
+# 增量读取者保存的「文件指纹」只摘要开头这么多原始字节，用来识别截断或替换。
+PREFIX_DIGEST_BYTES = 4096
+
+
+def is_compressed_path(path: str | Path) -> bool:
+    """按后缀判断写侧是否应写块压缩格式。"""
+    return str(path).lower().endswith(COMPRESSED_SUFFIX)
+
+
+def is_session_log_path(path: str | Path) -> bool:
+    """``*.jsonl`` 或 ``*.jsonl.gz``：会话日志形态（而不是单文件 JSON 快照）。"""
+    return str(path).lower().endswith(SESSION_LOG_SUFFIXES)
+
+
+def compress_block(data: bytes) -> bytes:
+    """把一批完整的行压成一个独立的 gzip member（mtime 固定为 0，输出可复现）。"""
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def decode_members(data: bytes) -> tuple[bytes, int]:
+    """解出 ``data`` 里全部完整的 member，返回 ``(明文, 消耗的字节数)``。
+
+    结尾不完整的 member（写侧正写到一半）不计入消耗，调用方下次从那里接着读。
+
+    Raises:
+        gzip.BadGzipFile: 数据不是 gzip（``OSError`` 的子类，与读文件失败同路处理）
+    """
+    chunks: list[bytes] = []
+    consumed = 0
+    for offset, length, chunk in iter_members(data):
+        chunks.append(chunk)
+        consumed = offset + length
+    return b"".join(chunks), consumed
+
+
+def iter_members(data: bytes) -> Iterator[tuple[int, int, bytes]]:
+    """逐个解出完整的 member，产出 ``(原始偏移, 原始长度, 明文)``；不完整的结尾不产出。
+
+    字节偏移索引靠它记下每个 member 的位置：读某一条只需解它所在的那一个 member。
+
+    解码器不能一次拿到剩余的全部字节：member 结束时 ``unused_data`` 会把余下部分整份
+    复制出来，成千上万个小 member（逐条组提交的日志）就成了平方级。这里按片喂，片长
+    从上一个 member 的两倍起步、不够再翻倍，每个 member 的复制量与它自身同阶。
+    """
+    view = memoryview(data)
+    total = len(data)
+    consumed = 0
+    feed = MIN_FEED_BYTES
+    while consumed < total:
+        decoder = zlib.decompressobj(wbits=31)
+        parts: list[bytes] = []
+        position = consumed
+        size = feed
+        while not decoder.eof and position < total:
+            piece = view[position : position + size]
+            try:
+                parts.append(decoder.decompress(piece))
+            except zlib.error as exc:
+                raise gzip.BadGzipFile(f"corrupt gzip member at byte {consumed}: {exc}") from exc
+            position += len(piece)
+            size *= 2
+        if not decoder.eof:
+            return
+        length = position - len(decoder.unused_data) - consumed
+        yield consumed, length, b"".join(parts)
+        consumed += length
+        # 同一份日志里的 member 大小相近。
+        feed = max(MIN_FEED_BYTES, 2 * length)
+
+
+def decompress_member(data: bytes) -> bytes:
+    """解一个完整的 member（按索引记录读回的单个块）。"""
+    decoder = zlib.decompressobj(wbits=31)
+    try:
+        chunk = decoder.decompress(data)
+    except zlib.error as exc:
+        raise gzip.BadGzipFile(f"corrupt gzip member: {exc}") from exc
+    if not decoder.eof:
+        raise gzip.BadGzipFile("truncated gzip member")
+    return chunk
+
+
+def read_log_bytes(path: str | Path) -> bytes:
+    """读出整份会话日志的明文字节（压缩格式解完整 member，明文原样返回）。"""
+    raw = Path(path).read_bytes()
+    if raw.startswith(GZIP_MAGIC) or (raw and is_compressed_path(path)):
+        return decode_members(raw)[0]
+    return raw
+
+
+def read_log_text(path: str | Path) -> str:
+    return read_log_bytes(path).decode("utf-8")
+
+
+def read_appended(path: str | Path, offset: int) -> tuple[bytes, int]:
+    """从原始字节偏移 ``offset`` 起读出新增的明文，返回 ``(明文, 新偏移)``。
+
+    明文日志原样返回新增字节（可能以半行结尾，由调用方处理）；压缩日志只返回完整
+    member 的内容，新偏移停在 member 边界上。
+    """
+    with Path(path).open("rb") as handle:
+        head = handle.read(len(GZIP_MAGIC))
+        handle.seek(offset)
+        data = handle.read()
+    if head == GZIP_MAGIC or is_compressed_path(path):
+        if len(head) < len(GZIP_MAGIC):
+            return b"", offset  # 魔数都还没写全
+        plain, consumed = decode_members(data)
+        return plain, offset + consumed
+    return data, offset + len(data)
+
+
+def iter_log_blocks(
+    path: str | Path, offset: int = 0, *, chunk_size: int = READ_CHUNK_BYTES
+) -> Iterator[tuple[bytes, int]]:
+    """从原始字节偏移 ``offset`` 起流式读出明文，产出 ``(明文块, 该块之后的原始偏移)``。
+
+    明文日志按 ``chunk_size`` 切块（块边界可能落在行中间，由调用方拼接）；压缩日志
+    每块是一个完整 member 的明文，结尾不完整的 member 不产出。内存占用只与块大小
+    有关，与文件大小无关。
+    """
+    with Path(path).open("rb") as handle:
+        head = handle.read(len(GZIP_MAGIC))
+        handle.seek(offset)
+        if not (head == GZIP_MAGIC or is_compressed_path(path)):
+            while chunk := handle.read(chunk_size):
+                offset += len(chunk)
+                yield chunk, offset
+            return
+        # 缓冲里只留结尾不完整的那个 member；其余按偏移交给 iter_members，不复制剩余字节。
+        buffer = b""
+        want = chunk_size
+        while True:
+            data = handle.read(want)
+            if not data:
+                return
+            buffer = buffer + data if buffer else data
+            consumed = 0
+            for _start, length, chunk in iter_members(buffer):
+                consumed += length
+                yield chunk, offset + consumed
+            offset += consumed
+            buffer = buffer[consumed:]
+            # 一整块里没有完整 member（单个 member 比块还大）：下次读的量翻倍，重解总量仍是线性。
+            want = chunk_size if consumed else max(chunk_size, len(buffer))
+
+
+def iter_log_entries(
+    path: str | Path, offset: int = 0, *, chunk_size: int = READ_CHUNK_BYTES
+) -> Iterator[tuple[Any, int]]:
+    """从原始字节偏移 ``offset`` 起逐条解析 JSONL，产出 ``(条目, 可续读的原始偏移)``。
+
+    偏移是消费完这一条之后可以安全续读的位置：块内最后一条推进到块尾，其余停在块首
+    （从那里续读不漏条目，但会重放同块里已读过的几条）。增量读取者读完后保存最后一次
+    拿到的偏移即可。结尾解析不了的半行视为仍在写入，不产出，留到下一次。
+
+    Raises:
+        json.JSONDecodeError: 某个完整行不是合法 JSON
+    """
+    carry = b""
+    for block, end in iter_log_blocks(path, offset, chunk_size=chunk_size):
+        data = carry + block
+        cut = data.rfind(b"\n") + 1
+        carry = data[cut:]
+        lines = [line for line in data[:cut].split(b"\n") if line.strip()]
+        for position, line in enumerate(lines, start=1):
+            yield json.loads(line), (end - len(carry) if position == len(lines) else offset)
+        offset = end - len(carry)
+    if carry.strip():
+        try:
+            entry = json.loads(carry)
+        except ValueError:
+            return  # 还在写，下一次再读
+        yield entry, offset + len(carry)
+
+
+def prefix_digest(path: str | Path, offset: int) -> str:
+    """日志开头 ``min(offset, PREFIX_DIGEST_BYTES)`` 个原始字节的 SHA-256。
+
+    与续读偏移一起保存；下次续读前重算，对不上说明文件被截断或替换，应从头重读。
+    """
+    with Path(path).open("rb") as handle:
+        head = handle.read(min(offset, PREFIX_DIGEST_BYTES))
+    return hashlib.sha256(head).hexdigest()
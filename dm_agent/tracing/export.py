@@ -0,0 +1,739 @@
+"""Incremental SQLite export of session logs and canned performance reports.
+
+``analyze-dir`` answers "what happened in these traces" by re-reading JSONL. Questions
+across tens of thousands of runs ("p95 tokens per successful run by model", "which tools
+fail most") are joins and aggregates, so ``dm-agent-trace export --sqlite DB`` ingests
+sessions into normalized tables once and ``dm-agent-trace query DB REPORT`` answers them
+from indexes in seconds.
+
+Ingest is incremental per file. The ``sessions`` table remembers each log's size, mtime,
+byte offset and a digest of its head: unchanged files are skipped without being opened,
+grown files are read from the stored offset, and truncated or replaced files have their
+rows dropped and are ingested again. Event rows are keyed by ``(session_id, entry_id)``,
+so re-reading a line never duplicates it. Large strings kept in a blob store are never
+read; only their recorded length is stored.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from .analysis import percentile
+from .blobs import BlobStore, is_blob_ref
+from .compression import iter_log_entries, prefix_digest
+from .session import LEGACY_ID_PREFIX
+
+# Bump when the tables change; an older database is rebuilt from the logs on next export.
+EXPORT_SCHEMA_VERSION = 2
+# Row limit for reports that list individual items rather than groups.
+DEFAULT_QUERY_LIMIT = 20
+
+_TABLES = ("sessions", "runs", "steps", "tool_calls", "llm_calls", "compactions")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL DEFAULT 0,
+    offset INTEGER NOT NULL DEFAULT 0,
+    prefix_sha256 TEXT NOT NULL DEFAULT '',
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    provider TEXT,
+    model TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    session_id INTEGER NOT NULL,
+    run_id TEXT NOT NULL,
+    task TEXT,
+    provider TEXT,
+    model TEXT,
+    started_at TEXT,
+    ended_at TEXT,
+    status TEXT,
+    duration_seconds REAL,
+    failure_reason TEXT,
+    PRIMARY KEY (session_id, run_id)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    session_id INTEGER NOT NULL,
+    run_id TEXT NOT NULL,
+    step_number INTEGER NOT NULL,
+    entry_id TEXT,
+    action TEXT,
+    total_seconds REAL,
+    phases TEXT,
+    PRIMARY KEY (session_id, run_id, step_number)
+);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    session_id INTEGER NOT NULL,
+    entry_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    step_number INTEGER,
+    action TEXT,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cached INTEGER NOT NULL DEFAULT 0,
+    observation_chars INTEGER,
+    seconds REAL,
+    PRIMARY KEY (session_id, entry_id)
+);
+CREATE TABLE IF NOT EXISTS llm_calls (
+    session_id INTEGER NOT NULL,
+    entry_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    step_number INTEGER,
+    timestamp TEXT,
+    prompt_chars INTEGER,
+    estimated_prompt_tokens INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER,
+    total_tokens INTEGER,
+    usage_source TEXT,
+    time_to_first_token_seconds REAL,
+    time_to_action_seconds REAL,
+    PRIMARY KEY (session_id, entry_id)
+);
+CREATE TABLE IF NOT EXISTS compactions (
+    session_id INTEGER NOT NULL,
+    entry_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    step_number INTEGER,
+    phase TEXT,
+    trigger TEXT,
+    reused INTEGER NOT NULL DEFAULT 0,
+    folded_message_count INTEGER,
+    kept_message_count INTEGER,
+    tokens_before INTEGER,
+    tokens_after INTEGER,
+    PRIMARY KEY (session_id, entry_id)
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (provider, model, status);
+CREATE INDEX IF NOT EXISTS steps_run ON steps (session_id, run_id);
+CREATE INDEX IF NOT EXISTS tool_calls_action ON tool_calls (action, failed);
+CREATE INDEX IF NOT EXISTS tool_calls_step ON tool_calls (session_id, run_id, step_number);
+CREATE INDEX IF NOT EXISTS llm_calls_run ON llm_calls (session_id, run_id);
+CREATE INDEX IF NOT EXISTS compactions_run ON compactions (session_id, run_id);
+"""
+
+
+class _Percentile:
+    """SQLite aggregate ``percentile(value, fraction)``; NULL values are ignored."""
+
+    def __init__(self) -> None:
+        self.values: list[float] = []
+        self.fraction = 0.5
+
+    def step(self, value: Any, fraction: Any) -> None:
+        if value is not None:
+            self.values.append(float(value))
+            self.fraction = float(fraction)
+
+    def finalize(self) -> float | None:
+        if not self.values:
+            return None
+        return round(percentile(sorted(self.values), self.fraction), 6)
+
+
+def connect_database(path: str | Path, *, readonly: bool = False) -> sqlite3.Connection:
+    """Open an export database with the ``percentile`` aggregate registered.
+
+    A writable connection creates the tables, and drops and recreates them when the
+    database was written by another schema version (it is derived data). A read-only
+    connection never changes the file.
+
+    Raises:
+        sqlite3.Error: the file cannot be opened, or is not a database
+    """
+    if readonly:
+        uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(path))
+    connection.row_factory = sqlite3.Row
+    connection.create_aggregate("percentile", 2, _Percentile)  # type: ignore[arg-type]
+    if readonly:
+        return connection
+    # One commit per file: WAL without a full fsync per commit keeps that cheap, and a
+    # crash can only lose the last files, which the next export reads again.
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != EXPORT_SCHEMA_VERSION:
+        with connection:
+            for table in _TABLES:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+    connection.executescript(_SCHEMA)
+    connection.execute(f"PRAGMA user_version = {EXPORT_SCHEMA_VERSION}")
+    return connection
+
+
+def export_sessions(paths: Iterable[str | Path], database: str | Path) -> dict[str, Any]:
+    """Ingest session logs into ``database``; return file and entry counts plus per-file errors.
+
+    Each file is committed on its own, so an interrupted export keeps everything ingested
+    so far and the next one picks up from there.
+    """
+    result: dict[str, Any] = {
+        "database": str(database),
+        "files": 0,
+        "skipped": 0,
+        "reset": 0,
+        "entries": 0,
+        "errors": [],
+    }
+    connection = connect_database(database)
+    try:
+        for path in paths:
+            result["files"] += 1
+            try:
+                outcome, entries = ingest_session(connection, path)
+            except (OSError, ValueError) as exc:
+                connection.rollback()
+                result["errors"].append({"path": str(path), "error": str(exc)})
+                continue
+            result["entries"] += entries
+            if outcome == "skipped":
+                result["skipped"] += 1
+            elif outcome == "reset":
+                result["reset"] += 1
+    finally:
+        connection.close()
+    return result
+
+
+def ingest_session(connection: sqlite3.Connection, path: str | Path) -> tuple[str, int]:
+    """Bring one log's rows up to date; return ``(outcome, entries read)``.
+
+    ``outcome`` is ``"skipped"`` (size and mtime unchanged), ``"appended"`` (read from the
+    stored offset, including a first ingest) or ``"reset"`` (the file was truncated or
+    replaced; its old rows were dropped and it was read from the start).
+
+    Raises:
+        OSError: the file cannot be read
+        ValueError: a complete line is not valid JSON
+    """
+    source = Path(path)
+    stat = source.stat()
+    key = str(source.resolve())
+    row = connection.execute("SELECT * FROM sessions WHERE path = ?", (key,)).fetchone()
+    if row is None:
+        cursor = connection.execute("INSERT INTO sessions (path) VALUES (?)", (key,))
+        session = _SessionState(int(cursor.lastrowid or 0))
+        outcome = "appended"
+    else:
+        if row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            return "skipped", 0
+        session = _SessionState(
+            row["id"],
+            offset=row["offset"],
+            entry_count=row["entry_count"],
+            provider=row["provider"],
+            model=row["model"],
+        )
+        outcome = "appended"
+        if stat.st_size < session.offset or (
+            session.offset and prefix_digest(source, session.offset) != row["prefix_sha256"]
+        ):
+            for table in _TABLES[1:]:
+                connection.execute(f"DELETE FROM {table} WHERE session_id = ?", (session.id,))
+            session = _SessionState(session.id)
+            outcome = "reset"
+
+    blobs = BlobStore.for_log(source)
+    ingest = _EntryIngest(connection, session, blobs if blobs.exists() else None)
+    start = session.entry_count
+    for entry, offset in iter_log_entries(source, session.offset):
+        ingest.feed(entry)
+        session.offset = offset
+    connection.execute(
+        "UPDATE sessions SET size = ?, mtime_ns = ?, offset = ?, prefix_sha256 = ?,"
+        " entry_count = ?, provider = ?, model = ? WHERE id = ?",
+        (
+            stat.st_size,
+            stat.st_mtime_ns,
+            session.offset,
+            prefix_digest(source, session.offset),
+            session.entry_count,
+            session.provider,
+            session.model,
+            session.id,
+        ),
+    )
+    connection.commit()
+    return outcome, session.entry_count - start
+
+
+class _SessionState:
+    """What ingest needs to carry between exports of one growing log."""
+
+    def __init__(
+        self,
+        session_id: int,
+        *,
+        offset: int = 0,
+        entry_count: int = 0,
+        provider: str | None = None,
+        model: str | None = None,
+    ) -> None:
+        self.id = session_id
+        self.offset = offset
+        self.entry_count = entry_count
+        # The latest ``runtime`` entry; runs started after it inherit provider/model.
+        self.provider = provider
+        self.model = model
+
+
+class _EntryIngest:
+    """Turns session entries into rows, one ``feed`` per entry."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        session: _SessionState,
+        blobs: BlobStore | None,
+    ) -> None:
+        self.connection = connection
+        self.session = session
+        self.blobs = blobs
+        self._handlers: dict[str, Callable[[str, str, dict[str, Any], dict[str, Any]], None]] = {
+            "runtime": self._runtime,
+            "run_start": self._run_start,
+            "run_end": self._run_end,
+            "step": self._step,
+            "step_timing": self._step_timing,
+            "tool_call": self._tool_call,
+            "llm_call": self._llm_call,
+            "compaction": self._compaction,
+        }
+
+    def feed(self, entry: Any) -> None:
+        if not isinstance(entry, dict):
+            raise ValueError("Session log line is not a JSON object.")
+        session = self.session
+        entry_id = str(entry.get("id") or f"{LEGACY_ID_PREFIX}{session.entry_count:04d}")
+        session.entry_count += 1
+        handler = self._handlers.get(str(entry.get("event", "")))
+        if handler is None:
+            return
+        payload = entry.get("payload")
+        handler(
+            entry_id,
+            str(entry.get("run_id") or ""),
+            payload if isinstance(payload, dict) else {},
+            entry,
+        )
+
+    def _runtime(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        self.session.provider = _optional_str(payload.get("provider"))
+        self.session.model = _optional_str(payload.get("model"))
+
+    def _run_start(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        self.connection.execute(
+            "INSERT INTO runs (session_id, run_id, task, provider, model, started_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (session_id, run_id) DO UPDATE SET task = excluded.task,"
+            " provider = excluded.provider, model = excluded.model,"
+            " started_at = excluded.started_at",
+            (
+                self.session.id,
+                run_id,
+                self._text(payload.get("task")),
+                self.session.provider,
+                self.session.model,
+                _optional_str(entry.get("timestamp")),
+            ),
+        )
+
+    def _run_end(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        metadata = payload.get("metadata")
+        metadata = metadata if isinstance(metadata, dict) else {}
+        self.connection.execute(
+            "INSERT INTO runs (session_id, run_id, provider, model, ended_at, status,"
+            " duration_seconds, failure_reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (session_id, run_id) DO UPDATE SET ended_at = excluded.ended_at,"
+            " status = excluded.status, duration_seconds = excluded.duration_seconds,"
+            " failure_reason = excluded.failure_reason",
+            (
+                self.session.id,
+                run_id,
+                self.session.provider,
+                self.session.model,
+                _optional_str(entry.get("timestamp")),
+                _optional_str(payload.get("status")),
+                _optional_float(payload.get("duration_seconds")),
+                self._text(metadata.get("failure_reason")),
+            ),
+        )
+
+    def _step(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        step_number = _optional_int(payload.get("step_number"))
+        if step_number is None:
+            return
+        self.connection.execute(
+            "INSERT INTO steps (session_id, run_id, step_number, entry_id, action)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (session_id, run_id, step_number) DO UPDATE SET"
+            " entry_id = excluded.entry_id, action = excluded.action",
+            (self.session.id, run_id, step_number, entry_id, _optional_str(payload.get("action"))),
+        )
+
+    def _step_timing(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        step_number = _optional_int(payload.get("step_number"))
+        if step_number is None:
+            return
+        phases = payload.get("phases")
+        self.connection.execute(
+            "INSERT INTO steps (session_id, run_id, step_number, total_seconds, phases)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (session_id, run_id, step_number) DO UPDATE SET"
+            " total_seconds = excluded.total_seconds, phases = excluded.phases",
+            (
+                self.session.id,
+                run_id,
+                step_number,
+                _optional_float(payload.get("total_seconds")),
+                json.dumps(phases if isinstance(phases, dict) else {}, sort_keys=True),
+            ),
+        )
+        self._assign_tool_seconds(run_id, step_number, payload.get("tools"))
+
+    def _assign_tool_seconds(self, run_id: str, step_number: int, tools: Any) -> None:
+        """Give each timed tool to the step's first untimed ``tool_call`` of that action."""
+        if not isinstance(tools, list) or not tools:
+            return
+        pending: dict[str, list[int]] = {}
+        for row in self.connection.execute(
+            "SELECT rowid, action FROM tool_calls WHERE session_id = ? AND run_id = ?"
+            " AND step_number = ? AND seconds IS NULL ORDER BY rowid",
+            (self.session.id, run_id, step_number),
+        ):
+            pending.setdefault(str(row["action"]), []).append(row["rowid"])
+        updates = []
+        for tool in tools:
+            if not isinstance(tool, dict):
+                continue
+            rowids = pending.get(str(tool.get("action", "")))
+            seconds = _optional_float(tool.get("seconds"))
+            if rowids and seconds is not None:
+                updates.append((seconds, rowids.pop(0)))
+        self.connection.executemany("UPDATE tool_calls SET seconds = ? WHERE rowid = ?", updates)
+
+    def _tool_call(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO tool_calls (session_id, entry_id, run_id, step_number,"
+            " action, failed, cached, observation_chars) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.session.id,
+                entry_id,
+                run_id,
+                _optional_int(payload.get("step_number")),
+                _optional_str(payload.get("action")),
+                int(bool(payload.get("failed"))),
+                int(bool(payload.get("cached"))),
+                _text_length(payload.get("observation")),
+            ),
+        )
+
+    def _llm_call(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        usage = payload.get("usage")
+        usage = usage if isinstance(usage, dict) else {}
+        timing = payload.get("timing")
+        timing = timing if isinstance(timing, dict) else {}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO llm_calls (session_id, entry_id, run_id, step_number,"
+            " timestamp, prompt_chars, estimated_prompt_tokens, prompt_tokens,"
+            " completion_tokens, cached_tokens, total_tokens, usage_source,"
+            " time_to_first_token_seconds, time_to_action_seconds)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.session.id,
+                entry_id,
+                run_id,
+                _optional_int(payload.get("step_number")),
+                _optional_str(entry.get("timestamp")),
+                _optional_int(payload.get("prompt_chars")),
+                _optional_int(payload.get("estimated_prompt_tokens")),
+                _optional_int(usage.get("prompt_tokens")),
+                _optional_int(usage.get("completion_tokens")),
+                _optional_int(usage.get("cached_tokens")),
+                _optional_int(usage.get("total_tokens")),
+                _optional_str(payload.get("usage_source")),
+                _optional_float(timing.get("time_to_first_token_seconds")),
+                _optional_float(timing.get("time_to_action_seconds")),
+            ),
+        )
+
+    def _compaction(self, entry_id: str, run_id: str, payload: dict[str, Any], entry: Any) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO compactions (session_id, entry_id, run_id, step_number,"
+            " phase, trigger, reused, folded_message_count, kept_message_count,"
+            " tokens_before, tokens_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.session.id,
+                entry_id,
+                run_id,
+                _optional_int(payload.get("step_number")),
+                _optional_str(payload.get("phase")),
+                _optional_str(payload.get("trigger")),
+                int(bool(payload.get("reused"))),
+                _optional_int(payload.get("folded_message_count")),
+                _optional_int(payload.get("kept_message_count")),
+                _optional_int(payload.get("estimated_tokens_before")),
+                _optional_int(payload.get("estimated_tokens_after")),
+            ),
+        )
+
+    def _text(self, value: Any) -> str | None:
+        """Short fields (task, failure reason) are resolved when they went to the blob store."""
+        if is_blob_ref(value) and self.blobs is not None:
+            value = self.blobs.resolve(value)
+        return _optional_str(value)
+
+
+def _optional_str(value: Any) -> str | None:
+    if value is None:
+        return None
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _optional_int(value: Any) -> int | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value)
+
+
+def _optional_float(value: Any) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _text_length(value: Any) -> int | None:
+    if is_blob_ref(value):
+        return _optional_int(value.get("chars"))
+    if value is None:
+        return None
+    return len(value) if isinstance(value, str) else len(json.dumps(value, ensure_ascii=False))
+
+
+# Tokens of one model call: provider-reported when available, else the prompt estimate.
+_CALL_TOKENS = (
+    "COALESCE(total_tokens, COALESCE(prompt_tokens, estimated_prompt_tokens, 0)"
+    " + COALESCE(completion_tokens, 0))"
+)
+
+REPORTS: dict[str, tuple[str, str]] = {
+    "models": (
+        "Runs, success rate, duration and tokens per successful run by provider/model.",
+        f"""
+        WITH run_tokens AS (
+            SELECT session_id, run_id, SUM({_CALL_TOKENS}) AS tokens, COUNT(*) AS llm_calls
+            FROM llm_calls GROUP BY session_id, run_id
+        )
+        SELECT COALESCE(r.provider, '') AS provider, COALESCE(r.model, '') AS model,
+            COUNT(*) AS runs,
+            SUM(r.status = 'success') AS successes,
+            ROUND(AVG(r.status = 'success'), 4) AS success_rate,
+            percentile(r.duration_seconds, 0.5) AS p50_seconds,
+            percentile(r.duration_seconds, 0.95) AS p95_seconds,
+            percentile(CASE WHEN r.status = 'success' THEN t.tokens END, 0.5)
+                AS p50_tokens_per_success,
+            percentile(CASE WHEN r.status = 'success' THEN t.tokens END, 0.95)
+                AS p95_tokens_per_success
+        FROM runs AS r LEFT JOIN run_tokens AS t USING (session_id, run_id)
+        GROUP BY 1, 2 ORDER BY runs DESC, provider, model LIMIT :limit
+        """,
+    ),
+    "status": (
+        "Run outcomes and failure reasons.",
+        """
+        SELECT COALESCE(status, 'unfinished') AS status,
+            COALESCE(failure_reason, '') AS failure_reason, COUNT(*) AS runs
+        FROM runs GROUP BY 1, 2 ORDER BY runs DESC, status LIMIT :limit
+        """,
+    ),
+    "tools": (
+        "Calls, failure rate and uncached latency per tool.",
+        """
+        SELECT COALESCE(action, '') AS action, COUNT(*) AS calls,
+            SUM(failed) AS failures, ROUND(AVG(failed), 4) AS failure_rate,
+            SUM(cached) AS cached,
+            percentile(CASE WHEN cached = 0 THEN seconds END, 0.5) AS p50_seconds,
+            percentile(CASE WHEN cached = 0 THEN seconds END, 0.95) AS p95_seconds,
+            CAST(AVG(observation_chars) AS INTEGER) AS avg_observation_chars
+        FROM tool_calls GROUP BY 1 ORDER BY calls DESC, action LIMIT :limit
+        """,
+    ),
+    "llm": (
+        "Model calls, streaming latency and prompt-cache hit rate by model.",
+        f"""
+        SELECT COALESCE(r.model, '') AS model, COUNT(*) AS calls,
+            percentile(l.time_to_first_token_seconds, 0.5) AS p50_first_token_seconds,
+            percentile(l.time_to_first_token_seconds, 0.95) AS p95_first_token_seconds,
+            percentile(l.time_to_action_seconds, 0.5) AS p50_action_seconds,
+            percentile(l.time_to_action_seconds, 0.95) AS p95_action_seconds,
+            SUM({_CALL_TOKENS}) AS tokens,
+            SUM(CASE WHEN l.usage_source = 'estimated' THEN 1 ELSE 0 END) AS estimated_calls,
+            ROUND(1.0 * SUM(l.cached_tokens) / NULLIF(SUM(l.prompt_tokens), 0), 4)
+                AS cache_hit_rate
+        FROM llm_calls AS l LEFT JOIN runs AS r USING (session_id, run_id)
+        GROUP BY 1 ORDER BY calls DESC, model LIMIT :limit
+        """,
+    ),
+    "phases": (
+        "Per-step seconds by phase (from step_timing).",
+        """
+        SELECT p.key AS phase, COUNT(*) AS steps,
+            ROUND(SUM(p.value), 6) AS total_seconds,
+            percentile(p.value, 0.5) AS p50_seconds,
+            percentile(p.value, 0.95) AS p95_seconds
+        FROM steps, json_each(steps.phases) AS p
+        WHERE steps.phases IS NOT NULL
+        GROUP BY 1 ORDER BY total_seconds DESC LIMIT :limit
+        """,
+    ),
+    "compactions": (
+        "Context compactions and the tokens they saved, by trigger.",
+        """
+        SELECT COALESCE(trigger, '') AS trigger, COALESCE(phase, '') AS phase,
+            COUNT(*) AS compactions,
+            CAST(AVG(tokens_before) AS INTEGER) AS avg_tokens_before,
+            CAST(AVG(tokens_after) AS INTEGER) AS avg_tokens_after,
+            ROUND(1 - 1.0 * SUM(tokens_after) / NULLIF(SUM(tokens_before), 0), 4)
+                AS saved_ratio
+        FROM compactions GROUP BY 1, 2 ORDER BY compactions DESC LIMIT :limit
+        """,
+    ),
+    "slowest-runs": (
+        "The longest runs with their step count and session file.",
+        """
+        SELECT s.path AS session, r.run_id, COALESCE(r.model, '') AS model,
+            COALESCE(r.status, 'unfinished') AS status, r.duration_seconds,
+            (SELECT COUNT(*) FROM steps AS st
+                WHERE st.session_id = r.session_id AND st.run_id = r.run_id) AS steps
+        FROM runs AS r JOIN sessions AS s ON s.id = r.session_id
+        WHERE r.duration_seconds IS NOT NULL
+        ORDER BY r.duration_seconds DESC LIMIT :limit
+        """,
+    ),
+}
+
+
+def run_report(
+    connection: sqlite3.Connection,
+    name: str,
+    *,
+    limit: int = DEFAULT_QUERY_LIMIT,
+) -> list[dict[str, Any]]:
+    """Run one canned report from :data:`REPORTS`.
+
+    Raises:
+        KeyError: unknown report name
+    """
+    return run_sql(connection, REPORTS[name][1], {"limit": limit})
+
+
+def run_sql(
+    connection: sqlite3.Connection,
+    sql: str,
+    parameters: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    cursor = connection.execute(sql, parameters or {})
+    columns = [column[0] for column in cursor.description or ()]
+    return [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+
+
+def _export(
+    sources: list[Path],
+    *,
+    database: Path,
+    pattern: str,
+    as_json: bool,
+) -> int:
+    paths: list[Path] = []
+    for source in sources:
+        if source.is_dir():
+            paths.extend(sorted(path for path in source.glob(pattern) if path.is_file()))
+        else:
+            paths.append(source)
+    try:
+        result = export_sessions(paths, database)
+    except sqlite3.Error as exc:
+        print(f"Could not write {database}: {exc}", file=sys.stderr)
+        return 2
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"Database: {result['database']}")
+        print(
+            f"Files: {result['files']} (unchanged {result['skipped']}, "
+            f"re-read {result['reset']}), new entries: {result['entries']}"
+        )
+        for error in result["errors"]:
+            print(f"- {error['path']}: {error['error']}")
+    return 1 if result["errors"] else 0
+
+
+def _query(
+    database: Path,
+    *,
+    report: str | None,
+    sql: str | None,
+    limit: int,
+    as_json: bool,
+) -> int:
+    if report is None and sql is None:
+        print("Reports:")
+        for name, (description, _) in REPORTS.items():
+            print(f"- {name}: {description}")
+        return 0
+    if not database.is_file():
+        print(f"Database not found: {database}", file=sys.stderr)
+        return 2
+    try:
+        connection = connect_database(database, readonly=True)
+        try:
+            if sql is not None:
+                rows = run_sql(connection, sql)
+            else:
+                rows = run_report(connection, str(report), limit=limit)
+        finally:
+            connection.close()
+    except sqlite3.Error as exc:
+        print(f"Query failed: {exc}", file=sys.stderr)
+        return 2
+    if as_json:
+        print(json.dumps({"report": report or "sql", "rows": rows}, ensure_ascii=False, indent=2))
+        return 0
+    _print_table(rows)
+    return 0
+
+
+def _print_table(rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        print("(no rows)")
+        return
+    columns = list(rows[0])
+    cells = [[_cell(row[column]) for column in columns] for row in rows]
+    widths = [
+        max(len(column), *(len(line[index]) for line in cells))
+        for index, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths, strict=True)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths, strict=True)))
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
@@ -7,12 +7,14 @@ import sys
 from pathlib import Path
 from typing import Any
 
-from .session import find_entry_index, latest_checkpoint_entry
+from .compression import compress_block, is_compressed_path
+from .index import SessionIndex
+from .session import CHECKPOINT_EVENT, find_entry_index, latest_checkpoint_entry
 from .writer import TraceWriter
 
 
 def _fork(
-    entries: list[dict[str, Any]],
+    index: SessionIndex,
     *,
     source: Path,
     at: str,
@@ -21,7 +23,7 @@ def _fork(
 ) -> int:
     """把源会话截到 ``--at``（含）写成一份新会话，并指出能不能直接续跑。"""
     try:
-        result = fork_session(entries, source=source, at=at, output=output)
+        result = fork_session_at(index, source=source, at=at, output=output)
     except ValueError as exc:
         print(f"Fork failed: {exc}", file=sys.stderr)
         return 2
@@ -66,18 +68,54 @@ def fork_session(
         ValueError: ``at`` 未命中/歧义，或目标文件已存在
     """
     index = find_entry_index(entries, at)
-    entry_id = str(entries[index].get("id", ""))
     kept = entries[: index + 1]
-    target = output or source.with_suffix("").with_name(f"{source.stem}.fork-{entry_id}.jsonl")
+    return _write_fork(kept, latest_checkpoint_entry(kept), source=source, output=output)
+
+
+def fork_session_at(
+    index: SessionIndex,
+    *,
+    source: Path,
+    at: str,
+    output: Path | None = None,
+) -> dict[str, Any]:
+    """同 ``fork_session``，但借字节偏移索引定位：分叉点之后的条目不读也不解析。
+
+    Raises:
+        ValueError: ``at`` 未命中/歧义，或目标文件已存在
+    """
+    position = index.find(at)
+    target = output or _default_fork_target(source, index.records[position].entry_id)
+    if target.exists():
+        # 在读前缀之前就拒绝，免得白读一遍大文件。
+        raise ValueError(f"Refusing to overwrite an existing file: {target}")
+    checkpoint_position = index.latest(CHECKPOINT_EVENT, until=position)
+    kept = index.entries(0, position + 1)
+    checkpoint = kept[checkpoint_position] if checkpoint_position is not None else None
+    return _write_fork(kept, checkpoint, source=source, output=target)
+
+
+def _write_fork(
+    kept: list[dict[str, Any]],
+    checkpoint: dict[str, Any] | None,
+    *,
+    source: Path,
+    output: Path | None,
+) -> dict[str, Any]:
+    entry_id = str(kept[-1].get("id", ""))
+    target = output or _default_fork_target(source, entry_id)
     if target.exists():
         raise ValueError(f"Refusing to overwrite an existing file: {target}")
 
-    checkpoint = latest_checkpoint_entry(kept)
     checkpoint_payload = (checkpoint or {}).get("payload") or {}
     target.parent.mkdir(parents=True, exist_ok=True)
-    with target.open("w", encoding="utf-8") as handle:
-        for entry in kept:
-            handle.write(json.dumps(entry, ensure_ascii=False, sort_keys=True) + "\n")
+    lines = "".join(json.dumps(entry, ensure_ascii=False, sort_keys=True) + "\n" for entry in kept)
+    if is_compressed_path(target):
+        # 拷贝的前缀写成一个 gzip member，随后的 fork 条目由 TraceWriter 追加为下一个。
+        target.write_bytes(compress_block(lines.encode("utf-8")))
+    else:
+        with target.open("w", encoding="utf-8") as handle:
+            handle.write(lines)
     writer = TraceWriter(target, fork_parent_id=entry_id)
     try:
         writer.record(
@@ -100,3 +138,10 @@ def fork_session(
         "resumable_checkpoint_entry_id": str((checkpoint or {}).get("id", "")),
         "resumable_step_number": checkpoint_payload.get("step_number"),
     }
+
+
+def _default_fork_target(source: Path, entry_id: str) -> Path:
+    """``<源名>.fork-<entry id>.jsonl``；压缩的源会话分叉出来仍是 ``.jsonl.gz``。"""
+    if source.name.lower().endswith(".jsonl.gz"):
+        return source.with_name(f"{source.name[: -len('.jsonl.gz')]}.fork-{entry_id}.jsonl.gz")
+    return source.with_suffix("").with_name(f"{source.stem}.fork-{entry_id}.jsonl")
@@ -0,0 +1,391 @@
+"""会话日志的字节偏移索引（``<日志名>.idx`` 边车文件）。
+
+``load_session_entries`` 要把整份 JSONL 解析一遍才能找到一条条目或翻一页；几百 MB
+的长会话里，``--resume-at``、``dm-agent-trace fork --at`` 与控制台的分页都花在这上面。
+边车索引为每条条目记一行 ``[id, event, run_id, 块偏移, 块长度, 块内偏移, 长度]``：
+
+- 明文日志里一行就是一个块，按偏移 ``seek`` 后读出该行即可；
+- 块压缩日志（``*.jsonl.gz``）的块是条目所在的 gzip member，只解这一个 member。
+
+于是按 id 定位是一次字典查找，「最后一条 checkpoint」是一次二分，翻页只读这一页
+的字节。代价在 ``SessionIndex.load``：它把整份边车读进内存，O(条目数)，20 万条
+（边车约 8 MB）约 1 秒，仍远小于解析日志本身；要反复查询的调用方应缓存实例。
+
+``TraceWriter`` 每次组提交后追加对应的索引行；没有索引的老日志（含 1.x trace）在
+第一次读取时重建并落盘。读侧从不信任索引超出日志的部分：索引落后于日志时现场扫描
+尾部补齐，首末两条对不上（文件被截断或替换）时整份重建。
+
+id 与 ``parent_id`` 的补齐规则与 ``normalize_entries`` 完全一致，读回的条目和
+``load_session_entries`` 的结果逐条相同。
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+from .blobs import resolve_entries
+from .compression import GZIP_MAGIC, decompress_member, is_compressed_path, iter_members
+from .session import LEGACY_ID_PREFIX
+
+INDEX_SUFFIX = ".idx"
+# 边车格式版本；不一致时整份重建。
+INDEX_VERSION = 1
+
+
+@dataclass(slots=True)
+class IndexRecord:
+    """一条条目在日志里的位置。明文日志的块就是这一行（``start`` 恒为 0）。"""
+
+    entry_id: str
+    event: str
+    run_id: str
+    block_offset: int
+    block_length: int
+    start: int
+    length: int
+
+    @property
+    def block_end(self) -> int:
+        return self.block_offset + self.block_length
+
+    def to_row(self) -> list[Any]:
+        return [
+            self.entry_id,
+            self.event,
+            self.run_id,
+            self.block_offset,
+            self.block_length,
+            self.start,
+            self.length,
+        ]
+
+
+def index_path_for(path: str | Path) -> Path:
+    """``session.jsonl`` -> ``session.jsonl.idx``（压缩日志同理）。"""
+    log = Path(path)
+    return log.with_name(f"{log.name}{INDEX_SUFFIX}")
+
+
+def block_records(
+    lines: list[bytes],
+    identities: Iterable[tuple[str, str, str]],
+    *,
+    offset: int,
+    compressed: bool,
+    block_length: int,
+) -> list[IndexRecord]:
+    """为一次组提交写出的行生成索引记录（``identities`` 是每行的 id / event / run_id）。"""
+    records: list[IndexRecord] = []
+    position = 0 if compressed else offset
+    for line, (entry_id, event, run_id) in zip(lines, identities, strict=True):
+        if compressed:
+            records.append(
+                IndexRecord(entry_id, event, run_id, offset, block_length, position, len(line))
+            )
+        else:
+            records.append(IndexRecord(entry_id, event, run_id, position, len(line), 0, len(line)))
+        position += len(line)
+    return records
+
+
+def open_index_sidecar(path: str | Path) -> IO[str]:
+    """以追加模式打开日志的边车索引（写入方持有句柄）；新文件先写表头。"""
+    handle = index_path_for(path).open("a", encoding="utf-8")
+    if handle.tell() == 0:
+        handle.write(_header(is_compressed_path(path)))
+    return handle
+
+
+def format_index_rows(records: Iterable[IndexRecord]) -> str:
+    return "".join(_format_row(record) for record in records)
+
+
+class SessionIndex:
+    """一份会话日志的条目位置表，支持按 id 定位、按事件取最近一条、按区间读条目。
+
+    用 ``SessionIndex.load(path)`` 构造。实例是打开那一刻的快照：日志之后追加的
+    条目要重新 ``load`` 才看得到。``load`` 解析整份边车，是 O(条目数)；之后的查找与
+    翻页只与取出的条目数有关。
+    """
+
+    def __init__(self, path: Path, records: list[IndexRecord], *, compressed: bool) -> None:
+        self.path = path
+        self.compressed = compressed
+        self._records = records
+        self._first_positions: dict[str, int] | None = None
+        self._event_positions: dict[str, list[int]] = {}
+        for position, record in enumerate(records):
+            self._event_positions.setdefault(record.event, []).append(position)
+
+    @classmethod
+    def load(cls, path: str | Path, *, owner: bool = False) -> SessionIndex:
+        """读边车索引并与日志核对，缺失或失配时重建，落后时扫描尾部补齐。
+
+        每次调用都解析整份边车，耗时与条目数成正比（约 5 µs/条）；服务端按日志的
+        ``(mtime, size)`` 缓存实例，只在日志变化后重读。
+
+        读侧只在整份重建时回写边车（原子替换）；``owner=True`` 给持有日志的写入方用，
+        尾部补齐的结果同样回写，之后的组提交接着往边车后面追加。
+
+        Raises:
+            FileNotFoundError: 日志不存在
+            json.JSONDecodeError: 日志中有无法解析的完整行
+            gzip.BadGzipFile: 压缩日志损坏
+        """
+        log = Path(path)
+        size = log.stat().st_size
+        compressed = _is_compressed_log(log)
+        records = _read_sidecar(index_path_for(log), compressed)
+        rebuilt = records is None or not _matches(log, records, size, compressed)
+        if records is None or rebuilt:
+            records = []
+        covered = records[-1].block_end if records else 0
+        tail = (
+            _scan(log, covered, compressed, first_position=len(records)) if size > covered else []
+        )
+        records.extend(tail)
+        index = cls(log, records, compressed=compressed)
+        if rebuilt or (owner and tail):
+            index.save()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def records(self) -> list[IndexRecord]:
+        return self._records
+
+    def count(self, event: str) -> int:
+        return len(self._event_positions.get(event, ()))
+
+    def find(self, reference: str) -> int:
+        """与 ``find_entry_index`` 同一套规则：精确匹配优先，其次唯一前缀。"""
+        reference = str(reference or "").strip()
+        if not reference:
+            raise ValueError("Entry id is required.")
+        if self._first_positions is None:
+            self._first_positions = {}
+            for position, record in enumerate(self._records):
+                self._first_positions.setdefault(record.entry_id, position)
+        exact = self._first_positions.get(reference)
+        if exact is not None:
+            return exact
+        prefixed = [
+            position
+            for position, record in enumerate(self._records)
+            if record.entry_id.startswith(reference)
+        ]
+        if not prefixed:
+            raise ValueError(f"No session entry matches id {reference!r}.")
+        if len(prefixed) > 1:
+            matched = ", ".join(self._records[position].entry_id for position in prefixed[:5])
+            raise ValueError(f"Entry id {reference!r} is ambiguous; matches: {matched} ...")
+        return prefixed[0]
+
+    def latest(self, event: str, *, until: int | None = None) -> int | None:
+        """最后一条 ``event`` 条目的下标；``until`` 限定不晚于该下标。"""
+        positions = self._event_positions.get(event, [])
+        cut = len(positions) if until is None else bisect.bisect_right(positions, until)
+        return positions[cut - 1] if cut else None
+
+    def entry(self, position: int, *, resolve_blobs: bool = True) -> dict[str, Any]:
+        if not 0 <= position < len(self._records):
+            raise IndexError(position)
+        return self.entries(position, position + 1, resolve_blobs=resolve_blobs)[0]
+
+    def entries(
+        self, start: int = 0, stop: int | None = None, *, resolve_blobs: bool = True
+    ) -> list[dict[str, Any]]:
+        """读出 ``[start, stop)`` 区间的条目（已按 ``normalize_entries`` 的规则补齐 id）。
+
+        明文日志一次读出整段字节；压缩日志每个 member 只解一次。blob 引用默认换回
+        原文——只读这一段条目引用到的 blob。
+        """
+        start, stop, _ = slice(start, stop).indices(len(self._records))
+        if start >= stop:
+            return []
+        selected = self._records[start:stop]
+        chunks = _read_chunks(self.path, selected, self.compressed)
+        entries: list[dict[str, Any]] = []
+        previous_id = self._records[start - 1].entry_id if start else ""
+        for record, chunk in zip(selected, chunks, strict=True):
+            entry = json.loads(chunk)
+            if not entry.get("id"):
+                entry["id"] = record.entry_id
+            if entry.get("parent_id") is None:
+                entry["parent_id"] = previous_id
+            previous_id = record.entry_id
+            entries.append(entry)
+        return resolve_entries(entries, self.path) if resolve_blobs else entries
+
+    def save(self) -> None:
+        """原子写回整份边车；目录只读等写失败只是下次再重建，不影响读取。"""
+        sidecar = index_path_for(self.path)
+        tmp_path = sidecar.with_name(f"{sidecar.name}.tmp-{os.getpid()}")
+        body = _header(self.compressed) + format_index_rows(self._records)
+        try:
+            tmp_path.write_text(body, encoding="utf-8")
+            os.replace(tmp_path, sidecar)
+        except OSError:
+            with contextlib.suppress(OSError):
+                tmp_path.unlink()
+
+
+def _header(compressed: bool) -> str:
+    return json.dumps({"version": INDEX_VERSION, "compressed": compressed}) + "\n"
+
+
+def _format_row(record: IndexRecord) -> str:
+    return json.dumps(record.to_row(), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _read_chunks(log: Path, records: list[IndexRecord], compressed: bool) -> list[bytes]:
+    """按记录读回各条目的原始行：明文一次读出整段，压缩日志每个 member 只解一次。"""
+    chunks: list[bytes] = []
+    with log.open("rb") as handle:
+        if compressed:
+            block_offset = -1
+            plain = b""
+            for record in records:
+                if record.block_offset != block_offset:
+                    handle.seek(record.block_offset)
+                    plain = decompress_member(handle.read(record.block_length))
+                    block_offset = record.block_offset
+                chunks.append(plain[record.start : record.start + record.length])
+        else:
+            base = records[0].block_offset
+            handle.seek(base)
+            span = handle.read(records[-1].block_end - base)
+            for record in records:
+                chunks.append(span[record.block_offset - base : record.block_end - base])
+    for record, chunk in zip(records, chunks, strict=True):
+        if len(chunk) != record.length:
+            raise ValueError(f"Session log {log} changed since it was indexed.")
+    return chunks
+
+
+def _is_compressed_log(path: Path) -> bool:
+    with path.open("rb") as handle:
+        head = handle.read(len(GZIP_MAGIC))
+    return head == GZIP_MAGIC or is_compressed_path(path)
+
+
+def _read_sidecar(sidecar: Path, compressed: bool) -> list[IndexRecord] | None:
+    """读边车；缺失、版本不符或内容损坏时返回 None（由调用方重建）。
+
+    写入方可能正追加到一半：结尾那行没有换行时先丢掉它，只读完整的行。
+    """
+    try:
+        text = sidecar.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+    header_line, _, body = text.partition("\n")
+    try:
+        header = json.loads(header_line)
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("version") != INDEX_VERSION:
+        return None
+    if bool(header.get("compressed")) != compressed:
+        return None
+    complete = body[: body.rfind("\n") + 1]
+    try:
+        # 整份拼成一个 JSON 数组一次解析：几十万行的边车逐行 json.loads 太慢。
+        rows = json.loads("[" + complete.rstrip("\n").replace("\n", ",") + "]")
+        records = [IndexRecord(*row) for row in rows]
+    except (ValueError, TypeError):
+        return None
+    previous = -1
+    for record in records:
+        if not isinstance(record.block_offset, int) or record.block_offset < previous:
+            return None
+        previous = record.block_offset
+    return records
+
+
+def _matches(log: Path, records: list[IndexRecord], size: int, compressed: bool) -> bool:
+    """抽查首末两条：日志被截断或整份替换过时，索引作废。"""
+    if not records:
+        return True
+    if size < records[-1].block_end:
+        return False
+    probes = [records[0], records[-1]]
+    try:
+        first, last = (json.loads(chunk) for chunk in _read_chunks(log, probes, compressed))
+    except (OSError, ValueError):
+        return False
+    if not (isinstance(first, dict) and isinstance(last, dict)):
+        return False
+    # 老格式条目没有 id，索引里是按位置合成的 legacy id，此时只要求日志里也没有 id。
+    return all(
+        str(entry.get("id") or "") in (record.entry_id, "")
+        for entry, record in zip((first, last), probes, strict=True)
+    )
+
+
+def _scan(log: Path, offset: int, compressed: bool, *, first_position: int) -> list[IndexRecord]:
+    """从原始字节偏移 ``offset`` 起扫描日志，为每个完整的条目行生成索引记录。"""
+    records: list[IndexRecord] = []
+    with log.open("rb") as handle:
+        handle.seek(offset)
+        if not compressed:
+            position = offset
+            for line in handle:
+                entry = _parse_line(line)
+                if entry is not None:
+                    position_in_log = first_position + len(records)
+                    records.append(
+                        _record(entry, position_in_log, (position, len(line)), 0, len(line))
+                    )
+                position += len(line)
+            return records
+        data = handle.read()
+    for member_offset, member_length, plain in iter_members(data):
+        block = (offset + member_offset, member_length)
+        start = 0
+        for line in plain.splitlines(keepends=True):
+            entry = _parse_line(line)
+            if entry is not None:
+                records.append(
+                    _record(entry, first_position + len(records), block, start, len(line))
+                )
+            start += len(line)
+    return records
+
+
+def _parse_line(line: bytes) -> dict[str, Any] | None:
+    """空行返回 None；没写完的结尾行（无换行且解析失败）也返回 None，其余解析错误照抛。"""
+    if not line.strip():
+        return None
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        if line.endswith(b"\n"):
+            raise
+        return None
+    if not isinstance(entry, dict):
+        raise ValueError(f"Session entry is not a JSON object: {line[:80]!r}")
+    return entry
+
+
+def _record(
+    entry: dict[str, Any], position: int, block: tuple[int, int], start: int, length: int
+) -> IndexRecord:
+    entry_id = str(entry.get("id") or "") or f"{LEGACY_ID_PREFIX}{position:04d}"
+    return IndexRecord(
+        entry_id,
+        str(entry.get("event", "")),
+        str(entry.get("run_id", "")),
+        block[0],
+        block[1],
+        start,
+        length,
+    )
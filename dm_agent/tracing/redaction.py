@@ -0,0 +1,158 @@
+"""Secret redaction for shareable session logs, prepared once per writer.
+
+旧实现对每个字符串遍历一遍全部环境变量（每次都重新判断变量名是否敏感），再跑
+三条大小写不敏感的正则；一条 8000 字符的工具观察光是 ``api_key=`` 那条交替正则
+就要在每个位置逐个尝试关键字。``Redactor`` 在构造时做完所有准备：
+
+- 敏感环境变量的值只收集一次，按长度降序排好，逐个用 C 层的子串查找预筛，命中
+  才替换；
+- 键值对与 ``Bearer`` 模式拆成以字面关键字开头的正则，在小写副本上扫描——字面
+  前缀让 ``re`` 走快速子串搜索，而不是在每个位置回溯交替分支。
+
+脱敏结果与旧实现一致：键值同时命中多条模式时合并成一个 ``<redacted>``。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+SENSITIVE_ENV_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CREDENTIAL")
+# 短于此长度的值不当密钥处理，否则 "1"、"true" 之类会把整份日志替换得面目全非。
+MIN_SECRET_CHARS = 6
+
+_VALUE_TAIL = r"\s*[=:]\s*)[^\s,'\"}]+"
+# 每条都以字面关键字开头（在小写副本上匹配）；第 1 组是保留的前缀，其后是要遮住的值。
+_KEYWORD_PATTERNS = tuple(
+    re.compile(pattern)
+    for pattern in (
+        r"(api[_-]?key" + _VALUE_TAIL,
+        r"(token" + _VALUE_TAIL,
+        r"(secret" + _VALUE_TAIL,
+        r"(password" + _VALUE_TAIL,
+        r"(bearer\s+)[a-z0-9._\-]+",
+    )
+)
+# 小写后长度变化（极少数 Unicode 字符）时位置对不上，退回原来的大小写不敏感正则。
+_FALLBACK_PATTERNS = (
+    re.compile(r"(?i)((?:api[_-]?key|token|secret|password)\s*[=:]\s*)[^\s,'\"}]+"),
+    re.compile(r"(?i)(bearer\s+)[a-z0-9._\-]+"),
+)
+
+
+class Redactor:
+    """对会话条目 payload 做脱敏；构造时对环境变量拍一次快照。
+
+    Args:
+        environ: 用于收集密钥的环境变量，默认 ``os.environ``
+        home: 要替换成 ``~`` 的家目录，默认 ``Path.home()``；空串表示不替换
+    """
+
+    def __init__(self, environ: Mapping[str, str] | None = None, home: str | None = None) -> None:
+        source = os.environ if environ is None else environ
+        secrets: dict[str, str] = {}
+        for name, value in source.items():
+            if len(value) < MIN_SECRET_CHARS:
+                continue
+            if any(marker in name.upper() for marker in SENSITIVE_ENV_MARKERS):
+                # 同一个值出现在多个变量里时沿用第一个名字，与旧实现逐个替换的结果一致。
+                secrets.setdefault(value, f"<redacted-env:{name}>")
+        # 长的在前：一个密钥是另一个的子串时先替换更长的那个。
+        self._secrets = sorted(secrets.items(), key=lambda item: len(item[0]), reverse=True)
+        self._min_secret_chars = min((len(value) for value in secrets), default=0)
+        self.home = str(Path.home()) if home is None else home
+
+    @property
+    def secret_count(self) -> int:
+        return len(self._secrets)
+
+    def redact_text(self, text: str) -> str:
+        if self._secrets and len(text) >= self._min_secret_chars:
+            for value, placeholder in self._secrets:
+                if value in text:
+                    text = text.replace(value, placeholder)
+        if self.home and self.home in text:
+            text = text.replace(self.home, "~")
+        return _redact_assignments(text)
+
+    def redact(self, value: Any) -> Any:
+        """递归脱敏 dict / list / tuple 里的全部字符串（tuple 转成 list，与 JSON 一致）。"""
+        if isinstance(value, str):
+            return self.redact_text(value)
+        if isinstance(value, dict):
+            return {str(key): self.redact(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.redact(item) for item in value]
+        return value
+
+
+def _redact_assignments(text: str) -> str:
+    """遮住 ``api_key=...`` / ``token: ...`` / ``Bearer ...`` 的值，一次重建字符串。"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        for pattern in _FALLBACK_PATTERNS:
+            text = pattern.sub(r"\1<redacted>", text)
+        return text
+    spans: list[tuple[int, int]] = []
+    for pattern in _KEYWORD_PATTERNS:
+        spans.extend((match.end(1), match.end()) for match in pattern.finditer(lowered))
+    if not spans:
+        return text
+    spans.sort()
+    parts: list[str] = []
+    cursor = 0
+    for start, end in spans:
+        if start < cursor:
+            # 与上一段重叠（如 ``token=password=x``）：并入上一个 <redacted>。
+            cursor = max(cursor, end)
+            continue
+        parts.append(text[cursor:start])
+        parts.append("<redacted>")
+        cursor = end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def benchmark_redaction(
+    payload: dict[str, Any],
+    *,
+    redactor: Redactor | None = None,
+    rounds: int = 1000,
+) -> dict[str, Any]:
+    """测量单条 payload 的脱敏耗时（微秒/条），``python -m dm_agent.tracing.redaction`` 调用它。"""
+    engine = redactor or Redactor()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        engine.redact(payload)
+    elapsed = time.perf_counter() - started
+    return {
+        "rounds": rounds,
+        "secret_count": engine.secret_count,
+        "microseconds_per_record": round(elapsed / rounds * 1_000_000, 2),
+    }
+
+
+def sample_tool_call_payload() -> dict[str, Any]:
+    """一条触顶的 ``tool_call``：8000 字符观察，含家目录路径与一处键值对。"""
+    home = str(Path.home())
+    line = f"{home}/project/src/module.py:42: value = compute(token_count, limit)\n"
+    observation = (line * (8000 // len(line) + 1))[:7950] + "\napi_key=abc123"
+    return {
+        "step_number": 3,
+        "action": "read_file",
+        "action_input": {"path": "src/module.py"},
+        "observation": observation,
+        "failed": False,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_redaction(sample_tool_call_payload())
+    print(
+        f"redaction: {result['microseconds_per_record']} us/record "
+        f"({result['secret_count']} env secrets, {result['rounds']} rounds)"
+    )
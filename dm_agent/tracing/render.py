@@ -6,7 +6,7 @@ import json
 from pathlib import Path
 from typing import Any
 
-from .analysis import analyze_events, analyze_trace_directory
+from .analysis import analyze_trace_directory
 from .summary import diff_events, summarize_events
 
 
@@ -44,11 +44,10 @@ def _view(events: list[dict[str, Any]], *, as_json: bool, raw: bool) -> int:
 
 
 def _analyze(
-    events: list[dict[str, Any]],
+    analysis: dict[str, Any],
     *,
     as_json: bool,
 ) -> int:
-    analysis = analyze_events(events)
     if as_json:
         print(json.dumps(analysis, indent=2, ensure_ascii=False))
         return 0
@@ -87,17 +86,40 @@ def _analyze(
         print("Issues:")
         for issue in health["issues"]:
             print(f"- {issue}")
+    _print_latency(analysis.get("latency") or {})
     return 0
 
 
+def _print_latency(latency: dict[str, Any]) -> None:
+    """Print p50/p95 seconds per phase and per tool (omitted for traces without timing)."""
+    if not latency.get("step_count"):
+        return
+    step = latency.get("step_seconds") or {}
+    print(
+        f"Step latency: steps={latency['step_count']}, "
+        f"p50={step.get('p50_seconds', 0.0):.3f}s, p95={step.get('p95_seconds', 0.0):.3f}s"
+    )
+    for group, label in (("phases", "Phase"), ("tools", "Tool")):
+        for name, stats in (latency.get(group) or {}).items():
+            print(
+                f"- {label} {name}: total={stats['total_seconds']:.3f}s, "
+                f"p50={stats['p50_seconds']:.3f}s, p95={stats['p95_seconds']:.3f}s "
+                f"(n={stats['count']})"
+            )
+
+
 def _analyze_dir(
     directory: Path,
     *,
     pattern: str,
     as_json: bool,
     markdown_path: Path | None = None,
+    workers: int | None = 1,
+    cache_path: Path | None = None,
 ) -> int:
-    report = analyze_trace_directory(directory, pattern=pattern)
+    report = analyze_trace_directory(
+        directory, pattern=pattern, workers=workers, cache_path=cache_path
+    )
     if markdown_path:
         markdown_path.parent.mkdir(parents=True, exist_ok=True)
         markdown_path.write_text(render_trace_directory_markdown(report), encoding="utf-8")
@@ -133,6 +155,7 @@ def _analyze_dir(
     print("Final failure stages:")
     for stage, count in summary["final_failure_stage_counts"].items():
         print(f"- {stage}: {count}")
+    _print_latency(summary.get("latency") or {})
     if markdown_path:
         print(f"Markdown report: {markdown_path}")
     return 0 if not report["errors"] else 1
@@ -184,6 +207,26 @@ def render_trace_directory_markdown(report: dict[str, Any]) -> str:
     for stage, count in (summary.get("final_failure_stage_counts") or {}).items():
         lines.append(f"- `{stage}`: `{count}`")
 
+    latency = summary.get("latency") or {}
+    if latency.get("step_count"):
+        lines.extend(
+            [
+                "",
+                "## Step Latency",
+                "",
+                f"- Steps timed: `{latency['step_count']}`",
+                "",
+                "| Phase / tool | Samples | Total (s) | p50 (s) | p95 (s) |",
+                "| --- | ---: | ---: | ---: | ---: |",
+            ]
+        )
+        for group, prefix in (("phases", "phase"), ("tools", "tool")):
+            for name, stats in (latency.get(group) or {}).items():
+                lines.append(
+                    f"| {prefix} `{name}` | {stats['count']} | {stats['total_seconds']:.3f} | "
+                    f"{stats['p50_seconds']:.3f} | {stats['p95_seconds']:.3f} |"
+                )
+
     lines.extend(
         [
             "",
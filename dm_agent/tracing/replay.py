@@ -3,13 +3,12 @@
 from __future__ import annotations
 
 import json
-import os
 from collections.abc import Iterable
-from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 
 from dm_agent.tools import default_tools
+from dm_agent.tools.base import use_workspace
 
 from .summary import summarize_events
 
@@ -69,6 +68,7 @@ def replay_tools(
     allow_shell: bool = False,
 ) -> list[dict[str, Any]]:
     tools = {tool.name: tool for tool in default_tools(include_mcp=False)}
+    workspace.mkdir(parents=True, exist_ok=True)
     results: list[dict[str, Any]] = []
 
     for event in events:
@@ -99,7 +99,7 @@ def replay_tools(
             results.append(item)
             continue
         try:
-            with chdir(workspace):
+            with use_workspace(workspace):
                 actual = tool.execute(payload.get("action_input") or {})
         except Exception as exc:
             actual = f"Tool execution failed: {exc}"
@@ -112,14 +112,3 @@ def replay_tools(
         results.append(item)
 
     return results
-
-
-@contextmanager
-def chdir(path: Path):
-    previous = Path.cwd()
-    path.mkdir(parents=True, exist_ok=True)
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(previous)
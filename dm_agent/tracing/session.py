@@ -13,10 +13,13 @@
 from __future__ import annotations
 
 import json
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Any
 
+from .blobs import BlobStore, blob_placeholder, is_blob_ref, resolve_entries
+from .compression import read_log_text
+
 # 1.x 的老 trace 没有条目 id，读进来时按序合成，保证下游工具一律可用。
 LEGACY_ID_PREFIX = "legacy-"
 
@@ -26,6 +29,8 @@ CHECKPOINT_EVENT = "checkpoint"
 FORK_EVENT = "fork"
 RUN_START_EVENT = "run_start"
 PARSE_ERROR_EVENT = "parse_error"
+PLAN_SPLICED_EVENT = "plan_spliced"
+LLM_CALL_EVENT = "llm_call"
 
 
 def parse_failed_response_placeholder(response_chars: int) -> str:
@@ -66,10 +71,15 @@ def normalize_entries(raw_entries: Iterable[dict[str, Any]]) -> list[dict[str, A
     return entries
 
 
-def load_session_entries(path: str | Path) -> list[dict[str, Any]]:
-    """读取会话日志（或老 trace）并归一化。"""
-    lines = Path(path).read_text(encoding="utf-8").splitlines()
-    return normalize_entries(json.loads(line) for line in lines if line.strip())
+def load_session_entries(path: str | Path, *, resolve_blobs: bool = True) -> list[dict[str, Any]]:
+    """读取会话日志（或老 trace）并归一化。
+
+    ``resolve_blobs=False`` 保留 blob 引用原样，交给 ``rebuild_context(blobs=...)`` 之类
+    只解析真正用到的那部分。
+    """
+    lines = read_log_text(path).splitlines()
+    entries = normalize_entries(json.loads(line) for line in lines if line.strip())
+    return resolve_entries(entries, path) if resolve_blobs else entries
 
 
 def find_entry_index(entries: list[dict[str, Any]], reference: str) -> int:
@@ -103,12 +113,14 @@ def message_entries(entries: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
     return [entry for entry in entries if entry.get("event") == MESSAGE_EVENT]
 
 
-def conversation_from_entries(entries: Iterable[dict[str, Any]]) -> list[dict[str, str]]:
+def conversation_from_entries(
+    entries: Iterable[dict[str, Any]], *, blobs: BlobStore | None = None
+) -> list[dict[str, str]]:
     """从消息条目还原对话历史。
 
     脱敏档里 assistant 消息只留 ``content_chars`` / ``content_sha256``，此时用
     ``<redacted:...>`` 占位——序列与角色仍然逐位可比，这正是「压缩非破坏性」
-    验收要比的东西。
+    验收要比的东西。条目里还留着 blob 引用时用 ``blobs`` 解析。
     """
     history: list[dict[str, str]] = []
     for entry in message_entries(entries):
@@ -116,7 +128,7 @@ def conversation_from_entries(entries: Iterable[dict[str, Any]]) -> list[dict[st
         history.append(
             {
                 "role": str(payload.get("role", "")),
-                "content": _message_content(payload),
+                "content": _message_content(payload, blobs),
             }
         )
     return history
@@ -127,6 +139,7 @@ def rebuild_context(
     *,
     apply_compaction: bool = True,
     until_entry_id: str | None = None,
+    blobs: BlobStore | None = None,
 ) -> list[dict[str, str]]:
     """重建某一步发给 LLM 的对话窗口（不含 system prompt）。
 
@@ -134,63 +147,168 @@ def rebuild_context(
     ``compaction`` 条目，得到「假装从没压缩过」的全量历史。两者相减就是这次
     压缩折叠掉的原文——``no_compression`` ablation 需要的正是这个差值。
 
+    同一份日志要在多个截断点重建时，直接建一次 :class:`ContextIndex` 反复查询。
+
     Args:
         entries: 会话条目（已归一化）
         apply_compaction: 是否套用 ``compaction`` 条目的折叠区间
         until_entry_id: 只看这条之前（含）的条目；``None`` 表示看到末尾
+        blobs: 条目以 ``resolve_blobs=False`` 读入时用它解析 blob 引用——只解析最终
+            窗口里的消息，被折叠掉的原文不读
     """
-    collected = list(entries)
-    if until_entry_id is not None:
-        collected = collected[: find_entry_index(collected, until_entry_id) + 1]
+    return ContextIndex(entries, blobs=blobs).window_at(
+        until_entry_id, apply_compaction=apply_compaction
+    )
 
-    history: list[dict[str, str]] = []
-    history_ids: list[str] = []
-    summary = ""
-    first_kept_entry_id = ""
-    for entry in collected:
-        event = entry.get("event")
-        payload = entry.get("payload") or {}
-        if event == RUN_START_EVENT:
-            # 一个 writer 可以连续记录多个 run；run_start 是对话窗口的硬边界，旧 run
-            # 的消息与 compaction 仍留在 append-only 日志里，但不得混进当前窗口。
-            history.clear()
-            history_ids.clear()
-            summary = ""
-            first_kept_entry_id = ""
-        elif event == MESSAGE_EVENT:
-            history.append(
-                {"role": str(payload.get("role", "")), "content": _message_content(payload)}
-            )
-            history_ids.append(str(entry.get("id", "")))
-        elif event == PARSE_ERROR_EVENT:
-            # 写侧保留原始 assistant message 供审计，但实时上下文只放短占位，
-            # 避免一次超长 malformed completion 被近期窗口反复携带。读侧必须做
-            # 同样的替换，rebuild_context 才能逐字复现模型真正看到的窗口。旧日志
-            # 没有 context_replacement，说明当时原文仍在上下文中，必须保持旧语义。
-            context_replacement = payload.get("context_replacement")
-            if (
-                isinstance(context_replacement, str)
-                and history
-                and history[-1].get("role") == "assistant"
-            ):
-                history[-1] = {
-                    "role": "assistant",
-                    "content": context_replacement,
-                }
-        elif event == COMPACTION_EVENT and apply_compaction:
-            summary = str(payload.get("summary", ""))
-            first_kept_entry_id = str(payload.get("first_kept_entry_id", ""))
 
-    if not (apply_compaction and first_kept_entry_id):
-        return history
+class _Window:
+    """一个 run 的对话窗口：每个消息槽位的各个版本与这段里出现过的压缩。
+
+    消息只追加；``parse_error`` / ``plan_spliced`` 会改写已有槽位，改写记成新版本
+    而不是覆盖，于是任意一个时间点的窗口都能原样取回。
+    """
 
-    try:
-        start = history_ids.index(first_kept_entry_id)
-    except ValueError:
-        # 折叠起点不在本次截断范围内（例如 until_entry_id 早于压缩点），按未压缩处理。
-        return history
-    memory = [{"role": "user", "content": summary}] if summary else []
-    return memory + history[start:]
+    def __init__(self) -> None:
+        # 每个槽位的 [(生效的条目下标, message)]，按下标递增。
+        self.slots: list[list[tuple[int, dict[str, Any]]]] = []
+        self.slot_of: dict[str, int] = {}
+        # [(summary, first_kept_entry_id)]
+        self.compactions: list[tuple[str, str]] = []
+
+    def message(self, slot: int, position: int) -> dict[str, Any]:
+        versions = self.slots[slot]
+        if len(versions) == 1:
+            return versions[0][1]
+        for changed_at, message in reversed(versions):
+            if changed_at <= position:
+                return message
+        return versions[0][1]
+
+
+class ContextIndex:
+    """一遍扫描建好的上下文索引：任意条目处的窗口按窗口大小的代价取回。
+
+    ``rebuild_context`` 每次都从头走到截断点；ablation / 上下文效率分析要在同一份
+    日志的每一次 LLM 请求处各重建一次，总代价是 O(n²)。这里扫描时只给每条条目记
+    一个 ``(窗口, 消息数, 压缩数)`` 三元组，取窗口时再按它切片，``windows()`` 遍历
+    全部 ``llm_call`` 的窗口。语义与 ``rebuild_context`` 完全一致（后者就建在它上面）。
+
+    Args:
+        entries: 会话条目（已归一化）
+        blobs: 条目保留了 blob 引用时用它解析，只解析取回的窗口里的消息
+    """
+
+    def __init__(
+        self, entries: Iterable[dict[str, Any]], *, blobs: BlobStore | None = None
+    ) -> None:
+        self.entries = list(entries)
+        self.blobs = blobs
+        self._positions: dict[str, int] = {}
+        self._windows: list[_Window] = []
+        self._marks: list[tuple[int, int, int]] = []
+        self._build()
+
+    @classmethod
+    def load(cls, path: str | Path) -> ContextIndex:
+        """读会话日志建索引；blob 引用留到取窗口时再解析。"""
+        return cls(load_session_entries(path, resolve_blobs=False), blobs=BlobStore.for_log(path))
+
+    def _build(self) -> None:
+        window = _Window()
+        self._windows.append(window)
+        for position, entry in enumerate(self.entries):
+            self._positions.setdefault(str(entry.get("id", "")), position)
+            event = entry.get("event")
+            payload = entry.get("payload") or {}
+            if event == RUN_START_EVENT:
+                # 一个 writer 可以连续记录多个 run；run_start 是对话窗口的硬边界，旧 run
+                # 的消息与 compaction 仍留在 append-only 日志里，但不得混进当前窗口。
+                window = _Window()
+                self._windows.append(window)
+            elif event == MESSAGE_EVENT:
+                content = payload.get("content")
+                # content 可能暂时还是 blob 引用，取窗口时才解析（见 _materialize）。
+                message = {
+                    "role": str(payload.get("role", "")),
+                    "content": content if is_blob_ref(content) else _message_content(payload),
+                }
+                window.slot_of.setdefault(str(entry.get("id", "")), len(window.slots))
+                window.slots.append([(position, message)])
+            elif event == PARSE_ERROR_EVENT:
+                # 写侧保留原始 assistant message 供审计，但实时上下文只放短占位，
+                # 避免一次超长 malformed completion 被近期窗口反复携带。读侧必须做
+                # 同样的替换，才能逐字复现模型真正看到的窗口。旧日志没有
+                # context_replacement，说明当时原文仍在上下文中，必须保持旧语义。
+                context_replacement = payload.get("context_replacement")
+                if (
+                    isinstance(context_replacement, str)
+                    and window.slots
+                    and window.slots[-1][-1][1].get("role") == "assistant"
+                ):
+                    window.slots[-1].append(
+                        (position, {"role": "assistant", "content": context_replacement})
+                    )
+            elif event == PLAN_SPLICED_EVENT:
+                # speculative planning：第一个 agent 请求发出时计划还没生成，计划到达后
+                # 任务消息被原地改写成带计划的版本，之后的请求都带着它。
+                slot = window.slot_of.get(str(payload.get("message_entry_id", "")))
+                content = payload.get("content")
+                if slot is not None and isinstance(content, str):
+                    role = window.slots[slot][-1][1]["role"]
+                    window.slots[slot].append((position, {"role": role, "content": content}))
+            elif event == COMPACTION_EVENT:
+                window.compactions.append(
+                    (str(payload.get("summary", "")), str(payload.get("first_kept_entry_id", "")))
+                )
+            self._marks.append((len(self._windows) - 1, len(window.slots), len(window.compactions)))
+
+    def position(self, reference: str) -> int:
+        """条目 id（精确或唯一前缀）对应的下标；未命中/歧义时抛 ValueError。"""
+        position = self._positions.get(str(reference or "").strip())
+        return find_entry_index(self.entries, reference) if position is None else position
+
+    def window_at(
+        self, entry_id: str | None = None, *, apply_compaction: bool = True
+    ) -> list[dict[str, str]]:
+        """该条目（含）之前的窗口，与 ``rebuild_context(until_entry_id=...)`` 相同。
+
+        ``entry_id`` 为 ``None`` 时取日志末尾的窗口。
+        """
+        if entry_id is None:
+            if not self.entries:
+                return []
+            return self._window(len(self.entries) - 1, apply_compaction=apply_compaction)
+        return self._window(self.position(entry_id), apply_compaction=apply_compaction)
+
+    def windows(
+        self, *, apply_compaction: bool = True
+    ) -> Iterator[tuple[dict[str, Any], list[dict[str, str]]]]:
+        """按顺序产出每条 ``llm_call`` 条目与它发出时的窗口。"""
+        for position, entry in enumerate(self.entries):
+            if entry.get("event") == LLM_CALL_EVENT:
+                yield entry, self._window(position, apply_compaction=apply_compaction)
+
+    def _window(self, position: int, *, apply_compaction: bool) -> list[dict[str, str]]:
+        window_index, length, compactions = self._marks[position]
+        window = self._windows[window_index]
+        start = 0
+        memory: list[dict[str, Any]] = []
+        if apply_compaction and compactions:
+            summary, first_kept_entry_id = window.compactions[compactions - 1]
+            slot = window.slot_of.get(first_kept_entry_id) if first_kept_entry_id else None
+            # 折叠起点不在截断范围内（例如截断点早于压缩点）时按未压缩处理。
+            if slot is not None and slot < length:
+                start = slot
+                memory = [{"role": "user", "content": summary}] if summary else []
+        history = [window.message(slot, position) for slot in range(start, length)]
+        return memory + _materialize(history, self.blobs)
+
+
+def _materialize(history: list[dict[str, Any]], blobs: BlobStore | None) -> list[dict[str, str]]:
+    return [
+        {"role": message["role"], "content": _message_content(message, blobs)}
+        for message in history
+    ]
 
 
 def latest_checkpoint_entry(
@@ -208,10 +326,12 @@ def latest_checkpoint_entry(
     return None
 
 
-def _message_content(payload: dict[str, Any]) -> str:
+def _message_content(payload: dict[str, Any], blobs: BlobStore | None = None) -> str:
     content = payload.get("content")
     if isinstance(content, str):
         return content
+    if is_blob_ref(content):
+        return str(blobs.resolve(content)) if blobs is not None else blob_placeholder(content)
     digest = payload.get("content_sha256") or ""
     chars = payload.get("content_chars") or 0
     return f"<redacted:{chars}chars:{digest}>"
@@ -2,35 +2,150 @@
 
 from __future__ import annotations
 
-from collections.abc import Sequence
-from typing import Any
-
-
-def summarize_events(events: list[dict[str, Any]]) -> dict[str, Any]:
-    runtime = _first(events, "runtime")
-    run_start = _first(events, "run_start")
-    run_end = _last(events, "run_end")
-    steps = [event["payload"] for event in events if event.get("event") == "step"]
-    plan = _first(events, "plan")
-    metadata = run_end.get("payload", {}).get("metadata", {}) if run_end else {}
-    runtime_payload = runtime.get("payload", {}) if runtime else {}
-    return {
-        "run_id": events[0].get("run_id") if events else "",
-        "schema_version": (run_start or {}).get("payload", {}).get("schema_version"),
-        "task": (run_start or {}).get("payload", {}).get("task", ""),
-        "status": (run_end or {}).get("payload", {}).get("status", ""),
-        "final_answer": (run_end or {}).get("payload", {}).get("final_answer", ""),
-        "duration_seconds": (run_end or {}).get("payload", {}).get("duration_seconds"),
-        "provider": runtime_payload.get("provider") or metadata.get("provider"),
-        "model": runtime_payload.get("model") or metadata.get("model"),
-        "base_url": runtime_payload.get("base_url") or metadata.get("base_url"),
-        "event_count": len(events),
-        "step_count": len(steps),
-        "tool_call_count": sum(1 for event in events if event.get("event") == "tool_call"),
-        "replan_count": sum(1 for event in events if event.get("event") == "replan"),
-        "plan_steps": (plan or {}).get("payload", {}).get("steps", []),
-        "steps": steps,
-    }
+from collections.abc import Iterable, Sequence
+from typing import Any, TypeVar
+
+# Bumped whenever the shape of a saved reducer state changes; older states are discarded.
+REDUCER_STATE_VERSION = 1
+
+_Reducer = TypeVar("_Reducer", bound="TraceSummaryReducer")
+
+
+class TraceSummaryReducer:
+    """Single-pass accumulator behind :func:`summarize_events`.
+
+    Feed events in file order with :meth:`feed`; :meth:`summary` reflects everything
+    fed so far and can be taken at any point. ``keep_steps=False`` drops the per-step
+    payloads, the only part of the summary that grows with the trace, so memory stays
+    bounded when only headers and counters are needed. :meth:`to_state` /
+    :meth:`from_state` round-trip the accumulator through JSON so a live trace can be
+    resumed where the previous pass stopped.
+    """
+
+    def __init__(self, *, keep_steps: bool = True) -> None:
+        self.keep_steps = keep_steps
+        # Raw byte offset consumed from the source file and a digest of its head,
+        # maintained by ``reduce_trace_file``; unused when fed from a list.
+        self.offset = 0
+        self.prefix_sha256 = ""
+        self.event_count = 0
+        self.event_counts: dict[str, int] = {}
+        self.run_id: Any = ""
+        self.runtime: dict[str, Any] | None = None
+        self.run_start: dict[str, Any] | None = None
+        self.run_end: dict[str, Any] | None = None
+        self.plan_steps: list[Any] | None = None
+        self.step_count = 0
+        self.steps: list[Any] = []
+
+    def feed(self, event: dict[str, Any]) -> None:
+        name = event.get("event")
+        if self.event_count == 0:
+            self.run_id = event.get("run_id")
+        self.event_count += 1
+        key = str(name)
+        self.event_counts[key] = self.event_counts.get(key, 0) + 1
+        if name == "step":
+            payload = event["payload"]
+            self.step_count += 1
+            if self.keep_steps:
+                self.steps.append(payload)
+        elif name == "run_end":
+            self.run_end = event.get("payload", {})
+        elif name == "runtime" and self.runtime is None:
+            self.runtime = event.get("payload", {})
+        elif name == "run_start" and self.run_start is None:
+            self.run_start = event.get("payload", {})
+        elif name == "plan" and self.plan_steps is None:
+            self.plan_steps = event.get("payload", {}).get("steps", [])
+
+    def feed_all(self: _Reducer, events: Iterable[dict[str, Any]]) -> _Reducer:
+        for event in events:
+            self.feed(event)
+        return self
+
+    def count(self, event_name: str) -> int:
+        return self.event_counts.get(event_name, 0)
+
+    def summary(self) -> dict[str, Any]:
+        run_start = self.run_start or {}
+        run_end = self.run_end or {}
+        metadata = run_end.get("metadata", {}) if self.run_end is not None else {}
+        runtime_payload = self.runtime or {}
+        return {
+            "run_id": self.run_id if self.event_count else "",
+            "schema_version": run_start.get("schema_version"),
+            "task": run_start.get("task", ""),
+            "status": run_end.get("status", ""),
+            "final_answer": run_end.get("final_answer", ""),
+            "duration_seconds": run_end.get("duration_seconds"),
+            "provider": runtime_payload.get("provider") or metadata.get("provider"),
+            "model": runtime_payload.get("model") or metadata.get("model"),
+            "base_url": runtime_payload.get("base_url") or metadata.get("base_url"),
+            "event_count": self.event_count,
+            "step_count": self.step_count,
+            "tool_call_count": self.count("tool_call"),
+            "replan_count": self.count("replan"),
+            "plan_steps": self.plan_steps if self.plan_steps is not None else [],
+            "steps": list(self.steps),
+        }
+
+    def to_state(self) -> dict[str, Any]:
+        """JSON-serializable snapshot; restore it with :meth:`from_state`."""
+        return {
+            "version": REDUCER_STATE_VERSION,
+            "kind": type(self).__name__,
+            "keep_steps": self.keep_steps,
+            "offset": self.offset,
+            "prefix_sha256": self.prefix_sha256,
+            "event_count": self.event_count,
+            "event_counts": dict(self.event_counts),
+            "run_id": self.run_id,
+            "runtime": self.runtime,
+            "run_start": self.run_start,
+            "run_end": self.run_end,
+            "plan_steps": self.plan_steps,
+            "step_count": self.step_count,
+            "steps": list(self.steps),
+        }
+
+    @classmethod
+    def from_state(cls: type[_Reducer], state: dict[str, Any]) -> _Reducer:
+        """Rebuild a reducer from :meth:`to_state` output.
+
+        Raises:
+            ValueError: the state was saved by another reducer type or state version,
+                or is missing fields
+        """
+        if not isinstance(state, dict) or state.get("version") != REDUCER_STATE_VERSION:
+            raise ValueError("Unsupported trace reducer state version.")
+        if state.get("kind") != cls.__name__:
+            raise ValueError(
+                f"Reducer state was saved by {state.get('kind')!r}, not {cls.__name__}."
+            )
+        reducer = cls(keep_steps=bool(state.get("keep_steps")))
+        try:
+            reducer._restore(state)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"Malformed trace reducer state: {exc}") from exc
+        return reducer
+
+    def _restore(self, state: dict[str, Any]) -> None:
+        self.offset = int(state["offset"])
+        self.prefix_sha256 = str(state["prefix_sha256"])
+        self.event_count = int(state["event_count"])
+        self.event_counts = {str(key): int(value) for key, value in state["event_counts"].items()}
+        self.run_id = state["run_id"]
+        self.runtime = state["runtime"]
+        self.run_start = state["run_start"]
+        self.run_end = state["run_end"]
+        self.plan_steps = state["plan_steps"]
+        self.step_count = int(state["step_count"])
+        self.steps = list(state["steps"])
+
+
+def summarize_events(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    return TraceSummaryReducer().feed_all(events).summary()
 
 
 def diff_events(
@@ -79,20 +194,6 @@ def diff_events(
     }
 
 
-def _first(events: Sequence[dict[str, Any]], event_name: str) -> dict[str, Any] | None:
-    for event in events:
-        if event.get("event") == event_name:
-            return event
-    return None
-
-
-def _last(events: Sequence[dict[str, Any]], event_name: str) -> dict[str, Any] | None:
-    for event in reversed(events):
-        if event.get("event") == event_name:
-            return event
-    return None
-
-
 def _trace_header(summary: dict[str, Any]) -> dict[str, Any]:
     return {
         "run_id": summary.get("run_id", ""),
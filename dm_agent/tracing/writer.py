@@ -2,22 +2,31 @@
 
 from __future__ import annotations
 
+import contextlib
 import hashlib
 import json
 import os
 import platform
-import re
+import queue
 import sys
+import threading
+import time
 import uuid
 from collections.abc import Iterable
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, TextIO
+from typing import IO, Any
 
 from dm_agent.memory.context_budget import estimate_tokens_from_chars
 
+from .blobs import BlobStore, resolve_entries
+from .compression import compress_block, is_compressed_path, is_session_log_path, read_log_text
+from .index import SessionIndex, block_records, format_index_rows, open_index_sidecar
+from .redaction import Redactor
 from .session import new_entry_id, normalize_entries
 
+# 2.0 增量字段：流式请求的 llm_call 带 timing（首 token / 动作就绪耗时）；
+# 供应商回报用量时带 usage（prompt/completion/cached/cache_write tokens）。
 # 2.0: 每条 entry 带 id/parent_id，会话日志成为可导航的树；新增 message /
 # compaction / checkpoint / fork 四类条目。老字段（event/payload）一个没动，
 # 1.x 的文件仍然可读（读侧按序补 id），下游分析工具行为不变。
@@ -25,7 +34,17 @@ from .session import new_entry_id, normalize_entries
 # 1.1: additive events (observation_truncated, context_budget, edit_guard, ...)
 # and the llm_call estimated_prompt_tokens field. Older traces stay parseable.
 TRACE_SCHEMA_VERSION = "2.0"
-SENSITIVE_ENV_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CREDENTIAL")
+
+# fsync 策略：off 只 flush 到操作系统；checkpoint 在提交点（run_end / run_error /
+# checkpoint / close）额外 fsync；always 每次组提交都 fsync。
+FSYNC_POLICIES = ("off", "checkpoint", "always")
+# 无论缓冲了多少条，写到这些条目时都立刻提交：它们是续跑与跟读的边界。
+COMMIT_EVENTS = frozenset({"run_end", "run_error", "checkpoint"})
+# 后台写线程的默认队列长度；写满时 record() 阻塞，反压到调用方。
+DEFAULT_QUEUE_SIZE = 256
+# ``*.gz`` 日志没指定 flush_every 时的组提交条数：每次提交是一个 gzip member，逐条压缩
+# 既膨胀体积（每个 member 都有头尾、字典从零开始），也让读侧要解的 member 数翻几十倍。
+COMPRESSED_FLUSH_EVERY = 64
 
 
 class TraceWriter:
@@ -37,6 +56,23 @@ class TraceWriter:
     每条 entry 都有 ``id``（``<run_id 前 8 位>-<四位序号>``）与 ``parent_id``（上一条的
     id）。``fork_parent_id`` 让分叉出来的会话第一条指回源会话的分叉点，从而把多份
     JSONL 串成一棵树。
+
+    默认每条 entry 写完立刻 flush（``*.gz`` 路径默认按 ``COMPRESSED_FLUSH_EVERY`` 条组提交）。
+    ``flush_every`` > 1 或 ``flush_interval_ms`` > 0 开启组提交：条目先攒在内存里，攒够 N 条或最早一条等了 T 毫秒才一次性写出；
+    ``COMMIT_EVENTS``、``flush()`` 与 ``close()`` 总会把缓冲写干净。``fsync`` 取值见
+    ``FSYNC_POLICIES``。
+
+    ``background=True`` 把脱敏、序列化与写盘交给一个专用线程：``record()`` 同步分配
+    entry id 与 parent_id（``compaction`` 的 id 映射照常成立），只把 payload 的容器
+    快照放进有界队列。``finish_run()`` / ``close()`` 等队列按序写完才返回；写线程的
+    异常在调用方下一次 ``record`` / ``flush`` / ``finish_run`` / ``close`` 时原样抛出。
+
+    ``index=True``（默认）时每次组提交后把这批条目的字节位置追加到边车索引
+    ``<日志名>.idx``（见 ``tracing/index.py``）；索引写失败只停用索引，不影响日志。
+
+    ``blob_threshold`` > 0 时，payload 里长于它的字符串（脱敏之后）存进内容寻址的
+    ``<日志名>.blobs/``，条目里只留引用（见 ``tracing/blobs.py``）；blob 写失败时
+    停用外置、改回内联，不丢条目。
     """
 
     def __init__(
@@ -47,17 +83,54 @@ class TraceWriter:
         fork_parent_id: str = "",
         redact: bool = True,
         auto_close: bool = False,
+        flush_every: int | None = None,
+        flush_interval_ms: int = 0,
+        fsync: str = "off",
+        background: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        index: bool = True,
+        blob_threshold: int = 0,
     ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync 必须是 {', '.join(FSYNC_POLICIES)} 之一：{fsync!r}")
         self.path = Path(path)
+        self.blob_threshold = max(0, blob_threshold)
+        self._blobs: BlobStore | None = None
         self.capture_llm_io = capture_llm_io
         self.redact = redact
         self.auto_close = auto_close
+        # ``*.gz`` 路径写块压缩格式：每次组提交是一个独立的 gzip member。
+        self.compressed = is_compressed_path(self.path)
+        if flush_every is None:
+            flush_every = COMPRESSED_FLUSH_EVERY if self.compressed else 1
+        self.flush_every = max(1, flush_every)
+        self.flush_interval_ms = max(0, flush_interval_ms)
+        self.fsync = fsync
+        self.background = background
+        self.queue_size = max(1, queue_size)
+        self._queue: queue.Queue[tuple[Any, ...] | None] | None = None
+        self._worker: threading.Thread | None = None
+        self._worker_error: BaseException | None = None
+        self._pending: list[bytes] = []
+        # 与 _pending 一一对应的 (entry id, event, run_id)，提交时生成索引记录。
+        self._pending_identities: list[tuple[str, str, str]] = []
+        self.index = index
+        # 日志当前的原始字节长度：索引记录的偏移基准，打开时与文件大小核对。
+        self._log_offset = 0
+        self._index_synced = False
+        self._index_handle: IO[str] | None = None
+        # 脱敏引擎在第一次需要时构建（环境变量快照一次），之后每条记录复用。
+        self._redactor: Redactor | None = None
+        self._pending_since = 0.0
         self.run_id = uuid.uuid4().hex
-        self._handle: TextIO | None = None
+        self._handle: IO[Any] | None = None
         self._started = False
         self._ended = False
         self._seq = 0
         self._last_entry_id = fork_parent_id
+        # 累计写盘耗时（秒）；ReactAgent 按步取差值，作为 step_timing 的 trace_io 阶段。
+        # 后台模式下只含调用方线程上的入队耗时。
+        self.io_seconds = 0.0
 
     def __enter__(self) -> TraceWriter:
         self.open()
@@ -77,14 +150,53 @@ class TraceWriter:
     def open(self) -> None:
         if self._handle is None:
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            self._handle = self.path.open("a", encoding="utf-8")
+            # 明文也按字节写：索引记的是原始字节偏移，不能让文本层改写换行。
+            self._handle = self.path.open("ab")
+            if self.index:
+                self._sync_index()
 
     def close(self) -> None:
-        if self._handle is not None:
-            self._handle.close()
-            self._handle = None
+        try:
+            self._stop_worker()
+        finally:
+            if self._handle is not None:
+                try:
+                    if self._worker_error is None:
+                        self._commit(durable=True)
+                finally:
+                    self._handle.close()
+                    self._handle = None
+                    self._close_index()
+        self._raise_worker_error()
+
+    @property
+    def buffered(self) -> bool:
+        return self.flush_every > 1 or self.flush_interval_ms > 0
+
+    def flush(self) -> None:
+        """把缓冲中的条目写出并 flush；智能体在等模型之前调用，保证跟读者不落后。
+
+        后台模式下只是排一个提交指令，不等写线程。
+        """
+        self._raise_worker_error()
+        if self._queue is not None:
+            self._queue.put(("flush",))
+            return
+        if not self._pending:
+            return
+        started = time.perf_counter()
+        self.open()
+        self._commit(durable=False)
+        self.io_seconds += time.perf_counter() - started
 
-    def start_run(self, task: str, *, metadata: dict[str, Any] | None = None) -> None:
+    def start_run(
+        self,
+        task: str,
+        *,
+        metadata: dict[str, Any] | None = None,
+        workspace: str | Path | None = None,
+    ) -> None:
+        """写 ``run_start``；``cwd`` 记智能体的工作区，没有绑定工作区时才取进程 CWD。"""
         self._started = True
         self._ended = False
         self.record(
@@ -92,7 +204,7 @@ class TraceWriter:
             {
                 "schema_version": TRACE_SCHEMA_VERSION,
                 "task": task,
-                "cwd": str(Path.cwd()),
+                "cwd": str(Path(workspace).resolve() if workspace is not None else Path.cwd()),
                 "python": sys.version.split()[0],
                 "platform": platform.platform(),
                 "capture_llm_io": self.capture_llm_io,
@@ -112,6 +224,13 @@ class TraceWriter:
                 "metadata": metadata,
             },
         )
+        self.drain()
+
+    def drain(self) -> None:
+        """等后台写线程把已入队的条目全部写完（同步模式下是空操作）。"""
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_worker_error()
 
     def record_plan(self, steps: Iterable[Any]) -> None:
         plan = []
@@ -129,6 +248,10 @@ class TraceWriter:
     def record_plan_error(self, error: str) -> None:
         self.record("plan_error", {"error": error})
 
+    def record_plan_spliced(self, payload: dict[str, Any], *, message_index: int = -1) -> str:
+        """记录 speculative planning 把计划拼回任务消息（``message_entry_id`` 指向被改写的条目）。"""
+        return self.record("plan_spliced", payload)
+
     def record_skills(self, skill_names: list[str]) -> None:
         self.record("skills", {"activated": skill_names})
 
@@ -139,6 +262,9 @@ class TraceWriter:
         messages: list[dict[str, str]],
         temperature: float,
         raw_response: str | None = None,
+        timing: dict[str, Any] | None = None,
+        usage: dict[str, int] | None = None,
+        usage_source: str | None = None,
     ) -> None:
         prompt_chars = sum(len(message.get("content", "")) for message in messages)
         payload: dict[str, Any] = {
@@ -154,6 +280,15 @@ class TraceWriter:
             payload["raw_response"] = raw_response
         elif raw_response is not None:
             payload["response_chars"] = len(raw_response)
+        if timing:
+            # 流式请求的首 token / 动作就绪耗时（见 core.driver.consume_stream）。
+            payload["timing"] = dict(timing)
+        if usage:
+            # 供应商回报的真实用量；cached_tokens / prompt_tokens 就是前缀缓存命中率。
+            payload["usage"] = dict(usage)
+        if usage_source:
+            # 流式请求的用量口径：estimated 的条目没有 usage，只有 estimated_prompt_tokens。
+            payload["usage_source"] = usage_source
         self.record("llm_call", payload)
 
     def record_parse_error(
@@ -185,17 +320,19 @@ class TraceWriter:
         action_input: Any,
         observation: str,
         failed: bool = False,
+        cached: bool = False,
     ) -> None:
-        self.record(
-            "tool_call",
-            {
-                "step_number": step_number,
-                "action": action,
-                "action_input": action_input,
-                "observation": observation,
-                "failed": failed,
-            },
-        )
+        payload = {
+            "step_number": step_number,
+            "action": action,
+            "action_input": action_input,
+            "observation": observation,
+            "failed": failed,
+        }
+        if cached:
+            # 只在命中时出现，未启用缓存的 trace 形状不变。
+            payload["cached"] = True
+        self.record("tool_call", payload)
 
     def record_step(self, *, step_number: int, step: Any) -> None:
         payload = {
@@ -270,6 +407,16 @@ class TraceWriter:
             sanitize=False,
         )
 
+    def record_checkpoint_delta(
+        self, *, step_number: int, delta: dict[str, Any], base_id: str
+    ) -> str:
+        """追加一条增量 checkpoint：只记相对 ``base_id`` 那条 checkpoint 的变化。"""
+        return self.record(
+            "checkpoint",
+            {"step_number": step_number, "base_id": base_id, "delta": delta},
+            sanitize=False,
+        )
+
     def record(
         self,
         event: str,
@@ -282,8 +429,9 @@ class TraceWriter:
         ``sanitize=False`` 只给 ``checkpoint`` 条目用：脱敏会把 ``$HOME`` 改写成
         ``~``、把疑似密钥替换掉，写进可恢复状态会污染续跑的上下文。
         """
+        started = time.perf_counter()
+        self._raise_worker_error()
         self.open()
-        assert self._handle is not None
         self._seq += 1
         entry_id = new_entry_id(self.run_id, self._seq)
         envelope = {
@@ -292,25 +440,173 @@ class TraceWriter:
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "run_id": self.run_id,
             "event": event,
-            "payload": (
-                _sanitize(payload) if (self.redact if sanitize is None else sanitize) else payload
-            ),
         }
-        self._handle.write(json.dumps(envelope, ensure_ascii=False, sort_keys=True) + "\n")
-        self._handle.flush()
+        redact = self.redact if sanitize is None else sanitize
         self._last_entry_id = entry_id
-        if self.auto_close:
-            self.close()
+        if self.background:
+            # 调用方拿到 id 后可能继续改动 payload 里的 dict/list（如 run 元数据），
+            # 入队前先拍容器快照；字符串不可变，不复制。
+            self._ensure_worker().put(("entry", envelope, _snapshot(payload), redact))
+        else:
+            self._write_entry(envelope, payload, redact)
+        self.io_seconds += time.perf_counter() - started
         return entry_id
 
+    def _write_entry(self, envelope: dict[str, Any], payload: Any, redact: bool) -> None:
+        assert self._handle is not None
+        envelope["payload"] = self._redact(payload) if redact else payload
+        if self.blob_threshold:
+            envelope["payload"] = self._externalize(envelope["payload"])
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        line = json.dumps(envelope, ensure_ascii=False, sort_keys=True) + "\n"
+        self._pending.append(line.encode("utf-8"))
+        self._pending_identities.append((envelope["id"], envelope["event"], envelope["run_id"]))
+        if self.auto_close and not self.background:
+            self.close()
+        elif envelope["event"] in COMMIT_EVENTS:
+            self._commit(durable=True)
+        elif self._group_full():
+            self._commit(durable=False)
+
+    def _ensure_worker(self) -> queue.Queue[tuple[Any, ...] | None]:
+        if self._queue is None or self._worker is None:
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._worker = threading.Thread(
+                target=self._drain_queue,
+                args=(self._queue,),
+                name=f"session-writer-{self.path.name}",
+                daemon=True,
+            )
+            self._worker.start()
+        return self._queue
+
+    def _drain_queue(self, items: queue.Queue[tuple[Any, ...] | None]) -> None:
+        """写线程主循环：按入队顺序写；出错后丢弃后续条目，错误留给调用方抛出。"""
+        while True:
+            item = items.get()
+            try:
+                if item is None:
+                    return
+                if self._worker_error is not None:
+                    continue
+                if item[0] == "entry":
+                    self._write_entry(item[1], item[2], item[3])
+                elif self._handle is not None:
+                    self._commit(durable=False)
+            except Exception as exc:
+                self._worker_error = exc
+            finally:
+                items.task_done()
+
+    def _stop_worker(self) -> None:
+        if self._queue is None or self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._queue = None
+        self._worker = None
+
+    def _raise_worker_error(self) -> None:
+        # 错误是粘性的：一个写坏的 sink 之后的条目已被丢弃，继续写只会留下断链的日志。
+        if self._worker_error is not None:
+            raise self._worker_error
+
+    def _redact(self, payload: dict[str, Any]) -> Any:
+        if self._redactor is None:
+            self._redactor = Redactor()
+        return self._redactor.redact(payload)
+
+    def _externalize(self, payload: Any) -> Any:
+        if self._blobs is None:
+            # 引用 blob 的条目按 fsync 策略落盘时，blob 本身必须先落盘。
+            self._blobs = BlobStore.for_log(self.path, fsync=self.fsync != "off")
+        try:
+            return self._blobs.externalize(payload, self.blob_threshold)
+        except OSError as exc:
+            self.blob_threshold = 0
+            print(f"[warn] 会话 blob 目录 {self._blobs.root.name} 不可写，改为内联：{exc}")
+            return payload
+
+    def _group_full(self) -> bool:
+        if len(self._pending) >= self.flush_every:
+            return True
+        return (
+            self.flush_interval_ms > 0
+            and (time.monotonic() - self._pending_since) * 1000 >= self.flush_interval_ms
+        )
+
+    def _commit(self, *, durable: bool) -> None:
+        """一次 write + flush 写出全部缓冲条目；按 fsync 策略决定是否落到磁盘。"""
+        assert self._handle is not None
+        lines = self._pending
+        identities = self._pending_identities
+        if lines:
+            # 先清空再写：写失败时这批条目随异常一起交给调用方，不会在下次提交时重复写出。
+            self._pending = []
+            self._pending_identities = []
+            data = b"".join(lines)
+            block = compress_block(data) if self.compressed else data
+            self._handle.write(block)
+        self._handle.flush()
+        if self.fsync == "always" or (durable and self.fsync == "checkpoint"):
+            os.fsync(self._handle.fileno())
+        if lines:
+            offset = self._log_offset
+            self._log_offset += len(block)
+            if self.index:
+                # 日志先落地、索引后追加：索引永远不会指向日志里还不存在的字节。
+                records = block_records(
+                    lines,
+                    identities,
+                    offset=offset,
+                    compressed=self.compressed,
+                    block_length=len(block),
+                )
+                try:
+                    assert self._index_handle is not None
+                    self._index_handle.write(format_index_rows(records))
+                    self._index_handle.flush()
+                except OSError as exc:
+                    self._disable_index(exc)
+
+    def _sync_index(self) -> None:
+        """打开日志时核对边车索引：老日志或被别人追加过的日志先补齐，再接着追加。"""
+        size = self.path.stat().st_size
+        try:
+            if not (self._index_synced and size == self._log_offset):
+                SessionIndex.load(self.path, owner=True)
+            self._index_handle = open_index_sidecar(self.path)
+        except (OSError, ValueError) as exc:
+            self._disable_index(exc)
+            return
+        self._log_offset = size
+        self._index_synced = True
+
+    def _close_index(self) -> None:
+        if self._index_handle is not None:
+            with contextlib.suppress(OSError):
+                self._index_handle.close()
+            self._index_handle = None
+
+    def _disable_index(self, error: Exception) -> None:
+        # 索引只是加速结构：读侧发现它落后于日志时会扫描尾部补齐，停用不丢数据。
+        self.index = False
+        self._close_index()
+        print(f"[warn] 会话索引 {self.path.name}.idx 不可用，已停用：{error}")
+
 
-def load_trace_events(path: str | Path) -> list[dict[str, Any]]:
-    """读取会话日志（或 1.x 的老 trace），缺失的 id/parent_id 在读侧补齐。"""
+def load_trace_events(path: str | Path, *, resolve_blobs: bool = True) -> list[dict[str, Any]]:
+    """读取会话日志（或 1.x 的老 trace），缺失的 id/parent_id 在读侧补齐。
+
+    ``resolve_blobs=True`` 时把 blob 引用换回原文（日志旁没有 blob 目录时不做任何事）。
+    """
     events: list[dict[str, Any]] = []
-    for line in Path(path).read_text(encoding="utf-8").splitlines():
+    for line in read_log_text(path).splitlines():
         if line.strip():
             events.append(json.loads(line))
-    return normalize_entries(events)
+    entries = normalize_entries(events)
+    return resolve_entries(entries, path) if resolve_blobs else entries
 
 
 class SessionWriter:
@@ -321,10 +617,33 @@ class SessionWriter:
     可以有不同 payload 和不同 id，而 ``compaction`` 仍能准确指向各自文件中的条目。
     """
 
-    def __init__(self, trace_writer: TraceWriter | None = None) -> None:
+    def __init__(
+        self,
+        trace_writer: TraceWriter | None = None,
+        *,
+        flush_every: int | None = None,
+        flush_interval_ms: int = 0,
+        fsync: str = "off",
+        background: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        blob_threshold: int = 0,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync 必须是 {', '.join(FSYNC_POLICIES)} 之一：{fsync!r}")
+        # checkpoint sink 由本类按需创建，沿用这里的组提交 / fsync / 后台写 / blob 设置。
+        self._sink_options: dict[str, Any] = {
+            "flush_every": flush_every,
+            "flush_interval_ms": flush_interval_ms,
+            "fsync": fsync,
+            "background": background,
+            "queue_size": queue_size,
+            "blob_threshold": blob_threshold,
+        }
         self._sinks: dict[str, TraceWriter] = {}
         self._message_entry_ids: dict[str, list[str]] = {}
         self._disabled_checkpoint_paths: set[Path] = set()
+        # checkpoint sink 里已记下的消息 (role, content) -> entry id，供增量 checkpoint 引用。
+        self._checkpoint_messages: dict[tuple[str, str], str] = {}
         if trace_writer is not None:
             self._sinks["trace"] = trace_writer
             self._message_entry_ids["trace"] = []
@@ -343,16 +662,46 @@ class SessionWriter:
         writer = self._sinks.get("trace")
         return bool(getattr(writer, "capture_llm_io", False)) if writer is not None else False
 
-    def start_run(self, task: str, *, metadata: dict[str, Any] | None = None) -> None:
+    @property
+    def io_seconds(self) -> float:
+        """全部 sink 的累计写盘耗时。"""
+        return sum(float(getattr(writer, "io_seconds", 0.0)) for writer in self._sinks.values())
+
+    def start_run(
+        self,
+        task: str,
+        *,
+        metadata: dict[str, Any] | None = None,
+        workspace: str | Path | None = None,
+    ) -> None:
         self._message_entry_ids = {name: [] for name in self._sinks}
-        self._fanout("start_run", task, metadata=metadata)
+        self._fanout("start_run", task, metadata=metadata, workspace=workspace)
 
     def finish_run(self, result: dict[str, Any]) -> None:
         self._fanout("finish_run", result)
+        # checkpoint sink 是内部按需创建的，没有调用方替它 close；run 边界释放句柄，
+        # 同一个 SessionWriter 再跑下一轮时按需重新打开。
+        checkpoint = self._sinks.get("checkpoint")
+        if checkpoint is not None:
+            try:
+                checkpoint.close()
+            except OSError as exc:
+                self._disable_checkpoint_sink("checkpoint", exc)
 
     def close(self) -> None:
-        for writer in list(self._sinks.values()):
-            writer.close()
+        for name, writer in list(self._sinks.items()):
+            try:
+                writer.close()
+            except OSError as exc:
+                self._disable_checkpoint_sink(name, exc)
+
+    def flush(self) -> None:
+        """把各 sink 缓冲中的条目写出（未开启组提交时是空操作）。"""
+        for name, writer in list(self._sinks.items()):
+            try:
+                writer.flush()
+            except OSError as exc:
+                self._disable_checkpoint_sink(name, exc)
 
     def record(self, event: str, payload: dict[str, Any], *, sanitize: bool | None = None) -> str:
         return self._fanout("record", event, payload, sanitize=sanitize)
@@ -372,6 +721,8 @@ class SessionWriter:
                 self._disable_checkpoint_sink(name, exc)
                 continue
             self._message_entry_ids.setdefault(name, []).append(entry_id)
+            if name == "checkpoint":
+                self._checkpoint_messages[(role, content)] = entry_id
             results[name] = entry_id
         return results.get(self._primary_name(), "")
 
@@ -399,6 +750,20 @@ class SessionWriter:
                 self._disable_checkpoint_sink(name, exc)
         return results.get(self._primary_name(), "")
 
+    def record_plan_spliced(self, payload: dict[str, Any], *, message_index: int = -1) -> str:
+        """按每个 sink 的消息 id 映射写 ``plan_spliced`` 条目。"""
+        results: dict[str, str] = {}
+        for name, writer in list(self._sinks.items()):
+            local_payload = dict(payload)
+            if message_index >= 0:
+                ids = self._message_entry_ids.get(name, [])
+                local_payload["message_entry_id"] = _local_message_id(ids, message_index)
+            try:
+                results[name] = writer.record_plan_spliced(local_payload)
+            except OSError as exc:
+                self._disable_checkpoint_sink(name, exc)
+        return results.get(self._primary_name(), "")
+
     def record_checkpoint_state(self, *, step_number: int, state: dict[str, Any]) -> str:
         """checkpoint 状态只进入本地完整 sink，不泄露到分享档。"""
         writer = self._sinks.get("checkpoint")
@@ -410,10 +775,31 @@ class SessionWriter:
             self._disable_checkpoint_sink("checkpoint", exc)
             return ""
 
+    def record_checkpoint_delta(
+        self, *, step_number: int, delta: dict[str, Any], base_id: str
+    ) -> str:
+        writer = self._sinks.get("checkpoint")
+        if writer is None:
+            return ""
+        try:
+            return writer.record_checkpoint_delta(
+                step_number=step_number, delta=delta, base_id=base_id
+            )
+        except OSError as exc:
+            self._disable_checkpoint_sink("checkpoint", exc)
+            return ""
+
+    def checkpoint_message_id(self, message: dict[str, Any]) -> str:
+        """checkpoint sink 里内容与 ``message`` 完全一致的 ``message`` 条目 id，没有时为空串。"""
+        content = message.get("content")
+        if not isinstance(content, str):
+            return ""
+        return self._checkpoint_messages.get((str(message.get("role", "")), content), "")
+
     def ensure_checkpoint_sink(self, path: str | Path) -> None:
-        """为 ``*.jsonl`` checkpoint 准备本地完整 sink。"""
+        """为 ``*.jsonl`` / ``*.jsonl.gz`` checkpoint 准备本地完整 sink。"""
         target = Path(path)
-        if target.suffix.lower() != ".jsonl":
+        if not is_session_log_path(target):
             return
         resolved = target.resolve()
         if resolved in self._disabled_checkpoint_paths:
@@ -426,13 +812,16 @@ class SessionWriter:
         old = self._sinks.get("checkpoint")
         if old is not None:
             old.close()
+        # 句柄常驻：每条 checkpoint 条目都是提交点，写完即 flush（按策略 fsync），
+        # 不必为每条记录重新打开文件。
         self._sinks["checkpoint"] = TraceWriter(
             target,
             capture_llm_io=False,
             redact=False,
-            auto_close=True,
+            **self._sink_options,
         )
         self._message_entry_ids["checkpoint"] = []
+        self._checkpoint_messages = {}
 
     def __getattr__(self, name: str) -> Any:
         """把新增的 ``record_*`` 方法透明转发给所有 sink。"""
@@ -465,46 +854,24 @@ class SessionWriter:
             raise error
         writer = self._sinks.pop(name, None)
         self._message_entry_ids.pop(name, None)
+        self._checkpoint_messages = {}
         if writer is not None:
             self._disabled_checkpoint_paths.add(writer.path.resolve())
-            writer.close()
+            with contextlib.suppress(OSError):
+                writer.close()
         print(f"[warn] checkpoint 会话写入失败，已停用该 sink：{error}")
 
 
-def _local_message_id(entry_ids: list[str], index: int) -> str:
-    if 0 <= index < len(entry_ids):
-        return entry_ids[index]
-    return ""
-
-
-def _sanitize(value: Any) -> Any:
+def _snapshot(value: Any) -> Any:
+    """复制 payload 的 dict/list 骨架（叶子原样共享），供后台线程安全地序列化。"""
     if isinstance(value, dict):
-        return {str(key): _sanitize(item) for key, item in value.items()}
-    if isinstance(value, list):
-        return [_sanitize(item) for item in value]
-    if isinstance(value, tuple):
-        return [_sanitize(item) for item in value]
-    if isinstance(value, str):
-        return _sanitize_text(value)
+        return {key: _snapshot(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_snapshot(item) for item in value]
     return value
 
 
-def _sanitize_text(text: str) -> str:
-    sanitized = text
-    for name, value in os.environ.items():
-        if len(value) < 6:
-            continue
-        if any(marker in name.upper() for marker in SENSITIVE_ENV_MARKERS):
-            sanitized = sanitized.replace(value, f"<redacted-env:{name}>")
-
-    home = str(Path.home())
-    if home and home in sanitized:
-        sanitized = sanitized.replace(home, "~")
-
-    sanitized = re.sub(
-        r"(?i)(api[_-]?key|token|secret|password)(\s*[=:]\s*)([^\s,'\"}]+)",
-        r"\1\2<redacted>",
-        sanitized,
-    )
-    sanitized = re.sub(r"(?i)(bearer\s+)[a-z0-9._\-]+", r"\1<redacted>", sanitized)
-    return sanitized
+def _local_message_id(entry_ids: list[str], index: int) -> str:
+    if 0 <= index < len(entry_ids):
+        return entry_ids[index]
+    return ""
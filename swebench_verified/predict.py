@@ -21,7 +21,7 @@ import sys
 import tarfile
 import tempfile
 import time
-from contextlib import contextmanager, redirect_stdout
+from contextlib import redirect_stdout
 from io import StringIO
 from pathlib import Path, PurePosixPath
 from typing import Any
@@ -69,16 +69,6 @@ Rules:
 """
 
 
-@contextmanager
-def chdir(path: Path):
-    previous = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(previous)
-
-
 def _run(command: list[str], **kwargs: Any) -> subprocess.CompletedProcess[str]:
     return subprocess.run(
         command, capture_output=True, text=True, encoding="utf-8", errors="replace", **kwargs
@@ -414,6 +404,7 @@ def predict_one(
         temperature=temperature,
         trace_writer=trace_writer,
         capabilities=[SWEProgressLoopGuard()],
+        workspace=workspace,
     )
     prompt = PROMPT_TEMPLATE.format(
         repo=instance["repo"],
@@ -426,17 +417,16 @@ def predict_one(
     metadata: dict[str, Any] = {}
     step_count = 0
     diagnostics_measured = False
-    with chdir(workspace):
-        try:
-            with redirect_stdout(StringIO()):
-                result = agent.run(prompt)
-            diagnostics_measured = True
-            metadata = dict(result.get("metadata", {}))
-            status = str(metadata.get("status", "unknown"))
-            step_count = len(result.get("steps", []))
-        except Exception as exc:  # 单题崩溃不该让整批预测终止
-            status = "agent_exception"
-            failure = f"{type(exc).__name__}: {exc}"
+    try:
+        with redirect_stdout(StringIO()):
+            result = agent.run(prompt)
+        diagnostics_measured = True
+        metadata = dict(result.get("metadata", {}))
+        status = str(metadata.get("status", "unknown"))
+        step_count = len(result.get("steps", []))
+    except Exception as exc:  # 单题崩溃不该让整批预测终止
+        status = "agent_exception"
+        failure = f"{type(exc).__name__}: {exc}"
 
     patch = extract_patch(workspace)
     record: dict[str, Any] = {
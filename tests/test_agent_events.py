@@ -431,6 +431,32 @@ def test_on_run_end_retry_restores_full_compressor_state_after_real_compaction()
     assert memory.render_count == 1
 
 
+def test_run_level_retry_snapshot_does_not_pin_the_memory_undo_journal():
+    steps = 60
+    client = FakeRespondClient(
+        [_action("echo", {"text": f"step {index} app.py " + "x" * 120}) for index in range(steps)]
+        + [_action("finish", "done")]
+    )
+    agent = ReactAgent(
+        client,
+        [Tool("echo", "Echo", lambda arguments: "ok " + str(arguments))],
+        enable_planning=False,
+        enable_compression=True,
+    )
+    assert agent.compressor is not None
+    agent.compressor.compress_every = 1
+    agent.compressor.keep_recent = 1
+    agent.compressor.token_budget = 0
+    memory = agent.compressor.memory
+
+    result = agent.run("many steps with compaction", max_steps=steps + 1)
+
+    assert result["final_answer"] == "done"
+    assert agent.compressor.export_state()["compression_count"] > 1
+    # 候选折叠的 mark 用完即弃；整个 run 的重试基线不持有 mark，日志不随步数增长。
+    assert len(memory._journal) < 20
+
+
 def test_run_hook_exception_is_isolated_and_traced(tmp_path):
     trace_path = tmp_path / "run-hooks.jsonl"
     bus = EventBus()
@@ -86,6 +86,52 @@ def test_edit_guard_blocks_unread_file_then_allows_after_read(tmp_path, monkeypa
     assert not ReactAgent._is_failure_observation(blocked)
 
 
+def test_edit_guard_resolves_relative_paths_against_the_agent_workspace(tmp_path, monkeypatch):
+    workspace = tmp_path / "ws"
+    (workspace / "src").mkdir(parents=True)
+    target = workspace / "src" / "x.py"
+    target.write_text("original line\n", encoding="utf-8")
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+
+    client = FakeRespondClient(
+        [
+            _action("read_file", {"path": "src/x.py"}),
+            _action(
+                "edit_file",
+                {
+                    "path": str(target),
+                    "operation": "replace",
+                    "line_start": 1,
+                    "line_end": 1,
+                    "content": "edited line",
+                },
+            ),
+            _action("finish", "edited src/x.py after reading it"),
+        ]
+    )
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            _file_tools(),
+            enable_planning=False,
+            enable_compression=False,
+            workspace=workspace,
+            trace_writer=writer,
+        )
+        result = agent.run("edit src/x.py", max_steps=4)
+
+    assert result["metadata"]["status"] == "success"
+    assert result["metadata"].get("edit_guard_block_count", 0) == 0
+    assert target.read_text(encoding="utf-8") == "edited line\n"
+    run_start = next(
+        event for event in load_trace_events(trace_path) if event["event"] == "run_start"
+    )
+    assert run_start["payload"]["cwd"] == str(workspace.resolve())
+
+
 def test_edit_guard_requires_reread_after_write(tmp_path, monkeypatch):
     monkeypatch.chdir(tmp_path)
     Path("app.py").write_text("one\ntwo\n", encoding="utf-8")
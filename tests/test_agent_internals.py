@@ -6,13 +6,24 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
+import time
 
+import pytest
+
+from dm_agent.clients.base_client import BaseLLMClient, publish_usage
+from dm_agent.core import EventBus
 from dm_agent.core.agent import ReactAgent
 from dm_agent.core.context_window import should_log_memory_status
 from dm_agent.core.planner import PlanStep
 from dm_agent.core.prompting import build_user_prompt
+from dm_agent.core.response_parser import StreamingActionParser, batch_actions
 from dm_agent.tools.base import Tool
+from dm_agent.tools.execution_tools import run_python
+from dm_agent.tools.file_tools import create_file, read_file
 from dm_agent.tracing import TraceWriter, load_trace_events
 
 
@@ -289,3 +300,495 @@ def test_get_conversation_history_returns_a_copy():
     history.append({"role": "user", "content": "外部追加不应影响 agent"})
 
     assert len(agent.get_conversation_history()) == len(history) - 1
+
+
+# --- ``actions`` 批量：只读工具并发执行 -----------------------------------------
+
+
+def _batch(*actions) -> str:
+    return json.dumps(
+        {
+            "thought": "read several files at once",
+            "actions": [{"action": name, "action_input": args} for name, args in actions],
+        },
+        ensure_ascii=False,
+    )
+
+
+def test_batch_of_read_only_tools_runs_concurrently_in_deterministic_order(tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+    hook_order = []
+
+    def slow_read(arguments):
+        # 两个调用都到达屏障才放行：串行执行会在这里超时。
+        barrier.wait()
+        return f"content of {arguments['path']}"
+
+    bus = EventBus()
+    bus.on("before_tool_call", lambda event: hook_order.append(("before", event.arguments["path"])))
+    bus.on("after_tool_result", lambda event: hook_order.append(("after", event.arguments["path"])))
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            FakeRespondClient(
+                [
+                    _batch(("read_file", {"path": "a.py"}), ("read_file", {"path": "b.py"})),
+                    _action("finish", {"answer": "read both files"}),
+                ]
+            ),
+            [Tool("read_file", "Read", slow_read)],
+            enable_planning=False,
+            enable_compression=False,
+            event_bus=bus,
+            trace_writer=writer,
+        )
+        result = agent.run("read two files", max_steps=3)
+
+    assert result["metadata"]["status"] == "success"
+    assert result["metadata"]["parallel_batch_count"] == 1
+    assert result["metadata"]["parallel_action_count"] == 2
+    assert [step["observation"] for step in result["steps"][:2]] == [
+        "content of a.py",
+        "content of b.py",
+    ]
+    assert hook_order == [
+        ("before", "a.py"),
+        ("before", "b.py"),
+        ("after", "a.py"),
+        ("after", "b.py"),
+    ]
+    events = load_trace_events(trace_path)
+    tool_calls = [event["payload"] for event in events if event["event"] == "tool_call"]
+    assert [(call["step_number"], call["action_input"]["path"]) for call in tool_calls] == [
+        (1, "a.py"),
+        (1, "b.py"),
+    ]
+    tool_results = [
+        message["content"]
+        for message in agent.conversation_history
+        if message["content"].startswith("执行工具")
+    ]
+    assert len(tool_results) == 1
+    assert "content of a.py" in tool_results[0] and "content of b.py" in tool_results[0]
+
+
+def test_batch_rejects_tools_that_are_not_read_only():
+    calls = []
+    agent = ReactAgent(
+        FakeRespondClient(
+            [
+                _batch(("read_file", {"path": "a.py"}), ("run_shell", {"command": "rm -rf x"})),
+                _action("finish", {"answer": "stopped after the rejected batch"}),
+            ]
+        ),
+        [
+            Tool("read_file", "Read", lambda arguments: "content"),
+            Tool("run_shell", "Shell", lambda arguments: calls.append(arguments) or "ran"),
+        ],
+        enable_planning=False,
+        enable_compression=False,
+    )
+
+    result = agent.run("mixed batch", max_steps=3)
+
+    assert calls == []
+    assert result["metadata"]["parallel_action_rejected_count"] == 1
+    assert result["metadata"]["parallel_action_count"] == 1
+    assert "cannot be batched" in result["steps"][1]["observation"]
+
+
+def test_batch_reports_unknown_tools_instead_of_rejecting_them():
+    agent = ReactAgent(
+        FakeRespondClient(
+            [
+                _batch(
+                    ("read_file", {"path": "a.py"}),
+                    ("read_fiel", {"path": "b.py"}),
+                    ("", {}),
+                ),
+                _action("finish", {"answer": "stopped after the unknown tools"}),
+            ]
+        ),
+        [Tool("read_file", "Read", lambda arguments: "content")],
+        enable_planning=False,
+        enable_compression=False,
+    )
+
+    result = agent.run("misspelled batch", max_steps=3)
+
+    metadata = result["metadata"]
+    assert metadata["unknown_tool_count"] == 2
+    assert metadata["parallel_action_rejected_count"] == 0
+    assert [step["observation"] for step in result["steps"][1:3]] == [
+        "Unknown tool 'read_fiel'.",
+        "Unknown tool ''.",
+    ]
+
+
+def test_single_element_actions_list_behaves_like_a_single_action():
+    agent = _agent(
+        [
+            json.dumps(
+                {"thought": "t", "actions": [{"action": "echo", "action_input": {"text": "x"}}]}
+            ),
+            _action("finish", {"answer": "single element batch works"}),
+        ]
+    )
+
+    result = agent.run("single batch", max_steps=3)
+
+    assert result["steps"][0]["observation"] == "echo:x"
+    assert result["metadata"]["parallel_batch_count"] == 0
+
+
+def test_batch_actions_prefers_the_single_action_format():
+    assert batch_actions({"action": "read_file", "actions": [{"action": "x"}]}) is None
+    assert batch_actions({"actions": [{"action": " read_file ", "action_input": {}}, "junk"]}) == [
+        ("read_file", {}),
+        ("", None),
+    ]
+
+
+def _feed_until_ready(text, chunk_size=3):
+    parser = StreamingActionParser()
+    for index in range(0, len(text), chunk_size):
+        if parser.feed(text[index : index + chunk_size]):
+            return parser, index + chunk_size
+    return parser, len(text)
+
+
+def test_streaming_parser_is_ready_when_the_object_closes():
+    body = '{"thought": "a } in a string", "action": "echo", "action_input": {"text": "x"}}'
+    parser, consumed = _feed_until_ready("好的：\n" + body + "\n后面的解释不用等。")
+
+    assert parser.ready
+    assert json.loads(parser.text)["action_input"] == {"text": "x"}
+    assert consumed < len("好的：\n" + body) + 3
+
+
+def test_streaming_parser_does_not_wait_for_a_trailing_thought():
+    text = '{"action": "echo", "action_input": {"text": "x"}, "thought": "很长很长的解释'
+    parser, _ = _feed_until_ready(text)
+
+    assert parser.ready
+    assert json.loads(parser.text) == {"action": "echo", "action_input": {"text": "x"}}
+
+
+def test_streaming_parser_waits_while_action_input_is_incomplete():
+    parser, _ = _feed_until_ready(
+        '{"thought": "t", "action": "echo", "action_input": {"text": "x",'
+    )
+
+    assert not parser.ready
+    assert parser.text.startswith('{"thought"')
+
+
+# --- arun：协程版主循环 ---------------------------------------------------------
+
+
+class AsyncRespondClient:
+    """只在 ``arespond`` 上给响应；同步 ``respond`` 被调用即视为走错了路径。"""
+
+    def __init__(self, responses, *, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.model = "fake-async-model"
+
+    def respond(self, messages, **extra):
+        raise AssertionError("arun must not call the blocking respond()")
+
+    async def arespond(self, messages, **extra):
+        await asyncio.sleep(self.delay)
+        return self.responses.pop(0)
+
+
+def test_arun_matches_run_for_the_same_script():
+    script = [_action("echo", {"text": "hi"}), _action("finish", {"answer": "echoed hi back"})]
+
+    sync_result = _agent(list(script)).run("echo once", max_steps=3)
+    async_result = asyncio.run(_agent(list(script)).arun("echo once", max_steps=3))
+
+    assert async_result["final_answer"] == sync_result["final_answer"]
+    assert async_result["steps"] == sync_result["steps"]
+    assert async_result["metadata"]["status"] == "success"
+
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class PooledClient(BaseLLMClient):
+    """按事件循环共享一个假连接池；池被关掉后还在用就直接报错。"""
+
+    def __init__(self, delays):
+        super().__init__("key", model="pooled", base_url="http://pool", respond_retries=0)
+        self.delays = dict(delays)
+        self.pools = []
+
+    def complete(self, messages, **extra):
+        raise AssertionError("arun must use acomplete")
+
+    def extract_text(self, data):
+        return data["text"]
+
+    async def acomplete(self, messages, **extra):
+        pool = self._async_session_for_loop(self._new_pool)
+        task = messages[-1]["content"]
+        delay = next(value for key, value in self.delays.items() if key in task)
+        await asyncio.sleep(delay)
+        assert not pool.closed, "pool closed under an in-flight request"
+        return {"text": _action("finish", {"answer": f"finished after {delay}s"})}
+
+    def _new_pool(self):
+        pool = FakePool()
+        self.pools.append(pool)
+        return pool
+
+
+def test_concurrent_aruns_share_one_client_pool_until_its_owner_closes_it():
+    client = PooledClient({"fast-task": 0.01, "slow-task": 0.2})
+
+    def make_agent():
+        return ReactAgent(client, _tools(), enable_planning=False, enable_compression=False)
+
+    async def main():
+        async with client:
+            results = await asyncio.gather(
+                make_agent().arun("fast-task", max_steps=2),
+                make_agent().arun("slow-task", max_steps=2),
+            )
+            assert len(client.pools) == 1
+        return results
+
+    results = asyncio.run(main())
+
+    assert [result["metadata"]["status"] for result in results] == ["success"] * 2
+    assert client.pools[0].closed
+    # 新的事件循环重新建池，不沿用绑在旧循环上的那个。
+    asyncio.run(make_agent().arun("fast-task", max_steps=2))
+    assert len(client.pools) == 2
+
+
+def test_arun_reports_usage_from_clients_without_arespond(tmp_path):
+    class SyncUsageClient(FakeRespondClient):
+        def respond(self, messages, **extra):
+            publish_usage({"prompt_tokens": 40, "completion_tokens": 4, "total_tokens": 44})
+            return super().respond(messages, **extra)
+
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            SyncUsageClient([_action("finish", {"answer": "done with sync usage"})]),
+            _tools(),
+            enable_planning=False,
+            enable_compression=False,
+            trace_writer=writer,
+        )
+        asyncio.run(agent.arun("finish", max_steps=2))
+
+    llm_calls = [event for event in load_trace_events(trace_path) if event["event"] == "llm_call"]
+    assert llm_calls[0]["payload"]["usage"]["total_tokens"] == 44
+
+
+def test_arun_drives_many_agents_concurrently_on_one_event_loop():
+    def make_agent():
+        client = AsyncRespondClient(
+            [_action("echo", {"text": "x"}), _action("finish", {"answer": "finished echo run"})],
+            delay=0.2,
+        )
+        return ReactAgent(client, _tools(), enable_planning=False, enable_compression=False)
+
+    async def main():
+        agents = [make_agent() for _ in range(10)]
+        return await asyncio.gather(*(agent.arun("echo", max_steps=3) for agent in agents))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+
+    assert [result["metadata"]["status"] for result in results] == ["success"] * 10
+    # 串行需要 10 × 2 × 0.2 = 4 秒；并发推进只比单个 run 的两次等待略长。
+    assert elapsed < 2.0
+
+
+def test_agents_with_different_workspaces_run_concurrently_without_chdir(tmp_path):
+    tools = [
+        Tool("create_file", "Create", create_file),
+        Tool("read_file", "Read", read_file),
+        Tool("run_python", "Python", run_python),
+    ]
+
+    def make_agent(workspace):
+        script = [
+            _action("create_file", {"path": "pkg/out.txt", "content": workspace.name}),
+            _action("read_file", {"path": "pkg/out.txt"}),
+            _action("run_python", {"code": "import os; print(os.path.basename(os.getcwd()))"}),
+            _action("finish", {"answer": "wrote and read back out.txt"}),
+        ]
+        client = AsyncRespondClient(script, delay=0.05)
+        return ReactAgent(
+            client, tools, enable_planning=False, enable_compression=False, workspace=workspace
+        )
+
+    workspaces = [tmp_path / f"ws{index}" for index in range(4)]
+    for workspace in workspaces:
+        workspace.mkdir()
+    cwd_before = os.getcwd()
+
+    async def main():
+        agents = [make_agent(workspace) for workspace in workspaces]
+        return await asyncio.gather(*(agent.arun("write", max_steps=5) for agent in agents))
+
+    results = asyncio.run(main())
+
+    assert os.getcwd() == cwd_before
+    for workspace, result in zip(workspaces, results, strict=True):
+        assert (workspace / "pkg" / "out.txt").read_text(encoding="utf-8") == workspace.name
+        observations = [step["observation"] for step in result["steps"]]
+        # 观察里回显的仍是模型给出的相对路径，换个工作区回放也对得上。
+        assert "pkg/out.txt" in observations[0] and str(workspace) not in observations[0]
+        assert observations[1] == workspace.name
+        assert observations[2].splitlines()[0] == workspace.name
+    assert not (tmp_path / "pkg").exists()
+
+
+def test_memory_db_scopes_compressor_memory_to_the_repository_and_flushes_on_finish(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / "pkg").mkdir()
+    db = tmp_path / "memory.sqlite"
+    agent = _agent(
+        [_action("task_complete", {"message": "done"})],
+        enable_compression=True,
+        memory_db=db,
+        workspace=repo / "pkg",
+    )
+    memory = agent.compressor.memory
+    assert memory is agent.memory_store
+    assert memory.namespace.endswith(str(repo.resolve()))
+    memory.add("Observed failure: import cycle in pkg/core.py")
+    assert memory.stored_count() == 0
+
+    agent.run("finish", max_steps=2)
+
+    assert memory.stored_count() == 1
+
+
+def test_arun_records_llm_errors_and_reraises(tmp_path):
+    class BrokenClient(AsyncRespondClient):
+        async def arespond(self, messages, **extra):
+            raise RuntimeError("upstream down")
+
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            BrokenClient([]),
+            _tools(),
+            enable_planning=False,
+            enable_compression=False,
+            trace_writer=writer,
+        )
+        with pytest.raises(RuntimeError, match="upstream down"):
+            asyncio.run(agent.arun("fail", max_steps=2))
+
+    events = [event["event"] for event in load_trace_events(trace_path)]
+    assert "llm_error" in events
+
+
+# --- 流式响应：动作一完整就执行 -------------------------------------------------
+
+
+class StreamingClient(FakeRespondClient):
+    """按块吐出响应；记录每条流是否在尾随闲聊之前就被关闭。"""
+
+    def __init__(self, responses, *, chunk_size=7):
+        super().__init__(responses)
+        self.chunk_size = chunk_size
+        self.closed_early: list[bool] = []
+
+    def stream_text(self, messages, **extra):
+        text = self.responses.pop(0) + "\n\n顺便再解释一下我为什么这样做……" * 20
+        index = 0
+        try:
+            while index < len(text):
+                yield text[index : index + self.chunk_size]
+                index += self.chunk_size
+        finally:
+            self.closed_early.append(index < len(text))
+
+
+def test_streaming_dispatches_actions_before_the_stream_ends(tmp_path):
+    client = StreamingClient(
+        [_action("echo", {"text": "hi"}), _action("finish", {"answer": "echoed hi back"})]
+    )
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            _tools(),
+            enable_planning=False,
+            enable_compression=False,
+            enable_streaming=True,
+            trace_writer=writer,
+        )
+        result = agent.run("echo once", max_steps=3)
+
+    assert result["metadata"]["status"] == "success"
+    assert result["steps"][0]["observation"] == "echo:hi"
+    assert client.closed_early == [True, True]
+    llm_calls = [event for event in load_trace_events(trace_path) if event["event"] == "llm_call"]
+    timing = llm_calls[0]["payload"]["timing"]
+    assert timing["streamed"] is True
+    assert timing["early_dispatch"] is True
+    assert timing["time_to_first_token_seconds"] <= timing["time_to_action_seconds"]
+    # 提前关闭的流拿不到供应商用量：标成估算，不混进真实用量。
+    assert llm_calls[0]["payload"]["usage_source"] == "estimated"
+    assert "usage" not in llm_calls[0]["payload"]
+
+
+def test_streams_that_report_usage_before_the_action_is_ready_record_provider_usage(tmp_path):
+    class UsageStreamingClient(FakeRespondClient):
+        # 与基类的整段回退一样：先拿到完整响应与用量，再一次性产出。
+        def stream_text(self, messages, **extra):
+            publish_usage({"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55})
+            yield self.responses.pop(0)
+
+    client = UsageStreamingClient([_action("finish", {"answer": "done with usage"})])
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            _tools(),
+            enable_planning=False,
+            enable_compression=False,
+            enable_streaming=True,
+            trace_writer=writer,
+        )
+        agent.run("finish", max_steps=2)
+
+    llm_calls = [event for event in load_trace_events(trace_path) if event["event"] == "llm_call"]
+    assert llm_calls[0]["payload"]["usage_source"] == "provider"
+    assert llm_calls[0]["payload"]["usage"]["total_tokens"] == 55
+
+
+def test_streaming_falls_back_to_respond_for_clients_without_stream_text():
+    script = [_action("echo", {"text": "hi"}), _action("finish", {"answer": "echoed hi back"})]
+    result = _agent(script, enable_streaming=True).run("echo once", max_steps=3)
+    assert result["metadata"]["status"] == "success"
+    assert result["steps"][0]["observation"] == "echo:hi"
+
+
+def test_arun_streams_through_the_same_path():
+    client = StreamingClient(
+        [_action("echo", {"text": "hi"}), _action("finish", {"answer": "echoed hi back"})]
+    )
+    agent = ReactAgent(
+        client, _tools(), enable_planning=False, enable_compression=False, enable_streaming=True
+    )
+    result = asyncio.run(agent.arun("echo once", max_steps=3))
+    assert result["final_answer"] == "echoed hi back"
+    assert client.closed_early == [True, True]
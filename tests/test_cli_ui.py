@@ -1,5 +1,7 @@
 from types import SimpleNamespace
 
+import pytest
+
 from dm_agent import Tool
 from dm_agent.cli import (
     Config,
@@ -184,3 +186,25 @@ def test_cli_advanced_feature_validation(monkeypatch):
 
     ok = parse_args(["task", "--enable-adaptive-replanning"])
     assert validate_feature_args(ok) == ""
+
+
+def test_dense_memory_flag_reaches_the_agent_memory_and_needs_numpy(monkeypatch, tmp_path):
+    monkeypatch.setattr("dm_agent.cli.args.load_config_from_file", lambda: {})
+    args = parse_args(["task", "--dense-memory"])
+    monkeypatch.setattr("dm_agent.cli.args.NUMPY_AVAILABLE", False)
+    assert "--dense-memory" in validate_feature_args(args)
+    monkeypatch.undo()
+    pytest.importorskip("numpy")
+    tools = [Tool("noop", "No operation.", lambda arguments: "ok")]
+
+    in_process = create_agent(Config(api_key="k", dense_memory=True), FakeClient(), tools)
+    persistent = create_agent(
+        Config(api_key="k", dense_memory=True, memory_db_path=str(tmp_path / "memory.db")),
+        FakeClient(),
+        tools,
+    )
+
+    assert in_process.compressor.memory.dense
+    assert persistent.compressor.memory is persistent.memory_store
+    assert persistent.memory_store.dense
+    persistent.memory_store.close()
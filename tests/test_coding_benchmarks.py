@@ -1023,12 +1023,16 @@ class _FakeUsage:
     prompt_tokens = 0
     completion_tokens = 0
     total_tokens = 0
+    cached_tokens = 0
+    cache_write_tokens = 0
     prompt_chars = 0
     completion_chars = 0
     estimated_tokens = 0
+    token_source = "heuristic"
 
 
 class _FakeUsageClient:
     model = "stub"
     base_url = ""
+    tokenizer = None
     usage = _FakeUsage()
@@ -5,10 +5,14 @@ from __future__ import annotations
 from dm_agent.core.agent import ReactAgent
 from dm_agent.memory.context_budget import (
     MIN_HEAD_CHARS,
+    CachedTokenizer,
     FileLedger,
+    HistoryTokenLedger,
+    ScriptAwareTokenizer,
     estimate_messages_tokens,
     estimate_tokens,
     estimate_tokens_from_chars,
+    tokenizer_for,
     truncate_observation,
 )
 
@@ -137,3 +141,115 @@ def test_file_ledger_reset() -> None:
     ledger.note_read("a.py", 1)
     ledger.reset()
     assert ledger.check_edit("a.py") == "never_read"
+
+
+def test_history_token_ledger_counts_only_appended_messages(monkeypatch) -> None:
+    from dm_agent.memory import context_budget
+
+    calls = []
+    original = context_budget.estimate_tokens
+    monkeypatch.setattr(
+        context_budget, "estimate_tokens", lambda text: calls.append(text) or original(text)
+    )
+    history = [{"role": "system", "content": "s" * 8}, {"role": "user", "content": "u" * 10}]
+    ledger = HistoryTokenLedger()
+    ledger.sync(history)
+    history.append({"role": "assistant", "content": "a" * 40})
+    ledger.sync(history)
+    ledger.sync(history)
+
+    assert len(calls) == 3
+    assert ledger.total_tokens == estimate_messages_tokens(history)
+    assert (ledger.user_messages, ledger.system_messages, ledger.non_system_messages) == (1, 1, 2)
+    assert ledger.tokens_for([1, 2]) == 3 + 10
+    assert ledger.tokens_for([0, 2]) == 2 + 10
+
+
+def test_history_token_ledger_rebuilds_when_history_is_replaced() -> None:
+    ledger = HistoryTokenLedger()
+    history = [{"role": "user", "content": "x" * 40}, {"role": "assistant", "content": "y"}]
+    ledger.sync(history)
+
+    shorter = [{"role": "user", "content": "z" * 8}]
+    ledger.sync(shorter)
+    assert ledger.total_tokens == 2
+
+    same_length = [{"role": "user", "content": "w" * 80}]
+    ledger.sync(same_length)
+    assert ledger.total_tokens == 20
+
+    same_length[0]["content"] = "v" * 4
+    ledger.replace(0, same_length[0])
+    ledger.sync(same_length)
+    assert ledger.total_tokens == 1
+
+
+def test_script_aware_tokenizer_prices_cjk_separately(monkeypatch) -> None:
+    from dm_agent.memory import context_budget
+
+    monkeypatch.setattr(context_budget, "TIKTOKEN_AVAILABLE", False)
+    deepseek = tokenizer_for("deepseek")
+    chinese = "修复上下文预算" * 10
+    english = "fix budget" * 10
+
+    # chars/4 把 70 个汉字算成 18 个 token；DeepSeek 文档给的是每字约 0.6。
+    assert estimate_tokens(chinese) == 18
+    assert deepseek.count(chinese) == 42
+    assert deepseek.count(english) == 30
+    assert deepseek.count("") == 0
+    assert deepseek.name == "deepseek-ratio"
+    assert tokenizer_for("openai", "gpt-4o").name == "openai-ratio"
+    assert tokenizer_for("scripted").name == "heuristic"
+    mixed = ScriptAwareTokenizer("t", chars_per_token=4.0, tokens_per_cjk_char=1.0)
+    assert mixed.count("abcd你好") == 3
+
+
+def test_cached_tokenizer_counts_each_content_once_for_the_ledger() -> None:
+    seen: list[str] = []
+
+    class Counting:
+        name = "counting"
+
+        def count(self, text: str) -> int:
+            seen.append(text)
+            return len(text)
+
+    tokenizer = CachedTokenizer(Counting(), max_entries=2)
+    history = [{"role": "system", "content": "sys"}, {"role": "user", "content": "task"}]
+    ledger = HistoryTokenLedger(tokenizer)
+    ledger.sync(history)
+    # 换一份内容相同的历史会触发重建，但不会重新分词。
+    ledger.sync([dict(message) for message in history])
+
+    assert ledger.total_tokens == 7
+    assert ledger.count_text("task") == 4
+    assert seen == ["sys", "task"]
+    assert (tokenizer.hits, tokenizer.misses) == (3, 2)
+    assert estimate_messages_tokens(history, tokenizer=tokenizer) == 7
+
+    tokenizer.count("new")  # 超出 max_entries，最久未用的 "sys" 被淘汰
+    tokenizer.count("sys")
+    assert seen == ["sys", "task", "new", "sys"]
+    assert tokenizer.name == "counting"
+
+
+def test_openai_tokenizer_loads_its_encoding_on_first_count(monkeypatch) -> None:
+    from dm_agent.memory import context_budget
+
+    loads: list[str] = []
+
+    def fake_encoding(model: str):
+        loads.append(model)
+        return None
+
+    monkeypatch.setattr(context_budget, "TIKTOKEN_AVAILABLE", True)
+    monkeypatch.setattr(context_budget, "_tiktoken_encoding", fake_encoding)
+
+    tokenizer = tokenizer_for("openai", "gpt-4o")
+    assert loads == []
+    # 编码加载失败时退回 openai 的字符比例。
+    ratio = context_budget.PROVIDER_TOKEN_RATIOS["openai"]
+    expected = ScriptAwareTokenizer("t", chars_per_token=ratio[0], tokens_per_cjk_char=ratio[1])
+    assert tokenizer.count("修复 budget" * 10) == expected.count("修复 budget" * 10)
+    assert tokenizer.name == "openai-ratio"
+    assert loads == ["gpt-4o"]
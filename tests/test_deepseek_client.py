@@ -1,6 +1,10 @@
+import asyncio
+import json
+
 import pytest
 import requests
 
+from dm_agent.clients.base_client import consume_last_usage
 from dm_agent.clients.deepseek_client import DeepSeekClient, DeepSeekError
 from dm_agent.clients.llm_factory import create_llm_client
 
@@ -112,3 +116,177 @@ def test_deepseek_retry_settings_flow_through_factory():
     assert client.max_retries == 5
     assert client.retry_backoff == 0.25
     assert client.retry_status_codes == frozenset({429})
+
+
+def test_deepseek_async_path_retries_and_reports_like_the_sync_path():
+    httpx = pytest.importorskip("httpx")
+    seen = []
+    outcomes = [
+        httpx.Response(503, json={"error": {"message": "busy"}}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "async ok"}}]}),
+    ]
+
+    def handler(request):
+        seen.append(request)
+        return outcomes.pop(0)
+
+    client = DeepSeekClient("test-key", retry_backoff=0, max_retries=1)
+    client._async_session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    text = asyncio.run(client.arespond([{"role": "user", "content": "hello"}]))
+
+    assert text == "async ok"
+    assert len(seen) == 2
+
+
+def test_deepseek_async_path_formats_http_errors():
+    httpx = pytest.importorskip("httpx")
+    client = DeepSeekClient("test-key", retry_backoff=0, max_retries=0)
+    client._async_session = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(401, json={"error": {"message": "bad key"}})
+        )
+    )
+
+    with pytest.raises(DeepSeekError, match="401 Unauthorized - bad key"):
+        asyncio.run(client.arespond([{"role": "user", "content": "hello"}]))
+
+
+def test_deepseek_async_session_survives_a_new_event_loop_per_call():
+    pytest.importorskip("httpx")
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive：连接留在池里，才会在第二个事件循环里被复用。
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    messages = [{"role": "user", "content": "hello"}]
+    try:
+        client = DeepSeekClient(
+            "test-key", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0
+        )
+
+        assert asyncio.run(client.arespond(messages)) == "ok"
+        assert asyncio.run(client.arespond(messages)) == "ok"
+
+        async def respond_then_close():
+            text = await client.arespond(messages)
+            await client.aclose()
+            return text
+
+        assert asyncio.run(respond_then_close()) == "ok"
+        assert client._async_session is None
+        assert asyncio.run(client.arespond(messages)) == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeStreamResponse(FakeResponse):
+    def __init__(self, lines, status_code=200, payload=None, **kwargs):
+        super().__init__(status_code, payload, **kwargs)
+        self.lines = lines
+        self.encoding = None
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeStreamSession(FakeSession):
+    def post(self, url, *, json, timeout, stream=False):
+        self.calls.append({"url": url, "json": json, "timeout": timeout, "stream": stream})
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _sse(content):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def test_deepseek_stream_text_yields_sse_deltas_and_retries_before_first_chunk():
+    stream = FakeStreamResponse(["", _sse("你好"), ": keep-alive", _sse("，世界"), "data: [DONE]"])
+    session = FakeStreamSession(
+        [
+            FakeStreamResponse(
+                [], 503, {"error": {"message": "busy"}}, reason="Service Unavailable"
+            ),
+            stream,
+        ]
+    )
+    client = _client_with_session(session, max_retries=1)
+
+    chunks = list(client.stream_text([{"role": "user", "content": "hello"}]))
+
+    assert chunks == ["你好", "，世界"]
+    assert [call["stream"] for call in session.calls] == [True, True]
+    assert session.calls[-1]["json"]["stream"] is True
+    assert stream.encoding == "utf-8"
+    assert stream.closed
+
+
+def test_deepseek_stream_closes_connection_when_consumer_stops_early():
+    stream = FakeStreamResponse([_sse("a"), _sse("b"), _sse("c")])
+    client = _client_with_session(FakeStreamSession([stream]))
+
+    consume_last_usage()
+    chunks = client.stream_text([{"role": "user", "content": "hello"}])
+    assert next(chunks) == "a"
+    chunks.close()
+
+    assert stream.closed
+    assert consume_last_usage() is None
+
+
+def test_deepseek_stream_requests_and_publishes_usage_from_the_final_event():
+    usage_event = "data: " + json.dumps(
+        {
+            "choices": [],
+            "usage": {
+                "prompt_tokens": 120,
+                "completion_tokens": 8,
+                "total_tokens": 128,
+                "prompt_cache_hit_tokens": 100,
+            },
+        }
+    )
+    session = FakeStreamSession([FakeStreamResponse([_sse("ok"), usage_event, "data: [DONE]"])])
+    client = _client_with_session(session)
+
+    consume_last_usage()
+    assert list(client.stream_text([{"role": "user", "content": "hello"}])) == ["ok"]
+
+    assert session.calls[0]["json"]["stream_options"] == {"include_usage": True}
+    assert consume_last_usage() == {
+        "prompt_tokens": 120,
+        "completion_tokens": 8,
+        "total_tokens": 128,
+        "cached_tokens": 100,
+        "cache_write_tokens": 0,
+    }
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 import pytest
@@ -101,3 +102,41 @@ def test_classify_retryable_exception_by_status_and_text() -> None:
 def test_llm_error_defaults_to_non_retryable() -> None:
     assert LLMError("boom").retryable is False
     assert LLMError("boom", retryable=True).retryable is True
+
+
+def test_async_respond_shares_the_retry_budget() -> None:
+    client = FlakyClient(failures=2, retryable=True, respond_retries=2)
+
+    text = asyncio.run(client.arespond([{"role": "user", "content": "hi"}]))
+
+    assert text == "ok"
+    assert client.calls == 3
+    assert client.total_respond_retries == 2
+
+
+def test_usage_tracking_client_async_path_counts_usage() -> None:
+    inner = FlakyClient(failures=1, retryable=True, respond_retries=1)
+    wrapper = UsageTrackingClient(inner)
+
+    text = asyncio.run(wrapper.arespond([{"role": "user", "content": "hi"}]))
+
+    assert text == "ok"
+    assert inner.total_respond_retries == 1
+    assert wrapper.usage.request_count == 1
+
+
+def test_usage_tracking_client_estimates_with_its_tokenizer_without_provider_usage() -> None:
+    class PerMessage:
+        name = "per-message"
+
+        def count(self, text: str) -> int:
+            return 10
+
+    inner = FlakyClient(failures=0, retryable=True)
+    wrapper = UsageTrackingClient(inner, tokenizer=PerMessage())
+
+    wrapper.respond([{"role": "system", "content": "s"}, {"role": "user", "content": "hi"}])
+
+    assert wrapper.usage.estimated_tokens == 30
+    assert wrapper.usage.token_source == "per-message"
+    assert UsageTrackingClient(inner).usage.token_source == "heuristic"
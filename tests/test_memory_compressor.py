@@ -4,9 +4,13 @@ import pytest
 
 from dm_agent.core.context_window import ContextWindow
 from dm_agent.core.run_state import RunContext
-from dm_agent.memory import ContextCompressor, Mem0StyleMemory
-from dm_agent.memory.context_budget import estimate_messages_tokens
-from dm_agent.memory.context_compressor import Compaction, apply_compaction
+from dm_agent.memory import ContextCompressor, Mem0StyleMemory, SQLiteMemory
+from dm_agent.memory.context_budget import HistoryTokenLedger, estimate_messages_tokens
+from dm_agent.memory.context_compressor import (
+    Compaction,
+    apply_compaction,
+    estimate_compacted_tokens,
+)
 
 
 class _CompactionRecorder:
@@ -527,3 +531,179 @@ def test_memory_without_invalidate_on_success_keeps_failures_fresh():
     failure_items = [item for item in memory.items if item.text.startswith("Observed failure")]
     assert failure_items
     assert all(item.metadata.get("superseded_at_turn") is None for item in failure_items)
+
+
+def test_memory_index_tracks_merges_evictions_and_restores(monkeypatch):
+    from dm_agent.memory import inverted_index
+
+    memory = Mem0StyleMemory(max_items=3)
+    memory.add("Observed failure: flaky timeout", metadata={"files": ["net.py"]}, importance=0.9)
+    memory.add("Observed failure: flaky timeout", metadata={"files": ["retry_policy.py"]})
+    # 去重合并进来的文件名也能检索到。
+    assert [hit.item.metadata["files"] for hit in memory.search("retry_policy.py")] == [
+        ["net.py", "retry_policy.py"]
+    ]
+    for index in range(4):
+        memory.add(f"Prior context: unrelated note {index}", importance=0.1 + index / 100)
+    # 淘汰最不重要的两条，被淘汰的记忆也从索引里消失。
+    assert len(memory) == 3
+    assert {hit.item.text for hit in memory.search("unrelated note 0")} == {
+        "Prior context: unrelated note 2",
+        "Prior context: unrelated note 3",
+    }
+
+    restored = Mem0StyleMemory.from_dict(memory.to_dict())
+    assert [hit.item.id for hit in restored.search("flaky timeout")] == [
+        hit.item.id for hit in memory.search("flaky timeout")
+    ]
+
+    # 大库里几乎人人都有的 token 只给稀有 token 找到的候选加分；候选不足 limit 时照常补齐。
+    monkeypatch.setattr(inverted_index, "COMMON_TERM_MIN_DOCS", 4)
+    large = Mem0StyleMemory(max_items=50)
+    for index in range(40):
+        large.add(f"Files mentioned or inspected: pkg/mod_{index}.py", type="semantic")
+    top = large.search("Files mentioned: pkg/mod_7.py", limit=3)
+    assert top[0].item.text.endswith("mod_7.py")
+    assert len(top) == 3
+    assert [hit.item.text for hit in large.search("pkg/mod_7.py pkg/mod_8.py", limit=2)] == [
+        "Files mentioned or inspected: pkg/mod_7.py",
+        "Files mentioned or inspected: pkg/mod_8.py",
+    ]
+
+
+def test_memory_rollback_undoes_a_journal_back_to_nested_marks():
+    memory = Mem0StyleMemory(max_items=3)
+    memory.add("Observed failure: flaky timeout", metadata={"files": ["net.py"]})
+    memory.add("Files mentioned or inspected: app.py", type="semantic")
+    outer_state = memory.to_dict()
+    outer = memory.capture_rollback_state()
+
+    memory.search("flaky timeout", turn=4)
+    inner_state = memory.to_dict()
+    inner = memory.capture_rollback_state()
+    memory.add("Observed failure: flaky timeout", metadata={"files": ["retry.py"]})
+    memory.supersede_failures({"net.py"}, turn=5)
+    for index in range(3):
+        memory.add(f"Prior context: note {index}", importance=0.9)
+    memory.restore_from_dict({"items": []})
+    memory.add("Tool used: run_tests.")
+
+    memory.restore_rollback_state(inner)
+    assert memory.to_dict() == inner_state
+    # 回滚后的索引与按同一份内容重建的索引打分一致（合并进来的 retry.py 已撤销）。
+    rebuilt = Mem0StyleMemory.from_dict(inner_state)
+    assert [(hit.item.id, hit.score) for hit in memory.search("retry.py", turn=4)] == [
+        (hit.item.id, hit.score) for hit in rebuilt.search("retry.py", turn=4)
+    ]
+    memory.restore_rollback_state(outer)
+    assert memory.to_dict() == outer_state
+    assert [item.text for item in memory.items] == [
+        "Observed failure: flaky timeout",
+        "Files mentioned or inspected: app.py",
+    ]
+    # 与 savepoint 相同：回滚到外层 mark 会作废之后取的 mark。
+    with pytest.raises(ValueError, match="stale"):
+        memory.restore_rollback_state(inner)
+    with pytest.raises(ValueError, match="another store"):
+        Mem0StyleMemory().restore_rollback_state(outer)
+
+
+def test_dense_memory_recalls_paraphrases_and_tracks_row_moves():
+    pytest.importorskip("numpy")
+    from dm_agent.memory.dense_index import DenseIndex
+
+    lexical = Mem0StyleMemory()
+    dense = Mem0StyleMemory(dense=True)
+    for memory in (lexical, dense):
+        memory.add("Completed operation: parsed configuration file settings.toml")
+        memory.add("Observed failure: HttpClient timed out", metadata={"files": ["http.py"]})
+    # 没有共享 token 时只有 dense 打分能召回改写过的说法。
+    assert lexical.search("parsing config") == []
+    assert dense.search("parsing config")[0].item.text.startswith("Completed operation")
+    assert dense.search("weather forecast") == []
+
+    index = DenseIndex()
+    for name in ("alpha_beta", "gamma", "delta_epsilon"):
+        index.add(name, name.split("_"))
+    index.remove("alpha_beta")
+    # 最后一行搬进空洞后，打分仍然对应到正确的 id。
+    assert set(index.scores(["delta", "epsilon"])) == {"delta_epsilon"}
+    assert index.scores(["gamma"]) == {"gamma": pytest.approx(1.0)}
+    for number in range(100):
+        index.add(f"doc{number}", [f"token{number}"])
+    assert len(index) == 102
+    assert max(index.scores(["token42"]).items(), key=lambda pair: pair[1])[0] == "doc42"
+
+    restored = Mem0StyleMemory(dense=True)
+    restored.restore_from_dict(dense.to_dict())
+    assert [hit.item.id for hit in restored.search("parsing config")] == [
+        hit.item.id for hit in dense.search("parsing config")
+    ]
+
+
+def test_sqlite_memory_persists_across_runs_per_namespace(tmp_path):
+    db = tmp_path / "memory.sqlite"
+    first = SQLiteMemory(db, namespace="agent@repo", flush_every=3, max_stored=4)
+    first.add("Observed failure: flaky timeout in net.py", metadata={"files": ["net.py"]})
+    first.add("Files mentioned or inspected: app.py", type="semantic")
+    # 批量写入：不到 flush_every 条改动时还没落盘。
+    assert first.stored_count() == 0
+    first.add("Tool used: run_tests.")
+    assert first.stored_count() == 3
+    for index in range(3):
+        first.add(f"Prior context: note {index}", importance=0.1)
+    first.close()
+
+    # 每个 namespace 只留 max_stored 行，先丢最不重要的。
+    second = SQLiteMemory(db, namespace="agent@repo")
+    assert second.stored_count() == 4
+    assert len(second) == 0
+    hits = second.search("why does net.py time out", limit=2, turn=1)
+    assert hits[0].item.text == "Observed failure: flaky timeout in net.py"
+    assert hits[0].item.last_accessed_turn == 1
+    assert second.recalled_count >= 1
+    # 候选折叠回滚会撤销召回与强化，不留下待写的改动。
+    state = second.capture_rollback_state()
+    second.add("Completed operation: net.py fixed")
+    second.restore_rollback_state(state)
+    assert "Completed operation: net.py fixed" not in {item.text for item in second.items}
+    second.flush()
+    second.close()
+
+    third = SQLiteMemory(db, namespace="agent@repo")
+    assert third.search("net.py", limit=1)[0].item.access_count == 2
+    third.close()
+    other = SQLiteMemory(db, namespace="agent@elsewhere")
+    assert other.search("net.py flaky timeout") == []
+    other.close()
+
+
+def test_estimate_compacted_tokens_matches_rebuilt_window():
+    history = [{"role": "system", "content": "sys"}, *_growing_history(30)]
+    compaction = ContextCompressor(compress_every=1, keep_recent=4).plan_compaction(history)
+    ledger = HistoryTokenLedger()
+    ledger.sync(history)
+
+    assert estimate_compacted_tokens(compaction, ledger) == estimate_messages_tokens(
+        apply_compaction(history, compaction)
+    )
+
+
+def test_context_window_estimates_each_message_once_on_a_growing_history(monkeypatch):
+    from dm_agent.memory import context_budget
+
+    calls = []
+    original = context_budget.estimate_tokens
+    monkeypatch.setattr(
+        context_budget, "estimate_tokens", lambda text: calls.append(text) or original(text)
+    )
+    compressor = ContextCompressor(compress_every=1000, keep_recent=4, token_budget=0)
+    window = ContextWindow(compressor=compressor, enabled=True)
+    context = RunContext(step_number=1, metadata=_window_metadata())
+    history = []
+    for message in _growing_history(200):
+        history.append(message)
+        window.build_messages("system", history, context=context)
+
+    assert len(calls) == 200
+    assert compressor.last_estimated_tokens == estimate_messages_tokens(history)
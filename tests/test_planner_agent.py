@@ -1,11 +1,14 @@
 import json
+import time
 
 import pytest
 
 from dm_agent.core.agent import ReactAgent
 from dm_agent.core.planner import AdaptiveReplanPolicy, TaskPlanner
+from dm_agent.core.prompting import PLAN_PENDING_HINT
 from dm_agent.tools.base import Tool
 from dm_agent.tracing import TraceWriter, load_trace_events
+from dm_agent.tracing.session import load_session_entries, rebuild_context
 
 
 class FakeRespondClient:
@@ -698,3 +701,141 @@ def test_react_agent_adaptive_replan_records_repeated_failures(tmp_path):
     ]
     assert [decision["repeated_failure"] for decision in decisions] == [False, True]
     assert decisions[1]["repeated_failure_details"]["action"] == "explode"
+
+
+class RoutingClient:
+    """规划请求与 agent 请求各走各的脚本，并各自模拟一次网络延迟。"""
+
+    def __init__(self, plan_response, agent_responses, *, delay=0.3):
+        self.plan_response = plan_response
+        self.agent_responses = list(agent_responses)
+        self.agent_requests = []
+        self.delay = delay
+
+    def respond(self, messages, **extra):
+        time.sleep(self.delay)
+        if "任务规划助手" in messages[-1]["content"]:
+            return self.plan_response
+        self.agent_requests.append([dict(message) for message in messages])
+        return self.agent_responses.pop(0)
+
+
+def test_speculative_planning_overlaps_plan_with_first_step(tmp_path):
+    plan_response = json.dumps(
+        {
+            "plan": [
+                {"step": 1, "action": "read_file", "reason": "inspect input"},
+                {"step": 2, "action": "task_complete", "reason": "finish"},
+            ]
+        }
+    )
+    client = RoutingClient(
+        plan_response,
+        [
+            json.dumps({"thought": "look", "action": "read_file", "action_input": {"path": "a"}}),
+            json.dumps({"thought": "done", "action": "finish", "action_input": {"answer": "ok"}}),
+        ],
+    )
+    tools = [
+        Tool("read_file", "Read a file", lambda arguments: "content"),
+        Tool("task_complete", "Finish", lambda arguments: "done"),
+    ]
+    trace_path = tmp_path / "trace.jsonl"
+    started = time.perf_counter()
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            tools,
+            enable_compression=False,
+            speculative_planning=True,
+            trace_writer=writer,
+        )
+        result = agent.run("inspect a file")
+    elapsed = time.perf_counter() - started
+
+    assert result["metadata"]["status"] == "success"
+    assert result["metadata"]["initial_plan_steps"] == 2
+    # 串行是 3 × 0.3 秒；规划与第一步重叠后只剩两次往返。
+    assert elapsed < 0.8
+    assert result["metadata"]["speculative_plan_hidden_seconds"] > 0.2
+
+    first, second = client.agent_requests
+    assert PLAN_PENDING_HINT in first[-1]["content"]
+    assert "执行计划：" in second[1]["content"]
+    assert PLAN_PENDING_HINT not in second[1]["content"]
+
+    entries = load_session_entries(trace_path)
+    spliced = [entry for entry in entries if entry["event"] == "plan_spliced"]
+    assert spliced[0]["payload"]["hidden_latency_seconds"] > 0.2
+    # 会话日志能复现拼入计划后的任务消息。
+    assert rebuild_context(entries)[0] == second[1]
+
+
+def test_speculative_planning_falls_back_when_planner_fails():
+    class FailingPlanner(RoutingClient):
+        def respond(self, messages, **extra):
+            if "任务规划助手" in messages[-1]["content"]:
+                raise RuntimeError("planner down")
+            return super().respond(messages, **extra)
+
+    client = FailingPlanner(
+        "",
+        [json.dumps({"thought": "done", "action": "finish", "action_input": {"answer": "ok"}})],
+        delay=0,
+    )
+    agent = ReactAgent(
+        client,
+        [Tool("task_complete", "Finish", lambda arguments: "done")],
+        enable_compression=False,
+        speculative_planning=True,
+    )
+
+    result = agent.run("finish")
+
+    assert result["metadata"]["status"] == "success"
+    assert result["metadata"]["initial_plan_steps"] == 0
+
+
+@pytest.mark.parametrize("planner_fails", [True, False])
+def test_speculative_planning_drops_the_pending_hint_without_a_plan(tmp_path, planner_fails):
+    class NoPlanClient(RoutingClient):
+        def respond(self, messages, **extra):
+            if planner_fails and "任务规划助手" in messages[-1]["content"]:
+                raise RuntimeError("planner down")
+            return super().respond(messages, **extra)
+
+    client = NoPlanClient(
+        json.dumps({"plan": []}),
+        [
+            json.dumps({"thought": "look", "action": "read_file", "action_input": {"path": "a"}}),
+            json.dumps({"thought": "done", "action": "finish", "action_input": {"answer": "ok"}}),
+        ],
+        delay=0,
+    )
+    tools = [
+        Tool("read_file", "Read a file", lambda arguments: "content"),
+        Tool("task_complete", "Finish", lambda arguments: "done"),
+    ]
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            tools,
+            enable_compression=False,
+            speculative_planning=True,
+            trace_writer=writer,
+        )
+        result = agent.run("inspect a file")
+
+    assert result["metadata"]["status"] == "success"
+    assert result["metadata"]["initial_plan_steps"] == 0
+    first, second = client.agent_requests
+    assert PLAN_PENDING_HINT in first[-1]["content"]
+    # 没有计划也不能让「不要修改文件」留在整个 run 的任务消息里。
+    assert PLAN_PENDING_HINT not in second[1]["content"]
+    assert "执行计划：" not in second[1]["content"]
+
+    entries = load_session_entries(trace_path)
+    spliced = [entry for entry in entries if entry["event"] == "plan_spliced"]
+    assert spliced[0]["payload"]["content"] == second[1]["content"]
+    assert rebuild_context(entries)[0] == second[1]
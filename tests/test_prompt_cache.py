@@ -0,0 +1,207 @@
+"""供应商前缀缓存：用量归一化、Claude 缓存断点、缓存友好的上下文布局。"""
+
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from typing import Any
+
+from dm_agent.clients.base_client import BaseLLMClient
+from dm_agent.clients.claude_client import ClaudeClient
+from dm_agent.clients.gemini_client import GeminiClient
+from dm_agent.clients.openai_client import OpenAIClient
+from dm_agent.core.agent import ReactAgent
+from dm_agent.core.context_window import ContextWindow
+from dm_agent.core.run_state import RunContext
+from dm_agent.evals.real_runner import UsageTrackingClient
+from dm_agent.memory import ContextCompressor
+from dm_agent.tools.base import Tool
+from dm_agent.tracing import TraceWriter, load_trace_events
+
+
+class CachingChatClient(BaseLLMClient):
+    """返回 DeepSeek 形状的 usage：第二次起整段前缀命中缓存。"""
+
+    def __init__(self, responses: list[str]) -> None:
+        super().__init__("test-key", model="fake", base_url="https://example.invalid")
+        self.responses = list(responses)
+        self.calls = 0
+
+    def complete(self, messages: list[dict[str, str]], **extra: Any) -> dict[str, Any]:
+        self.calls += 1
+        return {
+            "text": self.responses.pop(0),
+            "usage": {
+                "prompt_tokens": 100,
+                "completion_tokens": 10,
+                "total_tokens": 110,
+                "prompt_cache_hit_tokens": 0 if self.calls == 1 else 80,
+            },
+        }
+
+    def extract_text(self, data: dict[str, Any]) -> str:
+        return str(data["text"])
+
+
+def _action(action: str, action_input: Any) -> str:
+    return json.dumps({"thought": "t", "action": action, "action_input": action_input})
+
+
+def test_provider_usage_is_normalized_with_cached_tokens() -> None:
+    deepseek = CachingChatClient([])
+    assert deepseek.extract_usage(
+        {"usage": {"prompt_tokens": 50, "completion_tokens": 5, "prompt_cache_hit_tokens": 40}}
+    ) == {
+        "prompt_tokens": 50,
+        "completion_tokens": 5,
+        "total_tokens": 55,
+        "cached_tokens": 40,
+        "cache_write_tokens": 0,
+    }
+
+    claude_usage = SimpleNamespace(
+        input_tokens=10,
+        output_tokens=7,
+        cache_read_input_tokens=300,
+        cache_creation_input_tokens=20,
+    )
+    claude = ClaudeClient("test-key").extract_usage(
+        {"response": SimpleNamespace(usage=claude_usage)}
+    )
+    assert claude == {
+        "prompt_tokens": 330,
+        "completion_tokens": 7,
+        "total_tokens": 337,
+        "cached_tokens": 300,
+        "cache_write_tokens": 20,
+    }
+
+    openai_usage = SimpleNamespace(
+        input_tokens=200,
+        output_tokens=3,
+        total_tokens=203,
+        input_tokens_details=SimpleNamespace(cached_tokens=128),
+    )
+    openai = OpenAIClient("test-key").extract_usage(
+        {"response": SimpleNamespace(usage=openai_usage)}
+    )
+    assert openai is not None and openai["cached_tokens"] == 128
+
+    gemini_usage = SimpleNamespace(
+        prompt_token_count=90,
+        candidates_token_count=9,
+        total_token_count=99,
+        cached_content_token_count=64,
+    )
+    gemini = GeminiClient.extract_usage(
+        GeminiClient.__new__(GeminiClient),
+        {"response": SimpleNamespace(usage_metadata=gemini_usage)},
+    )
+    assert gemini is not None and gemini["cached_tokens"] == 64
+
+
+def test_gemini_stream_closes_the_sdk_iterator_when_the_consumer_stops_early() -> None:
+    closed: list[bool] = []
+    # SDK 自己也持有响应迭代器：不能指望引用计数归零时顺带关闭。
+    opened: list[Any] = []
+
+    def sdk_chunks() -> Any:
+        try:
+            for text in ("{", '"action"', ": ..."):
+                yield SimpleNamespace(text=text, usage_metadata=None)
+        finally:
+            closed.append(True)
+
+    def sdk_stream(**kwargs: Any) -> Any:
+        opened.append(sdk_chunks())
+        return opened[-1]
+
+    gemini = GeminiClient.__new__(GeminiClient)
+    gemini.model = "gemini-test"
+    gemini.client = SimpleNamespace(models=SimpleNamespace(generate_content_stream=sdk_stream))
+
+    chunks = gemini.stream_complete([{"role": "user", "content": "hi"}])
+    assert next(chunks) == "{"
+    chunks.close()
+
+    assert closed == [True]
+
+
+def test_claude_request_marks_system_and_last_message_for_caching() -> None:
+    messages = [
+        {"role": "system", "content": "system prompt"},
+        {"role": "user", "content": "task"},
+        {"role": "assistant", "content": "step"},
+        {"role": "user", "content": "observation"},
+    ]
+
+    request = ClaudeClient("test-key")._build_request(messages, {})
+
+    assert request["system"] == [
+        {"type": "text", "text": "system prompt", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert request["messages"][:2] == messages[1:3]
+    assert request["messages"][-1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    # 调用方的消息列表不被改写（trace 还要用它）。
+    assert messages[-1]["content"] == "observation"
+
+    plain = ClaudeClient("test-key", prompt_cache=False)._build_request(messages, {})
+    assert plain["system"] == "system prompt"
+    assert plain["messages"] == messages[1:]
+
+
+def test_cached_tokens_reach_usage_totals_and_llm_call_events(tmp_path) -> None:
+    inner = CachingChatClient([_action("echo", {"text": "a"}), _action("finish", {"answer": "ok"})])
+    client = UsageTrackingClient(inner)
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            client,
+            [Tool("echo", "Echo", lambda arguments: "echoed")],
+            enable_planning=False,
+            enable_compression=False,
+            trace_writer=writer,
+        )
+        agent.run("echo", max_steps=3)
+
+    assert client.usage.prompt_tokens == 200
+    assert client.usage.cached_tokens == 80
+    assert client.usage.cache_hit_rate == 0.4
+    calls = [event for event in load_trace_events(trace_path) if event["event"] == "llm_call"]
+    assert [call["payload"]["usage"]["cached_tokens"] for call in calls] == [0, 80]
+
+
+def _window_metadata() -> dict[str, Any]:
+    return {
+        "compressed_messages": 0,
+        "memory_items": 0,
+        "memory_injection_count": 0,
+        "memory_compression_count": 0,
+        "memory_log_count": 0,
+        "budget_compression_count": 0,
+    }
+
+
+def _count_prefix_rewrites(*, cache_friendly: bool) -> int:
+    compressor = ContextCompressor(compress_every=4, keep_recent=2, token_budget=400)
+    window = ContextWindow(compressor=compressor, enabled=True, cache_friendly=cache_friendly)
+    context = RunContext(step_number=1, metadata=_window_metadata())
+    history: list[dict[str, str]] = []
+    rewrites = 0
+    previous: list[dict[str, str]] = []
+    for index in range(60):
+        role = "user" if index % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"turn {index} app.py " + "x" * 80})
+        sent = window.build_messages("system", history, context=context)
+        # 前缀不再是上一次请求的前缀，就意味着供应商缓存失效。
+        if previous and sent[: len(previous)] != previous:
+            rewrites += 1
+        previous = sent
+    return rewrites
+
+
+def test_cache_friendly_layout_rewrites_the_prefix_less_often() -> None:
+    default_rewrites = _count_prefix_rewrites(cache_friendly=False)
+    cache_rewrites = _count_prefix_rewrites(cache_friendly=True)
+
+    assert 0 < cache_rewrites < default_rewrites
@@ -158,6 +158,7 @@ def test_model_omitted_when_empty() -> None:
 
 ALL_OPTIONS: dict[str, object] = {
     "enable_adaptive_replanning": True,
+    "speculative_planning": True,
     "enable_edit_guard": False,
     "max_steps": 10,
     "temperature": 0.5,
@@ -197,6 +198,7 @@ def test_generated_argv_is_accepted_by_the_real_cli_parser() -> None:
     # --disable-edit-guard 的 dest 是 enable_edit_guard + store_false，
     # 所以「传了这个开关」在解析结果里表现为 enable_edit_guard=False。
     assert parsed.enable_edit_guard is False
+    assert parsed.speculative_planning is True
 
 
 def test_default_argv_is_also_accepted(tmp_path: Path) -> None:
@@ -425,3 +425,20 @@ def test_stop_all_leaves_no_orphans(writable_client: TestClient, tmp_path: Path)
         while time.time() < deadline and record.process.poll() is None:
             time.sleep(0.1)
         assert record.process.poll() is not None
+
+
+def test_run_end_count_and_agent_status_read_compressed_logs(tmp_path: Path) -> None:
+    """块压缩会话日志：增量计数停在 member 边界，写到一半的 member 下次再数。"""
+    from dm_agent.server.runs import _count_run_ends, _read_agent_status
+    from dm_agent.tracing.compression import compress_block
+
+    path = tmp_path / "chat.jsonl.gz"
+    first = compress_block(b'{"event": "run_start"}\n{"event": "run_end", "payload": {}}\n')
+    second = compress_block(b'{"event": "run_end", "payload": {"status": "success"}}\n')
+    path.write_bytes(first + second[:9])
+    assert _count_run_ends(path) == 1
+
+    with path.open("ab") as handle:
+        handle.write(second[9:])
+    assert _count_run_ends(path) == 2
+    assert _read_agent_status(path) == "success"
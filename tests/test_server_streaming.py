@@ -262,3 +262,29 @@ def test_incomplete_trailing_line_at_exit_is_reported(tmp_path: Path) -> None:
 
     events = asyncio.run(collect(path))
     assert [event["event"] for event in events] == ["entry", "malformed", "done"]
+
+
+def test_compressed_log_is_tailed_member_by_member(tmp_path: Path) -> None:
+    """块压缩日志边写边读：写到一半的 gzip member 不会被当成坏行发出去。"""
+    from dm_agent.tracing.compression import compress_block
+
+    path = tmp_path / "live.jsonl.gz"
+    path.write_bytes(b"")
+    finished = [False]
+
+    async def writer() -> None:
+        for index in range(3):
+            member = compress_block(entry_line(index).encode("utf-8"))
+            with path.open("ab") as handle:
+                # 故意分两次写：读侧可能正好撞上只写了一半的 member。
+                handle.write(member[:7])
+                handle.flush()
+                await asyncio.sleep(0.3)
+                handle.write(member[7:])
+                handle.flush()
+        await asyncio.sleep(0.4)
+        finished[0] = True
+
+    events = asyncio.run(collect(path, writer=writer, finished=finished))
+    assert [event["event"] for event in events] == ["entry", "entry", "entry", "done"]
+    assert [event["data"]["id"] for event in events[:3]] == ["sess-0000", "sess-0001", "sess-0002"]
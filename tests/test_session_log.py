@@ -6,22 +6,38 @@
 
 from __future__ import annotations
 
+import gzip
 import json
 
 import pytest
 
 from dm_agent.core.agent import ReactAgent
+from dm_agent.core.persistence import load_resume_state
 from dm_agent.memory.context_compressor import ContextCompressor, apply_compaction
 from dm_agent.tools.base import Tool
 from dm_agent.tracing import (
+    ContextIndex,
+    SessionIndex,
+    SessionWriter,
     TraceWriter,
     find_entry_index,
+    latest_checkpoint_entry,
     load_session_entries,
+    load_trace_events,
     message_entries,
     normalize_entries,
     rebuild_context,
     summarize_events,
 )
+from dm_agent.tracing.compression import (
+    compress_block,
+    decode_members,
+    iter_log_blocks,
+    iter_log_entries,
+    read_appended,
+)
+from dm_agent.tracing.fork import fork_session, fork_session_at
+from dm_agent.tracing.index import index_path_for
 
 
 class FakeRespondClient:
@@ -443,6 +459,37 @@ def test_rebuild_context_can_replay_with_and_without_compaction(tmp_path):
     assert full[-1] == compacted[-1]
 
 
+def test_context_index_replays_every_request_window_in_one_pass(tmp_path):
+    trace_path = tmp_path / "session.jsonl"
+    responses = [_action("echo", {"text": f"turn {index}"}) for index in range(12)]
+    responses.append(_action("finish", {"answer": "done"}))
+    client = FakeRespondClient(responses)
+    writer = TraceWriter(trace_path, capture_llm_io=True)
+    agent = ReactAgent(
+        client,
+        _tools(),
+        enable_planning=False,
+        enable_compression=True,
+        context_token_budget=60,
+        trace_writer=writer,
+    )
+    agent.run("echo many times then finish", max_steps=20)
+    writer.close()
+    entries = load_session_entries(trace_path)
+    assert any(entry["event"] == "compaction" for entry in entries)
+
+    index = ContextIndex.load(trace_path)
+    windows = list(index.windows())
+    assert [window for _, window in windows] == [request[1:] for request in client.requests]
+    assert [entry["event"] for entry, _ in windows] == ["llm_call"] * len(client.requests)
+    for entry in entries[::5]:
+        for apply in (True, False):
+            assert index.window_at(entry["id"], apply_compaction=apply) == rebuild_context(
+                entries, until_entry_id=entry["id"], apply_compaction=apply
+            )
+    assert index.window_at() == rebuild_context(entries)
+
+
 # --- 7.1 checkpoint 退化成「记住某个 entry id」 ----------------------------
 
 
@@ -471,7 +518,16 @@ def test_session_checkpoint_appends_one_entry_per_step(tmp_path):
     checkpoints = [entry for entry in entries if entry["event"] == "checkpoint"]
     # 每步开头一条 + 步数耗尽的终态一条，append-only 全部留着。
     assert [entry["payload"]["step_number"] for entry in checkpoints] == [0, 1, 2, 3]
-    assert all(entry["payload"]["state"]["task"] for entry in checkpoints)
+    # 首条是完整关键帧，之后每条只记相对上一条的变化。
+    assert checkpoints[0]["payload"]["state"]["task"]
+    assert [entry["payload"]["base_id"] for entry in checkpoints[1:]] == [
+        entry["id"] for entry in checkpoints[:-1]
+    ]
+    assert all("state" not in entry["payload"] for entry in checkpoints[1:])
+    for entry in checkpoints:
+        state = load_resume_state(checkpoint_path, at=entry["id"])
+        assert state.task == "echo until the step limit"
+        assert state.step_count == entry["payload"]["step_number"]
 
 
 def _checkpoint_compaction_run(checkpoint_path, *, trace_path=None):
@@ -496,6 +552,39 @@ def _checkpoint_compaction_run(checkpoint_path, *, trace_path=None):
     return result
 
 
+@pytest.mark.parametrize("name", ["run.jsonl", "run.jsonl.gz"])
+def test_delta_checkpoints_fold_back_to_every_saved_snapshot(tmp_path, monkeypatch, name):
+    from dm_agent.core import checkpoint_delta
+    from dm_agent.core.persistence import RunPersistence
+
+    monkeypatch.setattr(checkpoint_delta, "KEYFRAME_INTERVAL", 5)
+    saved: list[dict] = []
+    original_save = RunPersistence.save
+
+    def recording_save(self, path, checkpoint):
+        saved.append(json.loads(json.dumps(checkpoint.to_dict())))
+        original_save(self, path, checkpoint)
+
+    monkeypatch.setattr(RunPersistence, "save", recording_save)
+    checkpoint_path = tmp_path / name
+    _checkpoint_compaction_run(checkpoint_path)
+
+    checkpoints = [
+        entry for entry in load_session_entries(checkpoint_path) if entry["event"] == "checkpoint"
+    ]
+    assert len(checkpoints) == len(saved) > 5
+    keyframes = [index for index, entry in enumerate(checkpoints) if "state" in entry["payload"]]
+    assert keyframes == list(range(0, len(checkpoints), 5))
+    # 新增的历史消息引用本文件里的 message 条目，不再重复存全文。
+    assert any(
+        entry["payload"]["delta"]["d"]["conversation_history"].get("r")
+        for entry in checkpoints
+        if "delta" in entry["payload"]
+    )
+    for entry, expected in zip(checkpoints, saved, strict=True):
+        assert load_resume_state(checkpoint_path, at=entry["id"]).to_dict() == expected
+
+
 def test_checkpoint_only_jsonl_contains_a_complete_viewable_session(tmp_path):
     checkpoint_path = tmp_path / "run.jsonl"
 
@@ -572,6 +661,330 @@ def test_checkpoint_session_sink_failure_warns_and_does_not_abort_the_run(tmp_pa
     assert capsys.readouterr().out.count("checkpoint 会话写入失败") == 1
 
 
+def _line_count(path):
+    return len(path.read_text(encoding="utf-8").splitlines()) if path.exists() else 0
+
+
+def test_group_commit_buffers_entries_until_a_commit_point(tmp_path):
+    trace_path = tmp_path / "buffered.jsonl"
+    writer = TraceWriter(trace_path, flush_every=3)
+    writer.start_run("buffered")
+    writer.record("note", {"index": 1})
+    assert _line_count(trace_path) == 0
+
+    writer.record("note", {"index": 2})
+    assert _line_count(trace_path) == 3
+
+    writer.record("note", {"index": 3})
+    writer.flush()
+    assert _line_count(trace_path) == 4
+
+    writer.record("note", {"index": 4})
+    writer.finish_run({"final_answer": "ok", "metadata": {"status": "success"}})
+    assert _line_count(trace_path) == 6
+
+    writer.record("note", {"index": 5})
+    writer.close()
+    entries = load_session_entries(trace_path)
+    assert [entry["event"] for entry in entries][-2:] == ["run_end", "note"]
+    assert all(
+        entries[index]["parent_id"] == entries[index - 1]["id"] for index in range(1, len(entries))
+    )
+
+
+def test_fsync_policy_syncs_only_at_commit_points(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("dm_agent.tracing.writer.os.fsync", lambda fd: synced.append(fd))
+
+    writer = TraceWriter(tmp_path / "durable.jsonl", fsync="checkpoint")
+    writer.start_run("durable")
+    writer.record("note", {})
+    assert synced == []
+    writer.record_checkpoint_state(step_number=1, state={"task": "durable"})
+    writer.finish_run({"final_answer": "ok", "metadata": {}})
+    assert len(synced) == 2
+    writer.close()
+
+    with pytest.raises(ValueError):
+        TraceWriter(tmp_path / "bad.jsonl", fsync="sometimes")
+
+
+def test_buffered_session_is_flushed_before_each_model_request(tmp_path):
+    trace_path = tmp_path / "live.jsonl"
+    checkpoint_path = tmp_path / "live.checkpoint.jsonl"
+    visible = []
+
+    class TailingClient(FakeRespondClient):
+        def respond(self, messages, **extra):
+            # 跟读者（SSE）在模型等待期间应能看到此前的全部条目。
+            visible.append((_line_count(trace_path), writer._seq))
+            return super().respond(messages, **extra)
+
+    writer = TraceWriter(trace_path, flush_every=1000, flush_interval_ms=60_000)
+    agent = ReactAgent(
+        TailingClient([_action("echo", {"text": "a"}), _action("finish", {"answer": "done"})]),
+        _tools(),
+        enable_planning=False,
+        trace_writer=writer,
+    )
+    agent.run("tail me", checkpoint_path=checkpoint_path)
+    sink = agent.trace_writer._sinks["checkpoint"]
+
+    assert len(visible) == 2
+    assert all(lines == written for lines, written in visible)
+    assert load_session_entries(trace_path)[-1]["event"] == "run_end"
+    assert sink._handle is None
+    assert [e["event"] for e in load_session_entries(checkpoint_path)][-1] == "run_end"
+    writer.close()
+
+
+def test_background_writer_keeps_order_ids_and_compaction_mapping(tmp_path):
+    trace_path = tmp_path / "bg.trace.jsonl"
+    checkpoint_path = tmp_path / "bg.checkpoint.jsonl"
+    responses = [_action("echo", {"text": f"turn {index}"}) for index in range(12)]
+    responses.append(_action("finish", {"answer": "done"}))
+    session = SessionWriter(
+        TraceWriter(trace_path, background=True, queue_size=2), background=True, queue_size=2
+    )
+    agent = ReactAgent(
+        FakeRespondClient(responses),
+        _tools(),
+        enable_planning=False,
+        enable_compression=True,
+        context_token_budget=60,
+        trace_writer=session,
+    )
+    result = agent.run("echo in the background", max_steps=20, checkpoint_path=checkpoint_path)
+    # finish_run 返回时 run_end 已经落盘，无需先 close。
+    assert load_session_entries(trace_path)[-1]["event"] == "run_end"
+    session.close()
+
+    assert result["metadata"]["status"] == "success"
+    for path in (trace_path, checkpoint_path):
+        entries = load_session_entries(path)
+        message_ids = {entry["id"] for entry in message_entries(entries)}
+        assert [int(entry["id"].rsplit("-", 1)[1]) for entry in entries] == list(
+            range(1, len(entries) + 1)
+        )
+        assert all(
+            entries[index]["parent_id"] == entries[index - 1]["id"]
+            for index in range(1, len(entries))
+        )
+        compactions = [entry["payload"] for entry in entries if entry["event"] == "compaction"]
+        assert compactions
+        for compaction in compactions:
+            assert compaction["first_kept_entry_id"] in message_ids
+
+
+def test_background_writer_snapshots_payloads_before_queueing(tmp_path):
+    trace_path = tmp_path / "snapshot.jsonl"
+    writer = TraceWriter(trace_path, background=True)
+    payload = {"metadata": {"status": "running"}, "items": [1]}
+    entry_id = writer.record("note", payload)
+    payload["metadata"]["status"] = "mutated"
+    payload["items"].append(2)
+    writer.close()
+
+    (entry,) = load_session_entries(trace_path)
+    assert entry["id"] == entry_id
+    assert entry["payload"] == {"metadata": {"status": "running"}, "items": [1]}
+
+
+def test_background_checkpoint_sink_failure_falls_back_like_the_sync_sink(
+    tmp_path, monkeypatch, capsys
+):
+    checkpoint_path = tmp_path / "failing.jsonl"
+    original = TraceWriter._write_entry
+
+    def failing_write(self, envelope, payload, redact):
+        if self.path == checkpoint_path:
+            raise OSError("disk full")
+        original(self, envelope, payload, redact)
+
+    monkeypatch.setattr(TraceWriter, "_write_entry", failing_write)
+    trace_path = tmp_path / "ok.jsonl"
+    session = SessionWriter(TraceWriter(trace_path, background=True), background=True)
+    agent = ReactAgent(
+        FakeRespondClient([_action("echo", {"text": "a"}), _action("finish", {"answer": "ok"})]),
+        _tools(),
+        enable_planning=False,
+        enable_compression=False,
+        trace_writer=session,
+    )
+
+    result = agent.run("checkpoint write fails off-thread", checkpoint_path=checkpoint_path)
+    session.close()
+
+    assert result["metadata"]["status"] == "success"
+    assert capsys.readouterr().out.count("checkpoint 会话写入失败") == 1
+    assert load_session_entries(trace_path)[-1]["event"] == "run_end"
+
+
+def test_compressed_session_logs_round_trip_resume_and_fork(tmp_path):
+    trace_path = tmp_path / "run.trace.jsonl.gz"
+    checkpoint_path = tmp_path / "run.checkpoint.jsonl.gz"
+    writer = TraceWriter(trace_path, flush_every=4)
+    agent = ReactAgent(
+        FakeRespondClient([_action("echo", {"text": "a"}), _action("finish", {"answer": "ok"})]),
+        _tools(),
+        enable_planning=False,
+        enable_compression=False,
+        trace_writer=writer,
+    )
+    agent.run("compressed", checkpoint_path=checkpoint_path)
+    writer.close()
+
+    for path in (trace_path, checkpoint_path):
+        entries = load_session_entries(path)
+        assert entries[-1]["event"] == "run_end"
+        # 多 member gzip 是标准格式，标准库直接能读出同一份 JSONL。
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            assert [json.loads(line)["id"] for line in handle] == [e["id"] for e in entries]
+    assert load_trace_events(trace_path) == load_session_entries(trace_path)
+
+    state = load_resume_state(checkpoint_path)
+    assert state.task == "compressed"
+
+    result = fork_session(
+        load_session_entries(checkpoint_path),
+        source=checkpoint_path,
+        at=load_session_entries(checkpoint_path)[2]["id"],
+    )
+    assert result["output"].endswith(".jsonl.gz")
+    assert load_session_entries(result["output"])[-1]["event"] == "fork"
+
+
+def test_compressed_reader_stops_at_a_partially_written_member(tmp_path):
+    path = tmp_path / "tail.jsonl.gz"
+    first = compress_block(b'{"event": "run_start"}\n')
+    second = compress_block(b'{"event": "run_end"}\n')
+    path.write_bytes(first + second[:10])
+
+    data, offset = read_appended(path, 0)
+    assert data == b'{"event": "run_start"}\n'
+    assert offset == len(first)
+    assert read_appended(path, offset) == (b"", offset)
+    assert [entry["event"] for entry in load_session_entries(path)] == ["run_start"]
+
+    with path.open("ab") as handle:
+        handle.write(second[10:])
+    assert read_appended(path, offset) == (b'{"event": "run_end"}\n', len(first) + len(second))
+
+
+def test_compressed_readers_decode_many_members_and_members_larger_than_a_read(tmp_path):
+    lines = [f'{{"event": "tool", "n": {index}}}\n'.encode() for index in range(3000)]
+    big = b"".join(lines)
+    path = tmp_path / "many.jsonl.gz"
+    data = b"".join(compress_block(line) for line in lines) + compress_block(big)
+    path.write_bytes(data + compress_block(b"partial\n")[:8])
+
+    assert decode_members(data) == (big + big, len(data))
+    # 读块比单个 member 小：缓冲翻倍，直到读出完整的 member；不完整的结尾不产出。
+    blocks = list(iter_log_blocks(path, chunk_size=512))
+    assert b"".join(block for block, _ in blocks) == big + big
+    assert blocks[-1][1] == len(data)
+
+
+def test_iter_log_entries_resumes_from_the_last_offset_in_both_formats(tmp_path):
+    lines = [f'{{"event": "tool", "n": {index}}}\n'.encode() for index in range(40)]
+    plain = tmp_path / "run.jsonl"
+    plain.write_bytes(b"".join(lines) + b'{"event": "run_')
+    packed = tmp_path / "run.jsonl.gz"
+    packed.write_bytes(compress_block(b"".join(lines[:25])) + compress_block(b"".join(lines[25:])))
+
+    for path in (plain, packed):
+        # 小读块让行跨块；从任一产出的偏移续读都不漏后面的条目，最后一个偏移读不出新条目。
+        pairs = list(iter_log_entries(path, chunk_size=64))
+        assert [entry["n"] for entry, _ in pairs] == list(range(40))
+        for index, (_, offset) in enumerate(pairs):
+            resumed = [entry["n"] for entry, _ in iter_log_entries(path, offset)]
+            assert resumed[len(resumed) - (39 - index) :] == list(range(index + 1, 40))
+        assert list(iter_log_entries(path, pairs[-1][1])) == []
+
+    # 半行不产出，偏移停在它前面；写完之后从该偏移读出这一条。
+    offset = list(iter_log_entries(plain))[-1][1]
+    assert offset == len(b"".join(lines))
+    with plain.open("ab") as handle:
+        handle.write(b'end"}')
+    assert list(iter_log_entries(plain, offset)) == [({"event": "run_end"}, plain.stat().st_size)]
+
+
+def test_compressed_writer_group_commits_by_default(tmp_path):
+    assert TraceWriter(tmp_path / "plain.jsonl").flush_every == 1
+    assert TraceWriter(tmp_path / "run.jsonl.gz").flush_every == 64
+    assert TraceWriter(tmp_path / "run.jsonl.gz", flush_every=1).flush_every == 1
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_session_index_serves_the_same_entries_as_a_full_parse(tmp_path, suffix):
+    checkpoint_path = tmp_path / f"run{suffix}"
+    session = SessionWriter(flush_every=3)
+    agent = ReactAgent(
+        FakeRespondClient(
+            [
+                _action("echo", {"text": "a"}),
+                _action("echo", {"text": "b"}),
+                _action("finish", {"answer": "ok"}),
+            ]
+        ),
+        _tools(),
+        enable_planning=False,
+        enable_compression=False,
+        trace_writer=session,
+    )
+    agent.run("indexed", checkpoint_path=checkpoint_path)
+    session.close()
+
+    # 写侧随组提交追加索引，读侧不需要重建。
+    sidecar = index_path_for(checkpoint_path)
+    written = sidecar.read_text(encoding="utf-8")
+    entries = load_session_entries(checkpoint_path)
+    index = SessionIndex.load(checkpoint_path)
+    assert sidecar.read_text(encoding="utf-8") == written
+    assert len(index) == len(entries)
+    assert index.entries() == entries
+    assert index.entries(2, 5) == entries[2:5]
+
+    middle = entries[len(entries) // 2]["id"]
+    position = index.find(middle)
+    assert position == find_entry_index(entries, middle)
+    checkpoint_position = index.latest("checkpoint", until=position)
+    assert checkpoint_position is not None
+    assert index.entry(checkpoint_position) == latest_checkpoint_entry(
+        entries, until_entry_id=middle
+    )
+
+    result = fork_session_at(index, source=checkpoint_path, at=middle)
+    assert load_session_entries(result["output"])[:-1] == entries[: position + 1]
+    assert result["resumable_checkpoint_entry_id"] == entries[checkpoint_position]["id"]
+
+
+def test_session_index_rebuilds_legacy_and_replaced_logs_and_reads_unindexed_tails(tmp_path):
+    path = tmp_path / "legacy.jsonl"
+    lines = [json.dumps({"event": "run_start", "payload": {"task": "old"}}), ""]
+    lines += [json.dumps({"event": "step", "payload": {"step_number": n}}) for n in (1, 2)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    index = SessionIndex.load(path)
+    assert index_path_for(path).is_file()
+    assert index.entries() == load_session_entries(path)
+    assert index.find("legacy-0002") == 2
+
+    # 别的进程追加、边车没跟上：读侧现场扫描尾部，结果仍与全量解析一致。
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps({"event": "run_end", "payload": {"status": "success"}}) + "\n")
+    assert SessionIndex.load(path).entries() == load_session_entries(path)
+
+    # 整份替换成另一次运行：首末条目对不上，索引作废重建。
+    with TraceWriter(tmp_path / "other.jsonl", index=False) as writer:
+        writer.record("run_start", {"task": "replaced"})
+        writer.record("run_end", {"status": "success"})
+    path.write_bytes((tmp_path / "other.jsonl").read_bytes() * 3)
+    rebuilt = SessionIndex.load(path)
+    assert rebuilt.entries() == load_session_entries(path)
+    assert rebuilt.count("run_end") == 3
+
+
 def test_resume_from_a_session_checkpoint_continues_the_run(tmp_path):
     from dm_agent.core.persistence import load_resume_state
 
@@ -774,3 +1187,59 @@ def test_legacy_traces_still_work_with_view_analyze_and_replay(tmp_path):
     assert trace_main(["view", str(legacy_path), "--json"]) == 0
     assert trace_main(["analyze", str(legacy_path), "--json"]) == 0
     assert trace_main(["replay", str(legacy_path)]) == 0
+
+
+def test_blob_store_dedupes_large_strings_and_readers_resolve_them(tmp_path):
+    from dm_agent.tracing.blobs import BlobStore, blob_dir_for
+
+    trace_path = tmp_path / "run.trace.jsonl"
+    checkpoint_path = tmp_path / "run.jsonl.gz"
+    big = "x" * 3000
+    writer = SessionWriter(TraceWriter(trace_path, blob_threshold=512), blob_threshold=512)
+    agent = ReactAgent(
+        FakeRespondClient(
+            [_action("echo", {"text": big}) for _ in range(3)]
+            + [_action("finish", {"answer": "ok"})]
+        ),
+        _tools(),
+        enable_planning=False,
+        enable_compression=False,
+        trace_writer=writer,
+    )
+    result = agent.run(
+        "echo the same file three times", max_steps=5, checkpoint_path=checkpoint_path
+    )
+    writer.close()
+    assert result["metadata"]["status"] == "success"
+
+    raw = load_session_entries(trace_path, resolve_blobs=False)
+    refs = [
+        entry["payload"]["observation"]
+        for entry in raw
+        if entry["event"] == "tool_call" and entry["payload"].get("action") == "echo"
+    ]
+    # 三次相同的观察只存了一份 blob。
+    assert len({ref["$blob"] for ref in refs}) == 1 and refs[0]["chars"] == len(f"echo:{big}")
+    assert len(list(blob_dir_for(trace_path).iterdir())) < len(raw)
+    assert big not in trace_path.read_text(encoding="utf-8")
+
+    resolved = load_session_entries(trace_path)
+    observations = [e["payload"]["observation"] for e in resolved if e["event"] == "tool_call"]
+    assert observations[0] == f"echo:{big}"
+    assert rebuild_context(raw, blobs=BlobStore.for_log(trace_path)) == rebuild_context(resolved)
+    assert SessionIndex.load(trace_path).entries() == resolved
+
+    state = load_resume_state(checkpoint_path)
+    assert state.steps[-1]["observation"] == f"echo:{big}"
+    history = state.conversation_history
+    assert len(history) > 3 and history == agent.conversation_history[: len(history)]
+
+    for blob in blob_dir_for(checkpoint_path).iterdir():
+        blob.unlink()
+    with pytest.raises(ValueError, match="missing blob"):
+        load_resume_state(checkpoint_path)
+    # 查看类读取不因缺 blob 失败，只换成占位。
+    assert any(
+        "<blob:" in str(entry["payload"].get("observation", ""))
+        for entry in load_session_entries(checkpoint_path)
+    )
@@ -0,0 +1,137 @@
+"""只读分析工具的结果缓存：指纹校验、写感知失效、计数与持久化。"""
+
+from __future__ import annotations
+
+import json
+import os
+
+from dm_agent.core.agent import ReactAgent
+from dm_agent.core.tool_cache import ToolResultCache
+from dm_agent.tools import default_tools
+from dm_agent.tools.base import Tool
+from dm_agent.tools.code_analysis_tools import parse_ast
+from dm_agent.tracing import TraceWriter, load_trace_events
+
+
+class FakeRespondClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.model = "fake-model"
+
+    def respond(self, messages, **extra):
+        return self.responses.pop(0)
+
+
+def _action(action, action_input):
+    return json.dumps({"thought": "t", "action": action, "action_input": action_input})
+
+
+def test_repeated_analysis_hits_the_cache_until_the_file_is_written(tmp_path):
+    (tmp_path / "mod.py").write_text("def a():\n    return 1\n", encoding="utf-8")
+    script = [
+        _action("parse_ast", {"path": "mod.py"}),
+        _action("parse_ast", {"path": "mod.py"}),
+        _action("read_file", {"path": "mod.py"}),
+        _action("edit_file", {"path": "mod.py", "old_string": "def a", "new_string": "def b"}),
+        _action("parse_ast", {"path": "mod.py"}),
+        _action("finish", {"answer": "renamed the function"}),
+    ]
+    trace_path = tmp_path / "trace.jsonl"
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            FakeRespondClient(script),
+            default_tools(include_mcp=False),
+            enable_planning=False,
+            enable_compression=False,
+            trace_writer=writer,
+            workspace=tmp_path,
+        )
+        result = agent.run("rename", max_steps=8)
+
+    metadata = result["metadata"]
+    assert metadata["tool_cache_hits"] == 1
+    assert metadata["tool_cache_misses"] == 2
+    assert metadata["tool_cache_invalidations"] == 1
+    observations = [step["observation"] for step in result["steps"]]
+    assert observations[0] == observations[1]
+    assert '"name": "b"' in observations[4]
+
+    calls = [
+        event["payload"] for event in load_trace_events(trace_path) if event["event"] == "tool_call"
+    ]
+    cached = [call.get("cached", False) for call in calls if call.get("action") == "parse_ast"]
+    assert cached == [False, True, False]
+
+
+def test_fingerprint_tolerates_touch_but_not_content_changes(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("x = 1\n", encoding="utf-8")
+    cache = ToolResultCache()
+    tool = Tool("parse_ast", "Parse", parse_ast)
+    key, target = cache.key_for(tool, "parse_ast", {"path": str(source)})
+    cache.put(key, target, "first")
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert cache.get(key) == "first"
+
+    source.write_text("y = 2\n", encoding="utf-8")
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_execution_and_foreign_runners_are_never_trusted(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("x = 1\n", encoding="utf-8")
+    cache = ToolResultCache()
+    foreign = Tool("parse_ast", "Parse", lambda arguments: "custom")
+    assert cache.key_for(foreign, "parse_ast", {"path": str(source)}) is None
+
+    key, target = cache.key_for(
+        Tool("parse_ast", "Parse", parse_ast), "parse_ast", {"path": str(source)}
+    )
+    cache.put(key, target, "parsed")
+    assert cache.note_action("read_file", {"path": str(source)}) == 0
+    assert cache.note_action("run_shell", {"command": "touch mod.py"}) == 1
+    assert cache.get(key) is None
+
+
+def test_persistent_cache_survives_a_new_instance(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("x = 1\n", encoding="utf-8")
+    cache_path = tmp_path / "cache" / "tools.json"
+    tool = Tool("parse_ast", "Parse", parse_ast)
+
+    first = ToolResultCache(cache_path)
+    key, target = first.key_for(tool, "parse_ast", {"path": str(source)})
+    first.put(key, target, "parsed")
+    first.save()
+
+    second = ToolResultCache(cache_path)
+    assert second.get(key) == "parsed"
+    source.write_text("x = 2\n", encoding="utf-8")
+    assert ToolResultCache(cache_path).get(key) is None
+
+
+def test_find_dependencies_is_not_cached_because_sibling_modules_change_its_output(tmp_path):
+    (tmp_path / "main.py").write_text("import helper\n", encoding="utf-8")
+    script = [
+        _action("find_dependencies", {"path": "main.py"}),
+        _action("create_file", {"path": "helper/__init__.py", "content": "X = 1\n"}),
+        _action("find_dependencies", {"path": "main.py"}),
+        _action("finish", {"answer": "done"}),
+    ]
+    agent = ReactAgent(
+        FakeRespondClient(script),
+        default_tools(include_mcp=False),
+        enable_planning=False,
+        enable_compression=False,
+        workspace=tmp_path,
+    )
+    result = agent.run("deps", max_steps=5)
+
+    before = json.loads(result["steps"][0]["observation"])
+    after = json.loads(result["steps"][2]["observation"])
+    assert before["third_party"] == ["helper"]
+    assert after["local_modules"] == ["helper"]
+    assert result["metadata"]["tool_cache_misses"] == 0
@@ -1,18 +1,21 @@
 import json
+from pathlib import Path
 
 import pytest
 
 import dm_agent.tools.file_tools as file_tools_module
 from dm_agent.core.observation import is_failure_observation
 from dm_agent.tools import task_complete
+from dm_agent.tools.base import resolve_path, use_workspace
 from dm_agent.tools.code_analysis_tools import get_code_metrics, get_function_signature, parse_ast
 from dm_agent.tools.code_index_tools import build_code_index, dependency_graph, search_symbol
-from dm_agent.tools.execution_tools import available_linters, run_linter, run_python
+from dm_agent.tools.execution_tools import available_linters, run_linter, run_python, run_shell
 from dm_agent.tools.file_tools import (
     EDIT_ECHO_MAX_LINES,
     _atomic_write_text,
     create_file,
     edit_file,
+    list_directory,
     read_file,
     search_in_file,
 )
@@ -321,6 +324,24 @@ def test_run_python_accepts_script_args(tmp_path):
     assert "returncode: 0" in result
 
 
+def test_tools_resolve_relative_paths_against_the_bound_workspace(tmp_path):
+    other = tmp_path / "elsewhere.txt"
+    other.write_text("absolute", encoding="utf-8")
+    script = tmp_path / "ws" / "pkg" / "show.py"
+
+    with use_workspace(tmp_path / "ws"):
+        assert create_file({"path": "pkg/show.py", "content": "print('from ws')\n"}).startswith(
+            "已将 17 个字符写入 pkg/show.py"
+        )
+        assert read_file({"path": str(other)}) == "absolute"
+        assert "from ws" in run_python({"path": "pkg/show.py"})
+        assert list_directory({"path": "pkg"}) == "show.py"
+        assert run_shell({"command": "ls pkg"}).startswith("show.py")
+
+    assert script.read_text(encoding="utf-8") == "print('from ws')\n"
+    assert resolve_path("pkg/show.py") == Path("pkg/show.py")
+
+
 def test_atomic_write_replaces_content_without_tmp_residue(tmp_path):
     target = tmp_path / "atomic.txt"
     target.write_text("before", encoding="utf-8")
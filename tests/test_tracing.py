@@ -3,9 +3,12 @@ import os
 from contextlib import contextmanager
 from pathlib import Path
 
+import pytest
+
 from dm_agent.cli import Config, write_run_report
 from dm_agent.core.agent import ReactAgent
 from dm_agent.tools import default_tools
+from dm_agent.tools.base import Tool
 from dm_agent.tracing import TraceWriter, load_trace_events
 from dm_agent.tracing.cli import (
     analyze_events,
@@ -16,6 +19,7 @@ from dm_agent.tracing.cli import (
     summarize_events,
 )
 from dm_agent.tracing.cli import main as trace_main
+from dm_agent.tracing.redaction import Redactor, benchmark_redaction, sample_tool_call_payload
 
 
 class FakeRespondClient:
@@ -539,3 +543,308 @@ def test_run_report_writes_human_readable_markdown(tmp_path):
     assert "trace.jsonl" in text
     assert "Dirty entries before run: `1`" in text
     assert "?? new_file.py" in text
+
+
+def test_agent_records_per_step_phase_timings_and_analysis_reports_percentiles(tmp_path):
+    trace_path = tmp_path / "timed.jsonl"
+    responses = [
+        json.dumps({"thought": "read", "action": "echo", "action_input": {"text": "a"}}),
+        json.dumps({"thought": "done", "action": "finish", "action_input": {"answer": "ok"}}),
+    ]
+    with TraceWriter(trace_path) as writer:
+        agent = ReactAgent(
+            FakeRespondClient(responses),
+            [Tool("echo", "Echo", lambda arguments: "echoed")],
+            enable_planning=False,
+            enable_compression=False,
+            trace_writer=writer,
+        )
+        agent.run("echo", max_steps=3)
+
+    events = load_trace_events(trace_path)
+    timings = [event["payload"] for event in events if event["event"] == "step_timing"]
+    assert [timing["step_number"] for timing in timings] == [1, 2]
+    assert "llm_wait" in timings[0]["phases"]
+    assert "tool_execution" in timings[0]["phases"]
+    assert [tool["action"] for tool in timings[0]["tools"]] == ["echo"]
+    for timing in timings:
+        assert sum(timing["phases"].values()) == pytest.approx(timing["total_seconds"], abs=1e-3)
+
+    latency = analyze_events(events)["latency"]
+    assert latency["step_count"] == 2
+    assert set(latency["tools"]) == {"echo"}
+    assert latency["phases"]["llm_wait"]["count"] == 2
+
+
+def test_trace_analyze_dir_pools_latency_samples_across_traces(tmp_path, capsys):
+    for name, seconds in [("a", [1.0, 2.0]), ("b", [3.0, 4.0, 5.0])]:
+        events = [{"run_id": name, "event": "run_start", "payload": {"task": name}}]
+        for step, value in enumerate(seconds, start=1):
+            events.append(
+                {
+                    "run_id": name,
+                    "event": "step_timing",
+                    "payload": {
+                        "step_number": step,
+                        "total_seconds": value,
+                        "phases": {"llm_wait": value},
+                        "tools": [
+                            {"action": "read_file", "seconds": value, "cached": False},
+                            {"action": "parse_ast", "seconds": 0.0, "cached": True},
+                        ],
+                    },
+                }
+            )
+        (tmp_path / f"{name}.jsonl").write_text(
+            "".join(json.dumps(event) + "\n" for event in events), encoding="utf-8"
+        )
+
+    latency = analyze_trace_directory(tmp_path)["summary"]["latency"]
+
+    assert latency["step_count"] == 5
+    assert latency["phases"]["llm_wait"]["p50_seconds"] == 3.0
+    assert latency["phases"]["llm_wait"]["p95_seconds"] == pytest.approx(4.8)
+    assert list(latency["tools"]) == ["read_file"]
+
+    assert trace_main(["analyze-dir", str(tmp_path)]) == 0
+    assert (
+        "- Phase llm_wait: total=15.000s, p50=3.000s, p95=4.800s (n=5)" in capsys.readouterr().out
+    )
+    markdown = render_trace_directory_markdown(analyze_trace_directory(tmp_path))
+    assert "## Step Latency" in markdown
+    assert "| tool `read_file` | 5 | 15.000 | 3.000 | 4.800 |" in markdown
+
+
+def test_redactor_masks_env_secrets_home_and_key_value_pairs_in_one_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("DM_TEST_SERVICE_TOKEN", "tok-abcdef-123456")
+    monkeypatch.setenv("DM_TEST_SHORT_KEY", "abc")
+    redactor = Redactor(home="/home/dev")
+
+    assert redactor.redact_text("use tok-abcdef-123456 and abc in /home/dev/repo") == (
+        "use <redacted-env:DM_TEST_SERVICE_TOKEN> and abc in ~/repo"
+    )
+    assert redactor.redact_text("API_KEY=xyz, Token: t0k, password=secret=x") == (
+        "API_KEY=<redacted>, Token: <redacted>, password=<redacted>"
+    )
+    assert redactor.redact_text("Authorization: Bearer AbC.123-x ok") == (
+        "Authorization: Bearer <redacted> ok"
+    )
+    assert redactor.redact({"args": ("token=1", 2)}) == {"args": ["token=<redacted>", 2]}
+
+    trace_path = tmp_path / "redacted.jsonl"
+    with TraceWriter(trace_path) as writer:
+        writer.record("note", {"text": "key tok-abcdef-123456"})
+        writer.record_checkpoint_state(step_number=1, state={"text": "tok-abcdef-123456"})
+    payloads = [event["payload"] for event in load_trace_events(trace_path)]
+    assert payloads[0]["text"] == "key <redacted-env:DM_TEST_SERVICE_TOKEN>"
+    assert payloads[1]["state"]["text"] == "tok-abcdef-123456"
+
+    result = benchmark_redaction(sample_tool_call_payload(), redactor=redactor, rounds=3)
+    assert result["rounds"] == 3 and result["microseconds_per_record"] > 0
+
+
+def _record_recovering_run(writer):
+    writer.start_run("stream me")
+    writer.record("parse_error", {"step_number": 1, "error": "bad json", "response_chars": 9})
+    writer.record("replan", {"reason": "parse failed", "steps": []})
+    writer.record_tool_call(
+        step_number=2,
+        action="edit_file",
+        action_input={"path": "unread.py"},
+        observation="ok",
+    )
+    writer.record("step_timing", {"step_number": 2, "total_seconds": 0.5, "phases": {"llm": 0.4}})
+    writer.record("step", {"step_number": 2, "action": "run_tests", "observation": "passed"})
+    writer.record("step", {"step_number": 3, "action": "finish", "observation": "<finished>"})
+    writer.finish_run({"final_answer": "done", "metadata": {"status": "success"}})
+
+
+def _complete_events(path):
+    """Complete lines only, the way a live reader sees a file that is still being written."""
+    from dm_agent.tracing.compression import read_log_text
+
+    for line in read_log_text(path).split("\n"):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+@pytest.mark.parametrize("name", ["live.jsonl", "live.jsonl.gz"])
+def test_streaming_reducer_resumes_from_saved_state_on_appended_lines(tmp_path, name):
+    from dm_agent.tracing.analysis import TraceAnalysisReducer, reduce_trace_file
+
+    trace_path = tmp_path / name
+    with TraceWriter(trace_path, index=False) as writer:
+        writer.start_run("first run")
+        writer.record_tool_call(
+            step_number=1, action="read_file", action_input={"path": "a.py"}, observation="x"
+        )
+    first = reduce_trace_file(trace_path, keep_steps=True)
+    state = json.loads(json.dumps(first.to_state()))
+    assert first.offset == trace_path.stat().st_size
+
+    with TraceWriter(trace_path, index=False) as writer:
+        _record_recovering_run(writer)
+    if not name.endswith(".gz"):
+        # A half-written line is left for the next pass instead of failing it.
+        with trace_path.open("a", encoding="utf-8") as handle:
+            handle.write('{"event": "step", "payl')
+
+    resumed = reduce_trace_file(trace_path, state=state)
+    events = list(_complete_events(trace_path))
+    assert resumed.summary() == summarize_events(events)
+    assert resumed.analysis() == analyze_events(events)
+    assert resumed.analysis()["recovery"]["replanned_after_failure"] is True
+    assert TraceAnalysisReducer.from_state(resumed.to_state()).analysis() == resumed.analysis()
+
+    # The file was replaced: the saved state no longer describes it and is discarded.
+    trace_path.unlink()
+    with TraceWriter(trace_path, index=False) as writer:
+        _record_recovering_run(writer)
+        writer.record("note", {"text": "x" * 200})
+    fresh = reduce_trace_file(trace_path, state=resumed.to_state())
+    assert fresh.analysis() == analyze_events(load_trace_events(trace_path))
+
+
+def test_trace_cli_analyze_saves_and_reuses_reducer_state(tmp_path, capsys):
+    trace_path = tmp_path / "run.jsonl"
+    state_path = tmp_path / "state" / "run.json"
+    with TraceWriter(trace_path) as writer:
+        writer.start_run("cli stream")
+    assert trace_main(["analyze", str(trace_path), "--json", "--state", str(state_path)]) == 0
+    assert "missing_run_end" in json.loads(capsys.readouterr().out)["trace_health"]["issues"]
+    saved = json.loads(state_path.read_text(encoding="utf-8"))
+    assert saved["offset"] == trace_path.stat().st_size
+
+    with TraceWriter(trace_path) as writer:
+        _record_recovering_run(writer)
+    assert trace_main(["analyze", str(trace_path), "--json", "--state", str(state_path)]) == 0
+    expected = analyze_events(load_trace_events(trace_path))
+    assert json.loads(capsys.readouterr().out) == expected
+
+
+def test_analyze_dir_cache_and_process_pool_keep_the_report_identical(tmp_path, monkeypatch):
+    from dm_agent.tracing import analysis
+
+    traces = tmp_path / "traces"
+    traces.mkdir()
+    for index in range(3):
+        with TraceWriter(traces / f"run-{index}.jsonl", index=False) as writer:
+            _record_recovering_run(writer)
+    (traces / "broken.jsonl").write_text("not json\n{}\n", encoding="utf-8")
+    baseline = analyze_trace_directory(traces)
+    cache_path = tmp_path / "cache" / "analysis.json"
+
+    monkeypatch.setattr(analysis, "PARALLEL_MIN_TRACES", 2)
+    assert analyze_trace_directory(traces, workers=2, cache_path=cache_path) == baseline
+
+    reads: list[str] = []
+    original = analysis.reduce_trace_file
+
+    def counting(path, **kwargs):
+        reads.append(Path(path).name)
+        return original(path, **kwargs)
+
+    monkeypatch.setattr(analysis, "reduce_trace_file", counting)
+    assert analyze_trace_directory(traces, cache_path=cache_path) == baseline
+    assert reads == ["broken.jsonl"]  # failures are retried, never cached
+
+    reads.clear()
+    with TraceWriter(traces / "run-1.jsonl", index=False) as writer:
+        _record_recovering_run(writer)
+    report = analyze_trace_directory(traces, cache_path=cache_path)
+    assert reads == ["broken.jsonl", "run-1.jsonl"]
+    monkeypatch.setattr(analysis, "reduce_trace_file", original)
+    assert report == analyze_trace_directory(traces)
+    assert [item["path"] for item in report["analyses"]] == [
+        str(traces / f"run-{index}.jsonl") for index in range(3)
+    ]
+
+
+def _record_exported_run(writer, *, status, tokens):
+    writer.start_run("export me")
+    writer.record_llm_call(
+        step_number=1,
+        messages=[{"role": "user", "content": "hi"}],
+        temperature=0.0,
+        raw_response="{}",
+        timing={"time_to_first_token_seconds": 0.2},
+        usage={"prompt_tokens": tokens, "completion_tokens": 10, "cached_tokens": tokens // 2},
+    )
+    writer.record_tool_call(
+        step_number=1, action="read_file", action_input={}, observation="x" * 40
+    )
+    writer.record_tool_call(
+        step_number=1, action="run_tests", action_input={}, observation="boom", failed=True
+    )
+    writer.record(
+        "step_timing",
+        {
+            "step_number": 1,
+            "total_seconds": 1.5,
+            "phases": {"llm": 1.0, "tools": 0.5},
+            "tools": [
+                {"action": "read_file", "seconds": 0.1, "cached": False},
+                {"action": "run_tests", "seconds": 0.4, "cached": False},
+            ],
+        },
+    )
+    writer.record("step", {"step_number": 1, "action": "run_tests", "observation": "boom"})
+    writer.record_compaction(
+        {
+            "step_number": 1,
+            "trigger": "budget",
+            "phase": "pre_llm",
+            "estimated_tokens_before": 1000,
+            "estimated_tokens_after": 250,
+        }
+    )
+    writer.finish_run(
+        {"final_answer": "done", "metadata": {"status": status, "duration_seconds": 3.0}}
+    )
+
+
+def test_sqlite_export_ingests_incrementally_and_answers_canned_reports(tmp_path, capsys):
+    from dm_agent.tracing.export import connect_database, export_sessions, run_report
+
+    traces = tmp_path / "traces"
+    traces.mkdir()
+    for index, model in enumerate(["model-a", "model-b"]):
+        with TraceWriter(traces / f"run-{index}.jsonl", index=False) as writer:
+            writer.record("runtime", {"provider": "test", "model": model})
+            _record_exported_run(writer, status="success", tokens=100 * (index + 1))
+    database = tmp_path / "db" / "traces.sqlite"
+
+    assert trace_main(["export", str(traces), "--sqlite", str(database), "--json"]) == 0
+    first = json.loads(capsys.readouterr().out)
+    assert (first["files"], first["skipped"], first["errors"]) == (2, 0, [])
+
+    with TraceWriter(traces / "run-1.jsonl", index=False) as writer:
+        _record_exported_run(writer, status="max_steps_exceeded", tokens=500)
+    second = export_sessions(sorted(traces.glob("*.jsonl")), database)
+    assert (second["skipped"], second["reset"]) == (1, 0)
+    assert first["entries"] == 2 * (second["entries"] + 1)  # only the appended run was read
+    assert export_sessions(sorted(traces.glob("*.jsonl")), database)["entries"] == 0
+
+    connection = connect_database(database, readonly=True)
+    models = {row["model"]: row for row in run_report(connection, "models")}
+    assert models["model-a"]["runs"] == 1 and models["model-b"]["runs"] == 2
+    assert models["model-b"]["success_rate"] == 0.5
+    assert models["model-b"]["p95_tokens_per_success"] == 210  # the failed run is excluded
+    tools = {row["action"]: row for row in run_report(connection, "tools")}
+    assert tools["run_tests"]["failure_rate"] == 1.0 and tools["run_tests"]["calls"] == 3
+    assert tools["read_file"]["p95_seconds"] == 0.1
+    assert tools["read_file"]["avg_observation_chars"] == 40
+    compactions = run_report(connection, "compactions")
+    assert compactions[0]["compactions"] == 3 and compactions[0]["saved_ratio"] == 0.75
+    connection.close()
+
+    (traces / "run-0.jsonl").write_text("", encoding="utf-8")
+    assert export_sessions([traces / "run-0.jsonl"], database)["reset"] == 1
+    assert trace_main(["query", str(database), "models", "--json"]) == 0
+    rows = json.loads(capsys.readouterr().out)["rows"]
+    assert [row["model"] for row in rows] == ["model-b"]
+    assert trace_main(["query", str(database), "--sql", "SELECT COUNT(*) AS n FROM runs"]) == 0
+    assert capsys.readouterr().out.split() == ["n", "2"]